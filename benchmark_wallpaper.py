@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Wallpaper-apply latency benchmark.
+
+Starts a private dbus-daemon session bus with the fake plasmashell from
+tests/fake_plasmashell.py (in its own process, so it does not compete
+for our GIL) and measures end-to-end ``change_wallpaper()`` and
+``get_current_wallpaper()`` latency plus the number of subprocesses each
+call spawns, for every D-Bus backend / apply mode / screen count.
+
+Runs headless; needs ``dbus-daemon``, ``gdbus`` and ``jeepney``::
+
+    python3 benchmark_wallpaper.py --screens 1 3 4 --iterations 50 --delay 0.001
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from kwallpaper import plasma_dbus, wallpaper  # noqa: E402
+from tests.fake_plasmashell import PrivateSessionBus  # noqa: E402
+
+
+class SubprocessCounter:
+    """Count ``subprocess.run`` calls (what the gdbus backend costs)."""
+
+    def __init__(self):
+        self.count = 0
+        self._real_run = subprocess.run
+
+    def __enter__(self):
+        def counting_run(*args, **kwargs):
+            self.count += 1
+            return self._real_run(*args, **kwargs)
+        subprocess.run = counting_run
+        return self
+
+    def __exit__(self, *exc):
+        subprocess.run = self._real_run
+
+
+def start_fake_shell(bus: PrivateSessionBus, screens: int, delay: float):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "tests.fake_plasmashell",
+         "--screens", str(screens), "--delay", str(delay)],
+        cwd=str(Path(__file__).resolve().parent), env=bus.env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    if proc.stdout.readline().strip() != "ready":
+        proc.kill()
+        raise RuntimeError("fake plasmashell failed to start")
+    return proc
+
+
+def reset_state(backend: str, batch: bool) -> None:
+    plasma_dbus.close()
+    plasma_dbus.set_backend(backend)
+    wallpaper.set_batch_apply(batch)
+    wallpaper.invalidate_screen_topology()
+    wallpaper.invalidate_current_wallpaper()
+
+
+def measure(fn, iterations: int):
+    """(median ms, mean ms, subprocesses per call) for ``fn``."""
+    times = []
+    with SubprocessCounter() as counter, \
+            contextlib.redirect_stderr(io.StringIO()):
+        for i in range(iterations):
+            start = time.perf_counter()
+            fn(i)
+            times.append((time.perf_counter() - start) * 1000)
+    return (statistics.median(times), statistics.mean(times),
+            counter.count / iterations)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="kWallpaper D-Bus apply benchmark")
+    parser.add_argument("--screens", type=int, nargs="+", default=[1, 3, 4])
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--delay", type=float, default=0.0,
+                        help="fake plasmashell latency per call (seconds)")
+    parser.add_argument("--backends", nargs="+", default=["gdbus", "session"],
+                        choices=["gdbus", "session"])
+    args = parser.parse_args(argv)
+
+    print(f"{'screens':>7} {'backend':>8} {'mode':>10} {'operation':>22} "
+          f"{'median ms':>10} {'mean ms':>9} {'subproc/call':>13}")
+    with PrivateSessionBus() as bus:
+        os.environ["DBUS_SESSION_BUS_ADDRESS"] = bus.address
+        for screens in args.screens:
+            shell = start_fake_shell(bus, screens, args.delay)
+            try:
+                for backend in args.backends:
+                    for batch in (True, False):
+                        mode = "batched" if batch else "per-screen"
+                        reset_state(backend, batch)
+                        rows = [
+                            ("change_wallpaper", lambda i: wallpaper.change_wallpaper(
+                                f"/tmp/kwallpaper-bench-{i}.jpg")),
+                            ("get_current (D-Bus)",
+                             lambda i: wallpaper.get_current_wallpaper(refresh=True)),
+                            ("get_current (cached)",
+                             lambda i: wallpaper.get_current_wallpaper()),
+                        ]
+                        for name, fn in rows:
+                            median, mean, spawned = measure(fn, args.iterations)
+                            print(f"{screens:>7} {backend:>8} {mode:>10} {name:>22} "
+                                  f"{median:>10.2f} {mean:>9.2f} {spawned:>13.1f}")
+            finally:
+                plasma_dbus.close()
+                shell.stdin.close()
+                shell.wait(timeout=5)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,94 +1,268 @@
 #!/usr/bin/env python3
 """
-kWallpaper daily schedule backup.
+kWallpaper forward schedule backup.
 
-Persists the previous day's astral schedule so the app can still classify
+Persists the legacy model's sun times (dawn, sunrise, sunset, dusk) for
+the next :data:`BACKUP_DAYS` days so the app can still classify
 time-of-day when Astral is unavailable or fails at runtime.
 
-Exactly one backup file is kept at a time: ``schedule_backup.json``.  It
-always contains the most recent successful schedule (tagged with the date
-it was computed for) and is overwritten on every save.
+One backup file is kept: ``schedule_backup.json``.  It holds the
+location it was computed for and one entry per date::
+
+    {"version": 2, "generated": "2026-06-21",
+     "location": {"timezone": ..., "latitude": ..., "longitude": ...},
+     "days": {"2026-06-21": {"dawn": ..., "sunrise": ..., ...}, ...}}
+
+:func:`save_forward_backup` rewrites it at most once per day and
+location, and a lookup is a dict access by date, so an Astral failure is
+covered for a week instead of one day.
+
+Time-of-day detection never writes it.  Cycle runs call
+:func:`request_forward_backup`, a write-behind: the first request of a
+day (or for a new location) is handed to a background writer thread,
+every later one is a tuple comparison.  Pending writes are flushed
+briefly at interpreter exit so a one-shot CLI run still leaves its
+backup behind.
 """
 
-import json
+import atexit
 import logging
-from datetime import datetime, timedelta
+import queue
+import threading
+from datetime import date as _date, datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, Optional
-
-logger = logging.getLogger(__name__)
+from typing import Any, Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
 
+from kwallpaper import statefile
 from kwallpaper.config import DEFAULT_SCHEDULE_BACKUP_DIR
 
-#: Single rolling backup file (overwritten on every save).
+logger = logging.getLogger(__name__)
+
+#: Backup file (rewritten once per day).
 BACKUP_FILE_NAME = "schedule_backup.json"
 
+#: Days covered by the backup, starting today.
+BACKUP_DAYS = 7
 
-def get_daily_backup_path() -> Path:
-    """Get the path to the (single, rolling) schedule backup file."""
-    return DEFAULT_SCHEDULE_BACKUP_DIR / BACKUP_FILE_NAME
+BACKUP_VERSION = 2
 
+_BOUNDARY_KEYS = ('dawn', 'sunrise', 'sunset', 'dusk')
 
-def load_daily_backup_schedule() -> Optional[Dict[str, Any]]:
-    """Load the most recent backup schedule if it exists and is valid.
+# (date, location) of the backup this process last wrote or found current.
+_current: Optional[Tuple[str, Tuple[str, float, float]]] = None
 
-    The backup is only useful for the *previous* day's sun times, so a
-    backup whose date is older than yesterday is ignored (treated as
-    missing).
-    """
-    backup_path = get_daily_backup_path()
-    if not backup_path.exists():
-        return None
+# Seconds interpreter exit waits for a pending background write.
+EXIT_FLUSH_TIMEOUT = 2.0
+
+_enabled = True
+
+# Write-behind: one daemon thread draining a queue of (date, location)
+# stamps; _requested is the last stamp handed to it.
+_jobs: "queue.Queue[Tuple[_date, Tuple[str, float, float]]]" = queue.Queue()
+_requested: Optional[Tuple[str, Tuple[str, float, float]]] = None
+_lock = threading.Lock()
+_worker: Optional[threading.Thread] = None
+
+
+def set_enabled(enabled: bool) -> None:
+    """Enable/disable background backup writes (:func:`request_forward_backup`)."""
+    global _enabled
+    _enabled = bool(enabled)
 
+
+def get_daily_backup_path() -> Path:
+    """Get the path to the schedule backup file."""
+    return DEFAULT_SCHEDULE_BACKUP_DIR / BACKUP_FILE_NAME
+
+
+def _load_backup() -> Optional[Dict[str, Any]]:
+    """The backup document, or None when missing, invalid or outdated."""
     try:
-        with open(backup_path, 'r') as f:
-            backup = json.load(f)
-    except (json.JSONDecodeError, OSError):
+        backup = statefile.read_json(get_daily_backup_path())
+    except (OSError, ValueError):
         return None
-
-    # Validate JSON structure
-    if not isinstance(backup, dict):
+    if (not isinstance(backup, dict)
+            or backup.get('version') != BACKUP_VERSION
+            or not isinstance(backup.get('days'), dict)
+            or not isinstance(backup.get('location'), dict)):
         return None
+    return backup
 
-    # Validate required fields
-    required = ['dawn', 'sunrise', 'sunset', 'dusk', 'time_of_day', 'previous_date']
-    if not all(k in backup for k in required):
-        return None
 
-    # Only the previous day's schedule is usable as a fallback.
-    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-    if backup.get('previous_date') != yesterday:
-        return None
+def _location(backup: Dict[str, Any]) -> Tuple[str, float, float]:
+    loc = backup['location']
+    return (loc.get('timezone'), loc.get('latitude'), loc.get('longitude'))
 
-    return backup
 
+def save_forward_backup(timezone_str: str, lat: float, lon: float,
+                        today: Optional[_date] = None,
+                        days: int = BACKUP_DAYS) -> bool:
+    """Compute and store the next ``days`` days of sun times.
 
-def save_daily_backup_schedule(
-    dawn: Optional[datetime],
-    sunrise: Optional[datetime],
-    sunset: Optional[datetime],
-    dusk: Optional[datetime],
-    time_of_day: str
-) -> None:
-    """Save the current schedule to the single rolling backup file.
+    A no-op (no astral call, no write) when this process already saved
+    or found a backup generated ``today`` for the same location.  Days
+    Astral cannot compute keep their previous entry.
 
-    Overwrites any previous backup; the file is tagged with yesterday's
-    date (the schedule it stands in for when Astral is unavailable).
+    Returns:
+        True when the backup file was rewritten.
     """
-    DEFAULT_SCHEDULE_BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+    global _current
+    if today is None:
+        today = datetime.now(ZoneInfo(timezone_str)).date()
+    location = (timezone_str, lat, lon)
+    stamp = (today.isoformat(), location)
+    if _current == stamp:
+        return False
+
+    previous = _load_backup()
+    if (previous is not None and previous.get('generated') == stamp[0]
+            and _location(previous) == location):
+        _current = stamp
+        return False
 
-    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-    backup = {
-        'date': yesterday,
-        'dawn': dawn.isoformat() if dawn else None,
-        'sunrise': sunrise.isoformat() if sunrise else None,
-        'sunset': sunset.isoformat() if sunset else None,
-        'dusk': dusk.isoformat() if dusk else None,
-        'time_of_day': time_of_day,
-        'timestamp': datetime.now().isoformat(),
+    from kwallpaper.suntime import _fix_next_day, _real_sun_data
+
+    entries: Dict[str, Any] = {}
+    if previous is not None and _location(previous) == location:
+        entries = {k: v for k, v in previous['days'].items()
+                   if k >= (today - timedelta(days=1)).isoformat()}
+    computed = 0
+    for offset in range(days):
+        day = today + timedelta(days=offset)
+        sun = _real_sun_data(timezone_str, lat, lon, date=day)
+        if sun is None:
+            continue
+        _fix_next_day(sun)
+        entries[day.isoformat()] = {
+            key: sun[key].isoformat() if sun.get(key) else None
+            for key in _BOUNDARY_KEYS}
+        computed += 1
+    if not computed:
+        return False
+
+    DEFAULT_SCHEDULE_BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+    written = statefile.write_json(get_daily_backup_path(), {
+        'version': BACKUP_VERSION,
+        'generated': stamp[0],
+        'location': {'timezone': timezone_str, 'latitude': lat,
+                     'longitude': lon},
+        'days': dict(sorted(entries.items())),
         'source': 'astral',
-        'previous_date': yesterday
-    }
+    })
+    _current = stamp
+    logger.debug(f"Schedule backup covers {computed} day(s) from {stamp[0]}")
+    return written
+
+
+def request_forward_backup(timezone_str: str, lat: float, lon: float,
+                           today: Optional[_date] = None) -> bool:
+    """Have the background writer run :func:`save_forward_backup`.
+
+    Queues at most one write per day and location; every other call
+    returns at once.  A write that computes nothing (Astral failing)
+    lets the next request try again.
+
+    Returns:
+        True when a write was queued.
+    """
+    global _requested, _worker
+    if not _enabled:
+        return False
+    if today is None:
+        today = datetime.now(ZoneInfo(timezone_str)).date()
+    location = (timezone_str, lat, lon)
+    stamp = (today.isoformat(), location)
+    with _lock:
+        if _requested == stamp:
+            return False
+        _requested = stamp
+        _jobs.put((today, location))
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_write_loop, daemon=True,
+                                       name="kwallpaper-backup")
+            _worker.start()
+    return True
+
+
+def _write_loop() -> None:
+    global _requested
+    while True:
+        today, location = _jobs.get()
+        stamp = (today.isoformat(), location)
+        try:
+            save_forward_backup(*location, today=today)
+        except Exception:
+            logger.debug("Schedule backup write failed", exc_info=True)
+        finally:
+            with _lock:
+                if _current != stamp and _requested == stamp:
+                    _requested = None
+            _jobs.task_done()
+
+
+def wait_idle(timeout: Optional[float] = None) -> bool:
+    """Block until queued backup writes are done.  Returns False on
+    timeout."""
+    done = threading.Event()
+
+    def _join():
+        _jobs.join()
+        done.set()
+
+    threading.Thread(target=_join, daemon=True).start()
+    return done.wait(timeout)
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    if _jobs.unfinished_tasks:
+        wait_idle(EXIT_FLUSH_TIMEOUT)
+
 
-    with open(get_daily_backup_path(), 'w') as f:
-        json.dump(backup, f, indent=2)
+def backup_sun_for(day: _date) -> Optional[Dict[str, Optional[datetime]]]:
+    """Sun times stored for ``day`` (tz-aware datetimes), or None."""
+    backup = _load_backup()
+    if backup is None:
+        return None
+    entry = backup['days'].get(day.isoformat())
+    if not isinstance(entry, dict):
+        return None
+    try:
+        return {key: datetime.fromisoformat(entry[key]) if entry.get(key)
+                else None for key in _BOUNDARY_KEYS}
+    except (TypeError, ValueError):
+        return None
+
+
+def load_daily_backup_schedule(now: Optional[datetime] = None
+                               ) -> Optional[Dict[str, Any]]:
+    """The backed-up schedule for ``now`` (default: the current time).
+
+    Returns a dict with the day's ``dawn``/``sunrise``/``sunset``/``dusk``
+    and the ``time_of_day`` they give for ``now``, or None when the
+    backup has no entry for that date.
+    """
+    backup = _load_backup()
+    if backup is None:
+        return None
+    try:
+        tz = ZoneInfo(_location(backup)[0])
+    except Exception:
+        return None
+    if now is None:
+        now = datetime.now(tz)
+    elif now.tzinfo is None:
+        now = now.replace(tzinfo=tz)
+    else:
+        now = now.astimezone(tz)
+
+    sun = backup_sun_for(now.date())
+    if sun is None:
+        return None
+    from kwallpaper.suntime import time_of_day_for
+    return {
+        'date': now.date().isoformat(),
+        **sun,
+        'time_of_day': time_of_day_for(now, sun),
+    }
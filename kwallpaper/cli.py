@@ -14,18 +14,18 @@ import time
 from datetime import datetime
 from pathlib import Path
 from zoneinfo import ZoneInfo
-from typing import Optional
+from typing import Optional, Union
 
+from kwallpaper import state_store
+from kwallpaper.backup import request_forward_backup
 from kwallpaper.config import (
     DEFAULT_CONFIG_PATH,
     DEFAULT_THEMES_DIR,
     load_config,
-    save_config,
 )
 from kwallpaper.shuffle_list_manager import (
     check_day_passed,
     get_current_date,
-    load_theme_change_date,
 )
 from kwallpaper.suntime import (
     TIME_CATEGORIES,
@@ -33,15 +33,21 @@ from kwallpaper.suntime import (
     detect_time_of_day_sun,
 )
 from kwallpaper.selection import (
+    select_at,
     select_image_for_specific_time,
     select_image_for_time_cli,
 )
+from kwallpaper.snapshot import ConfigSnapshot, load_snapshot
 from kwallpaper.themes import (
     discover_themes,
     extract_theme,
     resolve_theme_path,
 )
-from kwallpaper.wallpaper import change_wallpaper, get_current_wallpaper
+from kwallpaper.wallpaper import (
+    change_wallpaper,
+    configure_from_config,
+    get_current_wallpaper,
+)
 
 
 def validate_time_of_day(time_of_day: str) -> bool:
@@ -87,13 +93,29 @@ def run_extract_command(args) -> int:
 # CHANGE COMMAND
 # ============================================================================
 
+def _set_wallpaper(args, image_path: str) -> bool:
+    """Set ``image_path`` through ``args.apply`` when the caller supplies
+    one (the scheduler's deadline-bounded async apply), else with the
+    synchronous :func:`change_wallpaper`."""
+    apply = getattr(args, 'apply', None)
+    if apply is not None:
+        return apply(image_path)
+    return change_wallpaper(image_path)
+
+
 def run_change_command(args) -> int:
     """Handle change subcommand with daily shuffler support."""
     try:
-        # Get timezone from config
-        config_path = Path(args.config) if args.config else DEFAULT_CONFIG_PATH
-        config = load_config(str(config_path))
-        timezone_str = config.get('location', {}).get('timezone', 'UTC')
+        # One snapshot of config + run state for the whole command
+        if args.config:
+            config_path_obj = Path(args.config).expanduser().resolve()
+        else:
+            config_path_obj = DEFAULT_CONFIG_PATH
+        snap = load_snapshot(config_path_obj)
+        config = snap.config_dict()
+        configure_from_config(config)
+        timezone_str = snap.timezone
+        shuffle = None
 
         # Check if manual theme path override is provided
         if args.theme_path:
@@ -122,8 +144,10 @@ def run_change_command(args) -> int:
             # same shuffle list consistently.
             from kwallpaper.core import _pick_theme_for_shuffle
             print("Using daily shuffler")
+            shuffle = snap.state_dict()["shuffle"]
             try:
-                theme_path = _pick_theme_for_shuffle(config, timezone_str)
+                theme_path = _pick_theme_for_shuffle(config, timezone_str,
+                                                     shuffle)
             except FileNotFoundError as e:
                 print(f"Error: {e}", file=sys.stderr)
                 return 1
@@ -156,23 +180,15 @@ def run_change_command(args) -> int:
                     theme_path = str(item.parent)
                     break
 
-        # Get config path (use --config if provided, otherwise default)
-        if args.config:
-            config_path_obj = Path(args.config).expanduser().resolve()
-        else:
-            config_path_obj = DEFAULT_CONFIG_PATH
-
-        config = load_config(str(config_path_obj))
-
         # Handle --time argument for specific time selection
         if args.time:
             try:
-                time_of_day = detect_time_of_day_for_time(args.time, str(config_path_obj))
+                time_of_day = detect_time_of_day_for_time(args.time, snap)
                 print(f"Selecting image for time: {args.time} ({time_of_day})")
-                image_path = select_image_for_specific_time(args.time, theme_path, str(config_path_obj))
+                image_path = select_image_for_specific_time(args.time, theme_path, snap)
                 print(f"Changing wallpaper to: {Path(image_path).name}")
-                if change_wallpaper(image_path):
-                    _persist_last_applied_image(str(config_path_obj), image_path)
+                if _set_wallpaper(args, image_path):
+                    _persist_run_state(str(config_path_obj), image_path)
                     print("Wallpaper changed successfully!")
                     return 0
                 else:
@@ -183,15 +199,14 @@ def run_change_command(args) -> int:
                 return 1
 
         # Always detect current time of day
-        timezone = config.get('location', {}).get('timezone', 'America/Phoenix')
-        now = datetime.now(ZoneInfo(timezone))
-        time_of_day = detect_time_of_day_sun(str(config_path_obj), now=now)
+        now = datetime.now(snap.tz)
+        time_of_day = detect_time_of_day_sun(snap, now=now)
 
         # Monitor mode
         if args.monitor:
             print(f"Starting continuous monitoring mode...")
             print(f"Theme: {Path(theme_path).name}")
-            monitor_interval = config['scheduling']['cycle_interval']
+            monitor_interval = snap.cycle_interval
             print(f"Time-of-day check interval: {monitor_interval} seconds")
             print("Press Ctrl+C to stop")
             print("-" * 60)
@@ -201,17 +216,17 @@ def run_change_command(args) -> int:
 
             while True:
                 try:
-                    time_of_day = detect_time_of_day_sun(str(config_path_obj), now=now)
-                    current_time_str = datetime.now(ZoneInfo(timezone)).strftime("%H:%M:%S")
+                    time_of_day = detect_time_of_day_sun(snap, now=now)
+                    current_time_str = datetime.now(snap.tz).strftime("%H:%M:%S")
 
                     if time_of_day != last_time_of_day:
                         print(f"\n[{current_time_str}] Time changed: {last_time_of_day} → {time_of_day}")
                         last_time_of_day = time_of_day
 
-                        image_path = select_image_for_time_cli(theme_path, str(config_path_obj))
+                        image_path = select_image_for_time_cli(theme_path, snap)
                         print(f"  → Changing wallpaper to: {Path(image_path).name}")
 
-                        if change_wallpaper(image_path):
+                        if _set_wallpaper(args, image_path):
                             print(f"  ✓ Wallpaper updated successfully")
                         else:
                             print(f"  ✗ Failed to update wallpaper", file=sys.stderr)
@@ -239,24 +254,15 @@ def run_change_command(args) -> int:
 
         # Single change mode - use time-based selection
         print(f"Selecting image for current time: {time_of_day}")
-        now = datetime.now(ZoneInfo(timezone))
-        image_path = select_image_for_time_cli(theme_path, str(config_path_obj))
+        image_path = select_image_for_time_cli(theme_path, snap)
         print(f"Changing wallpaper to: {image_path}")
 
-        if change_wallpaper(image_path):
-            # Persist the last-applied image now that the wallpaper is up
-            # (skip-if-unchanged state; "persist after success" rule).
-            _persist_last_applied_image(str(config_path_obj), image_path)
-            # Persist shuffle state only now that the wallpaper is up, so a
-            # failed change doesn't advance the list (the next run retries
-            # the same theme instead of skipping it).
-            if not args.theme_path:
-                from kwallpaper.core import commit_shuffle_state
-                try:
-                    commit_shuffle_state(config, timezone_str)
-                except Exception as e:
-                    print(f"Warning: failed to persist shuffle state: {e}",
-                          file=sys.stderr)
+        if _set_wallpaper(args, image_path):
+            # Persist the last-applied image and, in shuffler mode, the
+            # advanced shuffle position only now that the wallpaper is up
+            # ("persist after success": a failed change doesn't advance
+            # the list, so the next run retries the same theme).
+            _persist_run_state(str(config_path_obj), image_path, shuffle)
             print("Wallpaper changed successfully!")
             return 0
         else:
@@ -277,14 +283,18 @@ def run_change_command(args) -> int:
 # CYCLE COMMAND
 # ============================================================================
 
-def resolve_current_theme_dir(config: dict) -> Optional[Path]:
+def resolve_current_theme_dir(config: Union[ConfigSnapshot, dict],
+                              state: Optional[dict] = None) -> Optional[Path]:
     """Resolve the theme directory the next cycle run will use.
 
     Prefers the theme of the current D-Bus wallpaper; falls back to the
-    last-applied theme from config (covers the case where the wallpaper
-    was changed outside kWallpaper, e.g. the user picked a solid colour
-    or a random image in Plasma settings).  Returns None when neither
-    resolves to an existing theme directory.
+    last-applied theme from the run state (covers the case where the
+    wallpaper was changed outside kWallpaper, e.g. the user picked a
+    solid colour or a random image in Plasma settings).  ``config`` is a
+    ConfigSnapshot (which carries the run state) or a config dict with
+    the run-state document in ``state``; a dict without ``state`` falls
+    back to the legacy config ``theme.last_applied`` key.  Returns None
+    when neither resolves to an existing theme directory.
     """
     current_wallpaper = get_current_wallpaper()
     if current_wallpaper:
@@ -293,7 +303,12 @@ def resolve_current_theme_dir(config: dict) -> Optional[Path]:
         candidate = DEFAULT_THEMES_DIR / theme_name
         if candidate.exists():
             return candidate
-    last_applied = config.get('theme', {}).get('last_applied', '')
+    if isinstance(config, ConfigSnapshot):
+        last_applied = config.last_applied_theme
+    elif state is not None:
+        last_applied = state.get('last_applied', {}).get('theme', '')
+    else:
+        last_applied = config.get('theme', {}).get('last_applied', '')
     if last_applied:
         candidate = DEFAULT_THEMES_DIR / last_applied
         if candidate.exists():
@@ -311,22 +326,23 @@ def _same_image_path(a: str, b: str) -> bool:
         return a == b
 
 
-def _persist_last_applied_image(config_path: str, image_path: str) -> None:
-    """Persist ``theme.last_applied_image`` after a successful wallpaper
-    change.
+def _persist_run_state(config_path: str, image_path: str,
+                       shuffle: Optional[dict] = None) -> None:
+    """Commit the last-applied image (and the shuffle section the picker
+    advanced, if any) after a successful wallpaper change.
 
-    Mirrors the shuffle-list "persist after success" rule: a failed
-    change never updates the state, so the next run retries the same
-    image.  Persistence failure is non-fatal (the wallpaper is already
-    up); the worst case is one extra D-Bus call on the next run.
+    "Persist after success": a failed change never updates the state, so
+    the next run retries the same image/theme.  One state-store
+    transaction; persistence failure is non-fatal (the wallpaper is
+    already up), the worst case is one extra D-Bus call on the next run.
     """
     try:
-        config = load_config(config_path)
-        config.setdefault('theme', {})['last_applied_image'] = image_path
-        save_config(config_path, config)
+        with state_store.transaction(config_path) as state:
+            state['last_applied']['image'] = image_path
+            if shuffle is not None:
+                state['shuffle'] = shuffle
     except Exception as e:
-        print(f"Warning: failed to persist last-applied image: {e}",
-              file=sys.stderr)
+        print(f"Warning: failed to persist run state: {e}", file=sys.stderr)
 
 
 def run_cycle_command(args) -> int:
@@ -337,7 +353,13 @@ def run_cycle_command(args) -> int:
     theme and applies it.  Checking this every cycle (instead of a
     midnight cron job) means a missed midnight (suspend, reboot, app not
     running at 00:00) is picked up on the next cycle run.
+
+    The :class:`~kwallpaper.selection.Selection` the run made (image,
+    display window, next change instant) is left on ``args.selection``
+    (None when the run did not select, e.g. the daily shuffle) so the
+    scheduler can re-arm from it without selecting again.
     """
+    args.selection = None
     try:
         # Get config path
         if args.config:
@@ -345,20 +367,26 @@ def run_cycle_command(args) -> int:
         else:
             config_path_obj = DEFAULT_CONFIG_PATH
 
-        config = load_config(str(config_path_obj))
+        # Config and run state (shuffle position, last-applied
+        # theme/image): one read each, shared by every step below.
+        snap = load_snapshot(config_path_obj)
+        configure_from_config(snap.config_dict())
+
+        # Keep the forward schedule backup current: written by a
+        # background thread, at most once per day.
+        request_forward_backup(snap.timezone, snap.latitude, snap.longitude)
 
         # Daily shuffle check: if a new day has started since the last
         # theme change, shuffle to the next theme and apply it.
-        if config.get('scheduling', {}).get('daily_shuffle_enabled', True):
-            timezone_str = config.get('location', {}).get('timezone', 'UTC')
-            if check_day_passed(load_theme_change_date(),
-                                get_current_date(timezone_str)):
+        if snap.daily_shuffle:
+            if check_day_passed(snap.state['shuffle']['last_change_date'],
+                                get_current_date(snap.timezone)):
                 print("New day detected - shuffling to next theme")
                 return run_change_command(args)
 
         # Resolve the theme the run will use (current D-Bus wallpaper
-        # first, then the last-applied theme from config).
-        theme_dir = resolve_current_theme_dir(config)
+        # first, then the last-applied theme).
+        theme_dir = resolve_current_theme_dir(snap)
 
         if theme_dir is None:
             print(
@@ -369,21 +397,24 @@ def run_cycle_command(args) -> int:
             )
             return 1
 
-        # Select image for current time
-        image_path = select_image_for_time_cli(str(theme_dir), str(config_path_obj))
-        image_path_obj = Path(image_path)
+        # Select image for current time (and its next change, for the
+        # scheduler re-arm)
+        selection = select_at(theme_dir, snap)
+        args.selection = selection
+        image_path_obj = Path(selection.path)
 
         # Skip-if-unchanged: no D-Bus call when the selected image is the
-        # one we last applied (persisted in config; survives restarts).
-        # The daily-shuffle path above (run_change_command) always applies.
-        last_applied_image = config.get('theme', {}).get('last_applied_image', '')
+        # one we last applied (persisted in the state store; survives
+        # restarts).  The daily-shuffle path above (run_change_command)
+        # always applies.
+        last_applied_image = snap.last_applied_image
         if _same_image_path(last_applied_image, str(image_path_obj)):
             print(f"No change: already showing {image_path_obj.name}")
             return 0
 
-        if change_wallpaper(str(image_path_obj)):
+        if _set_wallpaper(args, str(image_path_obj)):
             print(f"Changed wallpaper to {image_path_obj.name}")
-            _persist_last_applied_image(str(config_path_obj), str(image_path_obj))
+            _persist_run_state(str(config_path_obj), str(image_path_obj))
             return 0
         else:
             print(f"Failed to change wallpaper to {image_path_obj.name}", file=sys.stderr)
@@ -411,10 +442,11 @@ def run_shuffle_list_command(args) -> int:
         # Get timezone from config
         config_path = Path(args.config) if args.config else DEFAULT_CONFIG_PATH
         config = load_config(str(config_path))
+        configure_from_config(config)
         timezone_str = config.get('location', {}).get('timezone', 'UTC')
 
         # Load shuffle list state
-        shuffle_state = load_shuffle_list()
+        shuffle_state = load_shuffle_list(str(config_path))
 
         shuffle_list = shuffle_state.get("shuffle_list", [])
         current_index = shuffle_state.get("current_index", 0)
@@ -552,8 +584,10 @@ def run_status_command(args) -> int:
             config_path_obj = DEFAULT_CONFIG_PATH
 
         config = load_config(str(config_path_obj))
+        configure_from_config(config)
 
-        wallpaper_path = get_current_wallpaper()
+        # Status is what the user sees: always ask Plasma, not the cache.
+        wallpaper_path = get_current_wallpaper(refresh=True)
 
         # Get time of day
         timezone = config.get('location', {}).get('timezone', 'America/Phoenix')
@@ -700,7 +734,8 @@ def run_themes_reshuffle(args) -> int:
         theme_paths = [path for _, path in themes]
         shuffle_list = create_initial_shuffle(theme_paths)
 
-        save_shuffle_list(shuffle_list, 0, get_current_date(timezone_str))
+        save_shuffle_list(shuffle_list, 0, get_current_date(timezone_str),
+                          str(config_path))
 
         print("Themes reshuffled successfully!")
         print(f"Total themes: {len(shuffle_list)}")
@@ -14,26 +14,47 @@ Config schema (v2)::
                     "timezone": "America/Phoenix" },
       "scheduling": { "cycle_interval": 60, "run_cycle": true,
                       "daily_shuffle_enabled": true },
-      "theme": { "last_applied": "" }
+      "theme": { "last_applied": "" },
+      "wallpaper": { "dbus_backend": "auto", "batch_apply": true,
+                     "revalidate_interval": 300, "apply_deadline": 10,
+                     "resolution_variants": true, "variant_scale": 1 }
     }
 
 Legacy v1 keys (top-level ``interval``/``retry_attempts``/``retry_delay``,
 ``scheduling.interval``, ``scheduling.auto_start_on_launch``,
 ``application.*``) are migrated in place on first load by
-:meth:`normalize_config`.  ``load_config`` never mutates the file itself;
+:meth:`normalize_config`.  Run state (``theme.last_applied*``, the shuffle
+list) lives in ``state.json`` (see :mod:`kwallpaper.state_store`); the
+``theme`` keys only seed it once.  ``load_config`` never mutates the file itself;
 callers that save will persist the normalized form.
 
 ``ensure_config_dirs()`` is idempotent and cheap: it only does filesystem
 work once per process (guarded by a module-level flag), so it can be called
 from any startup path without paying the cost of mkdir + default-config
 creation on every ``load_config()`` call.
+
+``load_config()`` is backed by an in-process cache keyed on the file's
+``(path, st_mtime_ns, st_size)``: one cycle run reads the config from
+half a dozen places, and only the first pays for the parse, validation
+and normalization; the rest cost one ``stat``.  Every call still returns
+its own deep copy, so callers may mutate (and save) what they get
+without affecting anyone else.  Entries whose mtime is within
+``_RACY_WINDOW_NS`` of the moment they were parsed are re-read, because a
+second write inside the filesystem's timestamp granularity would not
+change the key (the "racy clean" case).  :func:`config_cache_stats`
+reports hits and misses.
 """
 
 import copy
 import json
 import logging
+import os
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
+
+from kwallpaper import statefile
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +67,7 @@ DEFAULT_CONFIG_PATH = DEFAULT_CONFIG_DIR / "config.json"
 DEFAULT_CACHE_DIR = Path.home() / ".var" / "app" / "top.spelunk.kwallpaper" / "cache" / "kwallpaper"
 DEFAULT_SCHEDULE_BACKUP_DIR = DEFAULT_CACHE_DIR / "schedule-backup"
 DEFAULT_THEMES_DIR = DEFAULT_CONFIG_DIR / "themes"
+# Pre-state-store shuffle state; only read to seed state.json.
 DEFAULT_SHUFFLE_LIST_PATH = DEFAULT_CONFIG_DIR / "shuffle-list.json"
 
 
@@ -64,17 +86,30 @@ def _default_config() -> Dict[str, Any]:
             "latitude": 33.4484,
             "longitude": -112.074,
             "timezone": "America/Phoenix",
+            "coordinate_precision": 4,       # sun-segment cache key decimals
         },
         "scheduling": {
             "cycle_interval": 60,            # seconds between cycle runs
             "run_cycle": True,
             "daily_shuffle_enabled": True,
             "safety_interval": 600,          # sun-mode safety-net tick (seconds)
+            "prefetch_lead": 30,             # warm next image this early (s; 0 = off)
             "suntime_model": "sun",       # legacy | sun
+            "segment_cache_size": 64,        # memoized sun-segment days (0 = off)
         },
+        # Legacy run state: seeds state.json once (kwallpaper.state_store),
+        # then no longer read or updated.
         "theme": {
             "last_applied": "",
-            "last_applied_image": "",        # path of last successfully applied image
+            "last_applied_image": "",
+        },
+        "wallpaper": {
+            "dbus_backend": "auto",          # auto | session | gdbus
+            "batch_apply": True,             # all screens in one evaluateScript
+            "revalidate_interval": 300,      # current-wallpaper cache (seconds)
+            "apply_deadline": 10,            # async apply overall deadline (seconds)
+            "resolution_variants": True,     # per-screen downscaled image copies
+            "variant_scale": 1,              # device px per logical px (HiDPI)
         },
     })
 
@@ -206,13 +241,55 @@ def create_backup_file() -> None:
             json.dump(default_backup, f, indent=2)
 
 
+# ============================================================================
+# load_config cache
+# ============================================================================
+
+# Entries modified this close to (or after) the time they were parsed are
+# not trusted: a rewrite within the timestamp granularity could keep the
+# same (mtime, size) key.
+_RACY_WINDOW_NS = 2_000_000_000
+
+_config_cache_lock = threading.Lock()
+# path -> ((st_mtime_ns, st_size), parsed_at_ns, normalized config)
+_config_cache: Dict[str, Tuple[Tuple[int, int], int, Dict[str, Any]]] = {}
+_config_cache_stats = {"hits": 0, "misses": 0}
+
+
+def invalidate_config_cache(config_path: Optional[str] = None) -> None:
+    """Drop the cached parse of ``config_path`` (all paths when None)."""
+    with _config_cache_lock:
+        if config_path is None:
+            _config_cache.clear()
+        else:
+            _config_cache.pop(os.path.abspath(config_path), None)
+
+
+def config_cache_stats() -> Dict[str, int]:
+    """Return ``{"hits": n, "misses": n, "entries": n}`` for load_config."""
+    with _config_cache_lock:
+        return dict(_config_cache_stats, entries=len(_config_cache))
+
+
+def _cached_config(key: str, stamp: Tuple[int, int]):
+    with _config_cache_lock:
+        entry = _config_cache.get(key)
+        if (entry is not None and entry[0] == stamp
+                and entry[1] - stamp[0] > _RACY_WINDOW_NS):
+            _config_cache_stats["hits"] += 1
+            return copy.deepcopy(entry[2])
+        _config_cache_stats["misses"] += 1
+        return None
+
+
 def load_config(config_path: str) -> Dict[str, Any]:
     """Load configuration from JSON file.
 
     The returned dict is normalized to the v2 schema (legacy keys
     migrated, missing keys filled in from defaults).  The file on disk
     is left untouched; save it with :func:`save_config` to persist the
-    normalized form.
+    normalized form.  Unchanged files are served from the in-process
+    cache; the result is always a private copy.
 
     Args:
         config_path: Path to config JSON file
@@ -226,11 +303,17 @@ def load_config(config_path: str) -> Dict[str, Any]:
     """
     ensure_config_dirs()
 
-    config_path_obj = Path(config_path)
-
-    if not config_path_obj.exists():
-        raise FileNotFoundError(f"Config file not found: {config_path}")
-
+    try:
+        st = os.stat(config_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Config file not found: {config_path}") from None
+    key = os.path.abspath(config_path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _cached_config(key, stamp)
+    if cached is not None:
+        return cached
+
+    parsed_at = time.time_ns()
     try:
         with open(config_path, 'r') as f:
             config = json.load(f)
@@ -242,25 +325,34 @@ def load_config(config_path: str) -> Dict[str, Any]:
 
     # Validate, then migrate to the current schema.
     validate_config(config)
-    return normalize_config(config)
+    config = normalize_config(config)
+    with _config_cache_lock:
+        _config_cache[key] = (stamp, parsed_at, copy.deepcopy(config))
+    return config
 
 
-def save_config(config_path: str, config: Dict[str, Any]) -> None:
+def save_config(config_path: str, config: Dict[str, Any],
+                fsync: bool = False) -> bool:
     """Save configuration to JSON file.
 
     The config is normalized to the v2 schema before writing, so saves
-    always produce a clean, current-format file.
+    always produce a clean, current-format file.  The write is skipped
+    when the file already holds exactly this config, and otherwise
+    replaces the file atomically (see :mod:`kwallpaper.statefile`).
 
     Args:
         config_path: Path to save config JSON file
         config: Configuration dictionary to save
-    """
-    config_path_obj = Path(config_path)
-    config_path_obj.parent.mkdir(parents=True, exist_ok=True)
+        fsync: Flush the new file to disk before returning
 
+    Returns:
+        True when the file was written, False when it was already current
+    """
     config = normalize_config(config)
-    with open(config_path, 'w') as f:
-        json.dump(config, f, indent=2)
+    written = statefile.write_json(config_path, config, fsync=fsync)
+    if written:
+        invalidate_config_cache(config_path)
+    return written
 
 
 def _require_positive_int(config: Dict[str, Any], dotted: str) -> None:
@@ -274,6 +366,17 @@ def _require_positive_int(config: Dict[str, Any], dotted: str) -> None:
             f"Config validation failed: '{dotted}' must be a positive integer")
 
 
+def _require_non_negative_int(config: Dict[str, Any], dotted: str) -> None:
+    section_name, _, key = dotted.partition(".")
+    section = config.get(section_name)
+    if not isinstance(section, dict) or key not in section:
+        return
+    value = section[key]
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise ValueError(
+            f"Config validation failed: '{dotted}' must be a non-negative integer")
+
+
 def _require_bool(config: Dict[str, Any], dotted: str) -> None:
     section_name, _, key = dotted.partition(".")
     section = config.get(section_name)
@@ -305,6 +408,18 @@ def _require_number(config: Dict[str, Any], dotted: str) -> None:
             f"Config validation failed: '{dotted}' must be a number")
 
 
+def _require_positive_number(config: Dict[str, Any], dotted: str) -> None:
+    section_name, _, key = dotted.partition(".")
+    section = config.get(section_name)
+    if not isinstance(section, dict) or key not in section:
+        return
+    value = section[key]
+    if isinstance(value, bool) or not isinstance(value, (int, float)) \
+            or value <= 0:
+        raise ValueError(
+            f"Config validation failed: '{dotted}' must be a positive number")
+
+
 def _require_suntime_model(config: Dict[str, Any]) -> None:
     section = config.get("scheduling")
     if not isinstance(section, dict) or "suntime_model" not in section:
@@ -315,6 +430,17 @@ def _require_suntime_model(config: Dict[str, Any]) -> None:
             "'legacy' or 'sun'")
 
 
+def _require_choice(config: Dict[str, Any], dotted: str, choices) -> None:
+    section_name, _, key = dotted.partition(".")
+    section = config.get(section_name)
+    if not isinstance(section, dict) or key not in section:
+        return
+    if section[key] not in choices:
+        quoted = ", ".join(f"'{c}'" for c in choices)
+        raise ValueError(
+            f"Config validation failed: '{dotted}' must be one of {quoted}")
+
+
 def validate_config(config: Dict[str, Any]) -> None:
     """Validate a configuration dictionary (v2 schema; legacy keys ok).
 
@@ -347,6 +473,7 @@ def validate_config(config: Dict[str, Any]) -> None:
     _require_number(config, "location.latitude")
     _require_number(config, "location.longitude")
     _require_str(config, "location.timezone")
+    _require_non_negative_int(config, "location.coordinate_precision")
 
     # scheduling
     if "scheduling" in config and not isinstance(config["scheduling"], dict):
@@ -355,6 +482,8 @@ def validate_config(config: Dict[str, Any]) -> None:
     # legacy alias, validated for backward compatibility
     _require_positive_int(config, "scheduling.interval")
     _require_positive_int(config, "scheduling.safety_interval")
+    _require_non_negative_int(config, "scheduling.prefetch_lead")
+    _require_non_negative_int(config, "scheduling.segment_cache_size")
     _require_bool(config, "scheduling.run_cycle")
     _require_bool(config, "scheduling.daily_shuffle_enabled")
     _require_str(config, "scheduling.daily_change_time")
@@ -367,3 +496,13 @@ def validate_config(config: Dict[str, Any]) -> None:
         raise ValueError("Config validation failed: 'theme' must be a dictionary")
     _require_str(config, "theme.last_applied")
     _require_str(config, "theme.last_applied_image")
+
+    # wallpaper
+    if "wallpaper" in config and not isinstance(config["wallpaper"], dict):
+        raise ValueError("Config validation failed: 'wallpaper' must be a dictionary")
+    _require_choice(config, "wallpaper.dbus_backend", ("auto", "session", "gdbus"))
+    _require_bool(config, "wallpaper.batch_apply")
+    _require_positive_int(config, "wallpaper.revalidate_interval")
+    _require_positive_number(config, "wallpaper.apply_deadline")
+    _require_bool(config, "wallpaper.resolution_variants")
+    _require_positive_number(config, "wallpaper.variant_scale")
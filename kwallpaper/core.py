@@ -5,8 +5,10 @@ kWallpaper core API.
 Clean, high-level operations shared by the CLI and the GUI:
 
 - apply_theme():  pick the image for the current time-of-day for a theme and
-  set it as the Plasma wallpaper.  Owns the config read-modify-write and the
-  shuffle-list state atomically (single writer for shuffle-list.json).
+  set it as the Plasma wallpaper.  Commits the run state (last-applied
+  theme/image, shuffle position) in one state-store transaction.
+- apply_theme_async(): the same, with the D-Bus part on the shared asyncio
+  loop (returns a concurrent.futures.Future).
 - import_theme(): extract a .ddw/.zip file into the themes directory.
 - delete_theme(): remove a theme from the themes directory.
 - set_wallpaper(): low-level "set this image on all screens" primitive.
@@ -15,6 +17,8 @@ These functions do blocking work (JSON I/O, astral math, D-Bus calls), so
 callers on a GUI thread should run them in a worker thread.
 """
 
+import asyncio
+import concurrent.futures
 import json
 import logging
 import random
@@ -24,15 +28,16 @@ import zipfile
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
-from zoneinfo import ZoneInfo
+from typing import Optional, Union
 
+from kwallpaper import state_store, variants
 from kwallpaper.config import (
     DEFAULT_CONFIG_PATH,
     DEFAULT_THEMES_DIR,
     load_config,
-    save_config,
 )
+from kwallpaper.manifest import build_manifest, invalidate_manifest
+from kwallpaper.snapshot import ConfigSnapshot
 from kwallpaper.suntime import (
     detect_time_of_day_for_time,
     detect_time_of_day_sun,
@@ -44,20 +49,16 @@ from kwallpaper.selection import (
 from kwallpaper.themes import (
     discover_themes,
     extract_theme,
+    invalidate_discover_cache,
+    invalidate_image_index,
     normalize_image_lists,
     resolve_theme_path,
     validate_theme_images,
 )
-from kwallpaper.wallpaper import change_wallpaper
+from kwallpaper.wallpaper import change_wallpaper, configure_from_config
 from kwallpaper.shuffle_list_manager import (
-    check_and_reshuffle,
-    check_day_passed,
-    create_initial_shuffle,
+    advance_shuffle,
     get_current_date,
-    load_shuffle_list,
-    load_theme_change_date,
-    save_shuffle_list,
-    save_theme_change_date,
 )
 
 logger = logging.getLogger(__name__)
@@ -138,6 +139,15 @@ def import_theme(zip_path: str) -> dict:
         # Move to themes directory
         target_dir.parent.mkdir(parents=True, exist_ok=True)
         shutil.move(str(extract_dir), str(target_dir))
+        invalidate_image_index(extract_dir)
+    invalidate_discover_cache()
+
+    # Record the normalized theme.json and the image list (sizes,
+    # dimensions, hashes) so later loads skip the glob and the parse.
+    build_manifest(target_dir)
+
+    # Pre-build the per-screen resolution variants in the background.
+    variants.prepare_theme_async(str(target_dir))
 
     return {
         'extract_dir': str(target_dir),
@@ -168,6 +178,9 @@ def delete_theme(path: str) -> bool:
     except ValueError:
         raise ValueError(f"Refusing to delete path outside themes dir: {path}")
     shutil.rmtree(theme_path)
+    invalidate_discover_cache()
+    invalidate_image_index(theme_path)
+    invalidate_manifest(theme_path)
     return True
 
 
@@ -189,114 +202,91 @@ def _resolve_theme_folder(theme_path: str) -> str:
     return resolve_theme_path(str(p))
 
 
-def _pick_theme_for_shuffle(config: dict, timezone_str: str) -> str:
+def _pick_theme_for_shuffle(config: dict, timezone_str: str,
+                            shuffle: Optional[dict] = None) -> str:
     """Daily shuffler: return the theme path selected for today.
 
-    This is the single writer for shuffle-list.json: it performs the whole
-    load -> maybe-reshuffle -> maybe-advance -> save sequence itself.
-
-    The shuffle state is only persisted *after* the wallpaper has actually
-    been set (see ``commit_shuffle_state`` / the callers' step 5), so a
-    failed wallpaper change cannot advance the list: the next run retries
-    the same theme instead of silently skipping it.
+    Runs the reshuffle/advance rules on ``shuffle`` (a state-store shuffle
+    section, updated in place; default: a fresh copy of the default
+    store's) without persisting anything.  The caller commits the
+    section only *after* the wallpaper has actually been set, so a failed
+    wallpaper change cannot advance the list: the next run retries the
+    same theme instead of silently skipping it.
     """
     themes = discover_themes()
     if not themes:
         raise FileNotFoundError("No themes found in themes directory")
-
-    shuffle_state = load_shuffle_list()
-    shuffle_list = shuffle_state.get("shuffle_list", [])
-    current_index = shuffle_state.get("current_index", 0)
-    last_used_date = shuffle_state.get("last_used_date", "")
-
-    # Reshuffle when the list is exhausted
-    if check_and_reshuffle(shuffle_list, current_index, last_used_date):
-        logger.info("Reshuffling themes...")
-        shuffle_list = create_initial_shuffle([path for _, path in themes])
-        current_index = 0
-
-    # Advance to the next theme once per day.  The date is only persisted
-    # after the wallpaper change succeeds (commit_shuffle_state), so a
-    # failed run retries the same advance on the next attempt.
-    last_change_date = load_theme_change_date()
-    current_date = get_current_date(timezone_str)
-    if check_day_passed(last_change_date, current_date):
-        logger.info("New day detected - advancing to next theme")
-        current_index = (current_index + 1) % len(shuffle_list) if shuffle_list else 0
-
-    theme_path = shuffle_list[current_index]
+    if shuffle is None:
+        shuffle = state_store.load_state()["shuffle"]
+    theme_path = advance_shuffle(shuffle, lambda: [path for _, path in themes],
+                                 get_current_date(timezone_str))
+    logger.debug(f"Shuffle position {shuffle['current_index']}: {theme_path}")
     return theme_path
 
 
-def commit_shuffle_state(config: dict, timezone_str: str) -> None:
-    """Persist shuffle-list.json after a successful wallpaper change.
+def commit_shuffle_state(config: dict, timezone_str: str,
+                         config_path: Optional[str] = None) -> None:
+    """Advance and persist the shuffle state in one transaction.
 
-    Called by the shuffler-mode callers (CLI change command, apply_theme)
-    once the new wallpaper is up.  A failed wallpaper change never reaches
-    this point, so the list is not advanced and the next run retries the
-    same theme.
+    For callers that did not keep the section their picker worked on;
+    apply_theme() and the CLI change command commit that section instead.
+    A failed wallpaper change never reaches this point, so the list is
+    not advanced and the next run retries the same theme.
     """
-    shuffle_state = load_shuffle_list()
-    shuffle_list = shuffle_state.get("shuffle_list", [])
-    current_index = shuffle_state.get("current_index", 0)
-
-    # Reshuffle when the list is exhausted (keeps the in-memory selection
-    # and the persisted list in sync)
-    if check_and_reshuffle(shuffle_list, current_index, ""):
-        themes = discover_themes()
-        shuffle_list = create_initial_shuffle([path for _, path in themes])
-        current_index = 0
-
-    current_date = get_current_date(timezone_str)
-    # Advance to the next theme once per day (same rule as the picker)
-    last_change_date = load_theme_change_date()
-    if check_day_passed(last_change_date, current_date):
-        current_index = (current_index + 1) % len(shuffle_list) if shuffle_list else 0
-        save_theme_change_date(current_date)
-
-    # Persist state (single writer)
-    save_shuffle_list(shuffle_list, current_index, current_date)
+    with state_store.transaction(config_path) as state:
+        advance_shuffle(state["shuffle"],
+                        lambda: [path for _, path in discover_themes()],
+                        get_current_date(timezone_str))
 
 
-def _reset_shuffle_to_theme(theme_path: str, timezone_str: str) -> None:
-    """Rebuild the shuffle list so the applied theme is at index 0.
-
-    Reuses shuffle_list_manager (single writer for shuffle-list.json).
-    """
+def _reset_shuffle_to_theme(theme_path: str, timezone_str: str,
+                            shuffle: dict) -> None:
+    """Rebuild ``shuffle`` (a state-store section) so the applied theme
+    is at index 0."""
     themes = [str(p) for _, p in discover_themes()]
     if theme_path not in themes:
         logger.warning(f"Folder path not in themes list: {theme_path}")
         return
     other_themes = [t for t in themes if t != theme_path]
     random.shuffle(other_themes)
-    save_shuffle_list([theme_path] + other_themes, 0, get_current_date(timezone_str))
+    shuffle.update(shuffle_list=[theme_path] + other_themes, current_index=0,
+                   last_used_date=get_current_date(timezone_str))
 
 
-def apply_theme(theme_path: str, config_path: Optional[str] = None,
-                time_str: Optional[str] = None) -> ApplyResult:
-    """Apply a theme: pick the image for the current time-of-day and set it.
+def _snapshot_for(config: Union[ConfigSnapshot, str, Path, None]) -> ConfigSnapshot:
+    """``config`` as a snapshot: returned as is, or loaded from the path
+    (default: DEFAULT_CONFIG_PATH)."""
+    if isinstance(config, ConfigSnapshot):
+        return config
+    cfg_path = Path(config).expanduser() if config else Path(DEFAULT_CONFIG_PATH)
+    return ConfigSnapshot.from_config(load_config(str(cfg_path)), cfg_path)
 
-    Owns the whole config read-modify-write:
-      1. load config
-      2. select the theme (manual path or daily shuffler)
-      3. pick the image for the current time
-      4. set the wallpaper
-      5. save config (theme.last_applied) + shuffle state
 
-    Args:
-        theme_path: Theme folder name or path.  If None, the daily shuffler
-            picks the theme.
-        config_path: Config file path (default: DEFAULT_CONFIG_PATH).
-        time_str: Optional "HH:MM" to select the image for a specific time.
-
-    Returns:
-        ApplyResult with success flag and details.
-    """
-    cfg_path = Path(config_path).expanduser() if config_path else Path(DEFAULT_CONFIG_PATH)
-    config = load_config(str(cfg_path))
-    timezone_str = config.get('location', {}).get('timezone', 'UTC')
+@dataclass
+class _ApplyPlan:
+    """Everything apply_theme() decided before touching the wallpaper."""
+    cfg_path: Path
+    theme_path: Optional[str]     # as requested (None: daily shuffler)
+    resolved: str                 # theme directory
+    name: str
+    image_path: str
+    timezone_str: str
+    shuffle: Optional[dict] = None  # advanced shuffle section (shuffler mode)
+    daily_shuffle: bool = False     # daily_shuffle_enabled at plan time
+
+
+def _prepare_apply(theme_path: Optional[str],
+                   config_path: Union[ConfigSnapshot, str, None],
+                   time_str: Optional[str]):
+    """Steps 1-3 of apply_theme(): returns an _ApplyPlan, or a failed
+    ApplyResult when the theme or image cannot be selected."""
+    snap = _snapshot_for(config_path)
+    config = snap.config_dict()
+    configure_from_config(config)
+    timezone_str = snap.timezone
 
     # 1. Pick the theme
+    shuffle = None
     if theme_path:
         try:
             resolved = _resolve_theme_folder(theme_path)
@@ -305,8 +295,9 @@ def apply_theme(theme_path: str, config_path: Optional[str] = None,
         name = Path(resolved).name
         logger.info(f"Using theme: {resolved}")
     else:
+        shuffle = snap.state_dict()["shuffle"]
         try:
-            resolved = _pick_theme_for_shuffle(config, timezone_str)
+            resolved = _pick_theme_for_shuffle(config, timezone_str, shuffle)
         except FileNotFoundError as e:
             return ApplyResult(False, message=str(e))
         name = Path(resolved).name
@@ -321,59 +312,151 @@ def apply_theme(theme_path: str, config_path: Optional[str] = None,
     # 3. Pick the image for the requested time
     if time_str:
         try:
-            tod = detect_time_of_day_for_time(time_str, str(cfg_path))
-            image_path = select_image_for_specific_time(time_str, resolved, str(cfg_path))
+            tod = detect_time_of_day_for_time(time_str, snap)
+            image_path = select_image_for_specific_time(time_str, resolved, snap)
         except Exception as e:
             logger.error(f"Image selection for time {time_str} failed: {e}")
             return ApplyResult(False, name, message=f"Image selection failed: {e}")
     else:
         try:
-            now = datetime.now(ZoneInfo(timezone_str))
-            tod = detect_time_of_day_sun(str(cfg_path), now=now)
-            image_path = select_image_for_time_cli(resolved, str(cfg_path))
+            now = datetime.now(snap.tz)
+            tod = detect_time_of_day_sun(snap, now=now)
+            image_path = select_image_for_time_cli(resolved, snap)
         except Exception as e:
             logger.error(f"Image selection failed: {e}")
             return ApplyResult(False, name, message=f"Image selection failed: {e}")
 
-    # 4. Set the wallpaper
-    if not set_wallpaper(image_path):
-        return ApplyResult(False, name, image_path, "Failed to change wallpaper")
+    return _ApplyPlan(snap.path, theme_path, resolved, name, image_path,
+                      timezone_str, shuffle, snap.daily_shuffle)
 
-    # 5. Persist config + shuffle state (atomic read-modify-write, done
-    #    after the wallpaper is up so a crash doesn't leave stale state)
+
+def _commit_apply(plan: _ApplyPlan) -> ApplyResult:
+    """Step 5 of apply_theme(): commit the run state once the wallpaper
+    is up."""
+    # One transaction, done after the wallpaper is up so a crash doesn't
+    # leave stale state ("persist after success").
     try:
-        config = load_config(str(cfg_path))
-        config.setdefault('theme', {})['last_applied'] = name
-        # Last-applied image path (skip-if-unchanged state); persisted
-        # only now that the wallpaper is up ("persist after success").
-        config.setdefault('theme', {})['last_applied_image'] = image_path
-        save_config(str(cfg_path), config)
-        if not theme_path:
-            # Shuffler mode: persist shuffle state now that the wallpaper
-            # is up (a failed set_wallpaper returned before this point).
-            commit_shuffle_state(config, timezone_str)
-        else:
-            shuffle_enabled = config.get('scheduling', {}).get(
-                'daily_shuffle_enabled', False)
-            if shuffle_enabled:
-                _reset_shuffle_to_theme(str(Path(resolved)), timezone_str)
+        with state_store.transaction(plan.cfg_path) as state:
+            # Last-applied image path is the skip-if-unchanged state.
+            state["last_applied"] = {"theme": plan.name,
+                                     "image": plan.image_path}
+            if plan.shuffle is not None:
+                # Shuffler mode: the section the picker advanced.
+                state["shuffle"] = plan.shuffle
+            elif plan.daily_shuffle:
+                _reset_shuffle_to_theme(str(Path(plan.resolved)),
+                                        plan.timezone_str, state["shuffle"])
     except Exception as e:
         # Wallpaper is already set; state persistence failure is non-fatal.
-        logger.error(f"Failed to persist config/shuffle state: {e}")
+        logger.error(f"Failed to persist run state: {e}")
+
+    return ApplyResult(True, plan.name, plan.image_path,
+                       f"Applied {plan.name} ({Path(plan.image_path).name})")
+
+
+def apply_theme(theme_path: str,
+                config_path: Union[ConfigSnapshot, str, None] = None,
+                time_str: Optional[str] = None) -> ApplyResult:
+    """Apply a theme: pick the image for the current time-of-day and set it.
+
+    Owns the whole run-state read-modify-write:
+      1. load config
+      2. select the theme (manual path or daily shuffler)
+      3. pick the image for the current time
+      4. set the wallpaper
+      5. commit the run state (last-applied theme/image + shuffle)
 
-    return ApplyResult(True, name, image_path,
-                       f"Applied {name} ({Path(image_path).name})")
+    Args:
+        theme_path: Theme folder name or path.  If None, the daily shuffler
+            picks the theme.
+        config_path: Config file path (default: DEFAULT_CONFIG_PATH), or
+            a ConfigSnapshot already taken by the caller.
+        time_str: Optional "HH:MM" to select the image for a specific time.
 
+    Returns:
+        ApplyResult with success flag and details.
+    """
+    plan = _prepare_apply(theme_path, config_path, time_str)
+    if isinstance(plan, ApplyResult):
+        return plan
 
-def next_change_time_for_config(config_path: str,
+    # 4. Set the wallpaper
+    if not set_wallpaper(plan.image_path):
+        return ApplyResult(False, plan.name, plan.image_path,
+                           "Failed to change wallpaper")
+
+    # 5. Persist config + shuffle state
+    return _commit_apply(plan)
+
+
+def apply_theme_async(theme_path: Optional[str],
+                      config_path: Union[ConfigSnapshot, str, None] = None,
+                      time_str: Optional[str] = None,
+                      deadline: Optional[float] = None
+                      ) -> "concurrent.futures.Future[ApplyResult]":
+    """apply_theme() with the wallpaper set on the shared asyncio loop.
+
+    Theme and image selection (steps 1-3) run in the calling thread; the
+    per-screen D-Bus sets run concurrently under ``deadline`` (default
+    ``wallpaper.apply_deadline``) via kwallpaper.wallpaper_async, and the
+    state commit follows on success.  Returns a Future resolving to an
+    ApplyResult, so a worker thread is free as soon as the image is
+    picked.
+    """
+    from kwallpaper import wallpaper_async
+
+    plan = _prepare_apply(theme_path, config_path, time_str)
+    if isinstance(plan, ApplyResult):
+        done = concurrent.futures.Future()
+        done.set_result(plan)
+        return done
+    return wallpaper_async.submit(_apply_plan_async(plan, deadline))
+
+
+async def _apply_plan_async(plan: _ApplyPlan,
+                            deadline: Optional[float]) -> ApplyResult:
+    from kwallpaper.wallpaper_async import change_wallpaper_async
+
+    report = await change_wallpaper_async(plan.image_path, deadline)
+    if not report.success:
+        return ApplyResult(False, plan.name, plan.image_path,
+                           f"Failed to change wallpaper: {report.message}")
+    for r in report.failed:
+        logger.warning(f"Screen {r.screen} not updated: {r.error}")
+    # The state commit is blocking file I/O: keep it off the loop.
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _commit_apply, plan)
+
+
+def _strict_selection(config: Union[ConfigSnapshot, str],
+                      now: Optional[datetime], purpose: str):
+    """select_at() on the theme the next cycle run will use, without
+    the sun-to-legacy fallback (errors propagate to the scheduler)."""
+    from kwallpaper.cli import resolve_current_theme_dir
+    from kwallpaper.selection import select_at
+
+    snap = _snapshot_for(config)
+    theme_dir = resolve_current_theme_dir(snap)
+    if theme_dir is None:
+        raise ValueError(
+            f"no theme available (apply a theme first); cannot {purpose}")
+    return select_at(str(theme_dir), snap, now=now, strict=True)
+
+
+def next_change_time_for_config(config: Union[ConfigSnapshot, str],
                                 now: Optional[datetime] = None) -> datetime:
-    """Next wallpaper-change instant for the sun-position model.
+    """Next wallpaper-change instant for the configured time model.
 
     Resolves the theme the next cycle run will use (current D-Bus
-    wallpaper first, then config ``theme.last_applied``), computes the
-    sun segments for the configured location, and returns the next image
-    boundary strictly after ``now`` (default: current time in the
-    configured timezone).
+    wallpaper first, then the last-applied theme) and returns the next
+    image boundary strictly after ``now`` (default: current time in the
+    configured timezone), as computed by
+    :func:`kwallpaper.selection.select_at` in strict mode.  ``config``
+    is a ConfigSnapshot or a config path.
+
+    The scheduler only calls this when the cycle run could not hand it
+    a :class:`~kwallpaper.selection.Selection` (lock-skipped run, daily
+    shuffle, start-up).
 
     The function-level imports keep core and cli import-decoupled
     (cli already imports core inside functions; keeping the reverse
@@ -383,29 +466,26 @@ def next_change_time_for_config(config_path: str,
         IncompleteSegmentsError: sun segments incomplete (polar
             day/night) — the caller (scheduler) falls back to the
             interval job.
-        ValueError: no theme can be resolved, or the theme's image
-            lists are inconsistent with the current time (empty
-            category list).
+        ValueError: no theme can be resolved, no legacy sun times, or
+            the theme's image lists are inconsistent with the current
+            time (empty category list).
     """
-    from kwallpaper.cli import resolve_current_theme_dir
-    from kwallpaper.selection import load_theme_data
-    from kwallpaper.solarsegments import (
-        image_at,
-        next_change_time,
-        segments_for_config,
-    )
-
-    config = load_config(config_path)
-    tz = ZoneInfo(config.get('location', {}).get('timezone', 'UTC'))
-    if now is None:
-        now = datetime.now(tz)
-
-    theme_dir = resolve_current_theme_dir(config)
-    if theme_dir is None:
-        raise ValueError(
-            "no theme available (apply a theme first); cannot compute "
-            "the next change time")
-    theme_data = load_theme_data(theme_dir)
-    seg = segments_for_config(config_path, now=now)
-    _category, current_image = image_at(now, seg, theme_data)
-    return next_change_time(now, seg, theme_data, current_image)
+    return _strict_selection(config, now, "compute the next change time"
+                             ).next_change
+
+
+def next_image_for_config(config: Union[ConfigSnapshot, str],
+                          at: datetime) -> str:
+    """Image file the configured time model shows at ``at``.
+
+    Resolves the theme like :func:`next_change_time_for_config` and maps
+    the segment (or legacy period) image at ``at`` to its file.  Used by
+    the scheduler's prefetch stage, which passes the next change instant.
+
+    Raises:
+        IncompleteSegmentsError: sun segments incomplete at ``at``.
+        ValueError: no theme can be resolved, or ``at`` falls in an
+            empty category.
+        FileNotFoundError: the theme has no image files.
+    """
+    return _strict_selection(config, at, "resolve the next image").path
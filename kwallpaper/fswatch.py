@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+kWallpaper file-system watcher for the config file and themes directory.
+
+Edits that happen outside the GUI — ``config.json`` changed by hand or
+by ``wallpaper_cli.py``, a theme folder copied into the themes directory
+— used to be noticed only when something polled: the scheduler when the
+GUI called ``reload_cycle_interval()``, theme discovery when its
+2-second cache expired.  :class:`FsWatcher` publishes them instead.
+
+Backends:
+
+- **inotify** (Linux, through ``ctypes``; no extra dependency): watches
+  the config file's directory, the themes directory and each theme
+  folder in it.  Only events for the config file itself count as
+  ``config`` changes, so the state store's own ``state.json`` writes do
+  not wake anybody.
+- **poll** (everything else, or when inotify cannot be set up — no
+  libc symbol, watch limit reached, a watched directory missing):
+  ``stat`` of the config file and of the themes directory entries every
+  ``poll_interval`` seconds.  An inotify watcher whose watched
+  directory disappears switches to polling.
+
+Changes are debounced: a burst of events (an editor's save dance, a
+theme being unpacked file by file) is delivered as one :class:`FsEvent`
+``debounce`` seconds after the last of them.  Subscribers run on the
+watcher thread and must hand off to their own thread (the GUI uses a
+queued Qt signal).
+
+Use :func:`get_watcher` to share one started watcher per config/themes
+pair; it also lets :func:`kwallpaper.themes.discover_themes` trust its
+cache until the watcher reports a themes change.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, Optional, Set, Tuple, Union
+
+from kwallpaper.config import DEFAULT_CONFIG_PATH, DEFAULT_THEMES_DIR
+
+logger = logging.getLogger(__name__)
+
+#: Event kinds.
+CONFIG = "config"
+THEMES = "themes"
+
+PathLike = Union[str, Path]
+
+# <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+
+_ENTRY_MASK = (_IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+               | _IN_CREATE | _IN_DELETE)
+_ROOT_MASK = _ENTRY_MASK | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR
+_EVENT_HEADER = struct.Struct("iIII")   # wd, mask, cookie, len
+
+
+@dataclass(frozen=True)
+class FsEvent:
+    """One debounced batch of changes."""
+    kinds: FrozenSet[str]       # subset of {CONFIG, THEMES}
+    names: Tuple[str, ...]      # changed entry names (may be empty)
+
+
+Subscriber = Callable[[FsEvent], None]
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6",
+                           use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p,
+                                           ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class FsWatcher:
+    """Watches one config file and one themes directory.
+
+    Args:
+        config_path: The config file (default: DEFAULT_CONFIG_PATH).
+        themes_dir: The themes directory (default: DEFAULT_THEMES_DIR).
+        debounce: Quiet time in seconds before a batch is published.
+        poll_interval: Seconds between checks of the polling backend.
+        use_inotify: False forces the polling backend.
+    """
+
+    def __init__(self, config_path: Optional[PathLike] = None,
+                 themes_dir: Optional[PathLike] = None,
+                 debounce: float = 0.5, poll_interval: float = 2.0,
+                 use_inotify: bool = True):
+        self.config_path = Path(config_path or DEFAULT_CONFIG_PATH).expanduser()
+        self.themes_dir = Path(themes_dir or DEFAULT_THEMES_DIR).expanduser()
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._use_inotify = use_inotify
+        self._backend: Optional[str] = None
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._fd: Optional[int] = None
+        self._wake: Optional[Tuple[int, int]] = None
+        self._wds: Dict[int, Path] = {}
+        self._lost_root = False
+
+    # ── public API ───────────────────────────────────────────────────────
+    @property
+    def backend(self) -> Optional[str]:
+        """``"inotify"``, ``"poll"``, or None when not running."""
+        return self._backend if self.running else None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """Call ``callback(event)`` for every batch; returns an
+        unsubscribe function."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def start(self) -> None:
+        """Start the watcher thread (no-op when already running)."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._backend = "inotify" if self._use_inotify and self._open_inotify() else "poll"
+        if self._backend == "inotify":
+            target, args = self._inotify_loop, ()
+        else:
+            # Baseline taken before returning, so a change made right
+            # after start() is not folded into it.
+            target = self._poll_loop
+            args = (self._config_stamp(), self._themes_stamp())
+        self._thread = threading.Thread(target=target, args=args,
+                                        name="kwallpaper-fswatch", daemon=True)
+        self._thread.start()
+        logger.debug(f"Watching {self.config_path} and {self.themes_dir} "
+                     f"({self._backend})")
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Stop the watcher thread and release its file descriptors."""
+        self._stop.set()
+        if self._wake is not None:
+            try:
+                os.write(self._wake[1], b"x")
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._close()
+
+    # ── delivery ─────────────────────────────────────────────────────────
+    def _publish(self, kinds: Set[str], names: Set[str]) -> None:
+        event = FsEvent(frozenset(kinds), tuple(sorted(names)))
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception:
+                logger.warning("fswatch subscriber failed", exc_info=True)
+
+    # ── inotify backend ──────────────────────────────────────────────────
+    def _open_inotify(self) -> bool:
+        libc = _load_libc()
+        if libc is None or not hasattr(libc, "inotify_init1"):
+            return False
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            logger.debug(f"inotify_init1 failed: {os.strerror(ctypes.get_errno())}")
+            return False
+        self._libc, self._fd = libc, fd
+        roots = [self.config_path.parent, self.themes_dir]
+        if not all(self._add_watch(root, _ROOT_MASK) for root in roots):
+            self._close()
+            return False
+        for entry in self._theme_folders():
+            self._add_watch(entry, _ENTRY_MASK | _IN_ONLYDIR)
+        self._wake = os.pipe()
+        return True
+
+    def _add_watch(self, path: Path, mask: int) -> bool:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err != errno.ENOENT:
+                logger.debug(f"inotify_add_watch({path}) failed: {os.strerror(err)}")
+            return False
+        self._wds[wd] = path
+        return True
+
+    def _theme_folders(self) -> List[Path]:
+        try:
+            return [p for p in self.themes_dir.iterdir()
+                    if p.is_dir() and not p.name.startswith('.')]
+        except OSError:
+            return []
+
+    def _close(self) -> None:
+        for fd in ([self._fd] if self._fd is not None else []) + list(self._wake or ()):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._fd = self._wake = None
+        self._wds.clear()
+
+    def _read_events(self, kinds: Set[str], names: Set[str]) -> None:
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            self._classify(wd, mask, name, kinds, names)
+
+    def _classify(self, wd: int, mask: int, name: str,
+                  kinds: Set[str], names: Set[str]) -> None:
+        if mask & _IN_Q_OVERFLOW:
+            kinds.update((CONFIG, THEMES))
+            return
+        path = self._wds.get(wd)
+        if mask & _IN_IGNORED:
+            self._wds.pop(wd, None)
+            if path in (self.config_path.parent, self.themes_dir):
+                self._lost_root = True
+                kinds.update((CONFIG, THEMES))
+            return
+        if path is None or name.startswith('.'):
+            return
+        if path == self.config_path.parent and name == self.config_path.name:
+            kinds.add(CONFIG)
+            names.add(name)
+        if path == self.themes_dir:
+            if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                self._add_watch(path / name, _ENTRY_MASK | _IN_ONLYDIR)
+            kinds.add(THEMES)
+            names.add(name)
+        elif path.parent == self.themes_dir:
+            kinds.add(THEMES)
+            names.add(path.name)
+
+    def _inotify_loop(self) -> None:
+        kinds: Set[str] = set()
+        names: Set[str] = set()
+        due: Optional[float] = None
+        self._lost_root = False
+        while not self._stop.is_set():
+            if self._lost_root:
+                logger.debug("Watched directory gone; switching to polling")
+                self._publish(kinds, names)
+                self._close()
+                self._backend = "poll"
+                self._poll_loop(self._config_stamp(), self._themes_stamp())
+                return
+            timeout = None if due is None else max(0.0, due - time.monotonic())
+            try:
+                ready, _, _ = select.select([self._fd, self._wake[0]], [], [], timeout)
+            except (OSError, ValueError):
+                break
+            if self._stop.is_set():
+                break
+            if self._fd in ready:
+                self._read_events(kinds, names)
+                if kinds:
+                    due = time.monotonic() + self.debounce
+            elif due is not None and time.monotonic() >= due:
+                self._publish(kinds, names)
+                kinds, names, due = set(), set(), None
+
+    # ── polling backend ──────────────────────────────────────────────────
+    def _config_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.config_path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _themes_stamp(self) -> Tuple[Tuple[str, int], ...]:
+        try:
+            entries = [(p.name, p.stat().st_mtime_ns)
+                       for p in self.themes_dir.iterdir()
+                       if not p.name.startswith('.')]
+        except OSError:
+            return ()
+        return tuple(sorted(entries))
+
+    def _poll_loop(self, config, themes) -> None:
+        while not self._stop.wait(self.poll_interval):
+            kinds: Set[str] = set()
+            names: Set[str] = set()
+            now_config, now_themes = self._config_stamp(), self._themes_stamp()
+            if now_config != config:
+                kinds.add(CONFIG)
+                names.add(self.config_path.name)
+            if now_themes != themes:
+                kinds.add(THEMES)
+                names.update(n for n, _ in set(now_themes) ^ set(themes))
+            config, themes = now_config, now_themes
+            if kinds:
+                self._publish(kinds, names)
+
+
+_watchers: Dict[Tuple[Path, Path], FsWatcher] = {}
+_watchers_lock = threading.Lock()
+
+
+def get_watcher(config_path: Optional[PathLike] = None,
+                themes_dir: Optional[PathLike] = None) -> FsWatcher:
+    """The shared, started watcher for ``config_path`` / ``themes_dir``.
+
+    A newly created watcher is also attached to the theme-discovery
+    cache (:func:`kwallpaper.themes.attach_watcher`).
+    """
+    from kwallpaper import themes
+
+    key = (Path(config_path or DEFAULT_CONFIG_PATH).expanduser(),
+           Path(themes_dir or DEFAULT_THEMES_DIR).expanduser())
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = _watchers[key] = FsWatcher(*key)
+            themes.attach_watcher(watcher)
+        watcher.start()
+    return watcher
+
+
+def stop_watchers() -> None:
+    """Stop every shared watcher (application shutdown)."""
+    with _watchers_lock:
+        watchers = list(_watchers.values())
+        _watchers.clear()
+    for watcher in watchers:
+        watcher.stop()
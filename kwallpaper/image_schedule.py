@@ -6,8 +6,8 @@ Computes the exact display time of every image in a theme for a calendar
 day — the data behind the GUI's 24-hour schedule preview (Phase 3).
 
 Self-contained: imports only solarsegments (the WDD model), selection
-(theme.json loading), and config.  No imports from the legacy suntime
-quirk paths.
+(theme.json loading), themes (the image file index) and config.  No
+imports from the legacy suntime quirk paths.
 
 Model (WDD parity): each effective segment window (dedup rule applied,
 see solarsegments._effective_windows) is divided equally among its
@@ -30,9 +30,10 @@ from zoneinfo import ZoneInfo
 from kwallpaper.solarsegments import (
     IncompleteSegmentsError,
     Segments,
-    _effective_windows,
     solar_segments,
+    timeline_for,
 )
+from kwallpaper.themes import image_file_for_value
 
 logger = logging.getLogger(__name__)
 
@@ -72,21 +73,10 @@ def _image_windows(seg: Segments,
                    theme_data: Dict[str, Any]) -> List[Tuple[datetime, datetime, int]]:
     """(start, end, image) for every image of the day, unclamped.
 
-    The dedup rule is applied via solarsegments._effective_windows.
-    Windows with no images or zero/negative duration contribute nothing.
+    Read from the day's compiled timeline (solarsegments.timeline_for,
+    dedup rule applied), the same instance the scheduler uses.
     """
-    out: List[Tuple[datetime, datetime, int]] = []
-    for category, (start, end) in _effective_windows(seg, theme_data).items():
-        image_list = theme_data.get(f"{category}ImageList", []) or []
-        n = len(image_list)
-        if n == 0 or end <= start:
-            continue
-        duration = (end - start).total_seconds() / n
-        for i, value in enumerate(image_list):
-            out.append((start + timedelta(seconds=i * duration),
-                        start + timedelta(seconds=(i + 1) * duration),
-                        value))
-    return out
+    return list(timeline_for(seg, theme_data).images)
 
 
 def all_image_times(day: date, seg: Segments,
@@ -164,35 +154,19 @@ def image_path_for_value(theme_dir: Path, theme_data: Dict[str, Any],
                          value: int) -> str:
     """Resolve a theme.json image value to a file path ("" if unresolvable).
 
-    Mirrors selection._match_image_file's positional mapping (same glob
-    pattern, same numbered fallback, same numeric sort, same 1-based
-    position with wraparound) so the preview always agrees with the
-    scheduler — but never raises: the preview degrades to a placeholder
-    box instead of failing.
+    Uses selection's positional mapping (``themes.image_file_for_value``:
+    same cached file list, same 1-based position with wraparound) so the
+    preview always agrees with the scheduler — but never raises: the
+    preview degrades to a placeholder box instead of failing.
     """
     try:
-        pattern = theme_data.get("imageFilename", "*.jpg") or "*.jpg"
-        files = list(Path(theme_dir).glob(pattern))
-        if not files:
-            base = Path(pattern).stem or "theme"
-            ext = Path(pattern).suffix or ".jpg"
-            files = [Path(theme_dir) / f"{base}_{i}{ext}"
-                     for i in range(1, 100)]
-            files = [f for f in files if f.exists()]
-        if not files:
-            return ""
-        def _idx(f: Path) -> int:
-            try:
-                return int(f.stem.split('_')[-1])
-            except Exception:
-                return 0
-        files.sort(key=_idx)
-        return str(files[(int(value) - 1) % len(files)])
+        path = image_file_for_value(Path(theme_dir), theme_data, value)
     except Exception:
         return ""
+    return str(path) if path is not None else ""
 
 
-def schedule_for_config(config_path: str, theme_dir: Path,
+def schedule_for_config(config, theme_dir: Path,
                         now: Optional[datetime] = None) -> ThemeSchedule:
     """Compute a theme's full-day schedule from the config (GUI seam).
 
@@ -206,7 +180,7 @@ def schedule_for_config(config_path: str, theme_dir: Path,
     re-implemented here; see the Phase 3 plan, locked decision 5).
 
     Args:
-        config_path: path to config.json.
+        config: ConfigSnapshot, or path to config.json.
         theme_dir: theme folder (must contain theme.json).
         now: override "now" (aware); defaults to the current time in
             the configured timezone.
@@ -218,15 +192,12 @@ def schedule_for_config(config_path: str, theme_dir: Path,
         IncompleteSegmentsError: today's sun segments incomplete (polar).
         FileNotFoundError: theme folder has no theme.json.
     """
-    from kwallpaper.config import load_config
     from kwallpaper.selection import load_theme_data
+    from kwallpaper.snapshot import as_snapshot
 
-    config = load_config(config_path)
-    loc = config.get("location", {})
-    tz = ZoneInfo(loc.get("timezone", "UTC"))
-    lat = float(loc.get("latitude", 0.0))
-    lon = float(loc.get("longitude", 0.0))
-    model = config.get("scheduling", {}).get("suntime_model", "sun")
+    snap = as_snapshot(config)
+    tz, lat, lon = snap.tz, snap.latitude, snap.longitude
+    model = snap.suntime_model
 
     if now is None:
         now = datetime.now(tz)
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+kWallpaper theme manifest sidecar.
+
+Every use of a theme used to re-find theme.json (``*.json`` glob, then
+``rglob``), parse and normalize it, and glob the image files.  Each theme
+directory now carries a manifest, ``.kwallpaper-manifest``, holding what
+those steps produce::
+
+    {"version": 1,
+     "source": {"theme_json": "theme.json", "theme_json_mtime_ns": ...,
+                "theme_json_size": ...},
+     "theme": {...normalized theme.json...},
+     "images": [{"path": "sun_1.jpg", "size": ..., "mtime_ns": ...,
+                 "width": ..., "height": ..., "sha256": ...}, ...]}
+
+It is JSON, but the name does not end in ``.json``, so theme discovery
+and ``find_theme_json`` never mistake it for the theme definition.
+
+A manifest on disk is fresh while theme.json still matches ``source``
+and no entry of the image directory changed after the manifest was
+written (directory mtimes not newer than the manifest's own mtime; the
+atomic rename that writes it moves the directory mtime itself, so the
+manifest's mtime is bumped once it is in place).  Image hashes are not
+part of freshness.
+
+Only :func:`read_manifest` is meant for hot paths (selection, cycle
+runs, previews): a few stats, plus one small read per process.
+Building hashes every image, so it happens at import time
+(``import_theme``) or on a background thread (:func:`request_manifest`)
+for themes imported before, or changed since; callers parse theme.json
+themselves meanwhile.  A theme directory that cannot be written to
+keeps its manifest in memory for the process.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from kwallpaper import statefile
+from kwallpaper.themes import (
+    _dir_stamp,
+    _scan_image_files,
+    normalize_image_lists,
+)
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".kwallpaper-manifest"
+MANIFEST_VERSION = 1
+
+_enabled = True
+
+# Theme dir -> (manifest, stamp it was last found fresh at); see _stamp().
+_loaded: Dict[str, Tuple[Dict[str, Any], tuple]] = {}
+
+# Background builder: one daemon thread draining a queue of theme dirs.
+_jobs: "queue.Queue[str]" = queue.Queue()
+_pending: Set[str] = set()
+_lock = threading.Lock()
+_worker: Optional[threading.Thread] = None
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# JPEG start-of-frame markers (baseline, progressive, ...): C0-CF
+# except DHT (C4), JPG (C8) and DAC (CC).
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def set_enabled(enabled: bool) -> None:
+    """Enable/disable background manifest builds (:func:`request_manifest`)."""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def manifest_path(theme_dir: Path) -> Path:
+    """Location of the manifest of ``theme_dir``."""
+    return Path(theme_dir) / MANIFEST_NAME
+
+
+def invalidate_manifest(theme_dir: Optional[Path] = None) -> None:
+    """Forget the memoized manifest of ``theme_dir`` (default: all)."""
+    if theme_dir is None:
+        _loaded.clear()
+    else:
+        _loaded.pop(str(theme_dir), None)
+
+
+def _image_dimensions(path: Path) -> Optional[Tuple[int, int]]:
+    """(width, height) from a PNG or JPEG header; None for other or
+    unreadable files.  Reads the header only, never decodes."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(24)
+            if head[:8] == _PNG_SIGNATURE and head[12:16] == b"IHDR":
+                return struct.unpack(">II", head[16:24])
+            if head[:2] != b"\xff\xd8":
+                return None
+            f.seek(2)
+            while True:
+                marker = f.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    return None
+                code = marker[1]
+                if code == 0xFF:            # fill byte
+                    f.seek(-1, 1)
+                    continue
+                if code == 0x01 or 0xD0 <= code <= 0xD8:
+                    continue                # standalone marker
+                length = struct.unpack(">H", f.read(2))[0]
+                if code in _JPEG_SOF:
+                    height, width = struct.unpack(">HH", f.read(5)[1:5])
+                    return width, height
+                f.seek(length - 2, 1)
+    except (OSError, struct.error):
+        return None
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _image_entry(theme_dir: Path, path: Path,
+                 previous: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Manifest entry of one image; reuses ``previous[rel]`` while the
+    file's size and mtime are unchanged."""
+    st = path.stat()
+    rel = path.relative_to(theme_dir).as_posix()
+    old = previous.get(rel)
+    if (old is not None and old.get("size") == st.st_size
+            and old.get("mtime_ns") == st.st_mtime_ns):
+        return old
+    dims = _image_dimensions(path)
+    return {
+        "path": rel,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "width": dims[0] if dims else None,
+        "height": dims[1] if dims else None,
+        "sha256": _sha256(path),
+    }
+
+
+def _source(theme_dir: Path, theme_json: Path) -> Dict[str, Any]:
+    st = theme_json.stat()
+    return {
+        "theme_json": theme_json.relative_to(theme_dir).as_posix(),
+        "theme_json_mtime_ns": st.st_mtime_ns,
+        "theme_json_size": st.st_size,
+    }
+
+
+def _stamp(theme_dir: Path, manifest: Dict[str, Any]) -> tuple:
+    """(theme.json source, image directory mtimes) as they are now.
+
+    Raises:
+        OSError, KeyError, TypeError: Files gone or a malformed manifest.
+    """
+    source = _source(theme_dir, theme_dir / manifest["source"]["theme_json"])
+    pattern = manifest["theme"].get("imageFilename", "*.jpg") or ""
+    return (tuple(sorted(source.items())), _dir_stamp(theme_dir, pattern))
+
+
+def _fresh_on_disk(theme_dir: Path, manifest: Dict[str, Any]) -> bool:
+    try:
+        source = _source(theme_dir, theme_dir / manifest["source"]["theme_json"])
+        pattern = manifest["theme"].get("imageFilename", "*.jpg") or ""
+        written = manifest_path(theme_dir).stat().st_mtime_ns
+        return (source == manifest["source"]
+                and max(_dir_stamp(theme_dir, pattern)) <= written)
+    except (OSError, KeyError, TypeError, ValueError, AttributeError):
+        return False
+
+
+def _read_file(theme_dir: Path) -> Optional[Dict[str, Any]]:
+    """The manifest on disk (any freshness), or None."""
+    try:
+        manifest = statefile.read_json(manifest_path(theme_dir))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def read_manifest(theme_dir: Path) -> Optional[Dict[str, Any]]:
+    """The fresh manifest of ``theme_dir``, or None (missing or stale).
+
+    Cheap (stats, plus one small read per process); never builds.
+    """
+    theme_dir = Path(theme_dir)
+    key = str(theme_dir)
+    entry = _loaded.get(key)
+    if entry is not None:
+        try:
+            if _stamp(theme_dir, entry[0]) == entry[1]:
+                return entry[0]
+        except (OSError, KeyError, TypeError, AttributeError):
+            pass
+    manifest = _read_file(theme_dir)
+    if manifest is None or not _fresh_on_disk(theme_dir, manifest):
+        return None
+    try:
+        _loaded[key] = (manifest, _stamp(theme_dir, manifest))
+    except (OSError, KeyError, TypeError, AttributeError):
+        return None
+    return manifest
+
+
+def build_manifest(theme_dir: Path) -> Dict[str, Any]:
+    """(Re)build and write the manifest of ``theme_dir``.
+
+    Hashes the images that are new or changed since the previous
+    manifest (if any): call it at import time or from the background
+    builder, not from a hot path.  The sidecar is written atomically
+    with :func:`kwallpaper.statefile.write_json`; when the directory
+    cannot be written to, or changed while it was scanned, the manifest
+    is only memoized for this process.
+
+    Raises:
+        FileNotFoundError: The directory has no theme.json.
+        ValueError: theme.json is not valid JSON.
+    """
+    from kwallpaper.selection import find_theme_json
+
+    theme_dir = Path(theme_dir)
+    theme_json = find_theme_json(theme_dir)
+    with open(theme_json, "r") as f:
+        theme_data = normalize_image_lists(json.load(f))
+
+    previous_manifest = (_loaded.get(str(theme_dir), (None,))[0]
+                         or _read_file(theme_dir) or {})
+    previous = {entry.get("path"): entry
+                for entry in previous_manifest.get("images", [])
+                if isinstance(entry, dict)}
+    manifest: Dict[str, Any] = {
+        "version": MANIFEST_VERSION,
+        "source": _source(theme_dir, theme_json),
+        "theme": theme_data,
+        "images": [],
+    }
+    # Stamp before the scan: a change made while hashing leaves the
+    # manifest stale instead of silently missing it.
+    stamp = _stamp(theme_dir, manifest)
+    pattern = theme_data.get("imageFilename", "*.jpg")
+    manifest["images"] = [_image_entry(theme_dir, p, previous)
+                          for p in _scan_image_files(theme_dir, pattern)]
+
+    path = manifest_path(theme_dir)
+    try:
+        if _stamp(theme_dir, manifest) == stamp:
+            statefile.write_json(path, manifest)
+            # The rename moved the directory mtime; the manifest must not
+            # look older than that (also when the write was a no-op).
+            os.utime(path)
+            logger.debug(f"Wrote theme manifest {path}")
+    except OSError as e:
+        logger.debug(f"Cannot write theme manifest {path}: {e}")
+    _loaded[str(theme_dir)] = (manifest, stamp)
+    return manifest
+
+
+def load_manifest(theme_dir: Path) -> Dict[str, Any]:
+    """The manifest of ``theme_dir``, built synchronously first when
+    missing or stale (import and tools; hot paths use
+    :func:`read_manifest` plus :func:`request_manifest`).
+
+    Raises:
+        FileNotFoundError: The directory has no theme.json.
+        ValueError: theme.json is not valid JSON.
+    """
+    return read_manifest(theme_dir) or build_manifest(theme_dir)
+
+
+def request_manifest(theme_dir: Path) -> None:
+    """Queue a background (re)build of the manifest of ``theme_dir``
+    (deduplicated; a no-op when background builds are disabled)."""
+    global _worker
+    if not _enabled:
+        return
+    key = str(theme_dir)
+    with _lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+        _jobs.put(key)
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_build_loop, daemon=True,
+                                       name="kwallpaper-manifest")
+            _worker.start()
+
+
+def _build_loop() -> None:
+    while True:
+        key = _jobs.get()
+        try:
+            if read_manifest(Path(key)) is None:
+                build_manifest(Path(key))
+        except Exception:
+            logger.debug("Theme manifest build failed", exc_info=True)
+        finally:
+            with _lock:
+                _pending.discard(key)
+            _jobs.task_done()
+
+
+def wait_idle(timeout: Optional[float] = None) -> bool:
+    """Block until the background builder has drained its queue (tests,
+    benchmarks).  Returns False on timeout."""
+    done = threading.Event()
+
+    def _join():
+        _jobs.join()
+        done.set()
+
+    threading.Thread(target=_join, daemon=True).start()
+    return done.wait(timeout)
+
+
+def theme_data_of(manifest: Dict[str, Any]) -> Dict[str, Any]:
+    """The normalized theme.json of ``manifest`` (a private copy)."""
+    return copy.deepcopy(manifest["theme"])
+
+
+def image_paths_of(manifest: Dict[str, Any], theme_dir: Path) -> List[Path]:
+    """The ordered image files of ``manifest`` (as image_files_for)."""
+    return [Path(theme_dir) / entry["path"] for entry in manifest["images"]]
+
+
+def image_info(image_path: Path) -> Optional[Dict[str, Any]]:
+    """Manifest entry (size, mtime, dimensions, hash) of an image whose
+    theme manifest this process already loaded; None otherwise.
+
+    A memo lookup only (no stat, no read), for hot paths such as
+    thumbnail generation.
+    """
+    image_path = Path(image_path)
+    entry = _loaded.get(str(image_path.parent))
+    if entry is None:
+        return None
+    for image in entry[0].get("images", []):
+        if image.get("path") == image_path.name:
+            return image
+    return None
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+kWallpaper Plasma shell D-Bus transports.
+
+Two interchangeable ways to call ``org.kde.plasmashell``:
+
+- :class:`GdbusTransport` — one ``gdbus call`` subprocess per method call.
+  This is the original implementation: it works anywhere ``gdbus`` is
+  installed, including Flatpak sandboxes that refuse a direct bus
+  connection, and it stays testable via ``subprocess.run`` mocks.
+- :class:`SessionBusTransport` — one long-lived in-process session-bus
+  connection (via the optional, pure-Python ``jeepney`` package).  Every
+  method call is a message on the same socket: no fork/exec and no bus
+  handshake per call.
+
+Both expose the same four calls (``ping``, ``evaluate_script``,
+``wallpaper``, ``set_wallpaper``) plus ``subscribe`` for signal
+notifications and ``name_has_owner`` (session bus only; gdbus reports
+``False`` / ``None``), with the same
+failure convention:
+a D-Bus error reply or timeout is reported as ``False``/``None``, never
+raised.  ``GdbusTransport`` lets ``FileNotFoundError`` (no ``gdbus``
+binary) propagate, exactly like the legacy code did.
+
+:func:`get_transport` picks the transport for the configured backend
+(``"auto"`` | ``"session"`` | ``"gdbus"``, see :func:`set_backend`).
+``"auto"`` tries the session bus and falls back to gdbus for the rest of
+the process when the connection cannot be opened.
+"""
+
+import logging
+import re
+import subprocess
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# jeepney availability (checked once; the session-bus backend is optional)
+try:
+    from jeepney import DBusAddress, MatchRule, MessageType, message_bus, new_method_call
+    from jeepney.io.threading import DBusRouter, open_dbus_connection
+    JEEPNEY_AVAILABLE = True
+except ImportError:
+    DBusAddress = None
+    MatchRule = None
+    MessageType = None
+    message_bus = None
+    new_method_call = None
+    DBusRouter = None
+    open_dbus_connection = None
+    JEEPNEY_AVAILABLE = False
+
+# Dead-router exceptions, guarded on their own so a jeepney release that
+# lacks one still gets the session backend.
+_router_errors = []
+try:
+    from jeepney.io.common import RouterClosed
+    _router_errors.append(RouterClosed)
+except ImportError:
+    pass
+try:
+    from jeepney.io.threading import ReceiveStopped
+    _router_errors.append(ReceiveStopped)
+except ImportError:
+    pass
+
+#: Exceptions from ``send_and_get_reply`` meaning the connection is dead
+#: (``ConnectionError`` or another socket error, or the router's receiver
+#: stopped): reconnect and retry.
+CONNECTION_LOST = (OSError,) + tuple(_router_errors)
+
+PLASMA_DEST = "org.kde.plasmashell"
+PLASMA_PATH = "/PlasmaShell"
+PLASMA_INTERFACE = "org.kde.PlasmaShell"
+
+#: Per-call timeout (seconds), matching the legacy gdbus calls.
+CALL_TIMEOUT = 5
+
+BACKENDS = ("auto", "session", "gdbus")
+
+
+class TransportUnavailable(OSError):
+    """The requested D-Bus transport cannot be used in this process."""
+
+
+# ============================================================================
+# gdbus (subprocess) transport
+# ============================================================================
+
+_GDBUS_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "a": "\a", "b": "\b",
+                  "f": "\f", "v": "\v"}
+
+
+def _unescape_gvariant(text: str) -> str:
+    """Undo GVariant text-format string escaping (``\\n``, ``\\'``, ``\\uXXXX``)."""
+    def _sub(m):
+        esc = m.group(1)
+        if esc[0] in "uU" and len(esc) > 1:
+            return chr(int(esc[1:], 16))
+        return _GDBUS_ESCAPES.get(esc, esc)
+    return re.sub(r"\\(u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|.)", _sub, text)
+
+
+def unwrap_gdbus_string(stdout: str) -> str:
+    """Extract the string from a gdbus ``('...',)`` reply.
+
+    Returns the stripped raw output when it is not a single-string tuple,
+    so callers can still run their own fallback parsing on it.
+    """
+    text = (stdout or "").strip()
+    match = re.match(r"^\((['\"])(.*)\1,\)$", text, re.DOTALL)
+    if not match:
+        return text
+    return _unescape_gvariant(match.group(2))
+
+
+def parse_gdbus_wallpaper(stdout: str) -> Dict[str, Any]:
+    """Parse the ``Image`` key out of a gdbus ``wallpaper`` reply.
+
+    Output looks like: ``({'Image': <'file:///path/to/img.jpg'>, ...},)``.
+    Returns ``{}`` when the reply carries no Image key.
+    """
+    match = re.search(r"'Image':\s*<'(file://[^']+)'>", stdout or "")
+    if not match:
+        match = re.search(r'"Image":\s*<(file://[^>]+)>', stdout or "")
+    if match:
+        return {"Image": match.group(1)}
+    return {}
+
+
+def _gvariant_quote(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+class GdbusTransport:
+    """One ``gdbus call`` subprocess per method call."""
+
+    name = "gdbus"
+
+    def _call(self, method: str, *args: str,
+              timeout: Optional[float] = CALL_TIMEOUT) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            ['gdbus', 'call', '--session', '--dest', PLASMA_DEST,
+             '--object-path', PLASMA_PATH, '--method', method] + list(args),
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+
+    def ping(self, timeout: float = CALL_TIMEOUT) -> bool:
+        result = self._call('org.freedesktop.DBus.Peer.Ping', timeout=timeout)
+        return result.returncode == 0
+
+    def evaluate_script(self, script: str,
+                        timeout: float = CALL_TIMEOUT) -> Optional[str]:
+        result = self._call('org.kde.PlasmaShell.evaluateScript', script,
+                            timeout=timeout)
+        if result.returncode != 0:
+            return None
+        return unwrap_gdbus_string(result.stdout)
+
+    def wallpaper(self, screen: int,
+                  timeout: float = CALL_TIMEOUT) -> Optional[Dict[str, Any]]:
+        result = self._call('org.kde.PlasmaShell.wallpaper', str(screen),
+                            timeout=timeout)
+        if result.returncode != 0:
+            return None
+        return parse_gdbus_wallpaper(result.stdout)
+
+    def set_wallpaper(self, plugin: str, params: Dict[str, str], screen: int,
+                      timeout: float = CALL_TIMEOUT) -> bool:
+        body = ", ".join(f"{_gvariant_quote(k)}: <{_gvariant_quote(v)}>"
+                         for k, v in params.items())
+        result = self._call('org.kde.PlasmaShell.setWallpaper', plugin,
+                            "{" + body + "}", str(screen), timeout=timeout)
+        return result.returncode == 0
+
+    def subscribe(self, callback, **match: str) -> bool:
+        """Signals need a persistent connection; not supported here."""
+        return False
+
+    def name_has_owner(self, name: str,
+                       timeout: float = CALL_TIMEOUT) -> Optional[bool]:
+        """Unknown here (None): without signals the answer would go stale,
+        so callers keep pinging."""
+        return None
+
+
+# ============================================================================
+# Persistent session-bus transport
+# ============================================================================
+
+class _CallbackQueue:
+    """Queue stand-in for ``DBusRouter.filter``: hands every matched
+    message to ``callback`` on the router's receiver thread.
+
+    Callbacks must be quick and must not make D-Bus calls themselves
+    (the receiver thread is the one that would deliver the reply).
+    """
+
+    def __init__(self, callback):
+        self._callback = callback
+
+    def put_nowait(self, msg) -> None:
+        try:
+            self._callback(msg)
+        except Exception:
+            logger.debug("D-Bus signal callback failed", exc_info=True)
+
+
+class SessionBusTransport:
+    """One long-lived session-bus connection shared by every call.
+
+    The jeepney ``DBusRouter`` is thread-safe (a receiver thread matches
+    replies to serials), so the scheduler thread and GUI workers can call
+    concurrently.  A dropped connection (plasmashell restart does not
+    drop it, but a bus restart or suspend quirk can) shows up as a
+    :data:`CONNECTION_LOST` error from the call and is re-opened once
+    per call; a connection that cannot be opened at all raises
+    :class:`TransportUnavailable`.
+    """
+
+    name = "session"
+
+    def __init__(self, bus: str = "SESSION"):
+        if not JEEPNEY_AVAILABLE:
+            raise TransportUnavailable("jeepney is not installed")
+        self._bus = bus
+        self._router: Optional[DBusRouter] = None
+        self._lock = threading.Lock()
+        self._subscriptions = []   # [(MatchRule, callback)], re-added on reconnect
+        self._shell = DBusAddress(PLASMA_PATH, bus_name=PLASMA_DEST,
+                                  interface=PLASMA_INTERFACE)
+        self._peer = DBusAddress(PLASMA_PATH, bus_name=PLASMA_DEST,
+                                 interface="org.freedesktop.DBus.Peer")
+
+    def _get_router(self) -> "DBusRouter":
+        with self._lock:
+            if self._router is not None:
+                return self._router
+            try:
+                conn = open_dbus_connection(bus=self._bus)
+            except Exception as e:
+                self._router = None
+                raise TransportUnavailable(
+                    f"cannot open session bus connection: {e}") from e
+            self._router = DBusRouter(conn)
+            for rule, callback in self._subscriptions:
+                self._install(self._router, rule, callback)
+            return self._router
+
+    @staticmethod
+    def _install(router: "DBusRouter", rule, callback) -> None:
+        router.filter(rule, queue=_CallbackQueue(callback))
+        try:
+            router.send_and_get_reply(message_bus.AddMatch(rule),
+                                      timeout=CALL_TIMEOUT)
+        except Exception:
+            logger.debug("AddMatch %s failed", rule.serialise(), exc_info=True)
+
+    @staticmethod
+    def _close_router(router: "DBusRouter") -> None:
+        try:
+            router.close()
+            router.conn.close()
+        except Exception:
+            logger.debug("closing D-Bus router failed", exc_info=True)
+
+    def connect(self) -> None:
+        """Open the connection now (raises TransportUnavailable)."""
+        self._get_router()
+
+    def subscribe(self, callback, **match: str) -> bool:
+        """Call ``callback(msg)`` for every signal matching ``match``
+        (``MatchRule`` keywords: ``interface``, ``member``, ``path``,
+        ``sender``, plus ``arg0`` for a string first-argument match).
+
+        The subscription survives reconnects.  Returns True.
+        """
+        arg0 = match.pop("arg0", None)
+        rule = MatchRule(type="signal", **match)
+        if arg0 is not None:
+            rule.add_arg_condition(0, arg0)
+        router = self._get_router()
+        with self._lock:
+            self._subscriptions.append((rule, callback))
+        self._install(router, rule, callback)
+        return True
+
+    def close(self) -> None:
+        with self._lock:
+            if self._router is not None:
+                self._close_router(self._router)
+                self._router = None
+
+    def _call(self, msg, timeout: float):
+        """Send ``msg`` and return the reply body, or None on error reply
+        or timeout.  Reconnects once on a dead connection."""
+        for attempt in (0, 1):
+            router = self._get_router()
+            try:
+                reply = router.send_and_get_reply(msg, timeout=timeout)
+            except TimeoutError:
+                logger.debug("D-Bus call %s timed out", msg.header.fields)
+                return None
+            except CONNECTION_LOST as e:
+                # Router stopped / socket closed: reconnect and retry once.
+                logger.debug("D-Bus call failed (%s); reconnecting", e)
+                with self._lock:
+                    if self._router is router:
+                        self._close_router(router)
+                        self._router = None
+                if attempt:
+                    raise TransportUnavailable(
+                        f"session bus connection lost: {e}") from e
+                continue
+            if reply.header.message_type == MessageType.error:
+                return None
+            return reply.body
+        return None
+
+    def ping(self, timeout: float = CALL_TIMEOUT) -> bool:
+        return self._call(new_method_call(self._peer, "Ping"),
+                          timeout) is not None
+
+    def name_has_owner(self, name: str,
+                       timeout: float = CALL_TIMEOUT) -> Optional[bool]:
+        """Whether ``name`` currently has an owner on the bus (None on
+        error)."""
+        body = self._call(message_bus.NameHasOwner(name), timeout)
+        return bool(body[0]) if body else None
+
+    def evaluate_script(self, script: str,
+                        timeout: float = CALL_TIMEOUT) -> Optional[str]:
+        body = self._call(new_method_call(self._shell, "evaluateScript",
+                                          "s", (script,)), timeout)
+        return body[0] if body else None
+
+    def wallpaper(self, screen: int,
+                  timeout: float = CALL_TIMEOUT) -> Optional[Dict[str, Any]]:
+        body = self._call(new_method_call(self._shell, "wallpaper",
+                                          "u", (screen,)), timeout)
+        if not body:
+            return None
+        # a{sv}: jeepney returns variants as (signature, value) pairs.
+        return {k: v[1] if isinstance(v, tuple) else v
+                for k, v in body[0].items()}
+
+    def set_wallpaper(self, plugin: str, params: Dict[str, str], screen: int,
+                      timeout: float = CALL_TIMEOUT) -> bool:
+        variants = {k: ("s", v) for k, v in params.items()}
+        msg = new_method_call(self._shell, "setWallpaper", "sa{sv}u",
+                              (plugin, variants, screen))
+        return self._call(msg, timeout) is not None
+
+
+# ============================================================================
+# Backend selection
+# ============================================================================
+
+_backend = "gdbus"
+_gdbus_transport = GdbusTransport()
+_session_transport: Optional[SessionBusTransport] = None
+_session_failed = False
+_select_lock = threading.Lock()
+
+
+def set_backend(name: str) -> None:
+    """Select the D-Bus backend: ``"auto"``, ``"session"`` or ``"gdbus"``.
+
+    Switching backends forgets a previous ``"auto"`` fallback decision,
+    so the session bus is retried.
+    """
+    global _backend, _session_failed
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown D-Bus backend: {name!r} "
+                         f"(expected one of {', '.join(BACKENDS)})")
+    with _select_lock:
+        if name != _backend:
+            _session_failed = False
+        _backend = name
+
+
+def get_backend() -> str:
+    """The configured backend preference."""
+    return _backend
+
+
+def get_transport():
+    """Return the transport for the configured backend.
+
+    ``"gdbus"`` always returns the subprocess transport.  ``"session"``
+    returns the persistent connection or raises
+    :class:`TransportUnavailable`.  ``"auto"`` returns the persistent
+    connection when it can be opened and the gdbus transport otherwise
+    (the failure is remembered; see :func:`set_backend`).
+    """
+    global _session_transport, _session_failed
+    if _backend == "gdbus":
+        return _gdbus_transport
+    with _select_lock:
+        if _backend == "auto" and _session_failed:
+            return _gdbus_transport
+        try:
+            if _session_transport is None:
+                _session_transport = SessionBusTransport()
+            _session_transport.connect()
+            return _session_transport
+        except TransportUnavailable as e:
+            if _backend == "session":
+                raise
+            logger.info("Session-bus D-Bus backend unavailable (%s); "
+                        "using gdbus", e)
+            _session_failed = True
+            return _gdbus_transport
+
+
+def close() -> None:
+    """Close the persistent connection (re-opened on next use) and forget
+    a previous ``"auto"`` fallback decision."""
+    global _session_transport, _session_failed
+    with _select_lock:
+        if _session_transport is not None:
+            _session_transport.close()
+        _session_transport = None
+        _session_failed = False
+
+
+def session_failed() -> bool:
+    """True once ``"auto"`` has fallen back to gdbus for this process."""
+    return _session_failed
+
+
+def session_transport_failed() -> None:
+    """Record that the persistent connection broke mid-operation, so
+    ``"auto"`` falls back to gdbus from now on."""
+    global _session_failed
+    with _select_lock:
+        _session_failed = True
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+kWallpaper next-image prefetch.
+
+The scheduler knows the exact instant of the next image change, so it
+can warm everything that apply will touch a little before it
+(``scheduling.prefetch_lead`` seconds): the theme image is pulled into
+the page cache and the resolution variant for every connected screen is
+built (or, when already built, pulled in too).  The boundary-time apply
+then never waits on a cold disk — spinning disks, NFS/SMB home
+directories — and plasmashell's decode reads from memory.
+
+Page-cache warming uses ``posix_fadvise(POSIX_FADV_WILLNEED)``, which
+starts kernel readahead for the whole file without copying it into this
+process; platforms without it fall back to reading the file once.
+"""
+
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from kwallpaper import variants
+
+logger = logging.getLogger(__name__)
+
+# Chunk size for the read-through fallback.
+_READ_CHUNK = 1024 * 1024
+
+
+def warm_file(path: str) -> bool:
+    """Ask the kernel to bring ``path`` into the page cache.
+
+    Returns False when the file cannot be opened.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError as e:
+        logger.debug(f"Prefetch: cannot open {path}: {e}")
+        return False
+    try:
+        if hasattr(os, 'posix_fadvise'):
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                return True
+            except OSError:
+                pass   # e.g. unsupported by the filesystem: read instead
+        while os.read(fd, _READ_CHUNK):
+            pass
+        return True
+    except OSError as e:
+        logger.debug(f"Prefetch: reading {path} failed: {e}")
+        return False
+    finally:
+        os.close(fd)
+
+
+def prefetch_image(image_path: str,
+                   resolutions: Optional[Dict[int, Tuple[int, int]]] = None
+                   ) -> List[str]:
+    """Warm ``image_path`` and its variants for the connected screens.
+
+    ``resolutions`` (``{screen: (w, h)}``) defaults to the cached screen
+    topology.  Missing variants are built synchronously, so call this
+    from a background thread.  Returns the paths that were warmed.
+    """
+    warmed = [image_path] if warm_file(image_path) else []
+    if not variants.is_enabled():
+        return warmed
+    if resolutions is None:
+        from kwallpaper.wallpaper import screen_resolutions
+        resolutions = screen_resolutions()
+    for resolution in sorted(set(resolutions.values())):
+        path = variants.ensure_variant(image_path, resolution)
+        if path != image_path and path not in warmed and warm_file(path):
+            warmed.append(path)
+    return warmed
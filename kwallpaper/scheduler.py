@@ -4,22 +4,40 @@ Scheduler module for background task management.
 
 Tasks:
 
-- ``cycle_task``: interval-based (every ``scheduling.interval`` seconds).
-  Re-applies the time-appropriate image of the current theme, and performs
-  the daily shuffle when the local date differs from the persisted
-  ``last_change_date`` (so a missed midnight — suspend, reboot, app not
-  running at 00:00 — is picked up on the next cycle run).
+- ``cycle_task``: a one-shot at the next image change of the configured
+  time model (sun segments, or the legacy period model), re-armed after
+  every run.  Re-applies the time-appropriate image of the current
+  theme, and performs the daily shuffle when the local date differs from
+  the persisted ``last_change_date`` (so a missed midnight — suspend,
+  reboot, app not running at 00:00 — is picked up on the next cycle
+  run).  When the next change cannot be computed (polar day/night,
+  astral unavailable) it runs every ``scheduling.cycle_interval``
+  seconds until it can.
+
+- ``safety_task``: the same run every ``scheduling.safety_interval``
+  seconds, for clock jumps, resume-from-sleep and missed one-shots.
+
+- ``prefetch_task``: a one-shot ``scheduling.prefetch_lead`` seconds
+  before each armed change instant that warms the next image and its
+  screen variants (:mod:`kwallpaper.prefetch`), so the change itself
+  never waits on a cold disk.
+
+While running, the manager subscribes to the shared file-system watcher
+(:mod:`kwallpaper.fswatch`): a ``config.json`` edited outside the GUI
+reschedules the safety job when its interval changed, and any config or
+themes change re-arms the next-change one-shot.
 
 A re-entrant lock guarantees cycle and change can never overlap.  Per-run
 results are logged via ``logging`` and, when a callback is installed,
 delivered to the GUI event log (instead of print).
 """
 
+import concurrent.futures
 import io
 import logging
 import sys
 import threading
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional, Callable, Any
 
 try:
@@ -33,12 +51,17 @@ except ImportError:
     DateTrigger = None
     IntervalTrigger = None
 
+from kwallpaper import fswatch
 from kwallpaper.config import load_config, DEFAULT_CONFIG_PATH
-from kwallpaper.core import next_change_time_for_config
+from kwallpaper.core import next_change_time_for_config, next_image_for_config
 from kwallpaper.cli import run_cycle_command
 
 logger = logging.getLogger(__name__)
 
+# Seconds a cycle run waits past ``wallpaper.apply_deadline`` for the
+# async apply's report before giving up on it.
+APPLY_RESULT_SLACK = 2.0
+
 
 class _CaptureStream:
     """In-memory replacement for sys.stdout/sys.stderr.
@@ -100,6 +123,7 @@ class SchedulerManager:
         self._is_running = False
         self._tasks: dict = {}
         self._lock = threading.Lock()
+        self._unwatch: Optional[Callable[[], None]] = None
         self.log_callback: Optional[Callable[[str], None]] = None
 
     # ── logging ──────────────────────────────────────────────────────────
@@ -123,6 +147,7 @@ class SchedulerManager:
             return {
                 'interval': scheduling.get('cycle_interval', 60),
                 'safety_interval': scheduling.get('safety_interval', 600),
+                'prefetch_lead': scheduling.get('prefetch_lead', 30),
                 'suntime_model': scheduling.get('suntime_model', 'sun'),
                 'daily_shuffle_enabled': scheduling.get('daily_shuffle_enabled', True),
                 'run_cycle': scheduling.get('run_cycle', True),
@@ -133,6 +158,7 @@ class SchedulerManager:
             return {
                 'interval': 60,
                 'safety_interval': 600,
+                'prefetch_lead': 30,
                 'suntime_model': 'sun',
                 'daily_shuffle_enabled': True,
                 'run_cycle': True,
@@ -149,13 +175,17 @@ class SchedulerManager:
             # actual cycle run was skipped by the lock.
             self._rearm_next_change()
             return
+        args = None
         try:
             class MockArgs:
                 theme_path = None
                 config = self.config_path
                 time = None
                 monitor = False
-            result, output = _run_cli_quietly(run_cycle_command, MockArgs())
+                selection = None
+                apply = self._apply_for_cycle
+            args = MockArgs()
+            result, output = _run_cli_quietly(run_cycle_command, args)
             if result != 0:
                 detail = f": {output}" if output else ""
                 self.log(f"Cycle task failed with exit code {result}{detail}",
@@ -167,30 +197,33 @@ class SchedulerManager:
             logger.debug("Cycle task traceback", exc_info=True)
         finally:
             self._lock.release()
-            # Sun mode: re-arm the one-shot at the next change instant.
-            # Legacy mode: no-op (the interval job keeps running).
-            self._rearm_next_change()
+            # Re-arm the one-shot at the next change instant, from the
+            # run's own selection when it made one.
+            self._rearm_next_change(getattr(args, 'selection', None))
 
-    def _rearm_next_change(self) -> None:
+    def _rearm_next_change(self, selection=None) -> None:
         """Re-arm the one-shot cycle job at the next image boundary.
 
-        Sun mode only (no-op for the legacy model, whose interval job
-        never needs re-arming).  Called after every cycle run — one-shot
-        or safety tick — and once from start().
+        Called after every cycle run — one-shot or safety tick — and
+        once from start(), for either time model.  ``selection`` is the
+        :class:`~kwallpaper.selection.Selection` of the run that just
+        finished; its next change is used as is, so a run resolves the
+        theme, loads theme.json and computes sun times only once.
 
         When the next change time cannot be computed (incomplete sun
-        segments — polar day/night — or no resolvable theme), the cycle
-        job falls back to the legacy-style interval trigger for the next
-        run; the re-arm after that run retries the sun model, so a polar
-        day self-heals once the segments are complete again.
+        segments — polar day/night —, no sun times for the legacy model
+        or no resolvable theme), the cycle job falls back to an interval
+        trigger for the next run; the re-arm after that run retries, so
+        a polar day self-heals once the segments are complete again.
         """
         if self.scheduler is None:
             return
         config = self._get_config()
-        if config.get('suntime_model') != 'sun':
-            return
         try:
-            next_dt = next_change_time_for_config(self.config_path)
+            if selection is not None and selection.next_change is not None:
+                next_dt = selection.next_change
+            else:
+                next_dt = next_change_time_for_config(self.config_path)
         except Exception as e:
             self.log(
                 f"Could not compute next change time ({e}); "
@@ -222,6 +255,42 @@ class SchedulerManager:
         self._tasks['cycle'] = {'next_change': next_dt.isoformat(),
                                 'type': 'date'}
         self.log(f"Next wallpaper change at {next_dt.isoformat()}")
+        self._arm_prefetch(next_dt, config.get('prefetch_lead', 30))
+
+    def _arm_prefetch(self, next_dt: datetime, lead: int) -> None:
+        """Arm the one-shot prefetch ``lead`` seconds before ``next_dt``
+        (immediately when that is already past; not at all when the
+        change itself is past or ``lead`` is 0)."""
+        now = datetime.now(next_dt.tzinfo)
+        if not lead or next_dt <= now:
+            return
+        run_at = max(next_dt - timedelta(seconds=lead), now)
+        self.scheduler.add_job(
+            self._run_prefetch_task,
+            trigger=DateTrigger(run_date=run_at),
+            args=[next_dt],
+            id='prefetch_task',
+            name='Prefetch Next Wallpaper Task',
+            replace_existing=True,
+            misfire_grace_time=lead,
+        )
+        self._tasks['prefetch'] = {'run_at': run_at.isoformat(),
+                                   'type': 'date'}
+
+    def _run_prefetch_task(self, next_dt: datetime) -> None:
+        """Warm the image (and screen variants) shown from ``next_dt``.
+
+        Best effort and lock-free: a failure only costs the cold read
+        the prefetch was meant to save.
+        """
+        from kwallpaper.prefetch import prefetch_image
+        try:
+            image_path = next_image_for_config(self.config_path, next_dt)
+            warmed = prefetch_image(image_path)
+            self.log(f"Prefetched {len(warmed)} file(s) for the "
+                     f"{next_dt.isoformat()} change", logging.DEBUG)
+        except Exception as e:
+            self.log(f"Prefetch skipped: {e}", logging.DEBUG)
 
     # ── lifecycle ────────────────────────────────────────────────────────
     def start(self) -> bool:
@@ -243,39 +312,25 @@ class SchedulerManager:
             if self.scheduler is None:
                 self.scheduler = BackgroundScheduler(daemon=True)
 
-            interval = config.get('interval', 60)
             if config.get('run_cycle', True):
-                if config.get('suntime_model') == 'sun':
-                    # Event-driven: one-shot at the exact next change
-                    # (armed by _rearm_next_change, re-armed after every
-                    # run) plus a coarse safety-net interval job for
-                    # clock jumps, resume-from-sleep, missed runs and the
-                    # daily shuffle check.
-                    safety = config.get('safety_interval', 600)
-                    self.scheduler.add_job(
-                        self._run_cycle_task,
-                        trigger=IntervalTrigger(seconds=safety),
-                        id='safety_task',
-                        name='Cycle Safety Net Task',
-                        replace_existing=True,
-                    )
-                    self._tasks['safety'] = {'interval': safety,
-                                             'type': 'interval'}
-                    self.log(f"Added safety-net task: runs every {safety} "
-                             "seconds (includes daily shuffle check)")
-                    self._rearm_next_change()
-                else:
-                    self.scheduler.add_job(
-                        self._run_cycle_task,
-                        trigger=IntervalTrigger(seconds=interval),
-                        id='cycle_task',
-                        name='Cycle Wallpaper Task',
-                        replace_existing=True
-                    )
-                    self._tasks['cycle'] = {'interval': interval,
-                                            'type': 'interval'}
-                    self.log(f"Added cycle task: runs every {interval} seconds"
-                             " (includes daily shuffle check)")
+                # Event-driven (both time models): one-shot at the exact
+                # next change (armed by _rearm_next_change, re-armed
+                # after every run) plus a coarse safety-net interval job
+                # for clock jumps, resume-from-sleep, missed runs and the
+                # daily shuffle check.
+                safety = config.get('safety_interval', 600)
+                self.scheduler.add_job(
+                    self._run_cycle_task,
+                    trigger=IntervalTrigger(seconds=safety),
+                    id='safety_task',
+                    name='Cycle Safety Net Task',
+                    replace_existing=True,
+                )
+                self._tasks['safety'] = {'interval': safety,
+                                         'type': 'interval'}
+                self.log(f"Added safety-net task: runs every {safety} "
+                         "seconds (includes daily shuffle check)")
+                self._rearm_next_change()
 
             self.scheduler.start()
             # Check if at least one task was added
@@ -284,6 +339,7 @@ class SchedulerManager:
                 self._is_running = False
                 return False
             self._is_running = True
+            self._watch_files()
             self.log("Scheduler started successfully")
             return True
         except Exception as e:
@@ -305,6 +361,9 @@ class SchedulerManager:
             return True
 
         try:
+            if self._unwatch is not None:
+                self._unwatch()
+                self._unwatch = None
             if self.scheduler is not None:
                 self.scheduler.shutdown(wait=wait)
             self._is_running = False
@@ -315,66 +374,115 @@ class SchedulerManager:
             self._is_running = False
             return False
 
+    # ── file-system events ───────────────────────────────────────────────
+    def _watch_files(self) -> None:
+        if self._unwatch is not None:
+            return
+        try:
+            watcher = fswatch.get_watcher(self.config_path)
+        except Exception as e:
+            logger.warning(f"File watcher unavailable: {e}")
+            return
+        self._unwatch = watcher.subscribe(self._on_fs_event)
+
+    def _on_fs_event(self, event: fswatch.FsEvent) -> None:
+        """Watcher thread: react to config / themes changes on disk."""
+        if not self._is_running or self.scheduler is None:
+            return
+        if 'safety' not in self._tasks:
+            return  # run_cycle disabled: nothing scheduled to adjust
+        if fswatch.CONFIG in event.kinds:
+            config = self._get_config()
+            if self._tasks['safety'].get('interval') \
+                    != config.get('safety_interval'):
+                self.log("Config changed on disk; rescheduling")
+                self.reload_cycle_interval()
+                return
+        # A new time model, location, theme or theme.json can move the
+        # next change instant.
+        self._rearm_next_change()
+
     def reload_cycle_interval(self) -> bool:
-        """Re-read ``scheduling.cycle_interval`` / ``safety_interval`` from
-        config and reschedule the cycle task, so interval changes take
+        """Re-read ``scheduling.safety_interval`` / ``cycle_interval`` from
+        config and reschedule, so interval and time-model changes take
         effect without a full scheduler restart."""
         if not self._is_running or self.scheduler is None:
             return False
         try:
             config = self._get_config()
-            if config.get('suntime_model') == 'sun':
-                # Sun mode: re-add the safety-net job with the current
-                # config's interval (replace_existing) — a live
-                # safety_interval change takes effect without a restart,
-                # and a live legacy→sun switch gets the job at all —
-                # then re-arm the one-shot from the (possibly changed)
-                # config.
-                safety = config.get('safety_interval', 600)
-                try:
-                    self.scheduler.add_job(
-                        self._run_cycle_task,
-                        trigger=IntervalTrigger(seconds=safety),
-                        id='safety_task',
-                        name='Cycle Safety Net Task',
-                        replace_existing=True,
-                    )
-                    self._tasks['safety'] = {'interval': safety,
-                                             'type': 'interval'}
-                except Exception as e:
-                    logger.error(
-                        f"Failed to (re)add safety job: {e}")
-                # An interval fallback armed during incomplete segments
-                # picks up the new cycle_interval on the next re-arm.
-                self._rearm_next_change()
-                return True
-            # Legacy mode: drop the sun-mode safety job (a live
-            # sun→legacy switch would otherwise leave it ticking
-            # forever), then re-add the interval job with the new
-            # interval.
-            if 'safety' in self._tasks:
-                try:
-                    self.scheduler.remove_job('safety_task')
-                except Exception:
-                    pass
-                del self._tasks['safety']
-            interval = config.get('interval', 60)
-            if 'cycle' in self._tasks:
+            # Re-add the safety-net job with the current config's
+            # interval (replace_existing) — a live safety_interval change
+            # takes effect without a restart — then re-arm the one-shot
+            # from the (possibly changed) config.
+            safety = config.get('safety_interval', 600)
+            try:
                 self.scheduler.add_job(
                     self._run_cycle_task,
-                    trigger=IntervalTrigger(seconds=interval),
-                    id='cycle_task',
-                    name='Cycle Wallpaper Task',
+                    trigger=IntervalTrigger(seconds=safety),
+                    id='safety_task',
+                    name='Cycle Safety Net Task',
                     replace_existing=True,
                 )
-                self._tasks['cycle'] = {
-                    'interval': interval, 'type': 'interval'}
-                self.log(f"Cycle task interval updated: every {interval} seconds")
+                self._tasks['safety'] = {'interval': safety,
+                                         'type': 'interval'}
+            except Exception as e:
+                logger.error(
+                    f"Failed to (re)add safety job: {e}")
+            # An interval fallback armed while the next change could not
+            # be computed picks up the new cycle_interval on this re-arm.
+            self._rearm_next_change()
             return True
         except Exception as e:
             logger.error(f"Failed to reload cycle interval: {e}", exc_info=True)
             return False
 
+    def apply_wallpaper(self, image_path: str,
+                        deadline: Optional[float] = None):
+        """Set ``image_path`` via the asyncio apply API without blocking.
+
+        The per-screen D-Bus sets run concurrently on the shared loop
+        under ``deadline`` (default ``wallpaper.apply_deadline``); the
+        per-screen outcome is logged when they finish.  Returns the
+        ``concurrent.futures.Future`` of the ApplyReport.
+        """
+        from kwallpaper.wallpaper_async import change_wallpaper_future
+
+        future = change_wallpaper_future(image_path, deadline)
+
+        def _log_report(f):
+            try:
+                report = f.result()
+            except Exception as e:
+                self.log(f"Wallpaper apply error: {e}", logging.ERROR)
+                return
+            level = logging.INFO if not report.failed else (
+                logging.WARNING if report.success else logging.ERROR)
+            self.log(report.message, level)
+        future.add_done_callback(_log_report)
+        return future
+
+    def _apply_for_cycle(self, image_path: str) -> bool:
+        """The cycle run's apply: :meth:`apply_wallpaper`, awaited.
+
+        Bounded by ``wallpaper.apply_deadline`` (plus a little slack for
+        the loop hand-off), so a wedged screen cannot hold the cycle lock
+        for the per-call timeouts of the synchronous walk.
+        """
+        from kwallpaper import wallpaper
+
+        deadline = wallpaper.get_apply_deadline()
+        future = self.apply_wallpaper(image_path, deadline)
+        try:
+            return future.result(timeout=deadline + APPLY_RESULT_SLACK).success
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self.log(f"Wallpaper apply did not finish within {deadline:g}s",
+                     logging.ERROR)
+            return False
+        except Exception:
+            # Already logged by apply_wallpaper's done callback.
+            return False
+
     def add_job(self, name: str, func: Callable, trigger: Any) -> bool:
         if not self._is_running or self.scheduler is None:
             logger.error("Scheduler is not running")
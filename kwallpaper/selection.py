@@ -5,31 +5,45 @@ kWallpaper image file selection.
 Turns "theme directory + time" into a concrete image file path.  The
 astral math lives in kwallpaper.suntime; this module owns the
 theme.json loading and file-matching (glob pattern / numbered files).
+
+:func:`select_at` is the single selection pass: one theme load and one
+segment (or sun-time) computation give the image, its file, its display
+window and the next change instant, so a cycle run and the scheduler
+re-arm that follows it share the work.
 """
 
 import json
 import logging
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
 from zoneinfo import ZoneInfo
 
 logger = logging.getLogger(__name__)
 
-from kwallpaper.config import load_config
+from kwallpaper.snapshot import as_snapshot
 from kwallpaper.suntime import (
     ASTRAL_AVAILABLE,
     _config_location,
-    _fix_next_day,
-    _real_sun_data,
+    _pick_image_list,
     detect_time_of_day_for_time,
     detect_time_of_day_sun,
     image_index_for,
     image_period,
+    legacy_next_change_time,
+    legacy_slot_at,
+    legacy_sun_for,
+    sun_times,
     _night_now_for_pos,
 )
-from kwallpaper.solarsegments import image_at, segments_for_config
-from kwallpaper.themes import extract_theme, image_files_for, normalize_image_lists
+from kwallpaper.solarsegments import (
+    image_at,
+    next_change_time,
+    segments_for_config,
+    timeline_for,
+)
+from kwallpaper.themes import extract_theme, image_file_for_value, normalize_image_lists
 
 
 def find_theme_json(theme_path_obj: Path) -> Path:
@@ -42,7 +56,17 @@ def find_theme_json(theme_path_obj: Path) -> Path:
 
 
 def load_theme_data(theme_path_obj: Path) -> Dict[str, Any]:
-    """Load and normalize theme.json from a theme directory."""
+    """Load and normalize theme.json from a theme directory.
+
+    Served from the theme manifest (``kwallpaper.manifest``) when it is
+    fresh; otherwise theme.json is parsed here and the manifest is
+    rebuilt in the background.
+    """
+    from kwallpaper.manifest import read_manifest, request_manifest, theme_data_of
+    manifest = read_manifest(theme_path_obj)
+    if manifest is not None:
+        return theme_data_of(manifest)
+    request_manifest(theme_path_obj)
     theme_json_path = find_theme_json(theme_path_obj)
     with open(theme_json_path, 'r') as f:
         theme_data = json.load(f)
@@ -62,143 +86,178 @@ def _match_image_file(theme_path_obj: Path, image_index: int,
                       theme_data: Dict[str, Any]) -> str:
     """Find the image file for a 1-based index in a theme directory.
 
-    Uses ``themes.image_files_for`` for discovery (glob pattern with
-    numbered-file fallback, numeric sort) — the same list that import
-    validation checks, so selection and validation can never disagree.
+    Uses ``themes.image_file_for_value`` (the cached
+    ``themes.image_files_for`` list — glob pattern with numbered-file
+    fallback, numeric sort — that import validation checks too), so
+    selection and validation can never disagree.  Indexes past the end
+    wrap around.
     """
-    image_files = image_files_for(theme_path_obj, theme_data)
-
-    if not image_files:
+    image_path = image_file_for_value(theme_path_obj, theme_data, image_index)
+    if image_path is None:
         raise FileNotFoundError(
             f"Image file not found for index {image_index} in theme '{theme_data.get('displayName')}'"
         )
-
-    # Find the file at the correct index
-    if image_index <= len(image_files):
-        image_path = image_files[image_index - 1]  # 1-based to 0-based
-    else:
-        # Wrap around if index exceeds available files
-        image_path = image_files[(image_index - 1) % len(image_files)]
-
     return str(image_path)
 
 
-def _pick_image_list(theme_data: Dict[str, Any],
-                     time_of_day: str) -> tuple:
-    """Return (time_of_day, image_list), advancing to the next category
-    when the current one has no images (legacy fallback order)."""
-    image_list = theme_data.get(f"{time_of_day}ImageList", [])
-    while not image_list:
-        time_categories = ['sunrise', 'day', 'sunset', 'night']
-        try:
-            current_idx = time_categories.index(time_of_day)
-            if current_idx < len(time_categories) - 1:
-                time_of_day = time_categories[current_idx + 1]
-                image_list = theme_data.get(f"{time_of_day}ImageList", [])
-            else:
-                raise ValueError("No images available in any time-of-day category")
-        except ValueError:
-            raise ValueError("No images available in any time-of-day category")
-    return time_of_day, image_list
-
-
-def _sun_for_config(config_path: str) -> Optional[dict]:
+def _sun_for_config(config) -> Optional[dict]:
     """Fetch astral sun values for the config location (or None)."""
     if not ASTRAL_AVAILABLE:
         return None
     try:
-        timezone_str, lat, lon = _config_location(config_path)
-        sun = _real_sun_data(timezone_str, lat, lon)
-        if sun is None:
-            return None
-        _fix_next_day(sun)
-        return sun
+        return sun_times(*_config_location(config))
     except Exception:
         return None
 
 
-def select_image_for_time_cli(theme_path: str, config_path: str) -> str:
-    """Select image based on current time using time-based detection.
+@dataclass(frozen=True)
+class Selection:
+    """Result of one :func:`select_at` pass.
+
+    Attributes:
+        now: The instant the selection was made for (aware).
+        model: Time model that produced the image: ``"sun"``, or
+            ``"legacy"`` (configured, or the fallback after a sun-model
+            failure).
+        category: Time-of-day category of the image.
+        image: Image value from the theme's lists (1-based index).
+        path: The image file.
+        window_start: Start of the image's display window.
+        window_end: End of the image's display window.
+        next_change: First instant after ``now`` at which ``model``
+            selects another image; None when it cannot be computed.
+    """
+
+    now: datetime
+    model: str
+    category: str
+    image: int
+    path: str
+    window_start: Optional[datetime]
+    window_end: Optional[datetime]
+    next_change: Optional[datetime]
+
+
+def _select_sun(theme_path_obj: Path, theme_data: Dict[str, Any],
+                config, now: datetime) -> Selection:
+    seg = segments_for_config(config, now=now)
+    category, image = image_at(now, seg, theme_data)
+    path = _match_image_file(theme_path_obj, image, theme_data)
+    window_start, window_end = (timeline_for(seg, theme_data).window_of(image)
+                                or (None, None))
+    return Selection(now=now, model='sun', category=category, image=image,
+                     path=path, window_start=window_start,
+                     window_end=window_end,
+                     next_change=next_change_time(now, seg, theme_data, image))
+
+
+def _select_legacy(theme_path_obj: Path, theme_data: Dict[str, Any],
+                   config, now: datetime, strict: bool) -> Selection:
+    sun_for = legacy_sun_for(config)
+    sun = sun_for(now.date())
+    time_of_day = None
+    if sun is None:
+        if strict:
+            raise ValueError(f"sun times unavailable for {now.date()}")
+        # Category from the schedule backup when astral fails.
+        time_of_day = detect_time_of_day_sun(config, now=now)
+    category, image, window_start, window_end = legacy_slot_at(
+        now, sun, theme_data, time_of_day=time_of_day)
+    path = _match_image_file(theme_path_obj, image, theme_data)
+    next_change = None
+    if sun is not None:
+        try:
+            next_change = legacy_next_change_time(now, theme_data, sun_for)
+        except ValueError:
+            if strict:
+                raise
+    return Selection(now=now, model='legacy', category=category, image=image,
+                     path=path, window_start=window_start,
+                     window_end=window_end, next_change=next_change)
 
-    This is the main CLI function that works with file paths.
+
+def select_at(theme_path: Union[str, Path], config,
+              now: Optional[datetime] = None,
+              strict: bool = False) -> Selection:
+    """Select the image for ``now`` and when it changes, in one pass.
 
     Args:
-        theme_path: Path to theme directory or zip file
-        config_path: Path to config file
+        theme_path: Theme directory or .zip/.ddw archive.
+        config: ConfigSnapshot, or path to config file.
+        now: Instant to select for (default: now in the configured
+            timezone).
+        strict: Propagate failures of the configured model instead of
+            falling back — the sun model to legacy, a missing next
+            change to None.
 
     Returns:
-        Path to selected image file
+        The :class:`Selection`.
 
     Raises:
-        FileNotFoundError: If theme.json not found
+        FileNotFoundError: If theme.json or the image file is not found
         ValueError: If no images available
+        IncompleteSegmentsError: Sun segments incomplete (strict only)
     """
-    theme_path_obj = _resolve_theme_dir(theme_path)
+    theme_path_obj = _resolve_theme_dir(str(theme_path))
     theme_data = load_theme_data(theme_path_obj)
 
     try:
-        config = load_config(config_path)
-        timezone = config.get('location', {}).get('timezone', 'America/Phoenix')
-        now = datetime.now(ZoneInfo(timezone))
+        snap = as_snapshot(config)
+        config, model, tz = snap, snap.suntime_model, snap.tz
     except Exception:
+        if strict:
+            raise
         # Fallback to UTC if timezone not available
-        config = {}
-        now = datetime.now(ZoneInfo('UTC'))
+        model, tz = None, ZoneInfo('UTC')
+    if now is None:
+        now = datetime.now(tz)
+    elif now.tzinfo is None:
+        now = now.replace(tzinfo=tz)
+    else:
+        now = now.astimezone(tz)
 
     # Sun-position model (WDD-style): routed by scheduling.suntime_model.
     # Any failure (polar incomplete segments, empty image list, astral
     # unavailable) falls back to the legacy model below.
-    if config.get('scheduling', {}).get('suntime_model') == 'sun':
+    if model == 'sun':
         try:
-            seg = segments_for_config(config_path, now=now)
-            _category, image_index = image_at(now, seg, theme_data)
-            return _match_image_file(theme_path_obj, image_index, theme_data)
+            return _select_sun(theme_path_obj, theme_data, config, now)
         except Exception as e:
+            if strict:
+                raise
             logger.warning(
                 "Sun-position model failed (%s); falling back to legacy", e)
 
-    # Get time-of-day category
-    time_of_day = detect_time_of_day_sun(config_path, now=now)
+    return _select_legacy(theme_path_obj, theme_data, config, now, strict)
 
-    # Get image list for current time-of-day
-    time_of_day, image_list = _pick_image_list(theme_data, time_of_day)
 
-    # Get sun times for position calculation
-    sun = _sun_for_config(config_path)
+def select_image_for_time_cli(theme_path: str, config) -> str:
+    """Select image based on current time using time-based detection.
 
-    # Calculate image index based on time period
-    if time_of_day == "night":
-        period_start, period_end = image_period("night", now, sun, tz=None)
-        period_duration = (period_end - period_start).total_seconds()
-        now_for_pos = _night_now_for_pos(now, period_start, period_end)
-        position = (now_for_pos - period_start).total_seconds() / period_duration
-        list_index = int((position - 1e-9) * len(image_list))
-        list_index = max(0, min(list_index, len(image_list) - 1))
-        image_index = image_list[list_index]
-    else:
-        period_start, period_end = image_period(time_of_day, now, sun, tz=None)
-        period_duration = (period_end - period_start).total_seconds()
-        position = (now - period_start).total_seconds() / period_duration
-        if time_of_day == "sunrise":
-            image_index = int((position - 1e-9) * len(image_list)) + 1
-        elif time_of_day == "day":
-            image_index = int((position - 1e-9) * len(image_list)) + 5
-        elif time_of_day == "sunset":
-            image_index = int((position - 1e-9) * len(image_list)) + 10
-        else:
-            image_index = image_list[0]
+    This is the main CLI function that works with file paths.
 
-    return _match_image_file(theme_path_obj, image_index, theme_data)
+    Args:
+        theme_path: Path to theme directory or zip file
+        config: ConfigSnapshot, or path to config file
+
+    Returns:
+        Path to selected image file
+
+    Raises:
+        FileNotFoundError: If theme.json not found
+        ValueError: If no images available
+    """
+    return select_at(theme_path, config).path
 
 
 def select_image_for_specific_time(time_str: str, theme_path: str,
-                                   config_path: str) -> str:
+                                   config) -> str:
     """Select image for a specific time (HH:MM format).
 
     Args:
         time_str: Time string in HH:MM format
         theme_path: Path to theme directory or zip file
-        config_path: Path to config file
+        config: ConfigSnapshot, or path to config file
 
     Returns:
         Path to selected image file
@@ -217,18 +276,17 @@ def select_image_for_specific_time(time_str: str, theme_path: str,
 
         # Get config timezone for timezone-aware datetime
         try:
-            config = load_config(config_path)
-            timezone = config.get('location', {}).get(
-                'timezone', 'America/Los_Angeles')
+            snap = as_snapshot(config)
+            config, model, tz = snap, snap.suntime_model, snap.tz
         except Exception:
-            config = {}
-            timezone = 'America/Los_Angeles'
+            snap, model = None, None
+            tz = ZoneInfo('America/Los_Angeles')
 
         # Ensure now is timezone-aware in the config timezone
         if now.tzinfo is None:
-            now = now.replace(tzinfo=ZoneInfo(timezone))
+            now = now.replace(tzinfo=tz)
         else:
-            now = now.astimezone(ZoneInfo(timezone))
+            now = now.astimezone(tz)
     except ValueError as e:
         raise ValueError(f"Invalid time format. Expected HH:MM, e.g., 14:30: {e}")
 
@@ -238,9 +296,9 @@ def select_image_for_specific_time(time_str: str, theme_path: str,
     # Sun-position model (WDD-style): routed by scheduling.suntime_model.
     # Any failure (polar incomplete segments, empty image list, astral
     # unavailable) falls back to the legacy model below.
-    if config.get('scheduling', {}).get('suntime_model') == 'sun':
+    if model == 'sun':
         try:
-            seg = segments_for_config(config_path, now=now)
+            seg = segments_for_config(config, now=now)
             _category, image_index = image_at(now, seg, theme_data)
             return _match_image_file(theme_path_obj, image_index, theme_data)
         except Exception as e:
@@ -248,26 +306,20 @@ def select_image_for_specific_time(time_str: str, theme_path: str,
                 "Sun-position model failed (%s); falling back to legacy", e)
 
     try:
-        time_of_day = detect_time_of_day_for_time(time_str, config_path)
+        time_of_day = detect_time_of_day_for_time(time_str, config)
     except Exception:
-        # Fallback to previous day's backup
+        # Fallback to the forward schedule backup
         from kwallpaper.backup import load_daily_backup_schedule
-        backup = load_daily_backup_schedule()
+        backup = load_daily_backup_schedule(now)
         if backup:
             time_of_day = backup['time_of_day']
         else:
-            raise RuntimeError("Astral failed and no previous day backup exists")
+            raise RuntimeError("Astral failed and no schedule backup covers today")
 
     time_of_day, image_list = _pick_image_list(theme_data, time_of_day)
 
-    try:
-        config = load_config(config_path)
-        timezone = config.get('location', {}).get('timezone', 'America/Phoenix')
-    except Exception:
-        timezone = 'America/Phoenix'
-
-    sun = _sun_for_config(config_path)
-    tz = ZoneInfo(timezone)
+    sun = _sun_for_config(config)
+    tz = snap.tz if snap is not None else ZoneInfo('America/Phoenix')
 
     # Calculate image index based on time period
     if time_of_day == "night":
@@ -352,23 +404,23 @@ def select_image_for_time(theme_data: Dict[str, Any], now: datetime,
 
             time_of_day = time_of_day_for(now, sun)
         except Exception:
-            # Astral failed - try to load previous day's backup
+            # Astral failed - fall back to the forward schedule backup
             from kwallpaper.backup import load_daily_backup_schedule
-            backup = load_daily_backup_schedule()
+            backup = load_daily_backup_schedule(now)
             if backup:
                 time_of_day = backup['time_of_day']
                 sun = None
             else:
-                raise RuntimeError("Astral failed and no previous day backup exists")
+                raise RuntimeError("Astral failed and no schedule backup covers today")
     else:
-        # No Astral available - try to load previous day's backup
+        # No Astral available - fall back to the forward schedule backup
         from kwallpaper.backup import load_daily_backup_schedule
-        backup = load_daily_backup_schedule()
+        backup = load_daily_backup_schedule(now)
         if backup:
             time_of_day = backup['time_of_day']
             sun = None
         else:
-            raise RuntimeError("Astral unavailable and no previous day backup exists")
+            raise RuntimeError("Astral unavailable and no schedule backup covers today")
 
     # Get image list for current time-of-day
     image_list = theme_data.get(f"{time_of_day}ImageList", [])
@@ -3,15 +3,16 @@
 Shuffle List Manager - Manages daily theme shuffling.
 
 This module handles the creation, persistence, and iteration of shuffled theme lists.
+The shuffle state lives in the run-state store (:mod:`kwallpaper.state_store`);
+callers that already hold an open state document use :func:`advance_shuffle`
+on its ``shuffle`` section instead of the load/save helpers.
 """
 
-import json
 import random
-from pathlib import Path
 from datetime import date
-from typing import List, Tuple, Optional, Dict, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from kwallpaper.config import DEFAULT_SHUFFLE_LIST_PATH
+from kwallpaper import state_store
 
 
 def create_initial_shuffle(themes: List[str]) -> List[str]:
@@ -89,83 +90,80 @@ def check_day_passed(last_change_date: str, current_date: Optional[str] = None)
 
 def save_theme_change_date(
     last_change_date: str,
-    shuffle_path: Optional[Path] = None
+    config_path: Optional[str] = None
 ) -> None:
     """Save the date of the last theme change."""
-    if shuffle_path is None:
-        shuffle_path = DEFAULT_SHUFFLE_LIST_PATH
-    
-    shuffle_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    state = load_shuffle_list(shuffle_path)
-    state['last_change_date'] = last_change_date
-    
-    with open(shuffle_path, 'w') as f:
-        json.dump(state, f, indent=2)
+    with state_store.transaction(config_path) as state:
+        state["shuffle"]["last_change_date"] = last_change_date
 
 
-def load_theme_change_date(shuffle_path: Optional[Path] = None) -> str:
+def load_theme_change_date(config_path: Optional[str] = None) -> str:
     """Load the date of the last theme change."""
-    if shuffle_path is None:
-        shuffle_path = DEFAULT_SHUFFLE_LIST_PATH
-    
-    state = load_shuffle_list(shuffle_path)
-    return state.get('last_change_date', '')
+    return load_shuffle_list(config_path).get('last_change_date', '')
 
 
 def save_shuffle_list(
     shuffle_list: List[str],
     current_index: int,
     last_used_date: str,
-    shuffle_path: Optional[Path] = None
+    config_path: Optional[str] = None
 ) -> None:
-    """Save shuffle list state to JSON file.
+    """Save shuffle list state to the run-state store.
     
     Args:
         shuffle_list: Current shuffled list of themes
         current_index: Current position in the list
         last_used_date: Date when list was last used (YYYY-MM-DD format)
-        shuffle_path: Optional path to save to (defaults to DEFAULT_SHUFFLE_LIST_PATH)
+        config_path: Config whose store to update (defaults to DEFAULT_CONFIG_PATH)
     """
-    if shuffle_path is None:
-        shuffle_path = DEFAULT_SHUFFLE_LIST_PATH
-    
-    shuffle_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Load existing state to preserve last_change_date
-    existing_state = load_shuffle_list(shuffle_path)
-    state = {
-        "shuffle_list": shuffle_list,
-        "current_index": current_index,
-        "last_used_date": last_used_date,
-        "last_change_date": existing_state.get('last_change_date', '')
-    }
-    
-    with open(shuffle_path, 'w') as f:
-        json.dump(state, f, indent=2)
+    with state_store.transaction(config_path) as state:
+        # last_change_date is preserved
+        state["shuffle"].update(shuffle_list=shuffle_list,
+                                current_index=current_index,
+                                last_used_date=last_used_date)
 
 
-def load_shuffle_list(shuffle_path: Optional[Path] = None) -> Dict[str, Any]:
-    """Load shuffle list state from JSON file.
+def load_shuffle_list(config_path: Optional[str] = None) -> Dict[str, Any]:
+    """Load shuffle list state from the run-state store.
     
     Args:
-        shuffle_path: Optional path to load from (defaults to DEFAULT_SHUFFLE_LIST_PATH)
+        config_path: Config whose store to read (defaults to DEFAULT_CONFIG_PATH)
         
     Returns:
-        Dictionary with shuffle_list, current_index, and last_used_date
+        Dictionary with shuffle_list, current_index, last_used_date and
+        last_change_date
     """
-    if shuffle_path is None:
-        shuffle_path = DEFAULT_SHUFFLE_LIST_PATH
-    
-    if not shuffle_path.exists():
-        return {
-            "shuffle_list": [],
-            "current_index": 0,
-            "last_used_date": ""
-        }
-    
-    with open(shuffle_path, 'r') as f:
-        return json.load(f)
+    return state_store.load_state(config_path)["shuffle"]
+
+
+def advance_shuffle(shuffle: Dict[str, Any], theme_paths: Callable[[], List[str]],
+                    current_date: str) -> str:
+    """Apply the daily shuffle rules to ``shuffle`` and return today's theme.
+
+    ``shuffle`` is a state-store shuffle section and is updated in place:
+    reshuffled (from ``theme_paths()``) when exhausted, advanced by one
+    when ``current_date`` differs from ``last_change_date``, and stamped
+    with ``current_date``.  Nothing is persisted; the caller commits the
+    section once the wallpaper is up, so a failed change never advances
+    the list.
+    """
+    shuffle_list = shuffle.get("shuffle_list", [])
+    current_index = shuffle.get("current_index", 0)
+
+    if check_and_reshuffle(shuffle_list, current_index,
+                           shuffle.get("last_used_date", "")):
+        shuffle_list = create_initial_shuffle(theme_paths())
+        current_index = 0
+
+    if check_day_passed(shuffle.get("last_change_date", ""), current_date):
+        current_index = (current_index + 1) % len(shuffle_list) if shuffle_list else 0
+        shuffle["last_change_date"] = current_date
+
+    shuffle.update(shuffle_list=shuffle_list, current_index=current_index,
+                   last_used_date=current_date)
+    if not shuffle_list:
+        raise FileNotFoundError("No themes found in themes directory")
+    return shuffle_list[current_index]
 
 
 def get_current_date(timezone_str: Optional[str] = None) -> str:
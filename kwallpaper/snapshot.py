@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+kWallpaper config snapshots.
+
+A cycle run used to hand a ``config_path`` string to every selection and
+segment function, and each of them loaded the config again, looked up
+the location and built its own ``ZoneInfo``.  :class:`ConfigSnapshot`
+is that work done once: the normalized config, the run state's theme
+fields (:mod:`kwallpaper.state_store`) and the values derived from them,
+parsed a single time and then passed down the pipeline.
+
+Snapshots are immutable (frozen, ``__slots__``): the raw config and
+state are exposed as read-only mappings with lists turned into tuples,
+so one snapshot can be shared between the scheduler thread, an async
+apply and the GUI without anyone changing it under the others.  Take a
+new snapshot (:func:`load_snapshot`) to see later edits.
+
+The path-based functions (``segments_for_config(config_path, ...)`` and
+friends) keep working: they accept either a snapshot or a path and turn
+a path into a snapshot with :func:`as_snapshot`.
+"""
+
+import copy
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Union
+from zoneinfo import ZoneInfo
+
+from kwallpaper.config import DEFAULT_CONFIG_PATH, _default_config, load_config
+
+ConfigSource = Union["ConfigSnapshot", str, Path]
+
+_DEFAULTS = _default_config()
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return copy.copy(value)
+
+
+def _section_value(config: Dict[str, Any], section: str, key: str) -> Any:
+    values = config.get(section)
+    if isinstance(values, dict) and key in values:
+        return values[key]
+    return _DEFAULTS[section][key]
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigSnapshot:
+    """Everything a cycle run reads from the config and run state.
+
+    Attributes:
+        path: The config file the snapshot was taken from.
+        timezone: IANA timezone name (``location.timezone``).
+        tz: ``ZoneInfo`` for ``timezone``, built once.
+        latitude: ``location.latitude``.
+        longitude: ``location.longitude``.
+        suntime_model: ``"sun"`` or ``"legacy"``.
+        cycle_interval: Seconds between cycle runs.
+        safety_interval: Safety-net tick in seconds.
+        prefetch_lead: Seconds to warm the next image ahead (0 = off).
+        daily_shuffle: Whether the daily theme shuffle is enabled.
+        config: The whole normalized config, read-only.
+        state: The run-state document, read-only.
+    """
+
+    path: Path
+    timezone: str
+    tz: ZoneInfo
+    latitude: float
+    longitude: float
+    suntime_model: str
+    cycle_interval: int
+    safety_interval: int
+    prefetch_lead: int
+    daily_shuffle: bool
+    config: Mapping[str, Any]
+    state: Mapping[str, Any]
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any],
+                    path: Optional[Union[str, Path]] = None,
+                    state: Optional[Dict[str, Any]] = None) -> "ConfigSnapshot":
+        """Build a snapshot from an already loaded (normalized) config.
+
+        ``state`` defaults to the run state stored next to ``path``.
+
+        Raises:
+            zoneinfo.ZoneInfoNotFoundError: If the timezone is unknown.
+        """
+        path = Path(path or DEFAULT_CONFIG_PATH).expanduser()
+        if state is None:
+            from kwallpaper import state_store
+            state = state_store.load_state(path)
+        timezone = _section_value(config, "location", "timezone")
+        return cls(
+            path=path,
+            timezone=timezone,
+            tz=ZoneInfo(timezone),
+            latitude=float(_section_value(config, "location", "latitude")),
+            longitude=float(_section_value(config, "location", "longitude")),
+            suntime_model=_section_value(config, "scheduling", "suntime_model"),
+            cycle_interval=_section_value(config, "scheduling", "cycle_interval"),
+            safety_interval=_section_value(config, "scheduling", "safety_interval"),
+            prefetch_lead=_section_value(config, "scheduling", "prefetch_lead"),
+            daily_shuffle=bool(_section_value(config, "scheduling",
+                                              "daily_shuffle_enabled")),
+            config=_freeze(config),
+            state=_freeze(state),
+        )
+
+    @property
+    def last_applied_theme(self) -> str:
+        """Theme directory of the last apply ("" if none yet)."""
+        return self.state.get("last_applied", {}).get("theme") or ""
+
+    @property
+    def last_applied_image(self) -> str:
+        """Image path of the last apply ("" if none yet)."""
+        return self.state.get("last_applied", {}).get("image") or ""
+
+    def config_dict(self) -> Dict[str, Any]:
+        """A mutable deep copy of the config, for dict-based callers."""
+        return _thaw(self.config)
+
+    def state_dict(self) -> Dict[str, Any]:
+        """A mutable deep copy of the run state."""
+        return _thaw(self.state)
+
+
+def load_snapshot(config_path: Optional[Union[str, Path]] = None) -> ConfigSnapshot:
+    """Load the config at ``config_path`` (default config) and its state.
+
+    Raises:
+        FileNotFoundError: If the config file does not exist.
+        ValueError: If it is invalid.
+        zoneinfo.ZoneInfoNotFoundError: If the timezone is unknown.
+    """
+    path = Path(config_path or DEFAULT_CONFIG_PATH).expanduser()
+    return ConfigSnapshot.from_config(load_config(str(path)), path)
+
+
+def as_snapshot(config: ConfigSource) -> ConfigSnapshot:
+    """Return ``config`` if it is already a snapshot, else load one."""
+    if isinstance(config, ConfigSnapshot):
+        return config
+    return load_snapshot(config)
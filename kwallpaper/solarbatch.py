@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+kWallpaper vectorized sun-segment engine (optional, needs NumPy).
+
+:func:`kwallpaper.solarsegments.solar_segments` computes one day with
+astral's scalar solver: five ``time_of_transit`` evaluations per day,
+each two NOAA passes.  Schedules that span many days — a year-long
+export, a multi-day preview, simulations — pay that per day.  This
+module evaluates the same NOAA equations astral uses (``astral.sun``:
+Julian century, equation of time, solar declination, hour angle with
+refraction at the target zenith, the two-pass transit refinement and
+the "crossing fell on another local date" retry of ``dawn``/``dusk``)
+over an array of dates at once.
+
+Results agree with ``solar_segments()`` to well within a second,
+including polar days/nights where a crossing does not exist (NaN in
+the columnar form, None in :class:`~kwallpaper.solarsegments.Segments`).
+The observer is at elevation 0, as in ``solar_segments()``.
+
+NumPy is optional: :data:`NUMPY_AVAILABLE` is False without it and the
+entry points raise RuntimeError; callers use ``solar_segments()``
+instead.
+"""
+
+import logging
+from datetime import date, datetime, timezone
+from typing import Dict, List, Sequence
+from zoneinfo import ZoneInfo
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+from kwallpaper.solarsegments import Segments
+
+logger = logging.getLogger(__name__)
+
+#: Column names of :func:`segment_arrays` (besides ``day``).
+BOUNDARIES = ("dawn", "golden_hour_end", "golden_hour", "dusk", "next_dawn")
+
+_JD_UNIX_EPOCH = 2440587.5      # Julian day of 1970-01-01T00:00Z
+_JD_J2000 = 2451545.0
+_CIVIL_ZENITH = 96.0            # sun at -6 deg: dawn / dusk
+_GOLDEN_ZENITH = 84.0           # sun at +6 deg: golden hour (end)
+
+
+def _require_numpy() -> None:
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("numpy is not installed")
+
+
+# ── NOAA solar equations (vectorized transcriptions of astral.sun) ───────
+
+def _geom_mean_long_sun(jc):
+    return (280.46646 + jc * (36000.76983 + 0.0003032 * jc)) % 360.0
+
+
+def _geom_mean_anomaly_sun(jc):
+    return 357.52911 + jc * (35999.05029 - 0.0001537 * jc)
+
+
+def _eccentricity_earth_orbit(jc):
+    return 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+
+
+def _sun_eq_of_center(jc):
+    m = np.radians(_geom_mean_anomaly_sun(jc))
+    return (np.sin(m) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+            + np.sin(2 * m) * (0.019993 - 0.000101 * jc)
+            + np.sin(3 * m) * 0.000289)
+
+
+def _sun_apparent_long(jc):
+    true_long = _geom_mean_long_sun(jc) + _sun_eq_of_center(jc)
+    omega = 125.04 - 1934.136 * jc
+    return true_long - 0.00569 - 0.00478 * np.sin(np.radians(omega))
+
+
+def _obliquity_correction(jc):
+    seconds = 21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))
+    e0 = 23.0 + (26.0 + seconds / 60.0) / 60.0
+    omega = 125.04 - 1934.136 * jc
+    return e0 + 0.00256 * np.cos(np.radians(omega))
+
+
+def _sun_declination(jc):
+    e = np.radians(_obliquity_correction(jc))
+    lambd = np.radians(_sun_apparent_long(jc))
+    return np.degrees(np.arcsin(np.sin(e) * np.sin(lambd)))
+
+
+def _eq_of_time(jc):
+    l0 = np.radians(_geom_mean_long_sun(jc))
+    e = _eccentricity_earth_orbit(jc)
+    m = np.radians(_geom_mean_anomaly_sun(jc))
+    y = np.tan(np.radians(_obliquity_correction(jc)) / 2.0) ** 2
+    etime = (y * np.sin(2 * l0) - 2.0 * e * np.sin(m)
+             + 4.0 * e * y * np.sin(m) * np.cos(2 * l0)
+             - 0.5 * y * y * np.sin(4 * l0) - 1.25 * e * e * np.sin(2 * m))
+    return np.degrees(etime) * 4.0
+
+
+def _hour_angle(lat: float, declination, zenith: float, rising: bool):
+    """Hour angle (radians) of the ``zenith`` crossing; NaN where the
+    sun never reaches it (astral raises "math domain error" there)."""
+    lat_r, dec_r = np.radians(lat), np.radians(declination)
+    h = ((np.cos(np.radians(zenith)) - np.sin(lat_r) * np.sin(dec_r))
+         / (np.cos(lat_r) * np.cos(dec_r)))
+    with np.errstate(invalid="ignore"):
+        ha = np.arccos(h)
+    return ha if rising else -ha
+
+
+def _refraction_at_zenith(zenith: float) -> float:
+    elevation = 90.0 - zenith
+    if elevation >= 85.0:
+        return 0.0
+    te = np.tan(np.radians(elevation))
+    if elevation > 5.0:
+        correction = 58.1 / te - 0.07 / te ** 3 + 0.000086 / te ** 5
+    elif elevation > -0.575:
+        correction = 1735.0 + elevation * (-518.2 + elevation * (
+            103.4 + elevation * (-12.79 + elevation * 0.711)))
+    else:
+        correction = -20.774 / te
+    return float(correction) / 3600.0
+
+
+def _transit(day_numbers, lat: float, lon: float, zenith: float,
+             rising: bool):
+    """UTC epoch seconds of the ``zenith`` crossing on each UTC day
+    (``day_numbers``: days since 1970-01-01); astral.sun.time_of_transit."""
+    lat = min(max(lat, -89.8), 89.8)
+    refraction = _refraction_at_zenith(zenith)
+    jd = day_numbers + _JD_UNIX_EPOCH
+    jc = (jd - _JD_J2000) / 36525.0
+    ha = _hour_angle(lat, _sun_declination(jc), zenith - refraction, rising)
+    minutes = 720.0 + 4.0 * (-lon - np.degrees(ha)) - _eq_of_time(jc)
+
+    jc = (jd + minutes / 1440.0 - _JD_J2000) / 36525.0
+    ha = _hour_angle(lat, _sun_declination(jc), zenith + refraction, rising)
+    minutes = 720.0 + 4.0 * (-lon - np.degrees(ha)) - _eq_of_time(jc)
+    return day_numbers * 86400.0 + minutes * 60.0
+
+
+def _local_day_numbers(seconds, tz: ZoneInfo):
+    """Local calendar day (days since 1970-01-01) of each UTC instant."""
+    out = np.full(seconds.shape, np.nan)
+    for i, ts in enumerate(seconds):
+        if np.isfinite(ts):
+            local = datetime.fromtimestamp(ts, tz)
+            out[i] = (local.date() - date(1970, 1, 1)).days
+    return out
+
+
+def _crossing(day_numbers, tz: ZoneInfo, lat: float, lon: float,
+              zenith: float, rising: bool):
+    """astral.sun.dawn/dusk: the crossing on each *local* date, retried
+    one day earlier/later when the first estimate lands on another
+    local date."""
+    seconds = _transit(day_numbers, lat, lon, zenith, rising)
+    local = _local_day_numbers(seconds, tz)
+    shift = np.where(local < day_numbers, 1.0, -1.0)
+    retry = np.isfinite(local) & (local != day_numbers)
+    if retry.any():
+        seconds[retry] = _transit(day_numbers[retry] + shift[retry],
+                                  lat, lon, zenith, rising)
+    return seconds
+
+
+def segment_arrays(days: Sequence[date], tz: ZoneInfo, lat: float,
+                   lon: float) -> Dict[str, "np.ndarray"]:
+    """Columnar segments for ``days`` at (lat, lon) in ``tz``.
+
+    Returns a dict with ``day`` (``datetime64[D]``) and one float64
+    array of UTC epoch seconds per name in :data:`BOUNDARIES`; NaN marks
+    a crossing that does not exist that day.
+
+    Raises:
+        RuntimeError: NumPy is not installed.
+    """
+    _require_numpy()
+    day_numbers = np.array(
+        [(d - date(1970, 1, 1)).days for d in days], dtype=np.float64)
+    # A day's next_dawn is the following day's dawn: over a run of
+    # consecutive days, n + 1 dawn evaluations cover both columns.
+    dawn_days = np.union1d(day_numbers, day_numbers + 1)
+    dawns = _crossing(dawn_days, tz, lat, lon, _CIVIL_ZENITH, True)
+    return {
+        "day": day_numbers.astype("datetime64[D]"),
+        "dawn": dawns[np.searchsorted(dawn_days, day_numbers)],
+        "golden_hour_end": _crossing(day_numbers, tz, lat, lon,
+                                     _GOLDEN_ZENITH, True),
+        "golden_hour": _crossing(day_numbers, tz, lat, lon,
+                                 _GOLDEN_ZENITH, False),
+        "dusk": _crossing(day_numbers, tz, lat, lon, _CIVIL_ZENITH, False),
+        "next_dawn": dawns[np.searchsorted(dawn_days, day_numbers + 1)],
+    }
+
+
+def batch_segments(days: Sequence[date], tz: ZoneInfo, lat: float,
+                   lon: float) -> List[Segments]:
+    """:class:`Segments` for every day in ``days`` (same as calling
+    ``solar_segments()`` per day, in one vectorized pass).
+
+    Raises:
+        RuntimeError: NumPy is not installed.
+    """
+    columns = segment_arrays(days, tz, lat, lon)
+
+    def at(name: str, i: int):
+        ts = columns[name][i]
+        if not np.isfinite(ts):
+            return None
+        return datetime.fromtimestamp(float(ts), timezone.utc).astimezone(tz)
+
+    return [Segments(day=d, **{name: at(name, i) for name in BOUNDARIES})
+            for i, d in enumerate(days)]
@@ -15,9 +15,30 @@ This module is self-contained: it imports nothing from kwallpaper.suntime
 ``scheduling.suntime_model`` config field ("legacy" | "sun").  When the
 segments are incomplete (polar day/night, astral failure) callers fall
 back to the legacy model.
+
+:func:`solar_segments` is memoized in a bounded LRU keyed on
+``(day, timezone, lat, lon)`` with the coordinates rounded to
+``location.coordinate_precision`` decimal places (default 4 = ~11 m,
+far below anything the sun times can resolve; the LRU holds
+``scheduling.segment_cache_size`` days, default 64), so the cycle run, the next-change re-arm, the
+prefetch and the GUI preview all share one astral computation per day.
+A day computed next to a cached one reuses the shared boundary (today's
+``next_dawn`` is tomorrow's ``dawn``).  :func:`segment_cache_stats`
+reports the hit rate.  Below the LRU sits the on-disk year table of
+:mod:`kwallpaper.solartable`, so a fresh process usually never calls
+astral at all.
+
+The image schedule of one day and theme is compiled once into a
+:class:`Timeline` (:func:`timeline_for`, cached next to the segments):
+sorted boundary instants plus the per-window image lists, so
+:func:`image_at`, :func:`next_change_time` and the schedule preview
+answer with a bisect instead of rebuilding and scanning the windows.
 """
 
 import logging
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
 from typing import Any, Callable, Dict, List, Optional, Tuple
@@ -76,38 +97,150 @@ def _astral_boundary(fn, observer, day, tz, **kwargs) -> Optional[datetime]:
         return None
 
 
-def solar_segments(day: date, tz: ZoneInfo, lat: float,
-                   lon: float) -> Segments:
-    """Compute the WDD segments for ``day`` at (lat, lon) in timezone ``tz``.
+# Sentinel for "boundary not known yet" (None means "no crossing").
+_UNKNOWN = object()
+
+_segment_cache_size = 64
+_coord_precision = 4
+_segment_cache_lock = threading.Lock()
+# (day, tz key, lat, lon) -> Segments, least recently used first
+_segment_cache: "OrderedDict[Tuple[date, str, float, float], Segments]" = OrderedDict()
+_segment_cache_stats = {"hits": 0, "misses": 0}
+# (Segments, image lists) -> Timeline, same bound as the segment cache
+_timeline_cache: "OrderedDict[Tuple[Segments, Tuple], Timeline]" = OrderedDict()
+
+
+def configure_from_config(config: Dict[str, Any]) -> None:
+    """Apply ``scheduling.segment_cache_size`` and
+    ``location.coordinate_precision`` from a (normalized) config."""
+    if not isinstance(config, dict):
+        return
+    scheduling = config.get('scheduling', {})
+    location = config.get('location', {})
+    if isinstance(scheduling, dict):
+        set_segment_cache_size(scheduling.get('segment_cache_size', 64))
+    if isinstance(location, dict):
+        set_coordinate_precision(location.get('coordinate_precision', 4))
+
+
+def set_segment_cache_size(size: int) -> None:
+    """Bound the segment cache to ``size`` days (0 disables it)."""
+    global _segment_cache_size
+    if isinstance(size, int) and not isinstance(size, bool) and size >= 0:
+        _segment_cache_size = size
+        with _segment_cache_lock:
+            while len(_segment_cache) > size:
+                _segment_cache.popitem(last=False)
+            while len(_timeline_cache) > size:
+                _timeline_cache.popitem(last=False)
+    else:
+        logger.warning(f"Invalid scheduling.segment_cache_size {size!r}; "
+                       f"keeping {_segment_cache_size}")
 
-    Boundaries:
-      dawn            sun at -6 deg  (astral dawn, civil twilight)
-      golden_hour_end sun at +6 deg  (astral dawn with depression=-6)
-      golden_hour     sun at +6 deg  (astral dusk with depression=-6)
-      dusk            sun at -6 deg  (astral dusk, civil twilight)
-      next_dawn       following day's dawn (end of the night segment)
 
-    Missing crossings (polar day/night) are returned as None, never
-    raised.
-    """
+def set_coordinate_precision(digits: int) -> None:
+    """Round cache keys (and the computation) to ``digits`` decimals."""
+    global _coord_precision
+    if isinstance(digits, int) and not isinstance(digits, bool) and digits >= 0:
+        if digits != _coord_precision:
+            _coord_precision = digits
+            clear_segment_cache()
+    else:
+        logger.warning(f"Invalid location.coordinate_precision {digits!r}; "
+                       f"keeping {_coord_precision}")
+
+
+def clear_segment_cache() -> None:
+    """Drop every cached day and reset the hit/miss counters."""
+    with _segment_cache_lock:
+        _segment_cache.clear()
+        _timeline_cache.clear()
+        _segment_cache_stats.update(hits=0, misses=0)
+
+
+def segment_cache_stats() -> Dict[str, Any]:
+    """Hits, misses, hit rate and current/maximum size of the cache."""
+    with _segment_cache_lock:
+        hits, misses = _segment_cache_stats["hits"], _segment_cache_stats["misses"]
+        size = len(_segment_cache)
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "size": size,
+            "maxsize": _segment_cache_size,
+            "hit_rate": hits / total if total else 0.0}
+
+
+def _compute_segments(day: date, tz: ZoneInfo, lat: float, lon: float,
+                      dawn: Any = _UNKNOWN,
+                      next_dawn: Any = _UNKNOWN) -> Segments:
+    """Uncached :func:`solar_segments`; ``dawn``/``next_dawn`` may be
+    supplied by a neighbouring day."""
     import astral
     from astral import sun as _sun
 
     location = astral.LocationInfo("kwallpaper", "default", tz.key, lat, lon)
     observer = location.observer
+    if dawn is _UNKNOWN:
+        dawn = _astral_boundary(_sun.dawn, observer, day, tz)
+    if next_dawn is _UNKNOWN:
+        next_dawn = _astral_boundary(_sun.dawn, observer,
+                                     day + timedelta(days=1), tz)
     return Segments(
         day=day,
-        dawn=_astral_boundary(_sun.dawn, observer, day, tz),
+        dawn=dawn,
         golden_hour_end=_astral_boundary(_sun.dawn, observer, day, tz,
                                          depression=-6),
         golden_hour=_astral_boundary(_sun.dusk, observer, day, tz,
                                      depression=-6),
         dusk=_astral_boundary(_sun.dusk, observer, day, tz),
-        next_dawn=_astral_boundary(_sun.dawn, observer,
-                                   day + timedelta(days=1), tz),
+        next_dawn=next_dawn,
     )
 
 
+def solar_segments(day: date, tz: ZoneInfo, lat: float,
+                   lon: float) -> Segments:
+    """Compute the WDD segments for ``day`` at (lat, lon) in timezone ``tz``.
+
+    Boundaries:
+      dawn            sun at -6 deg  (astral dawn, civil twilight)
+      golden_hour_end sun at +6 deg  (astral dawn with depression=-6)
+      golden_hour     sun at +6 deg  (astral dusk with depression=-6)
+      dusk            sun at -6 deg  (astral dusk, civil twilight)
+      next_dawn       following day's dawn (end of the night segment)
+
+    Missing crossings (polar day/night) are returned as None, never
+    raised.  Results are cached (see the module docstring); a cache miss
+    reads the precomputed year table (:mod:`kwallpaper.solartable`)
+    before asking astral.
+    """
+    lat, lon = round(lat, _coord_precision), round(lon, _coord_precision)
+    key = (day, tz.key, lat, lon)
+    with _segment_cache_lock:
+        cached = _segment_cache.get(key)
+        if cached is not None:
+            _segment_cache.move_to_end(key)
+            _segment_cache_stats["hits"] += 1
+            return cached
+        _segment_cache_stats["misses"] += 1
+        before = _segment_cache.get((day - timedelta(days=1),) + key[1:])
+        after = _segment_cache.get((day + timedelta(days=1),) + key[1:])
+
+    from kwallpaper import solartable
+
+    seg = solartable.lookup(day, tz, lat, lon)
+    if seg is None:
+        seg = _compute_segments(
+            day, tz, lat, lon,
+            dawn=before.next_dawn if before is not None else _UNKNOWN,
+            next_dawn=after.dawn if after is not None else _UNKNOWN)
+    if _segment_cache_size:
+        with _segment_cache_lock:
+            _segment_cache[key] = seg
+            _segment_cache.move_to_end(key)
+            while len(_segment_cache) > _segment_cache_size:
+                _segment_cache.popitem(last=False)
+    return seg
+
+
 def segments_for_now(now: datetime, tz: ZoneInfo,
                      lat: float, lon: float) -> Segments:
     """Segments for the day that owns ``now``.
@@ -189,6 +322,122 @@ def _effective_windows(seg: Segments,
     return windows
 
 
+_CATEGORIES = ("sunrise", "day", "sunset", "night")
+
+
+@dataclass(frozen=True, eq=False)
+class Timeline:
+    """One day's image schedule for one theme, compiled for lookups.
+
+    Built by :func:`timeline_for` from complete segments and the
+    theme's image lists (dedup rule applied).  Windows are disjoint, so
+    sorting them by start makes every query a bisect.
+
+    Attributes:
+        day: ``Segments.day`` the timeline was compiled from.
+        starts: Start instant of each window, ascending.
+        windows: ``(start, end, category, image_list)`` per window, in
+            the order of ``starts``.
+        boundaries: Every image-change instant of the day (window
+            starts, internal image boundaries and window ends), sorted.
+        images: ``(start, end, image_value)`` for every image, sorted.
+    """
+
+    day: date
+    starts: Tuple[datetime, ...]
+    windows: Tuple[Tuple[datetime, datetime, str, Tuple[Any, ...]], ...]
+    boundaries: Tuple[datetime, ...]
+    images: Tuple[Tuple[datetime, datetime, Any], ...]
+    _image_windows: Dict[Any, Tuple[datetime, datetime]]
+
+    @classmethod
+    def compile(cls, seg: Segments, theme_data: Dict[str, Any]) -> "Timeline":
+        windows = []
+        boundaries: List[datetime] = []
+        images = []
+        image_windows: Dict[Any, Tuple[datetime, datetime]] = {}
+        for category, (start, end) in _effective_windows(seg, theme_data).items():
+            image_list = tuple(theme_data.get(f"{category}ImageList", []) or [])
+            windows.append((start, end, category, image_list))
+            if not image_list:
+                continue
+            n = len(image_list)
+            duration = (end - start).total_seconds() / n
+            edges = [start + timedelta(seconds=i * duration)
+                     for i in range(n + 1)]
+            boundaries.extend(edges)
+            for i, value in enumerate(image_list):
+                images.append((edges[i], edges[i + 1], value))
+                # First occurrence wins (list.index semantics).
+                image_windows.setdefault(value, (edges[i], edges[i + 1]))
+        windows.sort(key=lambda w: w[0])
+        images.sort(key=lambda w: w[0])
+        return cls(day=seg.day, starts=tuple(w[0] for w in windows),
+                   windows=tuple(windows), boundaries=tuple(sorted(boundaries)),
+                   images=tuple(images), _image_windows=image_windows)
+
+    def image_at(self, now: datetime) -> Tuple[str, Any]:
+        """(category, image_value) displayed at ``now`` (aware).
+
+        Raises:
+            ValueError: ``now`` is in a category with no images, or
+                outside every window.
+        """
+        i = bisect_right(self.starts, now) - 1
+        if i >= 0:
+            start, end, category, image_list = self.windows[i]
+            if now < end:
+                if not image_list:
+                    raise ValueError(
+                        f"No images available in {category} category")
+                duration = (end - start).total_seconds()
+                position = (now - start).total_seconds() / duration
+                idx = int((position + 1e-9) * len(image_list))
+                idx = max(0, min(idx, len(image_list) - 1))
+                return category, image_list[idx]
+        raise ValueError(f"now {now} outside all segment windows of {self.day}")
+
+    def next_change(self, now: datetime) -> Optional[datetime]:
+        """First boundary strictly after ``now``; None past the last."""
+        i = bisect_right(self.boundaries, now)
+        return self.boundaries[i] if i < len(self.boundaries) else None
+
+    def window_of(self, image_value: Any) -> Optional[Tuple[datetime, datetime]]:
+        """Display window of ``image_value``, or None when it is in no
+        image list."""
+        try:
+            return self._image_windows.get(image_value)
+        except TypeError:
+            return None
+
+
+def timeline_for(seg: Segments, theme_data: Dict[str, Any]) -> Timeline:
+    """The compiled :class:`Timeline` for complete ``seg`` and a theme.
+
+    Cached (bounded like the segment cache) on the segments and the
+    theme's four image lists, so the scheduler re-arm, the cycle run's
+    selection and the preview share one instance per day and theme.
+    """
+    try:
+        key = (seg, tuple(tuple(theme_data.get(f"{c}ImageList", []) or [])
+                          for c in _CATEGORIES))
+        hash(key)
+    except TypeError:
+        return Timeline.compile(seg, theme_data)
+    with _segment_cache_lock:
+        timeline = _timeline_cache.get(key)
+        if timeline is not None:
+            _timeline_cache.move_to_end(key)
+            return timeline
+    timeline = Timeline.compile(seg, theme_data)
+    if _segment_cache_size:
+        with _segment_cache_lock:
+            _timeline_cache[key] = timeline
+            while len(_timeline_cache) > _segment_cache_size:
+                _timeline_cache.popitem(last=False)
+    return timeline
+
+
 def image_at(now: datetime, seg: Segments,
              theme_data: Dict[str, Any]) -> Tuple[str, int]:
     """Select (category, image_value) for ``now``.
@@ -209,39 +458,22 @@ def image_at(now: datetime, seg: Segments,
             f"sun segments incomplete for {seg.day}; fall back to legacy model")
     if now.tzinfo is None:
         now = now.replace(tzinfo=seg.dawn.tzinfo)
-    for category, (start, end) in _effective_windows(seg, theme_data).items():
-        if start <= now < end:
-            image_list = theme_data.get(f"{category}ImageList", []) or []
-            if not image_list:
-                raise ValueError(
-                    f"No images available in {category} category")
-            duration = (end - start).total_seconds()
-            elapsed = (now - start).total_seconds()
-            position = elapsed / duration
-            idx = int((position + 1e-9) * len(image_list))
-            idx = max(0, min(idx, len(image_list) - 1))
-            return category, image_list[idx]
-    raise ValueError(f"now {now} outside all segment windows of {seg.day}")
-
-
-def segments_for_config(config_path: str,
-                        now: Optional[datetime] = None) -> Segments:
+    return timeline_for(seg, theme_data).image_at(now)
+
+
+def segments_for_config(config, now: Optional[datetime] = None) -> Segments:
     """Segments for the configured location at ``now``.
 
-    Loads latitude/longitude/timezone from the config file (normalized
-    to defaults by ``load_config``).  ``now`` defaults to the current
-    time in the configured timezone.
+    ``config`` is a :class:`~kwallpaper.snapshot.ConfigSnapshot` or a
+    config path (loaded into one).  ``now`` defaults to the current time
+    in the configured timezone.
     """
-    from kwallpaper.config import load_config
+    from kwallpaper.snapshot import as_snapshot
 
-    config = load_config(config_path)
-    loc = config.get("location", {})
-    tz = ZoneInfo(loc.get("timezone", "America/Phoenix"))
-    lat = float(loc.get("latitude", 33.4484))
-    lon = float(loc.get("longitude", -112.074))
+    snap = as_snapshot(config)
     if now is None:
-        now = datetime.now(tz)
-    return segments_for_now(now, tz, lat, lon)
+        now = datetime.now(snap.tz)
+    return segments_for_now(now, snap.tz, snap.latitude, snap.longitude)
 
 
 def _image_window(seg: Segments, theme_data: Dict[str, Any],
@@ -249,32 +481,7 @@ def _image_window(seg: Segments, theme_data: Dict[str, Any],
     """Display window (start, end) of ``image_value``, or None when the
     value is not in any of the day's segment lists (after the dedup
     rule)."""
-    for category, (start, end) in _effective_windows(seg, theme_data).items():
-        image_list = theme_data.get(f"{category}ImageList", []) or []
-        if image_value not in image_list:
-            continue
-        n = len(image_list)
-        duration = (end - start).total_seconds() / n
-        i = image_list.index(image_value)
-        return (start + timedelta(seconds=i * duration),
-                start + timedelta(seconds=(i + 1) * duration))
-    return None
-
-
-def _all_boundaries(seg: Segments, theme_data: Dict[str, Any]) -> List[datetime]:
-    """Every image-change instant of the day: each effective window's
-    start, its internal image boundaries, and its end.  Sorted
-    ascending."""
-    bounds: List[datetime] = []
-    for category, (start, end) in _effective_windows(seg, theme_data).items():
-        image_list = theme_data.get(f"{category}ImageList", []) or []
-        if not image_list:
-            continue
-        n = len(image_list)
-        duration = (end - start).total_seconds() / n
-        for i in range(n + 1):
-            bounds.append(start + timedelta(seconds=i * duration))
-    return sorted(bounds)
+    return timeline_for(seg, theme_data).window_of(image_value)
 
 
 def next_change_time(now: datetime, seg: Segments,
@@ -335,9 +542,9 @@ def next_change_time(now: datetime, seg: Segments,
         # The current image's window has already ended (missed run or
         # clock jump): fall through to the next future boundary.
 
-    future = [b for b in _all_boundaries(seg, theme_data) if b > now]
-    if future:
-        return min(future)
+    change = timeline_for(seg, theme_data).next_change(now)
+    if change is not None:
+        return change
 
     # ``now`` is at/after this day's night end (a delayed run past
     # next_dawn): walk forward day by day via the injected provider.
@@ -351,7 +558,7 @@ def next_change_time(now: datetime, seg: Segments,
         nseg = next_segments_provider(day)
         if not nseg.complete:
             raise IncompleteSegmentsError(f"sun segments incomplete for {day}")
-        future = [b for b in _all_boundaries(nseg, theme_data) if b > now]
-        if future:
-            return min(future)
+        change = timeline_for(nseg, theme_data).next_change(now)
+        if change is not None:
+            return change
     raise IncompleteSegmentsError(f"no future boundary found after {now}")
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+kWallpaper precomputed yearly sun-segment tables.
+
+For a fixed location the segment boundaries of a whole year are known in
+advance, yet every process start (CLI run, scheduler, GUI) used to ask
+astral again.  This module stores them once per (timezone, latitude,
+longitude, year) as a compact binary table::
+
+    DEFAULT_CACHE_DIR / "solar" / <year>_<lat>_<lon>_<tz>.bin
+
+- a fixed header (magic, year, row/column counts, the key it was built
+  for), then
+- one row per day of the year plus January 1st of the next year (so
+  December 31st has a ``next_dawn``), each row :data:`COLUMNS` as
+  little-endian int64 UTC epoch seconds, :data:`MISSING` where the
+  crossing does not exist (polar day/night).
+
+Tables are memory-mapped read-only, so a lookup is a header check on
+first use and then a few integer reads; nothing is parsed or decoded.
+:func:`kwallpaper.solarsegments.solar_segments` consults :func:`lookup`
+before calling astral.  A missing table is queued for a background
+builder thread (daemon, like the variant builder) and astral answers
+for this call; the next process start finds the table on disk.
+
+Boundaries are stored at one-second resolution, which is the resolution
+at which astral and the NOAA equations agree anyway.
+"""
+
+import logging
+import mmap
+import os
+import queue
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from kwallpaper.config import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+TABLES_DIR = DEFAULT_CACHE_DIR / "solar"
+
+#: Per-day columns, in file order (``next_dawn`` is the next row's dawn).
+COLUMNS = ("dawn", "golden_hour_end", "golden_hour", "dusk")
+#: Stored for a crossing that does not exist that day.
+MISSING = -(2 ** 63)
+
+_MAGIC = b"KWSOLAR1"
+# magic, year, rows, columns, reserved, latitude, longitude, tz key
+_HEADER = struct.Struct("<8siiiidd64s")
+
+# (tz key, lat, lon, year)
+TableKey = Tuple[str, float, float, int]
+
+_enabled = True
+
+# Open tables: key -> (mmap, int64 view of the rows)
+_tables: Dict[TableKey, Tuple[mmap.mmap, memoryview]] = {}
+_tables_lock = threading.Lock()
+
+# Background builder: one daemon thread draining a queue of table keys.
+_jobs: "queue.Queue[TableKey]" = queue.Queue()
+_pending: Set[TableKey] = set()
+# Keys whose build failed in this process: astral answers for them from
+# then on instead of re-running a whole year on every miss.
+_failed: Set[TableKey] = set()
+_lock = threading.Lock()
+_worker: Optional[threading.Thread] = None
+
+
+def set_enabled(enabled: bool) -> None:
+    """Enable/disable table lookups and background builds."""
+    global _enabled
+    _enabled = bool(enabled)
+    if not _enabled:
+        close_tables()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def table_path(year: int, tz: ZoneInfo, lat: float, lon: float) -> Path:
+    """Cache location of the ``year`` table for (lat, lon) in ``tz``."""
+    return TABLES_DIR / f"{year}_{lat}_{lon}_{tz.key.replace('/', '-')}.bin"
+
+
+def _to_epoch(value: Optional[datetime]) -> int:
+    return MISSING if value is None else round(value.timestamp())
+
+
+def build_table(year: int, tz: ZoneInfo, lat: float, lon: float) -> Path:
+    """Compute the ``year`` table with astral and write it atomically.
+
+    Heavy (about four astral evaluations per day): call from a
+    background thread.  Returns the table path.
+    """
+    from kwallpaper.solarsegments import _UNKNOWN, _compute_segments
+
+    first = date(year, 1, 1)
+    rows = (date(year + 1, 1, 1) - first).days + 1
+    values = array("q")
+    dawn = _UNKNOWN
+    for i in range(rows):
+        seg = _compute_segments(first + timedelta(days=i), tz, lat, lon,
+                                dawn=dawn)
+        dawn = seg.next_dawn
+        values.extend(_to_epoch(getattr(seg, name)) for name in COLUMNS)
+    if sys.byteorder != "little":
+        values.byteswap()
+
+    header = _HEADER.pack(_MAGIC, year, rows, len(COLUMNS), 0, lat, lon,
+                          tz.key.encode())
+    path = table_path(year, tz, lat, lon)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Per-process temporary name: the GUI and the CLI may build the same
+    # table at once.
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.",
+                                    suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(values.tobytes())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    logger.debug(f"Built {year} sun table for {lat}, {lon} ({tz.key})")
+    return path
+
+
+def _open(key: TableKey) -> Optional[memoryview]:
+    """Map the table for ``key``; None when it is missing or invalid."""
+    tz_key, lat, lon, year = key
+    path = table_path(year, ZoneInfo(tz_key), lat, lon)
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, h_year, rows, columns, _, h_lat, h_lon, h_tz = \
+            _HEADER.unpack_from(mapped)
+        expected = _HEADER.size + rows * columns * 8
+        if (magic != _MAGIC or (h_tz.rstrip(b"\0").decode(), h_lat, h_lon,
+                                h_year) != key
+                or columns != len(COLUMNS) or len(mapped) != expected
+                or sys.byteorder != "little"):
+            raise ValueError("stale or foreign table")
+    except (struct.error, ValueError, UnicodeDecodeError) as e:
+        logger.debug(f"Ignoring sun table {path}: {e}")
+        mapped.close()
+        return None
+    view = memoryview(mapped)[_HEADER.size:].cast("q")
+    _tables[key] = (mapped, view)
+    return view
+
+
+def lookup(day: date, tz: ZoneInfo, lat: float, lon: float):
+    """Segments for ``day`` from the on-disk table, or None.
+
+    None means "ask astral": tables are disabled, the year's table is
+    not built yet (it is queued for the background builder), or its
+    build failed earlier in this process.
+    """
+    if not _enabled:
+        return None
+    from kwallpaper.solarsegments import Segments
+
+    key = (tz.key, lat, lon, day.year)
+    with _tables_lock:
+        entry = _tables.get(key)
+        view = entry[1] if entry is not None else _open(key)
+        if view is None:
+            _queue(key)
+            return None
+        base = (day - date(day.year, 1, 1)).days * len(COLUMNS)
+        raw = view[base:base + len(COLUMNS) + 1].tolist()
+
+    def at(ts: int) -> Optional[datetime]:
+        return None if ts == MISSING else datetime.fromtimestamp(ts, tz)
+
+    dawn, golden_hour_end, golden_hour, dusk, next_dawn = map(at, raw)
+    return Segments(day=day, dawn=dawn, golden_hour_end=golden_hour_end,
+                    golden_hour=golden_hour, dusk=dusk, next_dawn=next_dawn)
+
+
+def close_tables() -> None:
+    """Unmap every open table (they are re-opened on the next lookup)."""
+    with _tables_lock:
+        for mapped, view in _tables.values():
+            view.release()
+            mapped.close()
+        _tables.clear()
+
+
+def _queue(key: TableKey) -> None:
+    """Queue one build (deduplicated, never retried after a failure) and
+    make sure the builder runs."""
+    global _worker
+    with _lock:
+        if key in _pending or key in _failed:
+            return
+        _pending.add(key)
+        _jobs.put(key)
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_build_loop, daemon=True,
+                                       name="kwallpaper-suntable")
+            _worker.start()
+
+
+def _build_loop() -> None:
+    while True:
+        key = _jobs.get()
+        tz_key, lat, lon, year = key
+        try:
+            build_table(year, ZoneInfo(tz_key), lat, lon)
+        except Exception as e:
+            logger.warning(f"Sun table build for {year} at {lat}, {lon} "
+                           f"({tz_key}) failed: {e}; using astral directly")
+            logger.debug("Sun table build traceback", exc_info=True)
+            with _lock:
+                _failed.add(key)
+        finally:
+            with _lock:
+                _pending.discard(key)
+            _jobs.task_done()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+kWallpaper run-state store.
+
+Everything kWallpaper remembers between runs lives in one JSON document,
+``state.json``, next to the config file it belongs to::
+
+    {
+      "version": 1,
+      "last_applied": { "theme": "", "image": "" },
+      "shuffle": { "shuffle_list": [], "current_index": 0,
+                   "last_used_date": "", "last_change_date": "" }
+    }
+
+It replaces ``shuffle-list.json`` and the ``theme.last_applied`` /
+``theme.last_applied_image`` keys of ``config.json``, which a single
+apply used to update in several separate read-modify-write passes.  A
+run now reads the document once (:func:`load_state`) and writes it once
+(:func:`transaction`), through :mod:`kwallpaper.statefile`: an unchanged
+document is not rewritten and a real write replaces the file atomically.
+``config.json`` stays user configuration only, so a settings save in
+the GUI can no longer race a cycle run over the same file.
+
+Migration: the first time a store is opened and ``state.json`` does not
+exist yet, it is seeded from the ``shuffle-list.json`` in the same
+directory and the legacy ``theme.*`` keys of ``config.json``.  The old
+files are left in place (an older kWallpaper still finds them) but are
+no longer read or written.
+
+Transactions hold a process-local lock plus an ``flock`` on
+``state.json.lock``, so a cycle run in the GUI's scheduler and a
+``wallpaper_cli.py`` invocation cannot interleave their updates.
+Transactions are not re-entrant: pass the open state document down
+instead of opening a nested one.
+"""
+
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union
+
+from kwallpaper import statefile
+from kwallpaper.config import DEFAULT_CONFIG_PATH
+
+try:
+    import fcntl
+except ImportError:   # non-POSIX: the process-local lock still applies
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+STATE_FILE_NAME = "state.json"
+LEGACY_SHUFFLE_FILE_NAME = "shuffle-list.json"
+
+PathLike = Union[str, Path]
+
+_lock = threading.Lock()
+
+
+def _default_state() -> Dict[str, Any]:
+    return {
+        "version": STATE_VERSION,
+        "last_applied": {"theme": "", "image": ""},
+        "shuffle": {
+            "shuffle_list": [],
+            "current_index": 0,
+            "last_used_date": "",
+            "last_change_date": "",
+        },
+    }
+
+
+def state_path_for(config_path: Optional[PathLike] = None) -> Path:
+    """The ``state.json`` belonging to ``config_path`` (default config)."""
+    config_path = Path(config_path or DEFAULT_CONFIG_PATH).expanduser()
+    return config_path.with_name(STATE_FILE_NAME)
+
+
+def _normalize(state: Any) -> Dict[str, Any]:
+    """Fill in missing sections/keys from the defaults (in place)."""
+    if not isinstance(state, dict):
+        state = {}
+    for section, values in _default_state().items():
+        if not isinstance(values, dict):
+            continue
+        if not isinstance(state.get(section), dict):
+            state[section] = values
+            continue
+        for key, value in values.items():
+            state[section].setdefault(key, value)
+    state["version"] = STATE_VERSION
+    return state
+
+
+def _read_legacy(path: Path) -> Dict[str, Any]:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _migrate(config_path: Path) -> Dict[str, Any]:
+    """Seed a new state document from the pre-store files."""
+    state = _default_state()
+    shuffle = _read_legacy(config_path.with_name(LEGACY_SHUFFLE_FILE_NAME))
+    for key in state["shuffle"]:
+        if key in shuffle:
+            state["shuffle"][key] = shuffle[key]
+    theme = _read_legacy(config_path).get("theme")
+    if isinstance(theme, dict):
+        state["last_applied"]["theme"] = theme.get("last_applied") or ""
+        state["last_applied"]["image"] = theme.get("last_applied_image") or ""
+    if shuffle or isinstance(theme, dict):
+        logger.info(f"Migrated run state to {state_path_for(config_path)}")
+    return state
+
+
+def _read(config_path: Path) -> Dict[str, Any]:
+    """Parse (or migrate) the document; always a fresh object."""
+    path = state_path_for(config_path)
+    try:
+        return _normalize(statefile.read_json(path))
+    except FileNotFoundError:
+        state = _migrate(config_path)
+        statefile.write_json(path, state)
+        return state
+    except ValueError as e:
+        logger.warning(f"Ignoring unreadable {path}: {e}")
+        return _default_state()
+
+
+def load_state(config_path: Optional[PathLike] = None) -> Dict[str, Any]:
+    """Read the state document for ``config_path`` (a private copy).
+
+    Changes made to the returned dict are not persisted; use
+    :func:`transaction` for that.
+    """
+    return _read(Path(config_path or DEFAULT_CONFIG_PATH).expanduser())
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    if fcntl is None:
+        yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)   # releases the flock
+
+
+@contextmanager
+def transaction(config_path: Optional[PathLike] = None,
+                fsync: bool = False) -> Iterator[Dict[str, Any]]:
+    """Read-modify-write the state document as one unit.
+
+    Yields the document (read once); when the block exits normally it is
+    written back once, and not at all if nothing changed.  An exception
+    inside the block discards every change.
+
+    Example::
+
+        with state_store.transaction(config_path) as state:
+            state["last_applied"]["image"] = image_path
+    """
+    config_path = Path(config_path or DEFAULT_CONFIG_PATH).expanduser()
+    path = state_path_for(config_path)
+    with _lock, _file_lock(path):
+        state = _read(config_path)
+        yield state
+        statefile.write_json(path, _normalize(state), fsync=fsync)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+kWallpaper state-file writes.
+
+Every persisted JSON state file (``config.json``, ``state.json``) goes
+through :func:`write_json`:
+
+- **Dirty check** — the payload is serialized exactly as it would be
+  written and compared with what the file already holds; an identical
+  payload is not rewritten.  Cycle runs re-persist the same
+  last-applied image / shuffle state most of the time, and every
+  skipped write is one less SSD write and one less inotify event for
+  anything watching the config directory.
+- **Atomic replace** — real writes go to a temporary file in the same
+  directory which is then renamed over the target, so a crash mid-write
+  leaves either the old or the new file, never truncated JSON.
+  ``fsync=True`` additionally flushes the file and its directory before
+  returning; it is off by default because these files are cheap to
+  rebuild.
+
+The last text written or read per path is remembered together with the
+file's ``(st_mtime_ns, st_size)``, so the dirty check and
+:func:`read_json` on an unchanged file cost one ``stat`` and no read.
+As in the config cache, a file modified within ``_RACY_WINDOW_NS`` of
+being remembered is read again: a rewrite inside the filesystem's
+timestamp granularity would not change its stamp.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+PathLike = Union[str, Path]
+
+_RACY_WINDOW_NS = 2_000_000_000
+
+_lock = threading.Lock()
+# abs path -> ((st_mtime_ns, st_size), remembered_at_ns, text)
+_known: Dict[str, Tuple[Tuple[int, int], int, str]] = {}
+
+
+def _stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _current_text(path: str) -> Optional[str]:
+    """The file's text, from memory when its stamp is unchanged."""
+    stamp = _stamp(path)
+    if stamp is None:
+        return None
+    with _lock:
+        known = _known.get(path)
+    if (known is not None and known[0] == stamp
+            and known[1] - stamp[0] > _RACY_WINDOW_NS):
+        return known[2]
+    remembered_at = time.time_ns()
+    try:
+        with open(path, 'r') as f:
+            text = f.read()
+    except OSError:
+        return None
+    with _lock:
+        _known[path] = (stamp, remembered_at, text)
+    return text
+
+
+def dumps(data: Any) -> str:
+    """Serialize ``data`` the way every state file is written."""
+    return json.dumps(data, indent=2)
+
+
+def write_json(path: PathLike, data: Any, fsync: bool = False) -> bool:
+    """Write ``data`` as JSON to ``path`` unless it already holds it.
+
+    Args:
+        path: Target file; its parent directory is created if needed.
+        data: JSON-serializable payload.
+        fsync: Flush the file and directory to disk before returning.
+
+    Returns:
+        True when the file was (re)written, False for a no-op.
+    """
+    path = os.path.abspath(path)
+    text = dumps(data)
+    if _current_text(path) == text:
+        return False
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp = os.path.join(directory, f".{os.path.basename(path)}."
+                                  f"{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, 'w') as f:
+            f.write(text)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        _fsync_dir(directory)
+
+    stamp = _stamp(path)
+    with _lock:
+        if stamp is None:
+            _known.pop(path, None)
+        else:
+            _known[path] = (stamp, time.time_ns(), text)
+    return True
+
+
+def read_json(path: PathLike) -> Any:
+    """Parse the JSON in ``path`` (skipping the read when unchanged).
+
+    Raises:
+        FileNotFoundError: If ``path`` does not exist.
+        json.JSONDecodeError: If it holds invalid JSON.
+    """
+    path = os.path.abspath(path)
+    text = _current_text(path)
+    if text is None:
+        raise FileNotFoundError(path)
+    return json.loads(text)
+
+
+def forget(path: Optional[PathLike] = None) -> None:
+    """Drop the remembered contents of ``path`` (all paths when None)."""
+    with _lock:
+        if path is None:
+            _known.clear()
+        else:
+            _known.pop(os.path.abspath(path), None)
+
+
+def _fsync_dir(directory: str) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError as e:
+        logger.debug(f"fsync of {directory} failed: {e}")
+    finally:
+        os.close(fd)
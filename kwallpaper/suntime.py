@@ -9,6 +9,9 @@ ONE implementation of the dawn/sunrise/sunset/dusk period model shared by:
 - ``select_image_for_time_cli``(image file selection, CLI)
 - ``select_image_for_specific_time`` (image file selection for HH:MM)
 
+The four astral values of a (date, location) come from :func:`sun_times`,
+computed once per process and shared by detection and selection.
+
 The period model (all boundaries derived from four astral values):
 
     night_end   = dawn  - 30 min   (dawn lead-in; last 30 min before dawn)
@@ -39,8 +42,10 @@ now pinned by tests/test_suntime.py):
 """
 
 import logging
-from datetime import datetime, timedelta, timezone, time as time_class
-from typing import Any, Dict, List, Optional
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone, time as time_class
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from zoneinfo import ZoneInfo
 
 logger = logging.getLogger(__name__)
@@ -195,21 +200,68 @@ def _fix_next_day(sun: Dict[str, Optional[datetime]]) -> None:
         sun['dusk'] = sun['dusk'] + timedelta(days=1)
 
 
-def _config_location(config_path: Optional[str]):
-    """Read (timezone, lat, lon) from config, with legacy defaults."""
-    timezone_str = "America/Phoenix"
-    lat, lon = 33.4484, -112.074
-    if config_path:
-        try:
-            from kwallpaper.config import load_config
-            config = load_config(config_path)
-            loc = config.get('location', {})
-            timezone_str = loc.get('timezone', timezone_str)
-            lat = loc.get('latitude', lat)
-            lon = loc.get('longitude', lon)
-        except (FileNotFoundError, ValueError):
-            pass
-    return timezone_str, lat, lon
+# sun_times() memo: (date, timezone, lat, lon) -> next-day adjusted values.
+SUN_TIMES_CACHE_SIZE = 32
+_sun_times_cache: "OrderedDict[Tuple[date, str, float, float], Dict[str, Optional[datetime]]]" = OrderedDict()
+_sun_times_lock = threading.Lock()
+
+
+def sun_times(timezone_str: str, lat: float, lon: float,
+              day: Optional[date] = None) -> Optional[Dict[str, Optional[datetime]]]:
+    """Dawn/sunrise/sunset/dusk of ``day`` (default: today) at a
+    location, next-day adjusted (:func:`_fix_next_day`).
+
+    The one provider of legacy sun values for detection and selection:
+    astral runs once per (date, location) and process; later calls get
+    a copy of the memoized values.  Failures (None) are not memoized,
+    so the next call retries astral.
+    """
+    if day is None:
+        day = datetime.now().date()
+    key = (day, timezone_str, lat, lon)
+    with _sun_times_lock:
+        cached = _sun_times_cache.get(key)
+        if cached is not None:
+            _sun_times_cache.move_to_end(key)
+            return dict(cached)
+    sun = _real_sun_data(timezone_str, lat, lon, date=day)
+    if sun is None:
+        return None
+    _fix_next_day(sun)
+    with _sun_times_lock:
+        _sun_times_cache[key] = sun
+        while len(_sun_times_cache) > SUN_TIMES_CACHE_SIZE:
+            _sun_times_cache.popitem(last=False)
+    return dict(sun)
+
+
+def clear_sun_times() -> None:
+    """Drop every memoized :func:`sun_times` day."""
+    with _sun_times_lock:
+        _sun_times_cache.clear()
+
+
+def _config_location(config):
+    """Read (timezone, lat, lon) from config, with legacy defaults.
+
+    ``config`` is a :class:`~kwallpaper.snapshot.ConfigSnapshot`, a config
+    path, or None.
+    """
+    snap = _snapshot_or_none(config)
+    if snap is None:
+        return "America/Phoenix", 33.4484, -112.074
+    return snap.timezone, snap.latitude, snap.longitude
+
+
+def _snapshot_or_none(config):
+    """The snapshot for ``config``; None when unset, missing or invalid."""
+    if not config:
+        return None
+    from kwallpaper.snapshot import as_snapshot
+    try:
+        return as_snapshot(config)
+    except (FileNotFoundError, ValueError):
+        return None
 
 
 def _normalize_now(now: Optional[datetime], target_tz,
@@ -593,43 +645,221 @@ def image_index_for(time_of_day: str, now: datetime,
     return image_index
 
 
+# ============================================================================
+# Image file selection and next change (select_image_for_time_cli logic)
+# ============================================================================
+
+def _pick_image_list(theme_data: Dict[str, Any],
+                     time_of_day: str) -> tuple:
+    """Return (time_of_day, image_list), advancing to the next category
+    when the current one has no images (legacy fallback order)."""
+    image_list = theme_data.get(f"{time_of_day}ImageList", [])
+    while not image_list:
+        try:
+            current_idx = TIME_CATEGORIES.index(time_of_day)
+            if current_idx < len(TIME_CATEGORIES) - 1:
+                time_of_day = TIME_CATEGORIES[current_idx + 1]
+                image_list = theme_data.get(f"{time_of_day}ImageList", [])
+            else:
+                raise ValueError("No images available in any time-of-day category")
+        except ValueError:
+            raise ValueError("No images available in any time-of-day category")
+    return time_of_day, image_list
+
+
+def legacy_image_at(now: datetime, sun: Optional[Dict[str, Optional[datetime]]],
+                    theme_data: Dict[str, Any],
+                    time_of_day: Optional[str] = None) -> tuple:
+    """(category, image index) the legacy file selector shows at ``now``.
+
+    ``sun`` holds the astral values of ``now``'s date (next-day
+    adjusted) or None for the fixed-time fallback; ``time_of_day``
+    defaults to :func:`time_of_day_for` on ``sun``.  This is the index
+    math of ``select_image_for_time_cli``: night picks a list value,
+    sunrise/day/sunset use list positions offset by +1/+5/+10.
+
+    Raises:
+        ValueError: No category has images.
+    """
+    category, image_index, _start, _end = legacy_slot_at(
+        now, sun, theme_data, time_of_day)
+    return category, image_index
+
+
+def legacy_slot_at(now: datetime, sun: Optional[Dict[str, Optional[datetime]]],
+                   theme_data: Dict[str, Any],
+                   time_of_day: Optional[str] = None) -> tuple:
+    """Like :func:`legacy_image_at`, plus the slot of the category
+    period the image index was taken from.
+
+    Returns:
+        (category, image index, slot start, slot end); the slot is the
+        period divided equally among the category's images, in real
+        time (the night slots after midnight are not shifted a day).
+    """
+    if time_of_day is None:
+        time_of_day = time_of_day_for(now, sun)
+    time_of_day, image_list = _pick_image_list(theme_data, time_of_day)
+    n = len(image_list)
+
+    period_start, period_end = image_period(time_of_day, now, sun, tz=None)
+    period_duration = (period_end - period_start).total_seconds()
+    if time_of_day == "night":
+        now_for_pos = _night_now_for_pos(now, period_start, period_end)
+    else:
+        now_for_pos = now
+    position = (now_for_pos - period_start).total_seconds() / period_duration
+    slot = int((position - 1e-9) * n)
+
+    if time_of_day == "night":
+        slot = max(0, min(slot, n - 1))
+        image_index = image_list[slot]
+    elif time_of_day == "sunrise":
+        image_index = slot + 1
+    elif time_of_day == "day":
+        image_index = slot + 5
+    elif time_of_day == "sunset":
+        image_index = slot + 10
+    else:
+        image_index = image_list[0]
+
+    step = (period_end - period_start) / n
+    start = period_start + step * slot - (now_for_pos - now)
+    return time_of_day, image_index, start, start + step
+
+
+def legacy_sun_for(config) -> Callable[[date], Optional[Dict[str, Optional[datetime]]]]:
+    """Per-date sun values (next-day adjusted, :func:`sun_times`) at the
+    config location — the ``sun_for`` argument of
+    :func:`legacy_next_change_time`.  ``config`` is a ConfigSnapshot,
+    a config path or None (legacy default location)."""
+    timezone_str, lat, lon = _config_location(config)
+
+    def sun_for(day: date) -> Optional[Dict[str, Optional[datetime]]]:
+        return sun_times(timezone_str, lat, lon, day)
+    return sun_for
+
+
+def _legacy_candidates(day_start: datetime,
+                       sun: Dict[str, Optional[datetime]],
+                       theme_data: Dict[str, Any]) -> List[datetime]:
+    """Instants at which the legacy selection can change on the day
+    starting at ``day_start``: the category boundaries, every image
+    boundary inside each category's period (night also shifted back a
+    day, for the part after midnight) and the next midnight, where the
+    sun values switch to the next date."""
+    b = period_boundaries(sun)
+    out = [b['night_end'], b['sunrise_end'], b['dusk_start'], sun.get('dusk'),
+           day_start + timedelta(days=1)]
+    for category in TIME_CATEGORIES:
+        image_list = theme_data.get(f"{category}ImageList", []) or []
+        if not image_list:
+            continue
+        start, end = image_period(category, day_start, sun, tz=None)
+        step = (end - start) / len(image_list)
+        for i in range(1, len(image_list)):
+            out.append(start + step * i)
+            if category == "night":
+                out.append(start + step * i - timedelta(days=1))
+    return [c for c in out if c is not None]
+
+
+def legacy_next_change_time(now: datetime, theme_data: Dict[str, Any],
+                            sun_for: Callable[[date], Optional[Dict[str, Optional[datetime]]]],
+                            ) -> datetime:
+    """The next instant after ``now`` at which the legacy model selects
+    a different image (the legacy counterpart of
+    :func:`kwallpaper.solarsegments.next_change_time`).
+
+    The selection is piecewise constant between the candidates of
+    :func:`_legacy_candidates` (period edges, image boundaries, the
+    midnight sun-value switch); each candidate after ``now`` is checked
+    with :func:`legacy_image_at`, and the first one that shows another
+    image is returned.  Inclusive period ends and the position epsilon
+    can hold the old image exactly at a boundary, so a candidate is
+    also checked one second later.
+
+    Args:
+        now: Aware reference instant.
+        theme_data: The theme.json dict.
+        sun_for: Returns the (next-day adjusted) sun values for a date
+            in ``now``'s timezone, or None when astral cannot.
+
+    Raises:
+        ValueError: Sun values are unavailable, no category has images,
+            or the image does not change within two days.
+    """
+    tz = now.tzinfo
+
+    def sun_at(when: datetime) -> Dict[str, Optional[datetime]]:
+        sun = sun_for(when.date())
+        if sun is None:
+            raise ValueError(f"sun times unavailable for {when.date()}")
+        return sun
+
+    def image(when: datetime):
+        return legacy_image_at(when, sun_at(when), theme_data)[1]
+
+    current = image(now)
+    candidates: List[datetime] = []
+    for offset in range(2):
+        day = now.date() + timedelta(days=offset)
+        day_start = datetime.combine(day, time_class(0, 0), tzinfo=tz)
+        candidates.extend(_legacy_candidates(day_start, sun_at(day_start),
+                                             theme_data))
+    for candidate in sorted(set(candidates)):
+        if candidate <= now:
+            continue
+        for when in (candidate, candidate + timedelta(seconds=1)):
+            if image(when) != current:
+                return when
+    raise ValueError(f"legacy image does not change within two days of {now}")
+
+
 # ============================================================================
 # High-level detection / selection
 # ============================================================================
 
-def _get_sun(config_path: Optional[str], lat: float, lon: float,
+def _get_sun(config, lat: float, lon: float,
              mock_sun=None, now: Optional[datetime] = None):
     """Fetch sun values (mock or real) and normalize ``now``.
 
+    ``config`` is a ConfigSnapshot, a config path or None.
+
     Returns (sun_dict, now, timezone_str, target_tz, used_mock).
     """
-    timezone_str, cfg_lat, cfg_lon = _config_location(config_path)
+    snap = _snapshot_or_none(config)
+    timezone_str, cfg_lat, cfg_lon = _config_location(snap)
     lat = lat if mock_sun is not None else cfg_lat
     lon = lon if mock_sun is not None else cfg_lon
-    target_tz = ZoneInfo(timezone_str)
+    target_tz = snap.tz if snap is not None else ZoneInfo(timezone_str)
 
     if mock_sun is not None:
         sun = _mock_sun_data(mock_sun)
         now = _normalize_now(now, target_tz, mock_sun=mock_sun)
         return sun, now, timezone_str, target_tz, True
 
-    sun = _real_sun_data(timezone_str, cfg_lat, cfg_lon)
+    now = _normalize_now(now, target_tz, mock_sun=None)
+    sun = sun_times(timezone_str, cfg_lat, cfg_lon)
     if sun is None:
         raise RuntimeError("Astral failed")
-    _fix_next_day(sun)
-    now = _normalize_now(now, target_tz, mock_sun=None)
     return sun, now, timezone_str, target_tz, False
 
 
-def detect_time_of_day_sun(config_path: Optional[str] = None,
+def detect_time_of_day_sun(config=None,
                            lat: float = 39.5, lon: float = -119.8,
                            elevation: float = 0, mock_sun=None,
                            now: Optional[datetime] = None,
                            current_time: Optional[datetime] = None) -> str:
     """Detect current time-of-day category using Astral sunrise/sunset times.
 
+    Side-effect free: it only reads the schedule backup (as a fallback);
+    cycle runs keep it current via
+    :func:`kwallpaper.backup.request_forward_backup`.
+
     Args:
-        config_path: Optional path to config file containing location data
+        config: Optional ConfigSnapshot or path to the config file
+            containing location data
         lat: Latitude for sunrise/sunset calculation (default: 39.5)
         lon: Longitude for sunrise/sunset calculation (default: -119.8)
         elevation: Elevation in meters (default: 0, unused)
@@ -643,38 +873,34 @@ def detect_time_of_day_sun(config_path: Optional[str] = None,
     if current_time is not None:
         now = current_time
 
-    # If Astral is unavailable, load and use previous day's backup schedule
+    # If Astral is unavailable, classify with the forward schedule backup
     if not ASTRAL_AVAILABLE and mock_sun is None:
         from kwallpaper.backup import load_daily_backup_schedule
-        backup = load_daily_backup_schedule()
+        backup = load_daily_backup_schedule(now)
         if backup:
             return backup['time_of_day']
-        raise RuntimeError("Astral unavailable and no previous day backup exists")
+        raise RuntimeError("Astral unavailable and no schedule backup covers today")
 
     try:
-        sun, now, _, _, _ = _get_sun(config_path, lat, lon,
+        snap = _snapshot_or_none(config)
+        sun, now, _, _, _ = _get_sun(snap, lat, lon,
                                      mock_sun=mock_sun, now=now)
-        result = time_of_day_for(now, sun)
-        # Save successful Astral schedule to backup (real sun only)
-        if mock_sun is None:
-            from kwallpaper.backup import save_daily_backup_schedule
-            save_daily_backup_schedule(sun.get('dawn'), sun.get('sunrise'),
-                                       sun.get('sunset'), sun.get('dusk'),
-                                       result)
-        return result
+        return time_of_day_for(now, sun)
     except Exception as e:
-        # Astral failed - try to load previous day's backup
+        # Astral failed - fall back to the forward schedule backup
         logger.debug(f"detect_time_of_day_sun failed: {e}")
         from kwallpaper.backup import load_daily_backup_schedule
-        backup = load_daily_backup_schedule()
+        backup = load_daily_backup_schedule(now)
         if backup:
             return backup['time_of_day']
-        raise RuntimeError(f"Astral failed and no previous day backup exists: {e}")
+        raise RuntimeError(f"Astral failed and no schedule backup covers today: {e}")
 
 
-def detect_time_of_day_for_time(time_str: str,
-                                config_path: Optional[str] = None) -> str:
-    """Detect time-of-day category for a specific time string (HH:MM format)."""
+def detect_time_of_day_for_time(time_str: str, config=None) -> str:
+    """Detect time-of-day category for a specific time string (HH:MM format).
+
+    ``config`` is a ConfigSnapshot or a config path.
+    """
     try:
         hour, minute = map(int, time_str.split(':'))
         if not (0 <= hour < 24 and 0 <= minute < 60):
@@ -683,30 +909,29 @@ def detect_time_of_day_for_time(time_str: str,
         today = datetime.now().date()
         now = datetime.combine(today, datetime.strptime(time_str, '%H:%M').time())
 
-        timezone_str = "America/Los_Angeles"
-        if config_path:
+        snap = None
+        if config:
             try:
-                from kwallpaper.config import load_config
-                config = load_config(config_path)
-                timezone_str = config.get('location', {}).get(
-                    'timezone', timezone_str)
+                from kwallpaper.snapshot import as_snapshot
+                snap = as_snapshot(config)
             except Exception:
                 pass
 
-        now = now.replace(tzinfo=ZoneInfo(timezone_str))
+        now = now.replace(tzinfo=snap.tz if snap is not None
+                          else ZoneInfo("America/Los_Angeles"))
 
         try:
-            time_of_day = detect_time_of_day_sun(config_path, now=now)
+            time_of_day = detect_time_of_day_sun(snap, now=now)
             if time_of_day in TIME_CATEGORIES:
                 return time_of_day
         except Exception:
             pass
 
         from kwallpaper.backup import load_daily_backup_schedule
-        backup = load_daily_backup_schedule()
+        backup = load_daily_backup_schedule(now)
         if backup:
             return backup['time_of_day']
-        raise RuntimeError("Astral failed and no previous day backup exists")
+        raise RuntimeError("Astral failed and no schedule backup covers today")
 
     except ValueError as e:
         raise ValueError(f"Invalid time format. Expected HH:MM, e.g., 14:30: {e}")
@@ -14,6 +14,7 @@ from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+from kwallpaper import variants
 from kwallpaper.config import DEFAULT_CACHE_DIR, DEFAULT_THEMES_DIR
 
 
@@ -23,6 +24,36 @@ from kwallpaper.config import DEFAULT_CACHE_DIR, DEFAULT_THEMES_DIR
 
 _discover_cache: Optional[Tuple[float, List[Tuple[str, str]]]] = None
 _DISCOVER_CACHE_TIMEOUT = 2.0
+# Bumped by invalidate_discover_cache(); a scan that started before an
+# invalidation does not store its (possibly stale) result.
+_discover_generation = 0
+# kwallpaper.fswatch.FsWatcher for DEFAULT_THEMES_DIR, if one is running.
+_discover_watcher = None
+
+
+def invalidate_discover_cache() -> None:
+    """Drop the cached discover_themes() result."""
+    global _discover_cache, _discover_generation
+    _discover_cache = None
+    _discover_generation += 1
+
+
+def attach_watcher(watcher) -> None:
+    """Let a file-system watcher (:mod:`kwallpaper.fswatch`) keep the
+    discovery cache fresh.
+
+    While ``watcher`` runs, the cache is trusted until it reports a
+    themes change instead of expiring after ``_DISCOVER_CACHE_TIMEOUT``.
+    Watchers of another directory are ignored.
+    """
+    global _discover_watcher
+    if Path(watcher.themes_dir) != Path(DEFAULT_THEMES_DIR):
+        return
+    from kwallpaper.fswatch import THEMES
+
+    _discover_watcher = watcher
+    watcher.subscribe(
+        lambda event: THEMES in event.kinds and invalidate_discover_cache())
 
 
 def discover_themes() -> list:
@@ -39,9 +70,11 @@ def discover_themes() -> list:
 
     if _discover_cache is not None:
         cache_time, cached_themes = _discover_cache
-        if (time.time() - cache_time) < _DISCOVER_CACHE_TIMEOUT:
+        watched = _discover_watcher is not None and _discover_watcher.running
+        if watched or (time.time() - cache_time) < _DISCOVER_CACHE_TIMEOUT:
             return cached_themes
 
+    generation = _discover_generation
     themes = []
 
     try:
@@ -55,7 +88,8 @@ def discover_themes() -> list:
         pass
 
     themes.sort(key=lambda t: t[0].lower())
-    _discover_cache = (time.time(), themes)
+    if generation == _discover_generation:
+        _discover_cache = (time.time(), themes)
 
     return themes
 
@@ -145,17 +179,19 @@ def normalize_image_lists(theme_data: Dict[str, Any]) -> Dict[str, Any]:
     return normalized
 
 
-def image_files_for(theme_path_obj: Path, theme_data: Dict[str, Any]) -> List[Path]:
-    """Ordered image file list for a theme directory.
+# Image index: theme dir -> (directory stamp, imageFilename, files)
+_image_index: Dict[str, Tuple[Tuple[int, ...], str, Tuple[Path, ...]]] = {}
 
-    Single source of truth for image discovery, shared by selection
-    (``selection._match_image_file``) and import validation
-    (``validate_theme_images``): glob the ``imageFilename`` pattern; when
-    the glob matches nothing, fall back to numbered files
-    ``{pattern_base}_{1..99}{pattern_ext}``; sort numerically by the
-    trailing ``_N`` in the stem (non-numeric stems sort first).
-    """
-    filename_pattern = theme_data.get("imageFilename", "*.jpg")
+
+def invalidate_image_index(theme_dir: Optional[Path] = None) -> None:
+    """Drop the cached image list of ``theme_dir`` (default: all)."""
+    if theme_dir is None:
+        _image_index.clear()
+    else:
+        _image_index.pop(str(theme_dir), None)
+
+
+def _scan_image_files(theme_path_obj: Path, filename_pattern: str) -> List[Path]:
     pattern_base = Path(filename_pattern).stem if filename_pattern else "theme"
     pattern_ext = Path(filename_pattern).suffix if filename_pattern else ".jpg"
 
@@ -174,6 +210,61 @@ def image_files_for(theme_path_obj: Path, theme_data: Dict[str, Any]) -> List[Pa
     return image_files
 
 
+def _dir_stamp(theme_path_obj: Path, filename_pattern: str) -> Tuple[int, ...]:
+    """mtimes of the directories the pattern lists (adding, removing or
+    renaming an image changes one of them)."""
+    dirs = {theme_path_obj, theme_path_obj / Path(filename_pattern).parent}
+    return tuple(sorted(d.stat().st_mtime_ns for d in dirs))
+
+
+def image_files_for(theme_path_obj: Path, theme_data: Dict[str, Any]) -> List[Path]:
+    """Ordered image file list for a theme directory.
+
+    Single source of truth for image discovery, shared by selection
+    (``selection._match_image_file``) and import validation
+    (``validate_theme_images``): glob the ``imageFilename`` pattern; when
+    the glob matches nothing, fall back to numbered files
+    ``{pattern_base}_{1..99}{pattern_ext}``; sort numerically by the
+    trailing ``_N`` in the stem (non-numeric stems sort first).
+
+    The list is cached per directory and reused until the directory's
+    mtime (or the pattern) changes, so repeated lookups cost one stat
+    instead of a glob.  A fresh theme manifest (``kwallpaper.manifest``)
+    fills the cache without a glob in a new process.
+    """
+    from kwallpaper.manifest import image_paths_of, read_manifest
+
+    filename_pattern = theme_data.get("imageFilename", "*.jpg")
+    key = str(theme_path_obj)
+    try:
+        stamp = _dir_stamp(theme_path_obj, filename_pattern or "")
+    except OSError:
+        _image_index.pop(key, None)
+        return _scan_image_files(theme_path_obj, filename_pattern)
+    entry = _image_index.get(key)
+    if entry is not None and entry[0] == stamp and entry[1] == filename_pattern:
+        return list(entry[2])
+    manifest = read_manifest(theme_path_obj)
+    if (manifest is not None
+            and manifest["theme"].get("imageFilename", "*.jpg") == filename_pattern):
+        image_files = image_paths_of(manifest, theme_path_obj)
+    else:
+        image_files = _scan_image_files(theme_path_obj, filename_pattern)
+    _image_index[key] = (stamp, filename_pattern, tuple(image_files))
+    return image_files
+
+
+def image_file_for_value(theme_path_obj: Path, theme_data: Dict[str, Any],
+                         value: int) -> Optional[Path]:
+    """File of a theme.json image value: the value-th entry (1-based,
+    wrapping around) of :func:`image_files_for`; None when the theme
+    has no image files."""
+    image_files = image_files_for(theme_path_obj, theme_data)
+    if not image_files:
+        return None
+    return image_files[(int(value) - 1) % len(image_files)]
+
+
 def validate_theme_images(theme_dir: Path, theme_data: Dict[str, Any]) -> None:
     """Verify that every image referenced by ``theme_data`` exists on disk.
 
@@ -352,6 +443,9 @@ def import_theme(zip_path: str) -> Dict[str, Any]:
         target_dir.parent.mkdir(parents=True, exist_ok=True)
         shutil.move(str(extract_dir), str(target_dir))
 
+    # Pre-build the per-screen resolution variants in the background.
+    variants.prepare_theme_async(str(target_dir))
+
     return {
         'extract_dir': str(target_dir),
         'displayName': theme_data.get('displayName', target_name),
@@ -416,7 +510,7 @@ def ensure_thumbnail(image_path: str, thumb_size: int = 1080,
 
     _start_version = token.version if token is not None else 0
     try:
-        from PyQt6.QtCore import Qt
+        from PyQt6.QtCore import QSize, Qt
         from PyQt6.QtGui import QImage, QImageReader
         src = Path(image_path)
         thumb_dir = DEFAULT_CACHE_DIR / "thumbs" / src.parent.name
@@ -432,7 +526,13 @@ def ensure_thumbnail(image_path: str, thumb_size: int = 1080,
         # kind of waste this function exists to avoid, and a failed decode
         # must fall through to a re-encode, not silently return the original
         # full-res path (which would make the preview load full-res files).
-        if thumb_path.exists() and thumb_path.stat().st_mtime >= src.stat().st_mtime:
+        # The theme manifest, when loaded, already knows the source's
+        # mtime and pixel size.
+        from kwallpaper.manifest import image_info
+        info = image_info(src)
+        src_mtime = (info["mtime_ns"] / 1e9 if info is not None
+                     else src.stat().st_mtime)
+        if thumb_path.exists() and thumb_path.stat().st_mtime >= src_mtime:
             # Check the size from the file header (cheap) rather than
             # decoding the whole JPEG.  QImageReader.size() returns 0x0 for
             # an unreadable file, so a corrupt/empty cache entry falls
@@ -455,7 +555,10 @@ def ensure_thumbnail(image_path: str, thumb_size: int = 1080,
         reader = QImageReader(str(src))
         if not reader.canRead():
             return str(src)
-        src_size = reader.size()
+        if info is not None and info.get("width") and info.get("height"):
+            src_size = QSize(info["width"], info["height"])
+        else:
+            src_size = reader.size()
         if src_size.width() <= 0 or src_size.height() <= 0:
             return str(src)
         # Decode directly at target size: full-res sampling quality, no
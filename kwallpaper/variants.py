@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+kWallpaper resolution-matched wallpaper variants.
+
+``.ddw`` themes commonly ship 5K–6K JPEGs, and plasmashell decodes the
+full file for every screen on every image change.  This module keeps a
+pre-downscaled, high-quality copy of each theme image per connected
+screen resolution, next to the preview thumbnails::
+
+    DEFAULT_CACHE_DIR / "variants" / <W>x<H> / <theme folder> / <stem>.jpg
+
+The theme folder stays the variant's parent directory, so code that
+derives the theme from the current wallpaper path
+(``Path(current).parent.name``) keeps working when Plasma reports a
+variant.
+
+- :func:`variant_for` is the hot-path lookup used by
+  :mod:`kwallpaper.wallpaper`: a couple of ``stat`` calls, never a
+  decode.  A missing or stale variant is queued for the background
+  builder and the original image is used for this apply.
+- :func:`prepare_theme` queues every image of a theme (called after a
+  theme import).
+- :func:`ensure_variant` does the actual decode + encode (background
+  thread only).
+
+Variants are sized to *cover* the screen (Plasma's default
+"Scaled and Cropped" fill), never upscaled, and only written when they
+are actually smaller than the source.  Screen sizes come from the
+topology cache in logical pixels; ``wallpaper.variant_scale`` multiplies
+them for HiDPI setups (e.g. 2 for 200 % scaling).
+"""
+
+import logging
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from kwallpaper.config import DEFAULT_CACHE_DIR, DEFAULT_THEMES_DIR
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = DEFAULT_CACHE_DIR / "variants"
+
+# JPEG quality of the written variants (they are shown full-screen).
+VARIANT_QUALITY = 92
+
+# Enabled by wallpaper.resolution_variants; scaled by wallpaper.variant_scale.
+_enabled = True
+_scale = 1.0
+
+# (source path, target size) pairs whose source is already no larger than
+# the target: nothing to build, use the original.
+_not_needed: Set[Tuple[str, Tuple[int, int]]] = set()
+
+# Background builder: one daemon thread draining a queue of
+# (source path, target size) jobs.  Daemon, so a short-lived CLI process
+# never waits for it at exit (an interrupted build leaves only a .tmp).
+_jobs: "queue.Queue[Tuple[str, Tuple[int, int]]]" = queue.Queue()
+_pending: Set[Tuple[str, Tuple[int, int]]] = set()
+_lock = threading.Lock()
+_worker: Optional[threading.Thread] = None
+
+
+def set_enabled(enabled: bool) -> None:
+    """Enable/disable resolution-matched variants (``wallpaper.resolution_variants``)."""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def set_scale(scale: float) -> None:
+    """Device pixels per logical pixel used to size variants."""
+    global _scale
+    if isinstance(scale, (int, float)) and not isinstance(scale, bool) \
+            and scale > 0:
+        _scale = float(scale)
+    else:
+        logger.warning(f"Invalid wallpaper.variant_scale {scale!r}; "
+                       f"keeping {_scale:g}")
+
+
+def target_size(resolution: Tuple[int, int]) -> Tuple[int, int]:
+    """Variant size in device pixels for a logical screen ``resolution``."""
+    width, height = resolution
+    return (max(int(round(width * _scale)), 1),
+            max(int(round(height * _scale)), 1))
+
+
+def variant_path(image_path: str, size: Tuple[int, int]) -> Path:
+    """Cache location of the ``size`` variant of ``image_path``."""
+    src = Path(image_path)
+    return (VARIANTS_DIR / f"{size[0]}x{size[1]}" / src.parent.name
+            / (src.stem + ".jpg"))
+
+
+def _is_fresh(variant: Path, src: Path) -> bool:
+    try:
+        return variant.stat().st_mtime >= src.stat().st_mtime
+    except OSError:
+        return False
+
+
+def variant_for(image_path: str, resolution: Tuple[int, int]) -> Optional[str]:
+    """Path of an up-to-date variant of ``image_path`` for a screen of
+    ``resolution`` (logical pixels), or None to use the original.
+
+    Never decodes: a missing or stale variant is queued for the
+    background builder and None is returned.
+    """
+    if not _enabled or not resolution:
+        return None
+    size = target_size(resolution)
+    key = (str(image_path), size)
+    if key in _not_needed:
+        return None
+    variant = variant_path(image_path, size)
+    if _is_fresh(variant, Path(image_path)):
+        return str(variant)
+    _queue(key)
+    return None
+
+
+def variants_for_screens(image_path: str,
+                         resolutions: Dict[int, Tuple[int, int]]
+                         ) -> Dict[int, str]:
+    """``{screen: variant path}`` for the screens that have a ready variant."""
+    out = {}
+    for screen, resolution in resolutions.items():
+        variant = variant_for(image_path, resolution)
+        if variant is not None:
+            out[screen] = variant
+    return out
+
+
+def source_for(path: str) -> str:
+    """Map a variant path back to its theme image (identity otherwise).
+
+    Used when Plasma reports the current wallpaper, so callers keep
+    seeing the theme image kWallpaper selected.
+    """
+    p = Path(path)
+    try:
+        rel = p.relative_to(VARIANTS_DIR)
+    except ValueError:
+        return path
+    if len(rel.parts) != 3:
+        return path
+    theme_dir = DEFAULT_THEMES_DIR / rel.parts[1]
+    try:
+        for candidate in theme_dir.glob(p.stem + ".*"):
+            if candidate.stem == p.stem and candidate.is_file():
+                return str(candidate)
+    except OSError:
+        pass
+    return path
+
+
+# ============================================================================
+# Building
+# ============================================================================
+
+def ensure_variant(image_path: str, resolution: Tuple[int, int]) -> str:
+    """Build (or reuse) the variant of ``image_path`` for ``resolution``.
+
+    Decoding uses QImageReader.setScaledSize(), so the JPEG decoder
+    downscales during the inverse transform and no full-resolution buffer
+    is materialized; the result is written at :data:`VARIANT_QUALITY`.
+
+    Heavy: call from a background thread.  Returns the variant path, or
+    the original path when the source is not larger than the screen or
+    the build fails.
+    """
+    return _ensure_size(image_path, target_size(resolution))
+
+
+def _ensure_size(image_path: str, size: Tuple[int, int]) -> str:
+    """:func:`ensure_variant` for a target ``size`` in device pixels."""
+    src = Path(image_path)
+    variant = variant_path(image_path, size)
+    if _is_fresh(variant, src):
+        return str(variant)
+    try:
+        from PyQt6.QtCore import QSize, Qt
+        from PyQt6.QtGui import QImageReader
+
+        reader = QImageReader(str(src))
+        if not reader.canRead():
+            return str(src)
+        src_size = reader.size()
+        if src_size.width() <= 0 or src_size.height() <= 0:
+            return str(src)
+        # Cover the screen (Plasma crops to fill); never upscale.
+        scaled = src_size.scaled(QSize(*size),
+                                 Qt.AspectRatioMode.KeepAspectRatioByExpanding)
+        if (scaled.width() >= src_size.width()
+                or scaled.height() >= src_size.height()):
+            _not_needed.add((str(src), size))
+            return str(src)
+        reader.setScaledSize(scaled)
+        reader.setQuality(100)   # smooth scaling for the remainder
+        img = reader.read()
+        if img.isNull():
+            return str(src)
+        variant.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = variant.with_name(variant.name + ".tmp")
+        if not img.save(str(tmp_path), "JPG", VARIANT_QUALITY):
+            tmp_path.unlink(missing_ok=True)
+            return str(src)
+        tmp_path.replace(variant)
+        logger.debug(f"Built {size[0]}x{size[1]} variant of {src.name}")
+        return str(variant)
+    except Exception as e:
+        logger.debug(f"Variant generation failed for {image_path}: {e}")
+        return str(src)
+
+
+def _queue(key: Tuple[str, Tuple[int, int]]) -> None:
+    """Queue one build (deduplicated) and make sure the builder runs."""
+    global _worker
+    with _lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+        _jobs.put(key)
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_build_loop, daemon=True,
+                                       name="kwallpaper-variants")
+            _worker.start()
+
+
+def _build_loop() -> None:
+    while True:
+        image_path, size = _jobs.get()
+        try:
+            if (image_path, size) not in _not_needed:
+                _ensure_size(image_path, size)
+        except Exception:
+            logger.debug("Variant build failed", exc_info=True)
+        finally:
+            with _lock:
+                _pending.discard((image_path, size))
+            _jobs.task_done()
+
+
+def prepare_theme(theme_dir: str,
+                  resolutions: Optional[Iterable[Tuple[int, int]]] = None
+                  ) -> int:
+    """Queue variants of every image in ``theme_dir`` for the connected
+    screens (``resolutions`` defaults to the cached screen topology).
+
+    Returns the number of builds queued.  Does nothing when variants are
+    disabled or no screen resolution is known.
+    """
+    if not _enabled:
+        return 0
+    if resolutions is None:
+        from kwallpaper.wallpaper import screen_resolutions
+        resolutions = screen_resolutions().values()
+    sizes = sorted({target_size(r) for r in resolutions if r})
+    if not sizes:
+        return 0
+    from kwallpaper.selection import load_theme_data
+    from kwallpaper.themes import image_files_for
+    try:
+        theme_path = Path(theme_dir)
+        images: List[Path] = image_files_for(theme_path,
+                                             load_theme_data(theme_path))
+    except (OSError, ValueError) as e:
+        logger.debug(f"Cannot list images of {theme_dir} for variants: {e}")
+        return 0
+    queued = 0
+    for img in images:
+        for size in sizes:
+            if not _is_fresh(variant_path(str(img), size), img):
+                _queue((str(img), size))
+                queued += 1
+    return queued
+
+
+def prepare_theme_async(theme_dir: str) -> None:
+    """:func:`prepare_theme` without blocking the caller (the topology
+    lookup may cost a D-Bus round trip)."""
+    if _enabled:
+        threading.Thread(target=prepare_theme, args=(theme_dir,),
+                         daemon=True, name="kwallpaper-variants-prep").start()
+
+
+def wait_idle(timeout: Optional[float] = None) -> bool:
+    """Block until the background builder has drained its queue (tests,
+    benchmarks).  Returns False on timeout."""
+    done = threading.Event()
+
+    def _join():
+        _jobs.join()
+        done.set()
+
+    threading.Thread(target=_join, daemon=True).start()
+    return done.wait(timeout)
@@ -4,42 +4,591 @@ kWallpaper Plasma wallpaper application.
 
 Sets the wallpaper on all screens via the org.kde.plasmashell D-Bus API.
 
-Implementation note: the calls go through ``gdbus`` subprocesses (one
-connection per call) rather than a persistent D-Bus connection.  This is
-deliberate: it preserves the exact behaviour (and testability via
-``subprocess.run`` mocks) of the legacy implementation, and works in the
-Flatpak sandbox where a direct dbus-next/QDBusConnection setup would need
-extra permissions.  A persistent-connection rewrite is a future
-optimization.
+The D-Bus calls go through a transport from :mod:`kwallpaper.plasma_dbus`:
+either one ``gdbus`` subprocess per call (the original behaviour, still
+the module default and the fallback for sandboxes where a direct bus
+connection isn't permitted) or one persistent in-process session-bus
+connection.  The backend is chosen by the ``wallpaper.dbus_backend``
+config field (applied with :func:`configure_from_config`) or directly
+with :func:`set_dbus_backend`.
+
+By default every screen is set inside one batched ``evaluateScript``
+call (``wallpaper.batch_apply``); the per-screen ``wallpaper`` /
+``setWallpaper`` walk remains the fallback when Plasma refuses scripting
+(e.g. locked widgets) or the batched report cannot be parsed.
+
+On transports with signal support (session bus) the ``org.kde.plasmashell``
+name owner is tracked through ``NameOwnerChanged``: while the shell is
+known to be up no Ping precedes the per-screen walk, and while it is
+known to be down an apply is queued and replayed as soon as the shell
+registers (e.g. a scheduler run at login that beats plasmashell).
+
+Screens with a known resolution get the matching pre-downscaled variant
+from :mod:`kwallpaper.variants` (``wallpaper.resolution_variants``)
+instead of the full-size theme image, once it has been built.
 """
 
+import json
 import logging
 import re
 import subprocess
 import sys
-from typing import Optional
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from kwallpaper import plasma_dbus, variants
+from kwallpaper.plasma_dbus import TransportUnavailable
 
 logger = logging.getLogger(__name__)
 
-_PLASMA_DEST = "org.kde.plasmashell"
-_PLASMA_PATH = "/PlasmaShell"
+# kreadconfig arguments for the configured wallpaper image (fallback when
+# the D-Bus wallpaper query fails).
+KREADCONFIG_ARGS = ['--file', 'plasma-org.kde.plasma.desktop-appletsrc',
+                    '--group', 'Wallpaper', '--group', 'org.kde.image',
+                    '--key', 'Image']
+
+# Set all screens in one evaluateScript round trip (wallpaper.batch_apply).
+_batch_apply = True
+
+# Overall deadline (seconds) for one async apply (wallpaper.apply_deadline).
+_apply_deadline = 10.0
+
+# Desktop-script helper shared by the batch and topology scripts: one
+# report entry per desktop with its wallpaper plugin and screen size.
+_SCREEN_INFO_JS = """\
+function screenInfo(d, extra) {
+    var info = {screen: d.screen, plugin: String(d.wallpaperPlugin)};
+    try {
+        var g = screenGeometry(d.screen);
+        info.width = Math.round(g.width);
+        info.height = Math.round(g.height);
+    } catch (e) {}
+    for (var k in extra) info[k] = extra[k];
+    return info;
+}
+"""
+
+# Plasma desktop script: set the image on every desktop and print one JSON
+# report line.  The %s are the file:// URI as a JSON (hence JS) string
+# literal and a {screen: URI} object of per-screen overrides (variants).
+_BATCH_APPLY_SCRIPT = _SCREEN_INFO_JS + """\
+var uri = %s;
+var screenUris = %s;
+var report = [];
+var ds = desktops();
+for (var i = 0; i < ds.length; i++) {
+    var d = ds[i];
+    try {
+        d.wallpaperPlugin = "org.kde.image";
+        d.currentConfigGroup = ["Wallpaper", "org.kde.image", "General"];
+        d.writeConfig("Image", screenUris[String(d.screen)] || uri);
+        report.push(screenInfo(d, {ok: true}));
+    } catch (e) {
+        report.push(screenInfo(d, {ok: false, error: String(e)}));
+    }
+}
+print(JSON.stringify(report));
+"""
+
+_TOPOLOGY_SCRIPT = _SCREEN_INFO_JS + """\
+var report = [];
+var ds = desktops();
+for (var i = 0; i < ds.length; i++) report.push(screenInfo(ds[i], {}));
+print(JSON.stringify(report));
+"""
+
+
+@dataclass(frozen=True)
+class ScreenInfo:
+    """One Plasma desktop/screen as last reported by plasmashell."""
+    screen: int
+    plugin: str = ""
+    width: int = 0
+    height: int = 0
+
+    @property
+    def resolution(self) -> Optional[Tuple[int, int]]:
+        """``(width, height)`` in logical pixels, or None if unknown."""
+        if self.width > 0 and self.height > 0:
+            return (self.width, self.height)
+        return None
+
+
+# Screen-topology cache.  Monitors rarely change, so the topology is
+# reused across cycle runs until Plasma signals a change (session-bus
+# backend) or a set fails.  Every batched apply refreshes it for free.
+_topology: Optional[List[ScreenInfo]] = None
+_topology_lock = threading.Lock()
+_watched = set()   # ids of transports with change subscriptions
+
+# Current-wallpaper cache, written through by our own applies and
+# re-validated against D-Bus every ``wallpaper.revalidate_interval``
+# seconds or after an external change is signalled.
+_current: Optional[str] = None
+_current_checked: Optional[float] = None   # time.monotonic() of last validation
+_revalidate_interval = 300
+# Plasma signals wallpaperChanged for our own applies too; ignore those
+# that arrive within this many seconds of a successful apply.
+_OWN_APPLY_GRACE = 2.0
+_own_apply_at: Optional[float] = None
+
+# Plasma shell availability from NameOwnerChanged: True (name owned),
+# False (no owner), None (unknown: gdbus backend or not yet watched).
+_shell_up: Optional[bool] = None
+_shell_source: Optional[int] = None   # id() of the transport that reports it
+# Latest apply requested while the shell was down; replayed when it
+# registers.  Plasma creates its desktops shortly after taking the name,
+# so the replay retries after each of these delays (seconds).
+_pending_apply: Optional[str] = None
+_REPLAY_DELAYS = (0.5, 2.0, 5.0)
+
+
+def set_dbus_backend(name: str) -> None:
+    """Select the D-Bus backend (``"auto"`` | ``"session"`` | ``"gdbus"``)."""
+    plasma_dbus.set_backend(name)
+
+
+def configure_from_config(config: Dict[str, Any]) -> None:
+    """Apply the ``wallpaper`` section of a (normalized) config (and the
+    sun-segment cache settings, see
+    :func:`kwallpaper.solarsegments.configure_from_config`).
+
+    Called by the CLI and core entry points after loading the config, so
+    the scheduler and the GUI pick up the user's backend choice.
+    """
+    section = config.get('wallpaper', {}) if isinstance(config, dict) else {}
+    backend = section.get('dbus_backend', 'auto')
+    try:
+        plasma_dbus.set_backend(backend)
+    except ValueError as e:
+        logger.warning(f"{e}; keeping the {plasma_dbus.get_backend()} backend")
+    set_batch_apply(section.get('batch_apply', True))
+    set_revalidate_interval(section.get('revalidate_interval', 300))
+    set_apply_deadline(section.get('apply_deadline', 10))
+    variants.set_enabled(section.get('resolution_variants', True))
+    variants.set_scale(section.get('variant_scale', 1))
+    # The sun-segment cache settings ride on the same entry-point hook.
+    from kwallpaper import solarsegments
+    solarsegments.configure_from_config(config)
+
+
+def set_batch_apply(enabled: bool) -> None:
+    """Enable/disable the single-``evaluateScript`` multi-screen apply."""
+    global _batch_apply
+    _batch_apply = bool(enabled)
+
+
+def set_revalidate_interval(seconds: int) -> None:
+    """How long a cached current wallpaper is trusted without a D-Bus query."""
+    global _revalidate_interval
+    if isinstance(seconds, (int, float)) and not isinstance(seconds, bool) \
+            and seconds > 0:
+        _revalidate_interval = seconds
+    else:
+        logger.warning(f"Invalid wallpaper.revalidate_interval {seconds!r}; "
+                       f"keeping {_revalidate_interval}")
+
+
+def set_apply_deadline(seconds: float) -> None:
+    """Overall deadline for :mod:`kwallpaper.wallpaper_async` applies."""
+    global _apply_deadline
+    if isinstance(seconds, (int, float)) and not isinstance(seconds, bool) \
+            and seconds > 0:
+        _apply_deadline = float(seconds)
+    else:
+        logger.warning(f"Invalid wallpaper.apply_deadline {seconds!r}; "
+                       f"keeping {_apply_deadline}")
+
+
+def get_apply_deadline() -> float:
+    return _apply_deadline
+
+
+def _remember_current(image_path: Optional[str], own_apply: bool = False) -> None:
+    """Write ``image_path`` through to the current-wallpaper cache."""
+    global _current, _current_checked, _own_apply_at
+    now = time.monotonic()
+    with _topology_lock:
+        _current = image_path
+        _current_checked = now
+        if own_apply:
+            _own_apply_at = now
+
+
+def _parse_screen_count(output: Optional[str]) -> int:
+    """Screen count from a ``print(desktops().length)`` reply (>= 1)."""
+    output = output or ""
+    # Try to extract screen count from formats like "('1',)" or "(1,)"
+    # First try: extract digit inside quotes like "('1',)"
+    match = re.search(r"'(\d+)'", output)
+    if match:
+        screen_count = int(match.group(1))
+    else:
+        # Fallback: try to get the number directly without quotes
+        match = re.search(r'\((\d+),\)', output)
+        if match:
+            screen_count = int(match.group(1))
+        else:
+            # Try just the number alone
+            match = re.search(r'^(\d+)$', output.strip())
+            screen_count = int(match.group(1)) if match else 1
+
+    # If no screens detected (headless or desktops() not available), try setting on screen 0
+    return max(screen_count, 1)
+
+
+def invalidate_screen_topology(*_signal) -> None:
+    """Forget the cached screen topology (also a D-Bus signal callback)."""
+    global _topology
+    with _topology_lock:
+        _topology = None
+
+
+def invalidate_current_wallpaper(*_signal) -> None:
+    """Force the next :func:`get_current_wallpaper` to query D-Bus."""
+    global _current_checked
+    with _topology_lock:
+        _current_checked = None
+
+
+def _on_wallpaper_changed(*_signal) -> None:
+    """``wallpaperChanged`` callback: invalidate unless we just applied."""
+    with _topology_lock:
+        own = (_own_apply_at is not None
+               and time.monotonic() - _own_apply_at < _OWN_APPLY_GRACE)
+    if not own:
+        invalidate_current_wallpaper()
+
+
+def shell_available(transport=None) -> Optional[bool]:
+    """Whether plasmashell currently owns its bus name (None: unknown).
+
+    With ``transport``, only a state reported through that transport
+    counts (a gdbus fallback cannot see the signals).
+    """
+    with _topology_lock:
+        if transport is not None and id(transport) != _shell_source:
+            return None
+        return _shell_up
+
+
+def _set_shell_up(up: Optional[bool]) -> None:
+    """Record the shell state; replay a queued apply when it came up."""
+    global _shell_up, _pending_apply
+    with _topology_lock:
+        _shell_up = up
+        pending = None
+        if up:
+            pending, _pending_apply = _pending_apply, None
+    if pending is not None:
+        threading.Thread(target=_replay_pending, args=(pending,),
+                         daemon=True, name="kwallpaper-replay").start()
+
+
+def _queue_apply(image_path: str) -> None:
+    """Remember ``image_path`` for replay once the shell registers."""
+    global _pending_apply
+    with _topology_lock:
+        _pending_apply = image_path
+    print("Plasma shell is not running; the wallpaper will be applied "
+          "when it starts.", file=sys.stderr)
+
+
+def _replay_pending(image_path: str) -> None:
+    """Apply a queued wallpaper now that the shell is up (own thread:
+    signal callbacks must not make D-Bus calls)."""
+    for delay in _REPLAY_DELAYS:
+        time.sleep(delay)
+        with _topology_lock:
+            if _pending_apply is not None or _shell_up is False:
+                return   # superseded, or the shell went away again
+        if change_wallpaper(image_path):
+            logger.info(f"Applied queued wallpaper {image_path}")
+            return
+    logger.warning(f"Queued wallpaper {image_path} could not be applied "
+                   "after Plasma started")
+
+
+def _on_plasma_owner_changed(msg=None) -> None:
+    """``NameOwnerChanged`` for org.kde.plasmashell: desktops are
+    re-created, so drop the caches; replay a queued apply on start."""
+    invalidate_screen_topology()
+    invalidate_current_wallpaper()
+    body = getattr(msg, 'body', None)
+    if body and len(body) >= 3:
+        _set_shell_up(bool(body[2]))
+
+
+# (signal match, callback) pairs installed once per session-bus transport.
+_SIGNAL_WATCHES = (
+    # KScreen output added/removed/reconfigured.
+    (dict(interface='org.kde.kscreen.Backend', member='configChanged',
+          path='/backend'), invalidate_screen_topology),
+    # plasmashell restarted: desktops are re-created.
+    (dict(interface='org.freedesktop.DBus', member='NameOwnerChanged',
+          sender='org.freedesktop.DBus', arg0=plasma_dbus.PLASMA_DEST),
+     _on_plasma_owner_changed),
+    # Wallpaper changed in Plasma settings (or by another tool).
+    (dict(interface=plasma_dbus.PLASMA_INTERFACE, member='wallpaperChanged',
+          path=plasma_dbus.PLASMA_PATH), _on_wallpaper_changed),
+)
+
+
+def _watch(transport) -> None:
+    """Subscribe to the invalidation signals once per transport (a no-op
+    for transports without signal support), then take the current shell
+    state from the bus so NameOwnerChanged can keep it up to date."""
+    global _shell_source
+    with _topology_lock:
+        if transport is None or id(transport) in _watched:
+            return
+        _watched.add(id(transport))
+    try:
+        for match, callback in _SIGNAL_WATCHES:
+            if not transport.subscribe(callback, **match):
+                return
+        has_owner = getattr(transport, 'name_has_owner', None)
+        up = has_owner(plasma_dbus.PLASMA_DEST) if has_owner else None
+    except Exception:
+        logger.debug("Could not subscribe to Plasma change signals",
+                     exc_info=True)
+        return
+    if up is not None:
+        with _topology_lock:
+            _shell_source = id(transport)
+        _set_shell_up(up)
+
+
+def _screens_from_report(report: List[dict]) -> List[ScreenInfo]:
+    screens = []
+    for r in report:
+        try:
+            screens.append(ScreenInfo(
+                screen=int(r.get('screen', len(screens))),
+                plugin=str(r.get('plugin') or ''),
+                width=int(r.get('width') or 0),
+                height=int(r.get('height') or 0)))
+        except (TypeError, ValueError):
+            continue
+    return screens
+
+
+def _store_topology(transport, screens: List[ScreenInfo]) -> None:
+    """Cache ``screens`` and make sure change signals invalidate it
+    (``transport=None``: cache only)."""
+    global _topology
+    with _topology_lock:
+        _topology = list(screens)
+    if transport is not None:
+        _watch(transport)
+
+
+def _cached_topology() -> Optional[List[ScreenInfo]]:
+    with _topology_lock:
+        return list(_topology) if _topology is not None else None
+
+
+def _query_topology(transport) -> List[ScreenInfo]:
+    """Ask plasmashell for the topology (one evaluateScript call).
+
+    Falls back to ``desktops().length`` with unknown plugin/resolution;
+    returns ``[]`` when neither script works.
+    """
+    report = _parse_json_report(transport.evaluate_script(_TOPOLOGY_SCRIPT))
+    if report:
+        return _screens_from_report(report)
+    output = transport.evaluate_script('print(desktops().length);')
+    if output is None:
+        return []
+    return [ScreenInfo(screen=i) for i in range(_parse_screen_count(output))]
+
+
+def get_screen_topology(refresh: bool = False) -> List[ScreenInfo]:
+    """The cached per-screen topology, querying Plasma when needed.
+
+    Returns ``[]`` (uncached) when plasmashell cannot be reached.
+    """
+    if not refresh:
+        with _topology_lock:
+            if _topology is not None:
+                return list(_topology)
+    try:
+        transport = plasma_dbus.get_transport()
+        screens = _query_topology(transport)
+    except (TransportUnavailable, FileNotFoundError,
+            subprocess.TimeoutExpired) as e:
+        logger.debug(f"Screen topology unavailable: {e}")
+        return []
+    if screens:
+        _store_topology(transport, screens)
+    return screens
 
 
-def _gdbus(method: str, *args: str, timeout: Optional[int] = None) -> subprocess.CompletedProcess:
-    """Run a gdbus session-bus call against the Plasma shell."""
-    return subprocess.run(
-        ['gdbus', 'call', '--session', '--dest', _PLASMA_DEST,
-         '--object-path', _PLASMA_PATH, '--method', method] + list(args),
-        capture_output=True,
-        text=True,
-        timeout=timeout,
-    )
+def screen_resolutions() -> Dict[int, Tuple[int, int]]:
+    """``{screen: (width, height)}`` for screens with a known size."""
+    return {s.screen: s.resolution for s in get_screen_topology()
+            if s.resolution is not None}
+
+
+def _screen_images(image_path: str) -> Dict[int, str]:
+    """``{screen: variant path}`` for cached screens with a ready
+    resolution-matched variant of ``image_path``.
+
+    Uses the cached topology only (no D-Bus call); variants still missing
+    are queued for the background builder.
+    """
+    if not variants.is_enabled():
+        return {}
+    cached = _cached_topology()
+    if not cached:
+        return {}
+    return variants.variants_for_screens(
+        image_path, {s.screen: s.resolution for s in cached
+                     if s.resolution is not None})
+
+
+def _batch_apply_script(image_path: str,
+                        screen_images: Optional[Dict[int, str]] = None) -> str:
+    """The desktop script that sets ``image_path`` on every screen
+    (``screen_images`` on the screens it names)."""
+    overrides = {str(screen): f'file://{path}'
+                 for screen, path in (screen_images or {}).items()}
+    return _BATCH_APPLY_SCRIPT % (json.dumps(f'file://{image_path}'),
+                                  json.dumps(overrides))
+
+
+def _parse_json_report(output: Optional[str]) -> Optional[list]:
+    """Per-screen ``[{screen, plugin, width, height, ...}, ...]`` printed
+    by the batch/topology scripts.
+
+    Returns None when the reply holds no JSON report (script refused or
+    ``print`` output mangled), so the caller can fall back.
+    """
+    for line in reversed((output or "").strip().splitlines()):
+        line = line.strip()
+        if not line.startswith('['):
+            continue
+        try:
+            report = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(report, list) and all(isinstance(r, dict) for r in report):
+            return report
+    return None
+
+
+def _apply_batched(transport, image_path: str,
+                   screen_images: Dict[int, str]) -> Optional[bool]:
+    """Set ``image_path`` on every screen with one ``evaluateScript`` call.
+
+    Returns True/False for a parsed report, or None when the batched path
+    is unusable (no reply, no screens, unparsable report) and the caller
+    should fall back to the per-screen walk.
+    """
+    report = _parse_json_report(
+        transport.evaluate_script(_batch_apply_script(image_path, screen_images)))
+    if not report:
+        return None
+    ok = [r for r in report if r.get('ok')]
+    for r in report:
+        if not r.get('ok'):
+            logger.warning(f"Screen {r.get('screen')}: failed to set wallpaper: "
+                           f"{r.get('error', 'unknown error')}")
+    if len(ok) == len(report):
+        _store_topology(transport, _screens_from_report(report))
+    else:
+        invalidate_screen_topology()
+    if ok:
+        print(f"Wallpaper changed successfully on {len(ok)} screen(s)!", file=sys.stderr)
+        return True
+    print("Error: Failed to change wallpaper on any screen", file=sys.stderr)
+    return False
+
+
+def _apply(transport, image_path: str) -> bool:
+    """Batched apply when enabled, else (or on fallback) the per-screen walk.
+
+    Queues the apply instead when the shell is known to be down.
+    """
+    _watch(transport)
+    if shell_available(transport) is False:
+        _queue_apply(image_path)
+        return False
+    screen_images = _screen_images(image_path)
+    if _batch_apply:
+        result = _apply_batched(transport, image_path, screen_images)
+        if result is not None:
+            return result
+        logger.debug("Batched evaluateScript apply unavailable; "
+                     "falling back to per-screen setWallpaper")
+    return _apply_per_screen(transport, image_path, screen_images)
+
+
+def _apply_per_screen(transport, image_path: str,
+                      screen_images: Dict[int, str]) -> bool:
+    """Set ``image_path`` on every screen through ``transport``."""
+    # Check if Plasma shell is running (no Ping while NameOwnerChanged
+    # tracking says it is)
+    if shell_available(transport) is not True and not transport.ping():
+        print("Error: Plasma shell is not running. Please start Plasma first.", file=sys.stderr)
+        return False
+
+    # Screen count from the topology cache (queried once, then reused)
+    cached = _cached_topology()
+    if cached is None:
+        cached = _query_topology(transport)
+        if cached:
+            _store_topology(transport, cached)
+    screen_count = max(len(cached), 1)
+
+    screen_num = 0
+    success_count = 0
+    # Bounded: Plasma reports the screen count above; cap the loop well
+    # beyond any sane monitor count so a misbehaving D-Bus reply can't
+    # spin the worker thread forever.
+    max_screens = max(screen_count, 1) + 8
+    while screen_num < max_screens:
+        try:
+            current = transport.wallpaper(screen_num)
+            if not current or 'Image' not in current:
+                break
+            path = screen_images.get(screen_num, image_path)
+            if transport.set_wallpaper('org.kde.image',
+                                       {'Image': f'file://{path}'},
+                                       screen_num):
+                success_count += 1
+            screen_num += 1
+        except TransportUnavailable:
+            raise
+        except Exception:
+            break
+
+    # A failed set or a different number of screens than cached means the
+    # topology is stale.
+    if success_count != screen_num or screen_num != len(cached):
+        invalidate_screen_topology()
+
+    if success_count > 0:
+        print(f"Wallpaper changed successfully on {success_count} screen(s)!", file=sys.stderr)
+        return True
+    else:
+        print("Error: Failed to change wallpaper on any screen", file=sys.stderr)
+        return False
 
 
 def change_wallpaper(image_path: str) -> bool:
     """Change KDE Plasma wallpaper to specified image using DBus.
-    Sets wallpaper on all available screens using evaluateScript.
-    Falls back to single-screen approach if desktops() is not available.
+    Sets wallpaper on all available screens in one batched evaluateScript
+    call, falling back to per-screen setWallpaper calls when the script
+    is refused or not available.  Screens of a known resolution are
+    given the matching variant of the image when one has been built.
+
+    When the persistent session-bus connection breaks mid-apply under
+    the ``"auto"`` backend, the apply is retried once over gdbus.  When
+    the shell is known to be down (session bus), the apply is queued and
+    replayed as soon as plasmashell registers; this call returns False.
 
     Args:
         image_path: Path to image file to set as wallpaper
@@ -48,89 +597,24 @@ def change_wallpaper(image_path: str) -> bool:
         True if successful, False otherwise
     """
     try:
-        # Check if Plasma shell is running
-        plasma_check = subprocess.run(
-            ['gdbus', 'call', '--session', '--dest', _PLASMA_DEST,
-             '--object-path', _PLASMA_PATH,
-             '--method', 'org.freedesktop.DBus.Peer.Ping'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if plasma_check.returncode != 0:
-            print("Error: Plasma shell is not running. Please start Plasma first.", file=sys.stderr)
-            return False
-
-        # Try to get screen count using desktops().length
-        screen_count_script = 'print(desktops().length);'
-        screen_count_result = subprocess.run(
-            ['gdbus', 'call', '--session', '--dest', _PLASMA_DEST,
-             '--object-path', _PLASMA_PATH,
-             '--method', 'org.kde.PlasmaShell.evaluateScript', screen_count_script],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-
-        # Parse output - try to extract screen count from formats like "('1',)" or "(1,)"
-        # First try: extract digit inside quotes like "('1',)"
-        match = re.search(r"'(\d+)'", screen_count_result.stdout)
-        if match:
-            screen_count = int(match.group(1))
-        else:
-            # Fallback: try to get the number directly without quotes
-            match = re.search(r'\((\d+),\)', screen_count_result.stdout)
-            if match:
-                screen_count = int(match.group(1))
-            else:
-                # Try just the number alone
-                match = re.search(r'^(\d+)$', screen_count_result.stdout.strip())
-                screen_count = int(match.group(1)) if match else 1
-
-        # If no screens detected (headless or desktops() not available), try setting on screen 0
-        if screen_count < 1:
-            screen_count = 1
-
-        screen_num = 0
-        success_count = 0
-        # Bounded: Plasma reports the screen count above; cap the loop well
-        # beyond any sane monitor count so a misbehaving D-Bus reply can't
-        # spin the worker thread forever.
-        max_screens = max(screen_count, 1) + 8
-        while screen_num < max_screens:
-            try:
-                result = subprocess.run(
-                    ['gdbus', 'call', '--session', '--dest', _PLASMA_DEST,
-                     '--object-path', _PLASMA_PATH,
-                     '--method', 'org.kde.PlasmaShell.wallpaper', str(screen_num)],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                if '"Image": <' not in result.stdout and "'Image': <" not in result.stdout:
-                    break
-                wallpaper_param = f"{{'Image': <'file://{image_path}'>}}"
-                set_result = subprocess.run(
-                    ['gdbus', 'call', '--session', '--dest', _PLASMA_DEST,
-                     '--object-path', _PLASMA_PATH,
-                     '--method', 'org.kde.PlasmaShell.setWallpaper', 'org.kde.image',
-                     wallpaper_param, str(screen_num)],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                if set_result.returncode == 0:
-                    success_count += 1
-                screen_num += 1
-            except Exception:
-                break
-
-        if success_count > 0:
-            print(f"Wallpaper changed successfully on {success_count} screen(s)!", file=sys.stderr)
-            return True
+        try:
+            transport = plasma_dbus.get_transport()
+            ok = _apply(transport, image_path)
+        except TransportUnavailable as e:
+            if plasma_dbus.get_backend() != "auto":
+                print(f"Error: D-Bus session connection unavailable: {e}",
+                      file=sys.stderr)
+                return False
+            plasma_dbus.session_transport_failed()
+            transport = plasma_dbus.get_transport()
+            ok = _apply(transport, image_path)
+        if ok:
+            _remember_current(image_path, own_apply=True)
+            # Queue variants for screens this apply has just discovered.
+            _screen_images(image_path)
         else:
-            print("Error: Failed to change wallpaper on any screen", file=sys.stderr)
-            return False
+            invalidate_current_wallpaper()
+        return ok
 
     except FileNotFoundError as e:
         print(f"Error: gdbus command not found: {e}", file=sys.stderr)
@@ -140,44 +624,72 @@ def change_wallpaper(image_path: str) -> bool:
         return False
 
 
-def get_current_wallpaper() -> Optional[str]:
+def get_current_wallpaper(refresh: bool = False) -> Optional[str]:
     """Get current KDE Plasma wallpaper path.
 
+    Served from a process-wide cache that kWallpaper's own applies write
+    through; D-Bus is only queried when the cache is older than
+    ``wallpaper.revalidate_interval`` seconds, after an external change
+    was signalled (session-bus backend), or when ``refresh`` is True.
+
     Tries the D-Bus ``wallpaper`` method first (works in Flatpak where
     ``kreadconfig5`` is absent), then falls back to ``kreadconfig6`` / ``kreadconfig5``.
 
     Returns:
         Path to current wallpaper, or None if not found
     """
+    if not refresh:
+        hit, cached = _cached_current()
+        if hit:
+            return cached
+    wallpaper_path = _query_current_wallpaper()
+    if wallpaper_path is not None:
+        _remember_current(wallpaper_path)
+    return wallpaper_path
+
+
+def _cached_current() -> Tuple[bool, Optional[str]]:
+    """``(True, path)`` while the cached current wallpaper is fresh."""
+    with _topology_lock:
+        if (_current_checked is not None and
+                time.monotonic() - _current_checked < _revalidate_interval):
+            return True, _current
+    return False, None
+
+
+def _uri_to_path(uri: str) -> str:
+    """Filesystem path for a reported wallpaper URI (variants map back
+    to their theme image)."""
+    if uri.startswith('file://'):
+        uri = uri[len('file://'):]
+    return variants.source_for(uri)
+
+
+def _query_current_wallpaper() -> Optional[str]:
+    """Uncached lookup behind :func:`get_current_wallpaper`."""
     # Primary: D-Bus wallpaper method (screen 0)
     try:
-        result = _gdbus('org.kde.PlasmaShell.wallpaper', '0', timeout=5)
-        if result.returncode == 0:
-            # Output looks like: ({'Image': <'file:///path/to/img.jpg'>, ...},)
-            match = re.search(r"'Image':\s*<'(file://[^']+)'>", result.stdout)
-            if not match:
-                match = re.search(r'"Image":\s*<(file://[^>]+)>', result.stdout)
-            if match:
-                uri = match.group(1)
-                if uri.startswith('file://'):
-                    return uri[len('file://'):]
-                return uri
+        try:
+            transport = plasma_dbus.get_transport()
+            current = transport.wallpaper(0)
+        except TransportUnavailable:
+            transport, current = None, None
+        uri = (current or {}).get('Image')
+        if isinstance(uri, str) and uri:
+            _watch(transport)
+            return _uri_to_path(uri)
     except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
         pass
 
     # Fallback: kreadconfig6 / kreadconfig5
     for tool in ('kreadconfig6', 'kreadconfig5'):
         try:
-            result = subprocess.run([
-                tool,
-                '--file', 'plasma-org.kde.plasma.desktop-appletsrc',
-                '--group', 'Wallpaper',
-                '--group', 'org.kde.image',
-                '--key', 'Image'
-            ], capture_output=True, text=True, check=True, timeout=5)
+            result = subprocess.run([tool] + KREADCONFIG_ARGS,
+                                    capture_output=True, text=True,
+                                    check=True, timeout=5)
             wallpaper_path = result.stdout.strip()
             if wallpaper_path:
-                return wallpaper_path
+                return variants.source_for(wallpaper_path)
         except (subprocess.CalledProcessError, FileNotFoundError,
                 subprocess.TimeoutExpired, OSError):
             continue
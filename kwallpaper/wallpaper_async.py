@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+kWallpaper asyncio wallpaper application.
+
+Async counterparts of :func:`kwallpaper.wallpaper.change_wallpaper` and
+:func:`kwallpaper.wallpaper.get_current_wallpaper`:
+
+- :func:`change_wallpaper_async` sets the image on every screen with one
+  concurrent ``setWallpaper`` call per screen under a single overall
+  deadline (``wallpaper.apply_deadline``).  Screens that have not answered
+  when the deadline passes are cancelled, so one wedged screen costs at
+  most the deadline instead of 5 s per call.  The result is an
+  :class:`ApplyReport` with one :class:`ScreenResult` per screen.
+  Screens get their resolution-matched variant like the synchronous
+  path.
+- :func:`get_current_wallpaper_async` shares the synchronous module's
+  current-wallpaper cache and topology cache.
+
+Callers without an event loop (the scheduler's worker threads, the GUI's
+``QRunnable`` workers) use :func:`submit` / :func:`change_wallpaper_future`,
+which run the coroutine on one shared background loop thread and return a
+``concurrent.futures.Future`` — the calling thread is free as soon as the
+work is queued.
+
+The D-Bus backend follows :func:`kwallpaper.plasma_dbus.get_backend`:
+the session bus via ``jeepney``'s asyncio router, or ``gdbus``
+subprocesses started with ``asyncio.create_subprocess_exec`` (killed when
+cancelled).
+"""
+
+import asyncio
+import concurrent.futures
+import contextlib
+import logging
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from kwallpaper import plasma_dbus, wallpaper
+from kwallpaper.plasma_dbus import (
+    CONNECTION_LOST,
+    PLASMA_DEST,
+    PLASMA_INTERFACE,
+    PLASMA_PATH,
+    TransportUnavailable,
+    _gvariant_quote,
+    parse_gdbus_wallpaper,
+    unwrap_gdbus_string,
+)
+
+logger = logging.getLogger(__name__)
+
+# jeepney asyncio availability (checked once; optional like plasma_dbus)
+try:
+    from jeepney import DBusAddress, MessageType, new_method_call
+    from jeepney.io.asyncio import DBusRouter, open_dbus_connection
+    JEEPNEY_AVAILABLE = True
+except ImportError:
+    DBusAddress = None
+    MessageType = None
+    new_method_call = None
+    DBusRouter = None
+    open_dbus_connection = None
+    JEEPNEY_AVAILABLE = False
+
+
+@dataclass(frozen=True)
+class ScreenResult:
+    """Outcome of setting the wallpaper on one screen."""
+    screen: int
+    ok: bool
+    error: str = ""
+    elapsed: float = 0.0    # seconds until the screen answered (or gave up)
+
+
+@dataclass
+class ApplyReport:
+    """Outcome of one :func:`change_wallpaper_async` call."""
+    image_path: str
+    screens: List[ScreenResult] = field(default_factory=list)
+    timed_out: bool = False
+    error: str = ""
+
+    @property
+    def success(self) -> bool:
+        """True when at least one screen shows the new image."""
+        return any(r.ok for r in self.screens)
+
+    @property
+    def failed(self) -> List[ScreenResult]:
+        return [r for r in self.screens if not r.ok]
+
+    @property
+    def message(self) -> str:
+        if self.error:
+            return self.error
+        done = sum(1 for r in self.screens if r.ok)
+        msg = f"Wallpaper set on {done}/{len(self.screens)} screen(s)"
+        for r in self.failed:
+            msg += f"; screen {r.screen}: {r.error}"
+        return msg
+
+
+# ============================================================================
+# Async transports
+# ============================================================================
+
+class AsyncGdbusTransport:
+    """One ``gdbus call`` subprocess per method call, awaited."""
+
+    name = "gdbus"
+
+    async def _call(self, method: str, *args: str) -> Tuple[int, str]:
+        proc = await asyncio.create_subprocess_exec(
+            'gdbus', 'call', '--session', '--dest', PLASMA_DEST,
+            '--object-path', PLASMA_PATH, '--method', method, *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL)
+        try:
+            stdout, _ = await proc.communicate()
+        except asyncio.CancelledError:
+            # Straggler: don't leave a gdbus process behind.
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            raise
+        return proc.returncode, stdout.decode(errors='replace')
+
+    async def evaluate_script(self, script: str) -> Optional[str]:
+        rc, out = await self._call(f'{PLASMA_INTERFACE}.evaluateScript', script)
+        return unwrap_gdbus_string(out) if rc == 0 else None
+
+    async def wallpaper(self, screen: int) -> Optional[Dict[str, Any]]:
+        rc, out = await self._call(f'{PLASMA_INTERFACE}.wallpaper', str(screen))
+        return parse_gdbus_wallpaper(out) if rc == 0 else None
+
+    async def set_wallpaper(self, plugin: str, params: Dict[str, str],
+                            screen: int) -> bool:
+        body = ", ".join(f"{_gvariant_quote(k)}: <{_gvariant_quote(v)}>"
+                         for k, v in params.items())
+        rc, _ = await self._call(f'{PLASMA_INTERFACE}.setWallpaper', plugin,
+                                 "{" + body + "}", str(screen))
+        return rc == 0
+
+
+class AsyncSessionBusTransport:
+    """One session-bus connection per event loop (jeepney asyncio router).
+
+    Concurrent calls are pipelined on the same socket; the router's
+    receiver task matches replies to serials.  A dead connection is
+    noticed from the call that fails on it and re-opened once.
+    """
+
+    name = "session"
+
+    def __init__(self, bus: str = "SESSION"):
+        if not JEEPNEY_AVAILABLE:
+            raise TransportUnavailable("jeepney is not installed")
+        self._bus = bus
+        self._router: Optional["DBusRouter"] = None
+        self._stack: Optional[contextlib.AsyncExitStack] = None
+        self._connect_lock = asyncio.Lock()
+        self._shell = DBusAddress(PLASMA_PATH, bus_name=PLASMA_DEST,
+                                  interface=PLASMA_INTERFACE)
+
+    async def connect(self) -> "DBusRouter":
+        async with self._connect_lock:
+            if self._router is not None:
+                return self._router
+            try:
+                conn = await open_dbus_connection(bus=self._bus)
+            except Exception as e:
+                raise TransportUnavailable(
+                    f"cannot open session bus connection: {e}") from e
+            # Router first out: its context exit stops the receiver task
+            # before the connection closes.
+            stack = contextlib.AsyncExitStack()
+            stack.push_async_callback(conn.close)
+            self._router = await stack.enter_async_context(DBusRouter(conn))
+            self._stack = stack
+            return self._router
+
+    async def _drop(self) -> None:
+        stack = self._stack
+        self._router = self._stack = None
+        if stack is not None:
+            try:
+                await stack.aclose()
+            except Exception:
+                # The router re-raises whatever stopped its receiver.
+                logger.debug("closing D-Bus connection failed", exc_info=True)
+
+    async def close(self) -> None:
+        async with self._connect_lock:
+            await self._drop()
+
+    async def _call(self, msg):
+        """Reply body, or None on an error reply.  Reconnects once on a
+        dead connection, then raises TransportUnavailable."""
+        for attempt in (0, 1):
+            router = await self.connect()
+            try:
+                reply = await router.send_and_get_reply(msg)
+            except CONNECTION_LOST as e:
+                logger.debug("async D-Bus call failed (%s); reconnecting", e)
+                async with self._connect_lock:
+                    if self._router is router:
+                        await self._drop()
+                if attempt:
+                    raise TransportUnavailable(
+                        f"session bus connection lost: {e}") from e
+                continue
+            if reply.header.message_type == MessageType.error:
+                return None
+            return reply.body
+        return None
+
+    async def evaluate_script(self, script: str) -> Optional[str]:
+        body = await self._call(new_method_call(
+            self._shell, "evaluateScript", "s", (script,)))
+        return body[0] if body else None
+
+    async def wallpaper(self, screen: int) -> Optional[Dict[str, Any]]:
+        body = await self._call(new_method_call(
+            self._shell, "wallpaper", "u", (screen,)))
+        if not body:
+            return None
+        return {k: v[1] if isinstance(v, tuple) else v
+                for k, v in body[0].items()}
+
+    async def set_wallpaper(self, plugin: str, params: Dict[str, str],
+                            screen: int) -> bool:
+        variants = {k: ("s", v) for k, v in params.items()}
+        body = await self._call(new_method_call(
+            self._shell, "setWallpaper", "sa{sv}u", (plugin, variants, screen)))
+        return body is not None
+
+
+_gdbus_transport = AsyncGdbusTransport()
+# Session transports are bound to the loop that opened them.
+_session_transports: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+async def get_async_transport():
+    """The async transport for the configured backend on the running loop.
+
+    Mirrors :func:`kwallpaper.plasma_dbus.get_transport`: ``"auto"``
+    falls back to gdbus (process-wide) when the session bus is unusable.
+    """
+    backend = plasma_dbus.get_backend()
+    if backend == "gdbus" or (backend == "auto" and plasma_dbus.session_failed()):
+        return _gdbus_transport
+    loop = asyncio.get_running_loop()
+    try:
+        transport = _session_transports.get(loop)
+        if transport is None:
+            transport = AsyncSessionBusTransport()
+            _session_transports[loop] = transport
+        await transport.connect()
+        return transport
+    except TransportUnavailable as e:
+        if backend == "session":
+            raise
+        logger.info("Session-bus D-Bus backend unavailable (%s); using gdbus", e)
+        plasma_dbus.session_transport_failed()
+        return _gdbus_transport
+
+
+# ============================================================================
+# Async API
+# ============================================================================
+
+async def _screens_for_apply(transport) -> Optional[List[int]]:
+    """Screen numbers to set: the cached topology, else one topology query
+    (cached for the sync path too).  None when the topology is unknown."""
+    cached = wallpaper._cached_topology()
+    if cached is None:
+        report = wallpaper._parse_json_report(
+            await transport.evaluate_script(wallpaper._TOPOLOGY_SCRIPT))
+        if report:
+            cached = wallpaper._screens_from_report(report)
+            wallpaper._store_topology(None, cached)
+    screens = sorted({s.screen for s in cached or [] if s.screen >= 0})
+    return screens or None
+
+
+async def _apply_all_desktops(transport,
+                              image_path: str) -> Optional[List[ScreenResult]]:
+    """Set ``image_path`` on every desktop with the batched script.
+
+    Used when the topology is unknown, so Plasma walks its own desktops
+    instead of us guessing screen numbers.  Returns None when the reply
+    holds no report.
+    """
+    start = time.monotonic()
+    report = wallpaper._parse_json_report(await transport.evaluate_script(
+        wallpaper._batch_apply_script(image_path)))
+    if not report:
+        return None
+    elapsed = time.monotonic() - start
+    if all(r.get('ok') for r in report):
+        wallpaper._store_topology(None, wallpaper._screens_from_report(report))
+    results = []
+    for r in report:
+        screen = r.get('screen')
+        if not isinstance(screen, int) or screen < 0:
+            continue
+        ok = bool(r.get('ok'))
+        error = "" if ok else str(r.get('error', 'unknown error'))
+        results.append(ScreenResult(screen, ok, error, elapsed))
+    return results
+
+
+async def _set_one(transport, uri: str, screen: int) -> ScreenResult:
+    start = time.monotonic()
+    try:
+        ok = await transport.set_wallpaper('org.kde.image', {'Image': uri}, screen)
+        error = "" if ok else "setWallpaper failed"
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        ok, error = False, str(e)
+    return ScreenResult(screen, ok, error, time.monotonic() - start)
+
+
+async def change_wallpaper_async(image_path: str,
+                                 deadline: Optional[float] = None) -> ApplyReport:
+    """Set ``image_path`` on every screen concurrently.
+
+    Args:
+        image_path: Path to the image file.
+        deadline: Overall budget in seconds (default
+            ``wallpaper.apply_deadline``), covering the topology lookup
+            and every per-screen set.  Screens still pending when it
+            expires are cancelled and reported as failed.
+
+    Returns:
+        ApplyReport with one ScreenResult per screen.  When the screen
+        topology is unknown, every desktop is set with one batched
+        script instead of guessing screen numbers.  Never raises for
+        D-Bus failures; they are reported in the result.  When the
+        shell is known to be down the apply is queued for replay (see
+        :mod:`kwallpaper.wallpaper`) and reported with no screens.
+    """
+    if deadline is None:
+        deadline = wallpaper.get_apply_deadline()
+    loop = asyncio.get_running_loop()
+    end = loop.time() + deadline
+    report = ApplyReport(image_path)
+
+    if wallpaper.shell_available() is False:
+        wallpaper._queue_apply(image_path)
+        report.error = "Plasma shell is not running (apply queued)"
+        wallpaper.invalidate_current_wallpaper()
+        return report
+
+    batched = None
+    try:
+        transport = await asyncio.wait_for(get_async_transport(), deadline)
+        screens = await asyncio.wait_for(_screens_for_apply(transport),
+                                         max(end - loop.time(), 0))
+        if screens is None:
+            batched = await asyncio.wait_for(
+                _apply_all_desktops(transport, image_path),
+                max(end - loop.time(), 0))
+    except asyncio.TimeoutError:
+        report.timed_out = True
+        report.error = f"Plasma did not answer within {deadline:g}s"
+        wallpaper.invalidate_current_wallpaper()
+        return report
+    except (TransportUnavailable, OSError) as e:
+        report.error = f"D-Bus unavailable: {e}"
+        wallpaper.invalidate_current_wallpaper()
+        return report
+
+    if screens is None:
+        if not batched:
+            report.error = "Plasma reported no screens"
+            wallpaper.invalidate_current_wallpaper()
+            return report
+        report.screens = sorted(batched, key=lambda r: r.screen)
+    else:
+        screen_images = wallpaper._screen_images(image_path)
+        started = loop.time()
+        tasks = {asyncio.create_task(_set_one(
+                     transport, f'file://{screen_images.get(s, image_path)}', s)): s
+                 for s in screens}
+        done, pending = await asyncio.wait(tasks,
+                                           timeout=max(end - loop.time(), 0))
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            report.timed_out = True
+
+        results = []
+        for task, screen in tasks.items():
+            if task in done:
+                results.append(task.result())
+            else:
+                results.append(ScreenResult(screen, False, "deadline exceeded",
+                                            loop.time() - started))
+        report.screens = sorted(results, key=lambda r: r.screen)
+
+    if report.failed:
+        wallpaper.invalidate_screen_topology()
+        for r in report.failed:
+            logger.warning(f"Screen {r.screen}: failed to set wallpaper: {r.error}")
+    if report.success:
+        wallpaper._remember_current(image_path, own_apply=True)
+    else:
+        wallpaper.invalidate_current_wallpaper()
+    return report
+
+
+async def _kreadconfig_async(timeout: float) -> Optional[str]:
+    """Fallback: the configured image (or the theme image behind a
+    variant) from kreadconfig6 / kreadconfig5."""
+    for tool in ('kreadconfig6', 'kreadconfig5'):
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                tool, *wallpaper.KREADCONFIG_ARGS,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL)
+            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+        except (asyncio.TimeoutError, OSError):
+            continue
+        if proc.returncode == 0 and stdout.strip():
+            # Variants map back to their theme image, as in the sync path.
+            return wallpaper._uri_to_path(stdout.decode(errors='replace').strip())
+    return None
+
+
+async def get_current_wallpaper_async(refresh: bool = False,
+                                      deadline: float = plasma_dbus.CALL_TIMEOUT
+                                      ) -> Optional[str]:
+    """Async :func:`kwallpaper.wallpaper.get_current_wallpaper` (same cache)."""
+    if not refresh:
+        hit, cached = wallpaper._cached_current()
+        if hit:
+            return cached
+    loop = asyncio.get_running_loop()
+    end = loop.time() + deadline
+    path = None
+    try:
+        transport = await asyncio.wait_for(get_async_transport(), deadline)
+        current = await asyncio.wait_for(transport.wallpaper(0),
+                                         max(end - loop.time(), 0))
+        uri = (current or {}).get('Image')
+        if isinstance(uri, str) and uri:
+            path = wallpaper._uri_to_path(uri)
+    except (asyncio.TimeoutError, TransportUnavailable, OSError):
+        pass
+
+    if path is None:
+        path = await _kreadconfig_async(max(end - loop.time(), 0.5))
+
+    if path is not None:
+        wallpaper._remember_current(path)
+    return path
+
+
+# ============================================================================
+# Background loop for callers without an event loop
+# ============================================================================
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """The shared loop thread (started on first use, daemon)."""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, daemon=True,
+                             name="kwallpaper-async").start()
+        return _loop
+
+
+def submit(coro) -> concurrent.futures.Future:
+    """Run ``coro`` on the background loop; returns a thread-safe Future."""
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop())
+
+
+def change_wallpaper_future(image_path: str,
+                            deadline: Optional[float] = None
+                            ) -> "concurrent.futures.Future[ApplyReport]":
+    """:func:`change_wallpaper_async` on the background loop."""
+    return submit(change_wallpaper_async(image_path, deadline))
+
+
+def get_current_wallpaper_future(refresh: bool = False
+                                 ) -> "concurrent.futures.Future[Optional[str]]":
+    """:func:`get_current_wallpaper_async` on the background loop."""
+    return submit(get_current_wallpaper_async(refresh))
@@ -5,7 +5,7 @@ kWallpaper - Core functionality module (compatibility facade).
 This module used to be a ~2,700-line god module.  Phase 3 split it into:
 
 - kwallpaper.config     paths, load/save/validate, dir bootstrap
-- kwallpaper.backup     daily astral schedule backup
+- kwallpaper.backup     forward astral schedule backup
 - kwallpaper.suntime    ONE implementation of dawn/sunrise/sunset/dusk math
 - kwallpaper.selection  image file/index selection (theme.json + glob)
 - kwallpaper.themes     discovery, extraction, import/delete, thumbnails
@@ -39,7 +39,6 @@ from kwallpaper.config import (
 from kwallpaper.backup import (
     get_daily_backup_path,
     load_daily_backup_schedule,
-    save_daily_backup_schedule,
 )
 
 from kwallpaper.suntime import (
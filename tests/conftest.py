@@ -0,0 +1,44 @@
+"""Shared test fixtures."""
+import pytest
+
+from kwallpaper import backup, fswatch, manifest, solartable, suntime
+
+
+@pytest.fixture(autouse=True)
+def _no_solar_tables(monkeypatch):
+    """Keep solar_segments() on astral: no reads of (or background builds
+    into) the user's sun-table cache.  tests/test_solartable.py turns the
+    tables back on in a temporary directory."""
+    monkeypatch.setattr(solartable, "_enabled", False)
+
+
+@pytest.fixture(autouse=True)
+def _no_backup_writes(monkeypatch):
+    """No background writes into the user's schedule-backup directory;
+    tests/test_backup.py turns them back on in a temporary directory."""
+    monkeypatch.setattr(backup, "_enabled", False)
+
+
+@pytest.fixture(autouse=True)
+def _no_manifest_builds(monkeypatch):
+    """No background manifest builds racing a test's theme directory;
+    tests/test_manifest.py turns them back on."""
+    monkeypatch.setattr(manifest, "_enabled", False)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_sun_times():
+    """Tests patch suntime._real_sun_data; never serve another test's
+    memoized sun values."""
+    suntime.clear_sun_times()
+    yield
+    suntime.clear_sun_times()
+
+
+@pytest.fixture(autouse=True)
+def _stop_fs_watchers():
+    """Stop the shared file watchers a test started (widgets and the
+    scheduler start them), so no watcher thread outlives its test or
+    calls into a destroyed widget."""
+    yield
+    fswatch.stop_watchers()
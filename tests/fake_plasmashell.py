@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Stand-in ``org.kde.plasmashell`` service for tests and benchmarks.
+
+Runs on a private ``dbus-daemon`` session bus (see :class:`PrivateSessionBus`)
+and implements the subset of the Plasma shell API kWallpaper uses:
+
+- ``org.freedesktop.DBus.Peer.Ping`` (and ``Introspect``, which
+  ``gdbus call`` issues before every call)
+- ``org.kde.PlasmaShell.evaluateScript(s) -> s`` — recognizes the scripts
+  kwallpaper.wallpaper sends (screen count, topology, batched apply);
+  anything else is an error reply, like a script Plasma fails to run
+- ``org.kde.PlasmaShell.wallpaper(u) -> a{sv}``
+- ``org.kde.PlasmaShell.setWallpaper(s, a{sv}, u)``
+
+and emits ``wallpaperChanged(u)`` after every set and KScreen
+``configChanged`` from :meth:`FakePlasmaShell.set_screens`.
+
+Screen count, per-call delay and per-screen delay are configurable so the
+benchmark can model a slow shell.  In-process use::
+
+    with PrivateSessionBus() as bus, FakePlasmaShell(bus.address, screens=3):
+        ...
+
+or as a separate process (prints ``ready`` once the name is owned)::
+
+    DBUS_SESSION_BUS_ADDRESS=... python -m tests.fake_plasmashell --screens 3
+
+Requires ``jeepney`` and a ``dbus-daemon`` binary.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+try:
+    from jeepney import (
+        DBusAddress,
+        HeaderFields,
+        MessageType,
+        message_bus,
+        new_error,
+        new_method_return,
+        new_signal,
+    )
+    from jeepney.io.blocking import open_dbus_connection
+    JEEPNEY_AVAILABLE = True
+except ImportError:
+    JEEPNEY_AVAILABLE = False
+
+PLASMA_DEST = "org.kde.plasmashell"
+PLASMA_PATH = "/PlasmaShell"
+PLASMA_INTERFACE = "org.kde.PlasmaShell"
+
+_URI_RE = re.compile(r'var uri = (".*");')
+_SCREEN_URIS_RE = re.compile(r'var screenUris = (\{.*\});')
+
+# gdbus introspects before calling so it can type the arguments (the
+# screen number must go out as ``u``, not ``i``).
+_INTROSPECTION_XML = """\
+<!DOCTYPE node PUBLIC "-//freedesktop//DTD D-BUS Object Introspection 1.0//EN"
+ "http://www.freedesktop.org/standards/dbus/1.0/introspect.dtd">
+<node>
+  <interface name="org.freedesktop.DBus.Peer">
+    <method name="Ping"/>
+  </interface>
+  <interface name="org.kde.PlasmaShell">
+    <method name="evaluateScript">
+      <arg name="script" type="s" direction="in"/>
+      <arg type="s" direction="out"/>
+    </method>
+    <method name="wallpaper">
+      <arg name="screenNum" type="u" direction="in"/>
+      <arg type="a{sv}" direction="out"/>
+    </method>
+    <method name="setWallpaper">
+      <arg name="wallpaperPlugin" type="s" direction="in"/>
+      <arg name="parameters" type="a{sv}" direction="in"/>
+      <arg name="screenNum" type="u" direction="in"/>
+    </method>
+    <signal name="wallpaperChanged">
+      <arg name="screenNum" type="u"/>
+    </signal>
+  </interface>
+</node>
+"""
+
+
+def dbus_daemon_path() -> Optional[str]:
+    """The ``dbus-daemon`` binary, or None when it is not installed."""
+    return shutil.which("dbus-daemon")
+
+
+class PrivateSessionBus:
+    """A throw-away ``dbus-daemon --session`` for the duration of a test."""
+
+    def __init__(self):
+        self.address: Optional[str] = None
+        self._proc: Optional[subprocess.Popen] = None
+
+    def start(self) -> "PrivateSessionBus":
+        daemon = dbus_daemon_path()
+        if daemon is None:
+            raise FileNotFoundError("dbus-daemon not found")
+        self._proc = subprocess.Popen(
+            [daemon, "--session", "--nofork", "--print-address"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        self.address = self._proc.stdout.readline().strip()
+        if not self.address:
+            self.stop()
+            raise RuntimeError("dbus-daemon did not report an address")
+        return self
+
+    def stop(self) -> None:
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.wait(timeout=5)
+            self._proc = None
+
+    @property
+    def env(self) -> Dict[str, str]:
+        """``os.environ`` pointed at this bus (for subprocesses)."""
+        env = dict(os.environ)
+        env["DBUS_SESSION_BUS_ADDRESS"] = self.address
+        return env
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakePlasmaShell:
+    """Serve the Plasma shell API on ``address`` from a background thread.
+
+    Attributes:
+        images: ``{screen: uri}`` current wallpaper per screen.
+        calls: ``Counter`` of handled method names (including the
+            ``Introspect`` calls gdbus makes).
+        scripting: when False, every ``evaluateScript`` fails (as when
+            Plasma's widgets are locked).
+    """
+
+    def __init__(self, address: Optional[str] = None, screens: int = 1,
+                 delay: float = 0.0, screen_delay: float = 0.0):
+        if not JEEPNEY_AVAILABLE:
+            raise RuntimeError("jeepney is required for the fake plasmashell")
+        self.address = address or os.environ["DBUS_SESSION_BUS_ADDRESS"]
+        self.delay = delay
+        self.screen_delay = screen_delay
+        self.scripting = True
+        self.images: Dict[int, str] = {}
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._conn = None
+        self.set_screens(screens, signal=False)
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self) -> "FakePlasmaShell":
+        self._conn = open_dbus_connection(bus=self.address)
+        reply = self._conn.send_and_get_reply(
+            message_bus.RequestName(PLASMA_DEST))
+        if reply.body[0] != 1:      # DBUS_REQUEST_NAME_REPLY_PRIMARY_OWNER
+            raise RuntimeError(f"cannot own {PLASMA_DEST}: {reply.body}")
+        self._thread = threading.Thread(target=self._serve, daemon=True,
+                                        name="fake-plasmashell")
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -- state -------------------------------------------------------------
+
+    def set_screens(self, count: int, signal: bool = True) -> None:
+        """Change the number of screens (new ones get a default image) and
+        emit KScreen ``configChanged``."""
+        with self._lock:
+            self.images = {i: self.images.get(i, "file:///usr/share/default.jpg")
+                           for i in range(count)}
+        if signal and self._conn is not None:
+            self._send(new_signal(
+                DBusAddress("/backend", interface="org.kde.kscreen.Backend"),
+                "configChanged", "a{sv}", ({},)))
+
+    def _send(self, msg) -> None:
+        with self._send_lock:
+            self._conn.send(msg)
+
+    def _emit_wallpaper_changed(self, screen: int) -> None:
+        self._send(new_signal(
+            DBusAddress(PLASMA_PATH, interface=PLASMA_INTERFACE),
+            "wallpaperChanged", "u", (screen,)))
+
+    def _screen_report(self, screen: int, **extra) -> dict:
+        report = {"screen": screen, "plugin": "org.kde.image",
+                  "width": 1920, "height": 1080}
+        report.update(extra)
+        return report
+
+    # -- method handlers ---------------------------------------------------
+
+    def _serve(self) -> None:
+        while not self._stop.is_set():
+            try:
+                msg = self._conn.receive(timeout=0.1)
+            except TimeoutError:
+                continue
+            except Exception:
+                return
+            if msg.header.message_type != MessageType.method_call:
+                continue
+            member = msg.header.fields.get(HeaderFields.member)
+            self.calls[member] += 1
+            if self.delay:
+                time.sleep(self.delay)
+            try:
+                reply = self._handle(msg, member)
+            except Exception as e:
+                reply = new_error(msg, "org.kde.plasmashell.Error", "s",
+                                  (str(e),))
+            self._send(reply)
+
+    def _handle(self, msg, member: str):
+        if member == "Ping":
+            return new_method_return(msg)
+        if member == "Introspect":
+            return new_method_return(msg, "s", (_INTROSPECTION_XML,))
+        if member == "evaluateScript":
+            return self._evaluate_script(msg, msg.body[0])
+        if member == "wallpaper":
+            with self._lock:
+                uri = self.images.get(msg.body[0])
+            params = {"Image": ("s", uri)} if uri is not None else {}
+            return new_method_return(msg, "a{sv}", (params,))
+        if member == "setWallpaper":
+            plugin, params, screen = msg.body
+            with self._lock:
+                if screen not in self.images:
+                    raise ValueError(f"no screen {screen}")
+                self.images[screen] = params["Image"][1]
+            if self.screen_delay:
+                time.sleep(self.screen_delay)
+            self._emit_wallpaper_changed(screen)
+            return new_method_return(msg)
+        return new_error(msg, "org.freedesktop.DBus.Error.UnknownMethod",
+                         "s", (f"unknown method {member}",))
+
+    def _evaluate_script(self, msg, script: str):
+        if not self.scripting:
+            return new_error(msg, "org.kde.plasmashell.Error", "s",
+                             ("Scripting is locked",))
+        if script.strip() == "print(desktops().length);":
+            with self._lock:
+                return new_method_return(msg, "s", (str(len(self.images)),))
+        if "function screenInfo" not in script:
+            raise ValueError("unsupported script")
+        uri_match = _URI_RE.search(script)
+        with self._lock:
+            screens = sorted(self.images)
+        if uri_match is None:
+            report = [self._screen_report(i) for i in screens]
+        else:
+            uri = json.loads(uri_match.group(1))
+            overrides_match = _SCREEN_URIS_RE.search(script)
+            overrides = (json.loads(overrides_match.group(1))
+                         if overrides_match else {})
+            report = []
+            for i in screens:
+                with self._lock:
+                    self.images[i] = overrides.get(str(i), uri)
+                if self.screen_delay:
+                    time.sleep(self.screen_delay)
+                self._emit_wallpaper_changed(i)
+                report.append(self._screen_report(i, ok=True))
+        return new_method_return(msg, "s", (json.dumps(report) + "\n",))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--screens", type=int, default=1)
+    parser.add_argument("--delay", type=float, default=0.0,
+                        help="seconds of latency added to every call")
+    parser.add_argument("--screen-delay", type=float, default=0.0,
+                        help="seconds added per screen touched by a set")
+    args = parser.parse_args(argv)
+    shell = FakePlasmaShell(screens=args.screens, delay=args.delay,
+                            screen_delay=args.screen_delay).start()
+    print("ready", flush=True)
+    try:
+        sys.stdin.read()        # run until stdin closes / parent exits
+    finally:
+        shell.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
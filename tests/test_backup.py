@@ -1,75 +1,175 @@
-"""Tests for the single rolling schedule backup (kwallpaper.backup)."""
+"""Tests for the forward schedule backup (kwallpaper.backup)."""
 import json
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 import pytest
+from zoneinfo import ZoneInfo
 
 import kwallpaper.backup as backup_mod
+from kwallpaper import suntime
 from kwallpaper.backup import (
+    BACKUP_DAYS,
     BACKUP_FILE_NAME,
+    backup_sun_for,
     get_daily_backup_path,
     load_daily_backup_schedule,
-    save_daily_backup_schedule,
+    request_forward_backup,
+    save_forward_backup,
+    wait_idle,
 )
 
+TZ = ZoneInfo("America/Phoenix")
+LOCATION = ("America/Phoenix", 33.4484, -112.074)
+TODAY = date(2026, 6, 21)
+
 
 @pytest.fixture
 def backup_dir(tmp_path, monkeypatch):
     d = tmp_path / "schedule-backup"
     d.mkdir()
     monkeypatch.setattr(backup_mod, "DEFAULT_SCHEDULE_BACKUP_DIR", d)
+    monkeypatch.setattr(backup_mod, "_current", None)
+    monkeypatch.setattr(backup_mod, "_requested", None)
+    monkeypatch.setattr(backup_mod, "_enabled", True)
     return d
 
 
-def _ts(day_offset=0):
-    return (datetime.now() + timedelta(days=day_offset)).replace(
-        hour=12, minute=0, second=0, microsecond=0)
-
-
-class TestSingleBackupFile:
-    def test_path_is_fixed_name(self, backup_dir):
-        assert get_daily_backup_path() == backup_dir / BACKUP_FILE_NAME
-        assert get_daily_backup_path().name == "schedule_backup.json"
-
-    def test_save_creates_single_file(self, backup_dir):
-        save_daily_backup_schedule(_ts(), _ts(), _ts(), _ts(), "day")
-        files = list(backup_dir.iterdir())
-        assert [f.name for f in files] == [BACKUP_FILE_NAME]
-
-    def test_save_overwrites_instead_of_accumulating(self, backup_dir):
-        for _ in range(5):
-            save_daily_backup_schedule(_ts(), _ts(), _ts(), _ts(), "day")
-        files = list(backup_dir.iterdir())
-        assert len(files) == 1
-        backup = json.loads(files[0].read_text())
-        assert backup["time_of_day"] == "day"
-
-    def test_load_roundtrip(self, backup_dir):
-        save_daily_backup_schedule(_ts(), _ts(), _ts(), _ts(), "sunset")
-        backup = load_daily_backup_schedule()
-        assert backup is not None
-        assert backup["time_of_day"] == "sunset"
-        assert backup["previous_date"] == (
-            datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-
-    def test_load_missing_returns_none(self, backup_dir):
-        assert load_daily_backup_schedule() is None
-
-    def test_load_ignores_stale_backup(self, backup_dir):
-        # A backup older than yesterday is useless as a fallback.
-        old = (datetime.now() - timedelta(days=3)).strftime("%Y-%m-%d")
-        (backup_dir / BACKUP_FILE_NAME).write_text(json.dumps({
-            "date": old,
-            "dawn": None, "sunrise": None, "sunset": None, "dusk": None,
-            "time_of_day": "day",
-            "previous_date": old,
-        }))
-        assert load_daily_backup_schedule() is None
-
-    def test_load_invalid_json_returns_none(self, backup_dir):
-        (backup_dir / BACKUP_FILE_NAME).write_text("{ not json")
-        assert load_daily_backup_schedule() is None
-
-    def test_load_missing_fields_returns_none(self, backup_dir):
-        (backup_dir / BACKUP_FILE_NAME).write_text(json.dumps({"date": "x"}))
-        assert load_daily_backup_schedule() is None
+@pytest.fixture
+def fake_sun(monkeypatch):
+    """Deterministic sun times; records the dates astral is asked for."""
+    calls = []
+
+    def sun_data(tz, lat, lon, date=None):
+        calls.append(date)
+        at = lambda h: datetime(date.year, date.month, date.day, h, tzinfo=TZ)
+        return {"dawn": at(5), "sunrise": at(6), "sunset": at(19),
+                "dusk": at(20)}
+    monkeypatch.setattr(suntime, "_real_sun_data", sun_data)
+    return calls
+
+
+def test_path_is_fixed_name(backup_dir):
+    assert get_daily_backup_path() == backup_dir / BACKUP_FILE_NAME
+
+
+def test_save_covers_the_coming_days(backup_dir, fake_sun):
+    assert save_forward_backup(*LOCATION, today=TODAY)
+    assert fake_sun == [TODAY + timedelta(days=i) for i in range(BACKUP_DAYS)]
+    assert [f.name for f in backup_dir.iterdir()] == [BACKUP_FILE_NAME]
+
+    last = TODAY + timedelta(days=BACKUP_DAYS - 1)
+    assert backup_sun_for(last)["sunset"] == datetime(
+        last.year, last.month, last.day, 19, tzinfo=TZ)
+    assert backup_sun_for(last + timedelta(days=1)) is None
+
+
+def test_save_runs_once_per_day(backup_dir, fake_sun):
+    assert save_forward_backup(*LOCATION, today=TODAY)
+    for _ in range(5):
+        assert not save_forward_backup(*LOCATION, today=TODAY)
+    assert len(fake_sun) == BACKUP_DAYS
+
+    # Another process finds today's file and does not recompute either.
+    backup_mod._current = None
+    assert not save_forward_backup(*LOCATION, today=TODAY)
+    assert len(fake_sun) == BACKUP_DAYS
+
+    assert save_forward_backup(*LOCATION, today=TODAY + timedelta(days=1))
+    backup = json.loads(get_daily_backup_path().read_text())
+    assert backup["generated"] == "2026-06-22"
+    # Yesterday is kept for pre-dawn lookups; older days are dropped.
+    assert min(backup["days"]) == "2026-06-21"
+
+
+def test_location_change_recomputes(backup_dir, fake_sun):
+    save_forward_backup(*LOCATION, today=TODAY)
+    assert save_forward_backup("America/Phoenix", 34.0, -112.0, today=TODAY)
+    backup = json.loads(get_daily_backup_path().read_text())
+    assert backup["location"]["latitude"] == 34.0
+    assert min(backup["days"]) == "2026-06-21"
+
+
+def test_failed_days_keep_previous_entries(backup_dir, fake_sun, monkeypatch):
+    save_forward_backup(*LOCATION, today=TODAY)
+    monkeypatch.setattr(suntime, "_real_sun_data",
+                        lambda tz, lat, lon, date=None: None)
+    assert not save_forward_backup(*LOCATION, today=TODAY + timedelta(days=1))
+    assert backup_sun_for(TODAY + timedelta(days=3)) is not None
+
+
+def test_detection_does_not_write(backup_dir, monkeypatch):
+    at = lambda h: datetime(2026, 6, 21, h, tzinfo=TZ)
+    monkeypatch.setattr(suntime, "ASTRAL_AVAILABLE", True)
+    monkeypatch.setattr(suntime, "_real_sun_data", lambda *a, **k: {
+        "dawn": at(5), "sunrise": at(6), "sunset": at(19), "dusk": at(20)})
+    now = at(12)
+    for _ in range(3):
+        assert suntime.detect_time_of_day_sun(now=now) == "day"
+    assert list(backup_dir.iterdir()) == []
+
+
+def test_request_writes_in_background_once_per_day(backup_dir, fake_sun):
+    assert request_forward_backup(*LOCATION, today=TODAY)
+    assert wait_idle(5)
+    assert get_daily_backup_path().exists()
+    assert len(fake_sun) == BACKUP_DAYS
+
+    for _ in range(5):
+        assert not request_forward_backup(*LOCATION, today=TODAY)
+    assert request_forward_backup("America/Phoenix", 34.0, -112.0, today=TODAY)
+    assert wait_idle(5)
+    assert json.loads(get_daily_backup_path().read_text())["location"][
+        "latitude"] == 34.0
+
+
+def test_request_retries_after_failed_write(backup_dir, monkeypatch):
+    monkeypatch.setattr(suntime, "_real_sun_data",
+                        lambda tz, lat, lon, date=None: None)
+    assert request_forward_backup(*LOCATION, today=TODAY)
+    assert wait_idle(5)
+    assert not get_daily_backup_path().exists()
+    assert request_forward_backup(*LOCATION, today=TODAY)
+    assert wait_idle(5)
+
+
+def test_request_disabled(backup_dir, fake_sun):
+    backup_mod.set_enabled(False)
+    assert not request_forward_backup(*LOCATION, today=TODAY)
+    assert fake_sun == []
+
+
+@pytest.mark.parametrize("offset,hour,expected", [
+    (0, 12, "day"),
+    (3, 2, "night"),
+    (6, 19, "sunset"),
+])
+def test_load_classifies_now(backup_dir, fake_sun, offset, hour, expected):
+    save_forward_backup(*LOCATION, today=TODAY)
+    day = TODAY + timedelta(days=offset)
+    now = datetime(day.year, day.month, day.day, hour, 30, tzinfo=TZ)
+    backup = load_daily_backup_schedule(now)
+    assert backup["date"] == day.isoformat()
+    assert backup["time_of_day"] == expected
+
+
+def test_load_outside_coverage_returns_none(backup_dir, fake_sun):
+    save_forward_backup(*LOCATION, today=TODAY)
+    late = datetime(2026, 7, 5, 12, tzinfo=TZ)
+    assert load_daily_backup_schedule(late) is None
+
+
+def test_load_missing_returns_none(backup_dir):
+    assert load_daily_backup_schedule() is None
+
+
+def test_load_invalid_json_returns_none(backup_dir):
+    (backup_dir / BACKUP_FILE_NAME).write_text("{ not json")
+    assert load_daily_backup_schedule() is None
+
+
+def test_load_ignores_single_day_format(backup_dir):
+    (backup_dir / BACKUP_FILE_NAME).write_text(json.dumps({
+        "date": "2026-06-20", "dawn": None, "sunrise": None, "sunset": None,
+        "dusk": None, "time_of_day": "day", "previous_date": "2026-06-20",
+    }))
+    assert load_daily_backup_schedule() is None
@@ -0,0 +1,94 @@
+"""Tests for the mtime-keyed load_config cache."""
+import json
+import os
+
+import pytest
+
+from kwallpaper import config as config_module
+from kwallpaper.config import (
+    config_cache_stats,
+    invalidate_config_cache,
+    load_config,
+    save_config,
+)
+
+OLD = 1_600_000_000   # a settled mtime, well outside the racy window
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache(monkeypatch):
+    monkeypatch.setattr(config_module, "ensure_config_dirs", lambda: None)
+    invalidate_config_cache()
+    yield
+    invalidate_config_cache()
+
+
+def _write(path, data, mtime=OLD):
+    path.write_text(json.dumps(data))
+    os.utime(path, (mtime, mtime))
+
+
+def _misses():
+    return config_cache_stats()["misses"]
+
+
+def test_unchanged_file_parsed_once(tmp_path, monkeypatch):
+    p = tmp_path / "config.json"
+    _write(p, {"scheduling": {"cycle_interval": 60}})
+    parses = []
+    real_validate = config_module.validate_config
+    monkeypatch.setattr(config_module, "validate_config",
+                        lambda c: parses.append(1) or real_validate(c))
+    for _ in range(5):
+        assert load_config(str(p))["scheduling"]["cycle_interval"] == 60
+    assert len(parses) == 1
+
+
+def test_callers_get_private_copies(tmp_path):
+    p = tmp_path / "config.json"
+    _write(p, {"scheduling": {"cycle_interval": 60}})
+    first = load_config(str(p))
+    first["scheduling"]["cycle_interval"] = 5
+    assert load_config(str(p))["scheduling"]["cycle_interval"] == 60
+
+
+def test_external_edit_detected(tmp_path):
+    p = tmp_path / "config.json"
+    _write(p, {"scheduling": {"cycle_interval": 60}})
+    load_config(str(p))
+    _write(p, {"scheduling": {"cycle_interval": 90}}, mtime=OLD + 10)
+    before = _misses()
+    assert load_config(str(p))["scheduling"]["cycle_interval"] == 90
+    assert _misses() == before + 1
+
+
+def test_recently_modified_file_is_not_trusted(tmp_path):
+    p = tmp_path / "config.json"
+    p.write_text(json.dumps({"scheduling": {"cycle_interval": 60}}))
+    load_config(str(p))
+    # Same size, same mtime (a coarse-timestamp filesystem): only the
+    # racy-window rule notices the rewrite.
+    stat = p.stat()
+    p.write_text(json.dumps({"scheduling": {"cycle_interval": 90}}))
+    os.utime(p, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert load_config(str(p))["scheduling"]["cycle_interval"] == 90
+
+
+def test_save_config_invalidates(tmp_path):
+    p = tmp_path / "config.json"
+    _write(p, {"scheduling": {"cycle_interval": 60}})
+    config = load_config(str(p))
+    config["scheduling"]["cycle_interval"] = 120
+    save_config(str(p), config)
+    assert load_config(str(p))["scheduling"]["cycle_interval"] == 120
+
+
+def test_invalid_file_not_cached(tmp_path):
+    p = tmp_path / "config.json"
+    p.write_text("{not json")
+    os.utime(p, (OLD, OLD))
+    with pytest.raises(ValueError, match="Invalid JSON"):
+        load_config(str(p))
+    assert config_cache_stats()["entries"] == 0
+    with pytest.raises(FileNotFoundError):
+        load_config(str(tmp_path / "missing.json"))
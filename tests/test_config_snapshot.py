@@ -0,0 +1,81 @@
+"""Tests for ConfigSnapshot (kwallpaper.snapshot)."""
+import dataclasses
+import json
+from datetime import datetime
+
+import pytest
+
+from kwallpaper import solarsegments, state_store, statefile
+from kwallpaper.config import invalidate_config_cache
+from kwallpaper.snapshot import ConfigSnapshot, as_snapshot, load_snapshot
+
+
+@pytest.fixture
+def cfg(tmp_path):
+    statefile.forget()
+    invalidate_config_cache()
+    p = tmp_path / "config.json"
+    p.write_text(json.dumps({
+        "version": 2,
+        "location": {"latitude": 47.6, "longitude": -122.3,
+                     "timezone": "America/Los_Angeles"},
+        "scheduling": {"cycle_interval": 90, "suntime_model": "legacy",
+                       "daily_shuffle_enabled": False},
+    }))
+    with state_store.transaction(p) as state:
+        state["last_applied"] = {"theme": "Mojave",
+                                 "image": "/t/Mojave/m_3.jpg"}
+    return p
+
+
+def test_load_snapshot_parses_fields(cfg):
+    snap = load_snapshot(cfg)
+    assert snap.path == cfg
+    assert snap.timezone == "America/Los_Angeles"
+    assert snap.tz.key == "America/Los_Angeles"
+    assert (snap.latitude, snap.longitude) == (47.6, -122.3)
+    assert snap.suntime_model == "legacy"
+    assert snap.cycle_interval == 90
+    assert snap.safety_interval == 600       # filled in from the defaults
+    assert snap.daily_shuffle is False
+    assert snap.last_applied_theme == "Mojave"
+    assert snap.last_applied_image == "/t/Mojave/m_3.jpg"
+
+
+def test_snapshot_is_immutable(cfg):
+    snap = load_snapshot(cfg)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        snap.timezone = "UTC"
+    with pytest.raises(TypeError):
+        snap.config["location"]["timezone"] = "UTC"
+    assert isinstance(snap.state["shuffle"]["shuffle_list"], tuple)
+    assert not hasattr(snap, "__dict__")
+    # The mutable copies are private to the caller.
+    copy = snap.config_dict()
+    copy["location"]["timezone"] = "UTC"
+    assert snap.config["location"]["timezone"] == "America/Los_Angeles"
+
+
+def test_as_snapshot_passes_snapshots_through(cfg):
+    snap = load_snapshot(cfg)
+    assert as_snapshot(snap) is snap
+    assert as_snapshot(str(cfg)) == snap
+
+
+def test_from_config_fills_missing_sections(tmp_path):
+    snap = ConfigSnapshot.from_config({}, tmp_path / "config.json",
+                                      state={"last_applied": {}})
+    assert snap.timezone == "America/Phoenix"
+    assert snap.suntime_model == "sun"
+    assert snap.last_applied_theme == ""
+
+
+def test_segment_api_accepts_snapshot_or_path(cfg, monkeypatch):
+    seen = []
+    monkeypatch.setattr(solarsegments, "segments_for_now",
+                        lambda now, tz, lat, lon: seen.append((tz, lat, lon)))
+    snap = load_snapshot(cfg)
+    now = datetime(2026, 6, 1, 12, 0, tzinfo=snap.tz)
+    solarsegments.segments_for_config(snap, now=now)
+    solarsegments.segments_for_config(str(cfg), now=now)
+    assert seen[0] == seen[1] == (snap.tz, 47.6, -122.3)
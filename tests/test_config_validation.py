@@ -206,6 +206,46 @@ class TestSafetyIntervalValidation:
         assert _default_config()["scheduling"]["safety_interval"] == 600
 
 
+class TestPrefetchLeadValidation:
+    @pytest.mark.parametrize("value", [0, 30, 300])
+    def test_validate_config_prefetch_lead_valid(self, value):
+        config = _default_config()
+        config["scheduling"]["prefetch_lead"] = value
+        validate_config(config)  # should not raise; 0 disables prefetch
+
+    @pytest.mark.parametrize("bad", [-1, 2.5, "30", None, True])
+    def test_validate_config_prefetch_lead_invalid(self, bad):
+        config = _default_config()
+        config["scheduling"]["prefetch_lead"] = bad
+        with pytest.raises(ValueError, match="prefetch_lead"):
+            validate_config(config)
+
+    def test_normalize_config_fills_missing_prefetch_lead(self):
+        config = _default_config()
+        del config["scheduling"]["prefetch_lead"]
+        assert normalize_config(config)["scheduling"]["prefetch_lead"] == 30
+
+
+class TestSegmentCacheSettingsValidation:
+    @pytest.mark.parametrize("key", ["scheduling.segment_cache_size",
+                                     "location.coordinate_precision"])
+    @pytest.mark.parametrize("bad", [-1, "4", 1.5, None, True])
+    def test_validate_config_invalid(self, key, bad):
+        section, name = key.split(".")
+        config = _default_config()
+        config[section][name] = bad
+        with pytest.raises(ValueError, match=name):
+            validate_config(config)
+
+    def test_normalize_config_fills_defaults(self):
+        config = _default_config()
+        del config["scheduling"]["segment_cache_size"]
+        del config["location"]["coordinate_precision"]
+        result = normalize_config(config)
+        assert result["scheduling"]["segment_cache_size"] == 64
+        assert result["location"]["coordinate_precision"] == 4
+
+
 class TestLastAppliedImageValidation:
     def test_validate_config_last_applied_image_valid(self):
         config = _default_config()
@@ -224,3 +264,70 @@ class TestLastAppliedImageValidation:
         del config["theme"]["last_applied_image"]
         result = normalize_config(config)
         assert result["theme"]["last_applied_image"] == ""
+
+
+class TestDbusBackendValidation:
+    @pytest.mark.parametrize("value", ["auto", "session", "gdbus"])
+    def test_validate_config_dbus_backend_valid(self, value):
+        config = _default_config()
+        config["wallpaper"]["dbus_backend"] = value
+        validate_config(config)  # should not raise
+
+    @pytest.mark.parametrize("bad", ["dbus", "", None, 1, ["auto"]])
+    def test_validate_config_dbus_backend_invalid(self, bad):
+        config = _default_config()
+        config["wallpaper"]["dbus_backend"] = bad
+        with pytest.raises(ValueError, match="dbus_backend"):
+            validate_config(config)
+
+    def test_normalize_config_fills_missing_wallpaper_section(self):
+        config = _default_config()
+        del config["wallpaper"]
+        result = normalize_config(config)
+        assert result["wallpaper"]["dbus_backend"] == "auto"
+        assert result["wallpaper"]["batch_apply"] is True
+        assert result["wallpaper"]["revalidate_interval"] == 300
+        assert result["wallpaper"]["apply_deadline"] == 10
+        assert result["wallpaper"]["resolution_variants"] is True
+        assert result["wallpaper"]["variant_scale"] == 1
+
+    @pytest.mark.parametrize("bad", [0, -1, "300", None, True])
+    def test_validate_config_revalidate_interval_invalid(self, bad):
+        config = _default_config()
+        config["wallpaper"]["revalidate_interval"] = bad
+        with pytest.raises(ValueError, match="revalidate_interval"):
+            validate_config(config)
+
+    @pytest.mark.parametrize("bad", ["yes", 1, None])
+    def test_validate_config_batch_apply_invalid(self, bad):
+        config = _default_config()
+        config["wallpaper"]["batch_apply"] = bad
+        with pytest.raises(ValueError, match="batch_apply"):
+            validate_config(config)
+
+    @pytest.mark.parametrize("value", [0.5, 10])
+    def test_validate_config_apply_deadline_valid(self, value):
+        config = _default_config()
+        config["wallpaper"]["apply_deadline"] = value
+        validate_config(config)  # should not raise
+
+    @pytest.mark.parametrize("bad", [0, -2.5, "10", None, True])
+    def test_validate_config_apply_deadline_invalid(self, bad):
+        config = _default_config()
+        config["wallpaper"]["apply_deadline"] = bad
+        with pytest.raises(ValueError, match="apply_deadline"):
+            validate_config(config)
+
+    @pytest.mark.parametrize("bad", ["yes", 1, None])
+    def test_validate_config_resolution_variants_invalid(self, bad):
+        config = _default_config()
+        config["wallpaper"]["resolution_variants"] = bad
+        with pytest.raises(ValueError, match="resolution_variants"):
+            validate_config(config)
+
+    @pytest.mark.parametrize("bad", [0, -1, "2", None, True])
+    def test_validate_config_variant_scale_invalid(self, bad):
+        config = _default_config()
+        config["wallpaper"]["variant_scale"] = bad
+        with pytest.raises(ValueError, match="variant_scale"):
+            validate_config(config)
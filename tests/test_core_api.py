@@ -5,7 +5,7 @@ from pathlib import Path
 
 import pytest
 
-from kwallpaper import core
+from kwallpaper import core, state_store
 from kwallpaper.wallpaper_changer import (
     DEFAULT_SHUFFLE_LIST_PATH,
     DEFAULT_THEMES_DIR,
@@ -35,24 +35,6 @@ def theme_dir(tmp_path, monkeypatch):
     return t
 
 
-@pytest.fixture
-def clean_shuffle(monkeypatch, tmp_path):
-    """Point shuffle-list.json at a temp file."""
-    p = tmp_path / "shuffle-list.json"
-    monkeypatch.setattr(core, "load_shuffle_list",
-                        lambda shuffle_path=None: {
-                            "shuffle_list": [], "current_index": 0,
-                            "last_used_date": "", "last_change_date": ""})
-    monkeypatch.setattr(core, "save_shuffle_list",
-                        lambda *a, **k: None)
-    monkeypatch.setattr(core, "save_theme_change_date",
-                        lambda *a, **k: None)
-    monkeypatch.setattr(core, "load_theme_change_date",
-                        lambda shuffle_path=None: "")
-    monkeypatch.setattr(core, "check_day_passed", lambda *a, **k: False)
-    return p
-
-
 def test_import_theme_valid_zip(tmp_path, monkeypatch):
     src = tmp_path / "newtheme.ddw"
     with zipfile.ZipFile(src, "w") as zf:
@@ -117,14 +99,13 @@ def test_apply_theme_success(theme_dir, tmp_path, monkeypatch):
                         lambda theme, cfg_path: str(theme_dir / "test_3.jpg"))
     monkeypatch.setattr(core, "load_config",
                         lambda p: json.loads(cfg.read_text()))
-    monkeypatch.setattr(core, "save_config",
-                        lambda p, c: cfg.write_text(json.dumps(c)))
 
     result = core.apply_theme(str(theme_dir), str(cfg))
     assert result.success
     assert result.theme_name == "TestTheme"
-    saved = json.loads(cfg.read_text())
-    assert saved["theme"]["last_applied"] == "TestTheme"
+    saved = state_store.load_state(str(cfg))
+    assert saved["last_applied"] == {"theme": "TestTheme",
+                                     "image": str(theme_dir / "test_3.jpg")}
 
 
 def test_apply_theme_wallpaper_failure(theme_dir, tmp_path, monkeypatch):
@@ -174,14 +155,13 @@ def test_apply_theme_shuffler_mode_commits_state_after_wallpaper(
                         lambda theme, cfg_path: str(theme_dir / "test_3.jpg"))
     monkeypatch.setattr(core, "load_config",
                         lambda p: json.loads(cfg.read_text()))
-    monkeypatch.setattr(core, "save_config", lambda p, c: None)
-    committed = []
-    monkeypatch.setattr(core, "commit_shuffle_state",
-                        lambda config, tz: committed.append(1))
+    monkeypatch.setattr(core, "get_current_date", lambda tz: "2026-08-16")
 
     result = core.apply_theme(None, str(cfg))
     assert result.success
-    assert committed == [1]
+    shuffle = state_store.load_state(str(cfg))["shuffle"]
+    assert shuffle["shuffle_list"] == [str(theme_dir)]
+    assert shuffle["last_change_date"] == "2026-08-16"
 
 
 def test_apply_theme_shuffler_mode_no_commit_on_wallpaper_failure(
@@ -201,43 +181,60 @@ def test_apply_theme_shuffler_mode_no_commit_on_wallpaper_failure(
                         lambda theme, cfg_path: str(theme_dir / "test_3.jpg"))
     monkeypatch.setattr(core, "load_config",
                         lambda p: json.loads(cfg.read_text()))
-    committed = []
-    monkeypatch.setattr(core, "commit_shuffle_state",
-                        lambda config, tz: committed.append(1))
 
     result = core.apply_theme(None, str(cfg))
     assert not result.success
     assert "Failed to change wallpaper" in result.message
-    assert committed == []
+    shuffle = state_store.load_state(str(cfg))["shuffle"]
+    assert shuffle["shuffle_list"] == []
+    assert shuffle["last_change_date"] == ""
 
 
 def test_commit_shuffle_state_advances_once_per_day(tmp_path, monkeypatch):
     """commit_shuffle_state advances the index and records today's date on
     a new day, and is a no-op (no double advance) when run again the same
     day."""
-    state = {"shuffle_list": ["/t/a", "/t/b", "/t/c"], "current_index": 0,
-             "last_used_date": "2026-08-15", "last_change_date": "2026-08-15"}
-    saves = []
-    monkeypatch.setattr(core, "load_shuffle_list",
-                        lambda shuffle_path=None: dict(state))
-    monkeypatch.setattr(core, "save_shuffle_list",
-                        lambda lst, idx, date, shuffle_path=None:
-                        saves.append((list(lst), idx, date)))
-    monkeypatch.setattr(core, "load_theme_change_date",
-                        lambda shuffle_path=None: "2026-08-15")
-    monkeypatch.setattr(core, "save_theme_change_date", lambda *a, **k: None)
+    cfg = tmp_path / "config.json"
+    with state_store.transaction(str(cfg)) as state:
+        state["shuffle"] = {
+            "shuffle_list": ["/t/a", "/t/b", "/t/c"], "current_index": 0,
+            "last_used_date": "2026-08-15", "last_change_date": "2026-08-15"}
     monkeypatch.setattr(core, "get_current_date", lambda tz: "2026-08-16")
     monkeypatch.setattr(core, "discover_themes",
                         lambda: [("a", "/t/a"), ("b", "/t/b"), ("c", "/t/c")])
 
-    core.commit_shuffle_state({}, "UTC")
-    assert saves == [(["/t/a", "/t/b", "/t/c"], 1, "2026-08-16")]
+    core.commit_shuffle_state({}, "UTC", str(cfg))
+    expected = {"shuffle_list": ["/t/a", "/t/b", "/t/c"], "current_index": 1,
+                "last_used_date": "2026-08-16",
+                "last_change_date": "2026-08-16"}
+    assert state_store.load_state(str(cfg))["shuffle"] == expected
 
     # Same day again: state now shows today's date -> no double advance
-    state["current_index"] = 1
-    state["last_change_date"] = "2026-08-16"
-    monkeypatch.setattr(core, "load_theme_change_date",
-                        lambda shuffle_path=None: "2026-08-16")
-    saves.clear()
-    core.commit_shuffle_state({}, "UTC")
-    assert saves == [(["/t/a", "/t/b", "/t/c"], 1, "2026-08-16")]
+    core.commit_shuffle_state({}, "UTC", str(cfg))
+    assert state_store.load_state(str(cfg))["shuffle"] == expected
+
+
+def test_next_image_for_config_maps_segment_image(theme_dir, tmp_path,
+                                                  monkeypatch):
+    """The prefetch stage resolves the file shown from the next change."""
+    from datetime import datetime, timezone
+    from types import SimpleNamespace
+    from kwallpaper import cli, selection
+
+    cfg = tmp_path / "config.json"
+    cfg.write_text(json.dumps({"theme": {"last_applied": "TestTheme"}}))
+    monkeypatch.setattr(cli, "DEFAULT_THEMES_DIR", theme_dir.parent)
+    monkeypatch.setattr(cli, "get_current_wallpaper", lambda: None)
+    monkeypatch.setattr(selection, "segments_for_config",
+                        lambda path, now=None: object())
+    seen = []
+    monkeypatch.setattr(selection, "image_at",
+                        lambda at, seg, data: seen.append(at) or ("day", 4))
+    monkeypatch.setattr(selection, "timeline_for",
+                        lambda seg, data: SimpleNamespace(
+                            window_of=lambda image: None))
+    monkeypatch.setattr(selection, "next_change_time",
+                        lambda now, seg, data, image: None)
+    at = datetime(2026, 8, 18, 12, 0, tzinfo=timezone.utc)
+    assert core.next_image_for_config(str(cfg), at) == str(theme_dir / "test_4.jpg")
+    assert seen == [at]
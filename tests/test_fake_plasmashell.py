@@ -0,0 +1,159 @@
+"""End-to-end wallpaper tests against the fake plasmashell on a private bus.
+
+Skipped when ``dbus-daemon``, ``gdbus`` or ``jeepney`` is unavailable.
+"""
+
+import asyncio
+import shutil
+import subprocess
+import time
+
+import pytest
+
+from kwallpaper import plasma_dbus, wallpaper, wallpaper_async
+from tests.fake_plasmashell import (
+    JEEPNEY_AVAILABLE,
+    FakePlasmaShell,
+    PrivateSessionBus,
+    dbus_daemon_path,
+)
+
+pytestmark = pytest.mark.skipif(
+    not (JEEPNEY_AVAILABLE and dbus_daemon_path() and shutil.which("gdbus")),
+    reason="needs jeepney, dbus-daemon and gdbus")
+
+
+@pytest.fixture(scope="module")
+def bus():
+    with PrivateSessionBus() as bus:
+        yield bus
+
+
+@pytest.fixture
+def shell(bus, monkeypatch):
+    monkeypatch.setenv("DBUS_SESSION_BUS_ADDRESS", bus.address)
+    plasma_dbus.close()
+    wallpaper.invalidate_screen_topology()
+    wallpaper.invalidate_current_wallpaper()
+    wallpaper._watched.clear()
+    monkeypatch.setattr(wallpaper, "_batch_apply", True)
+    with FakePlasmaShell(bus.address, screens=3) as shell:
+        yield shell
+        plasma_dbus.close()
+    plasma_dbus.set_backend("gdbus")
+    wallpaper.invalidate_screen_topology()
+    wallpaper.invalidate_current_wallpaper()
+    wallpaper._watched.clear()
+
+
+@pytest.fixture
+def subprocess_calls(monkeypatch):
+    calls = []
+    real_run = subprocess.run
+
+    def counting_run(*args, **kwargs):
+        calls.append(args[0])
+        return real_run(*args, **kwargs)
+    monkeypatch.setattr(subprocess, "run", counting_run)
+    return calls
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_session_backend_batched_apply(shell, subprocess_calls):
+    plasma_dbus.set_backend("session")
+    assert wallpaper.change_wallpaper("/img/a.jpg") is True
+    assert set(shell.images.values()) == {"file:///img/a.jpg"}
+    assert shell.calls["evaluateScript"] == 1
+    assert shell.calls["setWallpaper"] == 0
+    assert subprocess_calls == []
+
+
+def test_gdbus_backend_batched_apply_is_one_subprocess(shell, subprocess_calls):
+    plasma_dbus.set_backend("gdbus")
+    assert wallpaper.change_wallpaper("/img/it's a.jpg") is True
+    assert set(shell.images.values()) == {"file:///img/it's a.jpg"}
+    assert len(subprocess_calls) == 1
+
+
+def test_per_screen_fallback_when_scripting_locked(shell):
+    plasma_dbus.set_backend("session")
+    shell.scripting = False
+    assert wallpaper.change_wallpaper("/img/b.jpg") is True
+    assert set(shell.images.values()) == {"file:///img/b.jpg"}
+    assert shell.calls["setWallpaper"] == 3
+
+
+@pytest.mark.parametrize("backend", ["gdbus", "session"])
+def test_per_screen_walk(shell, backend):
+    plasma_dbus.set_backend(backend)
+    wallpaper.set_batch_apply(False)
+    assert wallpaper.change_wallpaper("/img/c.jpg") is True
+    assert set(shell.images.values()) == {"file:///img/c.jpg"}
+
+
+def test_auto_backend_uses_session_bus(shell):
+    plasma_dbus.set_backend("auto")
+    assert plasma_dbus.get_transport().name == "session"
+
+
+@pytest.mark.parametrize("backend", ["gdbus", "session"])
+def test_get_current_wallpaper(shell, backend):
+    plasma_dbus.set_backend(backend)
+    shell.images[0] = "file:///home/u/x.jpg"
+    assert wallpaper.get_current_wallpaper(refresh=True) == "/home/u/x.jpg"
+
+
+def test_session_backend_reconnects_after_router_stops(shell):
+    plasma_dbus.set_backend("session")
+    transport = plasma_dbus.get_transport()
+    assert wallpaper.change_wallpaper("/img/a.jpg") is True
+    transport._router.close()   # receiver gone, as after a socket drop
+    assert wallpaper.change_wallpaper("/img/b.jpg") is True
+    assert set(shell.images.values()) == {"file:///img/b.jpg"}
+
+
+def test_external_change_invalidates_current_cache(shell, monkeypatch):
+    monkeypatch.setattr(wallpaper, "_OWN_APPLY_GRACE", 0.0)
+    plasma_dbus.set_backend("session")
+    assert wallpaper.change_wallpaper("/img/own.jpg") is True
+    # Another client changes screen 0 through Plasma.
+    plasma_dbus.GdbusTransport().set_wallpaper(
+        "org.kde.image", {"Image": "file:///img/external.jpg"}, 0)
+    assert _wait_for(lambda: wallpaper._current_checked is None)
+    assert wallpaper.get_current_wallpaper() == "/img/external.jpg"
+
+
+def test_screen_change_invalidates_topology(shell):
+    plasma_dbus.set_backend("session")
+    assert len(wallpaper.get_screen_topology()) == 3
+    shell.set_screens(2)
+    assert _wait_for(lambda: wallpaper._topology is None)
+    assert len(wallpaper.get_screen_topology()) == 2
+
+
+@pytest.mark.parametrize("backend", ["gdbus", "session"])
+def test_async_apply_sets_every_screen(shell, backend):
+    plasma_dbus.set_backend(backend)
+    report = asyncio.run(wallpaper_async.change_wallpaper_async(
+        "/img/async.jpg", deadline=5))
+    assert report.success and not report.failed
+    assert [r.screen for r in report.screens] == [0, 1, 2]
+    assert set(shell.images.values()) == {"file:///img/async.jpg"}
+    assert wallpaper.get_current_wallpaper() == "/img/async.jpg"
+
+
+def test_async_apply_deadline_with_slow_shell(shell):
+    plasma_dbus.set_backend("session")
+    shell.screen_delay = 0.4
+    report = asyncio.run(wallpaper_async.change_wallpaper_async(
+        "/img/slow.jpg", deadline=0.6))
+    assert report.timed_out
+    assert any(r.error == "deadline exceeded" for r in report.failed)
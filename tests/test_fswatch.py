@@ -0,0 +1,115 @@
+"""Tests for the config/themes file-system watcher (kwallpaper.fswatch)."""
+import json
+import queue
+import sys
+
+import pytest
+
+from kwallpaper import fswatch, themes
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    cfg = tmp_path / "config.json"
+    cfg.write_text("{}")
+    themes_dir = tmp_path / "themes"
+    (themes_dir / "Existing").mkdir(parents=True)
+    return cfg, themes_dir
+
+
+def _watch(cfg, themes_dir, **kwargs):
+    events = queue.Queue()
+    watcher = fswatch.FsWatcher(cfg, themes_dir, debounce=0.1,
+                                poll_interval=0.05, **kwargs)
+    watcher.subscribe(events.put)
+    watcher.start()
+    return watcher, events
+
+
+def _next(events, timeout=3.0):
+    return events.get(timeout=timeout)
+
+
+@pytest.fixture(params=["poll", "inotify"])
+def backend(request):
+    if request.param == "inotify" and not sys.platform.startswith("linux"):
+        pytest.skip("inotify is Linux-only")
+    return request.param
+
+
+def test_config_and_theme_changes_are_published(dirs, backend):
+    cfg, themes_dir = dirs
+    watcher, events = _watch(cfg, themes_dir,
+                             use_inotify=backend == "inotify")
+    try:
+        assert watcher.backend == backend
+        cfg.write_text(json.dumps({"scheduling": {"cycle_interval": 90}}))
+        assert fswatch.CONFIG in _next(events).kinds
+
+        (themes_dir / "NewTheme").mkdir()
+        (themes_dir / "NewTheme" / "theme.json").write_text("{}")
+        event = _next(events)
+        assert fswatch.THEMES in event.kinds
+        assert "NewTheme" in event.names
+    finally:
+        watcher.stop()
+    assert watcher.backend is None
+
+
+def test_unrelated_files_are_ignored(dirs):
+    cfg, themes_dir = dirs
+    watcher, events = _watch(cfg, themes_dir)
+    try:
+        (cfg.parent / "state.json").write_text("{}")
+        (themes_dir / ".partial").write_text("")
+        with pytest.raises(queue.Empty):
+            _next(events, timeout=0.5)
+    finally:
+        watcher.stop()
+
+
+def test_burst_is_debounced_into_one_event(dirs):
+    cfg, themes_dir = dirs
+    watcher, events = _watch(cfg, themes_dir)
+    try:
+        if watcher.backend != "inotify":
+            pytest.skip("inotify unavailable")
+        (themes_dir / "Burst").mkdir()
+        for i in range(20):
+            (themes_dir / "Burst" / f"img_{i}.jpg").write_bytes(b"x")
+        assert _next(events).names == ("Burst",)
+        with pytest.raises(queue.Empty):
+            _next(events, timeout=0.4)
+    finally:
+        watcher.stop()
+
+
+def test_missing_directory_falls_back_to_polling(tmp_path):
+    watcher, _events = _watch(tmp_path / "config.json", tmp_path / "nope")
+    try:
+        assert watcher.backend == "poll"
+    finally:
+        watcher.stop()
+
+
+def test_attached_watcher_replaces_discovery_ttl(dirs, monkeypatch):
+    cfg, themes_dir = dirs
+    (themes_dir / "Existing" / "theme.json").write_text("{}")
+    monkeypatch.setattr(themes, "DEFAULT_THEMES_DIR", themes_dir)
+    monkeypatch.setattr(themes, "_discover_watcher", None)
+    themes.invalidate_discover_cache()
+    watcher, events = _watch(cfg, themes_dir)
+    themes.attach_watcher(watcher)
+    try:
+        assert [n for n, _ in themes.discover_themes()] == ["Existing"]
+        # Far beyond the TTL: still served from the cache while watched.
+        monkeypatch.setattr(themes, "_DISCOVER_CACHE_TIMEOUT", -1)
+        assert themes.discover_themes() is themes.discover_themes()
+
+        (themes_dir / "Added").mkdir()
+        (themes_dir / "Added" / "theme.json").write_text("{}")
+        _next(events)   # delivered after the themes-cache subscriber
+        assert [n for n, _ in themes.discover_themes()] == ["Added", "Existing"]
+    finally:
+        watcher.stop()
+        themes.invalidate_discover_cache()
@@ -0,0 +1,188 @@
+"""Tests for the theme manifest sidecar (kwallpaper.manifest)."""
+import hashlib
+import json
+import os
+import struct
+import zipfile
+import zlib
+
+import pytest
+
+from kwallpaper import core, manifest, selection
+from kwallpaper import themes as themes_module
+from kwallpaper.manifest import (
+    MANIFEST_NAME,
+    build_manifest,
+    image_info,
+    load_manifest,
+    read_manifest,
+)
+
+THEME = {
+    "displayName": "Manifest Theme",
+    "imageFilename": "test_*.png",
+    "sunriseImageList": [1],
+    "dayImageList": [2],
+    "sunsetImageList": [1],
+    "nightImageList": [2],
+}
+
+
+def _png(width, height):
+    def chunk(kind, data):
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data)))
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr)
+            + chunk(b"IDAT", zlib.compress(b"")) + chunk(b"IEND", b""))
+
+
+def _jpeg(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + bytes(9)
+    sof = b"\xff\xc2" + struct.pack(">HBHHB", 11, 8, height, width, 1) + bytes(3)
+    return b"\xff\xd8" + app0 + sof + b"\xff\xd9"
+
+
+@pytest.fixture(autouse=True)
+def _fresh_memo():
+    manifest.invalidate_manifest()
+    themes_module.invalidate_image_index()
+    yield
+    manifest.invalidate_manifest()
+    themes_module.invalidate_image_index()
+
+
+@pytest.fixture
+def theme_dir(tmp_path):
+    d = tmp_path / "theme"
+    d.mkdir()
+    (d / "theme.json").write_text(json.dumps(THEME))
+    (d / "test_2.png").write_bytes(_png(640, 360))
+    (d / "test_1.png").write_bytes(_png(320, 200))
+    return d
+
+
+def test_build_writes_sidecar(theme_dir):
+    built = build_manifest(theme_dir)
+    on_disk = json.loads((theme_dir / MANIFEST_NAME).read_text())
+    assert on_disk == built
+    assert built["theme"]["dayImageList"] == [2]
+    assert [e["path"] for e in built["images"]] == ["test_1.png", "test_2.png"]
+    first = built["images"][0]
+    assert (first["width"], first["height"]) == (320, 200)
+    assert first["sha256"] == hashlib.sha256(
+        (theme_dir / "test_1.png").read_bytes()).hexdigest()
+    # Writing the sidecar does not make it stale.
+    assert read_manifest(theme_dir) == built
+
+
+def test_jpeg_dimensions(tmp_path):
+    path = tmp_path / "x.jpg"
+    path.write_bytes(_jpeg(1920, 1080))
+    assert manifest._image_dimensions(path) == (1920, 1080)
+    path.write_bytes(b"not an image")
+    assert manifest._image_dimensions(path) is None
+
+
+def test_sidecar_is_not_a_theme_json(theme_dir):
+    build_manifest(theme_dir)
+    assert selection.find_theme_json(theme_dir).name == "theme.json"
+
+
+def _bump_mtime(path):
+    """Move ``path``'s mtime a second on (past timestamp granularity)."""
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_hot_path_never_builds(theme_dir, monkeypatch):
+    monkeypatch.setattr(manifest, "_sha256",
+                        lambda p: pytest.fail("hashed on the hot path"))
+    data = selection.load_theme_data(theme_dir)
+    assert data["displayName"] == "Manifest Theme"
+    assert not (theme_dir / MANIFEST_NAME).exists()
+
+
+def test_old_theme_gets_manifest_in_background(theme_dir, monkeypatch):
+    monkeypatch.setattr(manifest, "_enabled", True)
+    assert read_manifest(theme_dir) is None
+    selection.load_theme_data(theme_dir)
+    assert manifest.wait_idle(5)
+    assert read_manifest(theme_dir) is not None
+    # Served from the manifest now; callers get a copy they can modify.
+    data = selection.load_theme_data(theme_dir)
+    data["dayImageList"].append(99)
+    assert selection.load_theme_data(theme_dir)["dayImageList"] == [2]
+
+
+def test_sidecar_is_replaced_atomically(theme_dir, monkeypatch):
+    written = []
+    real = manifest.statefile.write_json
+    monkeypatch.setattr(manifest.statefile, "write_json",
+                        lambda path, data: written.append(path) or real(path, data))
+    build_manifest(theme_dir)
+    assert written == [theme_dir / MANIFEST_NAME]
+    assert sorted(p.name for p in theme_dir.iterdir()) == [
+        MANIFEST_NAME, "test_1.png", "test_2.png", "theme.json"]
+
+
+def test_image_change_makes_manifest_stale(theme_dir):
+    build_manifest(theme_dir)
+    manifest.invalidate_manifest()
+    assert read_manifest(theme_dir) is not None
+    (theme_dir / "test_3.png").write_bytes(_png(10, 10))
+    _bump_mtime(theme_dir)
+    assert read_manifest(theme_dir) is None
+
+
+def test_fresh_manifest_is_served_without_rescan(theme_dir, monkeypatch):
+    build_manifest(theme_dir)
+    manifest.invalidate_manifest()
+    monkeypatch.setattr(manifest, "_scan_image_files",
+                        lambda *a: pytest.fail("rescanned"))
+    monkeypatch.setattr(themes_module, "_scan_image_files",
+                        lambda *a: pytest.fail("rescanned"))
+    files = themes_module.image_files_for(theme_dir, THEME)
+    assert [f.name for f in files] == ["test_1.png", "test_2.png"]
+    assert image_info(theme_dir / "test_2.png")["width"] == 640
+
+
+def test_theme_json_change_rebuilds_and_reuses_hashes(theme_dir, monkeypatch):
+    build_manifest(theme_dir)
+    changed = dict(THEME, displayName="Renamed")
+    (theme_dir / "theme.json").write_text(json.dumps(changed))
+    _bump_mtime(theme_dir / "theme.json")
+    assert read_manifest(theme_dir) is None
+
+    hashed = []
+    real = manifest._sha256
+    monkeypatch.setattr(manifest, "_sha256",
+                        lambda p: hashed.append(p.name) or real(p))
+    assert load_manifest(theme_dir)["theme"]["displayName"] == "Renamed"
+    assert hashed == []
+
+    (theme_dir / "test_3.png").write_bytes(_png(10, 10))
+    _bump_mtime(theme_dir)
+    assert [e["path"] for e in load_manifest(theme_dir)["images"]][-1] == "test_3.png"
+    assert hashed == ["test_3.png"]
+
+
+def test_import_writes_manifest(tmp_path, monkeypatch):
+    themes = tmp_path / "themes"
+    themes.mkdir()
+    monkeypatch.setattr(core, "DEFAULT_THEMES_DIR", themes)
+    monkeypatch.setattr(themes_module, "DEFAULT_THEMES_DIR", themes)
+    monkeypatch.setattr(core.variants, "prepare_theme_async", lambda path: None)
+    src = tmp_path / "packed.ddw"
+    with zipfile.ZipFile(src, "w") as zf:
+        zf.writestr("theme.json", json.dumps(THEME))
+        zf.writestr("test_1.png", _png(32, 16))
+        zf.writestr("test_2.png", _png(64, 32))
+
+    result = core.import_theme(str(src))
+    target = themes / "packed"
+    assert result["extract_dir"] == str(target)
+    fresh = read_manifest(target)
+    assert fresh is not None
+    assert [(e["width"], e["height"]) for e in fresh["images"]] == [(32, 16), (64, 32)]
+    assert sorted(p.name for p in target.glob("*.json")) == ["theme.json"]
@@ -248,7 +248,7 @@ class TestNextChangeTimeForConfig:
     """The core seam the scheduler calls: config path -> next change time."""
 
     def _setup(self, tmp_path, monkeypatch, last_applied="TestTheme",
-               complete=True):
+               complete=True, model="sun"):
         themes = tmp_path / "themes"
         t = themes / "TestTheme"
         t.mkdir(parents=True)
@@ -266,7 +266,7 @@ class TestNextChangeTimeForConfig:
                          "timezone": "America/Phoenix"},
             "scheduling": {"cycle_interval": 60, "run_cycle": True,
                            "daily_shuffle_enabled": True,
-                           "suntime_model": "sun"},
+                           "suntime_model": model},
             "theme": {"last_applied": last_applied},
         }))
         return str(cfg)
@@ -279,6 +279,24 @@ class TestNextChangeTimeForConfig:
             cfg, now=datetime(2026, 6, 21, 5, 30, tzinfo=TZ))
         assert result == datetime(2026, 6, 21, 5, 33, tzinfo=TZ)
 
+    def test_legacy_model_returns_next_period_image(self, tmp_path,
+                                                    monkeypatch):
+        from kwallpaper import suntime
+        cfg = self._setup(tmp_path, monkeypatch, model="legacy")
+
+        def sun_data(tz, lat, lon, date=None):
+            at = lambda h: datetime(date.year, date.month, date.day, h,
+                                    tzinfo=TZ)
+            return {"dawn": at(5), "sunrise": at(6), "sunset": at(19),
+                    "dusk": at(20)}
+        monkeypatch.setattr(suntime, "_real_sun_data", sun_data)
+        # Legacy day period: sunrise + 45 min to dusk - 45 min
+        # (06:45-19:15), five images of 2.5 h -> 12:00 is in image 7,
+        # which ends at 14:15.
+        result = core.next_change_time_for_config(
+            cfg, now=datetime(2026, 6, 21, 12, 0, tzinfo=TZ))
+        assert result == datetime(2026, 6, 21, 14, 15, 1, tzinfo=TZ)
+
     def test_no_theme_raises_value_error(self, tmp_path, monkeypatch):
         cfg = self._setup(tmp_path, monkeypatch, last_applied="")
         with pytest.raises(ValueError, match="no theme available"):
@@ -290,3 +308,85 @@ class TestNextChangeTimeForConfig:
         with pytest.raises(IncompleteSegmentsError):
             core.next_change_time_for_config(
                 cfg, now=datetime(2026, 6, 21, 5, 30, tzinfo=TZ))
+
+
+class TestSelectAt:
+    """The single selection pass shared by the cycle run and the re-arm."""
+
+    _setup = TestNextChangeTimeForConfig._setup
+
+    def test_sun_selection_carries_window_and_next_change(self, tmp_path,
+                                                         monkeypatch):
+        from kwallpaper.selection import select_at
+        cfg = self._setup(tmp_path, monkeypatch)
+        sel = select_at(tmp_path / "themes" / "TestTheme", cfg,
+                        now=_now(5, 30))
+        assert (sel.model, sel.category, sel.image) == ("sun", "day", 6)
+        assert Path(sel.path).name == "sun_06.jpg"
+        assert (sel.window_start, sel.window_end) == (_now(5, 24), _now(5, 33))
+        assert sel.next_change == _now(5, 33)
+
+    def test_legacy_selection_carries_window_and_next_change(self, tmp_path,
+                                                             monkeypatch):
+        from kwallpaper import suntime
+        from kwallpaper.selection import select_at
+        cfg = self._setup(tmp_path, monkeypatch, model="legacy")
+
+        evaluated = []
+
+        def sun_data(tz, lat, lon, date=None):
+            evaluated.append(date)
+            at = lambda h: datetime(date.year, date.month, date.day, h,
+                                    tzinfo=TZ)
+            return {"dawn": at(5), "sunrise": at(6), "sunset": at(19),
+                    "dusk": at(20)}
+        monkeypatch.setattr(suntime, "_real_sun_data", sun_data)
+        sel = select_at(tmp_path / "themes" / "TestTheme", cfg,
+                        now=_now(12, 0))
+        # Day period 06:45-19:15 in five 2.5 h slots: 12:00 is slot 2.
+        assert (sel.model, sel.category, sel.image) == ("legacy", "day", 7)
+        assert (sel.window_start, sel.window_end) == (_now(11, 45),
+                                                      _now(14, 15))
+        assert sel.next_change == _now(14, 15, 1)
+        # Category, image and next change share one astral evaluation
+        # per date (the next-change walk also looks at tomorrow).
+        assert evaluated == [D, D + timedelta(days=1)]
+        select_at(tmp_path / "themes" / "TestTheme", cfg, now=_now(13, 0))
+        assert evaluated == [D, D + timedelta(days=1)]
+
+    def test_sun_failure_falls_back_unless_strict(self, tmp_path,
+                                                  monkeypatch):
+        from kwallpaper.selection import select_at
+        cfg = self._setup(tmp_path, monkeypatch, complete=False)
+        monkeypatch.setattr("kwallpaper.selection.detect_time_of_day_sun",
+                            lambda config, now=None: "day")
+        theme = tmp_path / "themes" / "TestTheme"
+        sel = select_at(theme, cfg, now=_now(12, 0))
+        assert sel.model == "legacy"
+        with pytest.raises(IncompleteSegmentsError):
+            select_at(theme, cfg, now=_now(12, 0), strict=True)
+
+
+class TestTimeline:
+    """The compiled per-day timeline behind image_at/next_change_time."""
+
+    def test_boundaries_and_windows(self):
+        tl = solarsegments.Timeline.compile(_syn_seg(), THEME)
+        assert tl.boundaries[0] == _now(5, 0)
+        assert tl.boundaries[-1] == _now(5, 0, day=D + timedelta(days=1))
+        assert tl.next_change(_now(12, 0)) == _now(15, 0)
+        assert tl.next_change(_now(5, 0, day=D + timedelta(days=1))) is None
+        assert tl.window_of(6) == (_now(5, 24), _now(5, 33))
+        assert tl.window_of(99) is None
+        assert tl.image_at(_now(22, 0)) == ("night", 15)
+        assert [v for _s, _e, v in tl.images][:3] == [1, 2, 3]
+
+    def test_timeline_is_shared(self):
+        solarsegments.clear_segment_cache()
+        seg = _syn_seg()
+        first = solarsegments.timeline_for(seg, THEME)
+        assert solarsegments.timeline_for(_syn_seg(), dict(THEME)) is first
+        other = dict(THEME, nightImageList=[14, 15])
+        assert solarsegments.timeline_for(seg, other) is not first
+        solarsegments.clear_segment_cache()
+        assert solarsegments.timeline_for(seg, THEME) is not first
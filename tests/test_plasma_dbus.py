@@ -0,0 +1,599 @@
+"""Tests for the Plasma D-Bus transports and backend selection."""
+
+import json
+import re
+import subprocess
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from kwallpaper import plasma_dbus, variants, wallpaper
+from kwallpaper.plasma_dbus import (
+    GdbusTransport,
+    TransportUnavailable,
+    parse_gdbus_wallpaper,
+    unwrap_gdbus_string,
+)
+
+
+def _reset_shell_state():
+    wallpaper._shell_up = None
+    wallpaper._shell_source = None
+    wallpaper._pending_apply = None
+
+
+@pytest.fixture(autouse=True)
+def _gdbus_backend(tmp_path, monkeypatch):
+    """Every test starts (and ends) on the subprocess backend with an
+    empty screen-topology cache and an empty variant cache."""
+    monkeypatch.setattr(variants, "VARIANTS_DIR", tmp_path / "variants")
+    monkeypatch.setattr(variants, "_queue", lambda key: None)
+    variants.set_enabled(True)
+    plasma_dbus.set_backend("gdbus")
+    wallpaper.invalidate_screen_topology()
+    wallpaper.invalidate_current_wallpaper()
+    wallpaper._watched.clear()
+    _reset_shell_state()
+    yield
+    plasma_dbus.set_backend("gdbus")
+    wallpaper.invalidate_screen_topology()
+    wallpaper.invalidate_current_wallpaper()
+    wallpaper._watched.clear()
+    _reset_shell_state()
+
+
+class FakeTransport:
+    """In-memory stand-in for a transport: N screens, records setWallpaper."""
+
+    name = "fake"
+
+    def __init__(self, screens=2, running=True, broken=False,
+                 scripting=True):
+        self.screens = screens
+        self.running = running
+        self.broken = broken
+        self.scripting = scripting
+        self.images = {i: "file:///old.jpg" for i in range(screens)}
+        self.calls = []
+        self.subscriptions = []
+
+    def _info(self, screen, **extra):
+        return dict(screen=screen, plugin="org.kde.image",
+                    width=1920 + screen, height=1080, **extra)
+
+    def ping(self, timeout=5):
+        self.calls.append("ping")
+        if self.broken:
+            raise TransportUnavailable("connection lost")
+        return self.running
+
+    def evaluate_script(self, script, timeout=5):
+        self.calls.append("evaluateScript")
+        if self.broken:
+            raise TransportUnavailable("connection lost")
+        if not self.running or not self.scripting:
+            return None
+        if "screenInfo" not in script:
+            return str(self.screens)
+        uri = re.search(r'var uri = (".*");', script)
+        if uri is None:
+            return json.dumps([self._info(i) for i in self.images])
+        overrides = re.search(r'var screenUris = (\{.*\});', script)
+        overrides = json.loads(overrides.group(1)) if overrides else {}
+        for screen in self.images:
+            self.images[screen] = overrides.get(str(screen),
+                                                json.loads(uri.group(1)))
+        return json.dumps([self._info(i, ok=True) for i in self.images])
+
+    def wallpaper(self, screen, timeout=5):
+        self.calls.append("wallpaper")
+        if screen not in self.images:
+            return {}
+        return {"Image": self.images[screen]}
+
+    def set_wallpaper(self, plugin, params, screen, timeout=5):
+        self.calls.append("setWallpaper")
+        self.images[screen] = params["Image"]
+        return True
+
+    def subscribe(self, callback, **match):
+        self.subscriptions.append((callback, match))
+        return True
+
+
+class OwnerTrackingTransport(FakeTransport):
+    """Session-bus-like fake: answers NameHasOwner from ``running``."""
+
+    def name_has_owner(self, name, timeout=5):
+        self.calls.append("NameHasOwner")
+        return self.running
+
+    def owner_changed(self, up):
+        """Deliver a NameOwnerChanged signal for plasmashell."""
+        callback = {m["member"]: cb for cb, m in self.subscriptions}[
+            "NameOwnerChanged"]
+        self.running = up
+        callback(SimpleNamespace(body=(plasma_dbus.PLASMA_DEST,
+                                       "" if up else ":1.5",
+                                       ":1.5" if up else "")))
+
+
+class TestGdbusParsing:
+    def test_unwrap_single_string(self):
+        assert unwrap_gdbus_string("('2',)\n") == "2"
+
+    def test_unwrap_escapes(self):
+        assert unwrap_gdbus_string("('it\\'s\\na',)") == "it's\na"
+
+    def test_unwrap_passthrough(self):
+        assert unwrap_gdbus_string("(2,)") == "(2,)"
+
+    def test_parse_wallpaper_image(self):
+        out = "({'Image': <'file:///tmp/a b.jpg'>, 'FillMode': <2>},)"
+        assert parse_gdbus_wallpaper(out) == {"Image": "file:///tmp/a b.jpg"}
+
+    def test_parse_wallpaper_no_image(self):
+        assert parse_gdbus_wallpaper("(@a{sv} {},)") == {}
+
+    @pytest.mark.parametrize("output,expected", [
+        ("('3',)", 3), ("(2,)", 2), ("4", 4), ("", 1), ("0", 1),
+    ])
+    def test_parse_screen_count(self, output, expected):
+        assert wallpaper._parse_screen_count(output) == expected
+
+
+class TestGdbusTransport:
+    def test_set_wallpaper_command_line(self, monkeypatch):
+        mock_run = MagicMock(return_value=MagicMock(returncode=0, stdout="()"))
+        monkeypatch.setattr(subprocess, "run", mock_run)
+        assert GdbusTransport().set_wallpaper(
+            "org.kde.image", {"Image": "file:///x/it's.jpg"}, 1)
+        argv = mock_run.call_args[0][0]
+        assert argv[:3] == ["gdbus", "call", "--session"]
+        assert argv[-3:] == ["org.kde.image",
+                             "{'Image': <'file:///x/it\\'s.jpg'>}", "1"]
+
+    def test_evaluate_script_error_is_none(self, monkeypatch):
+        monkeypatch.setattr(subprocess, "run",
+                            MagicMock(return_value=MagicMock(returncode=1)))
+        assert GdbusTransport().evaluate_script("print(1)") is None
+
+
+class TestBackendSelection:
+    def test_unknown_backend_rejected(self):
+        with pytest.raises(ValueError, match="Unknown D-Bus backend"):
+            plasma_dbus.set_backend("dbus-python")
+
+    def test_gdbus_backend(self):
+        assert plasma_dbus.get_transport().name == "gdbus"
+
+    def test_auto_falls_back_to_gdbus(self, monkeypatch):
+        monkeypatch.setattr(plasma_dbus, "_session_transport", None)
+
+        def boom():
+            raise TransportUnavailable("no bus")
+        monkeypatch.setattr(plasma_dbus, "SessionBusTransport", boom)
+        plasma_dbus.set_backend("auto")
+        assert plasma_dbus.get_transport().name == "gdbus"
+        # The failure is remembered for the rest of the process.
+        assert plasma_dbus._session_failed is True
+
+    def test_session_backend_raises(self, monkeypatch):
+        monkeypatch.setattr(plasma_dbus, "_session_transport", None)
+
+        def boom():
+            raise TransportUnavailable("no bus")
+        monkeypatch.setattr(plasma_dbus, "SessionBusTransport", boom)
+        plasma_dbus.set_backend("session")
+        with pytest.raises(TransportUnavailable):
+            plasma_dbus.get_transport()
+
+    def test_configure_from_config(self):
+        wallpaper.configure_from_config({"wallpaper": {"dbus_backend": "auto"}})
+        assert plasma_dbus.get_backend() == "auto"
+
+    def test_configure_from_config_invalid_keeps_backend(self):
+        wallpaper.configure_from_config({"wallpaper": {"dbus_backend": "x"}})
+        assert plasma_dbus.get_backend() == "gdbus"
+
+
+class FakeRouter:
+    """Stand-in for jeepney's threading ``DBusRouter``; ``fail`` is the
+    exception the next ``send_and_get_reply`` raises."""
+
+    instances = []
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.fail = None
+        self.closed = False
+        FakeRouter.instances.append(self)
+
+    def send_and_get_reply(self, msg, timeout=None):
+        if self.fail is not None:
+            raise self.fail
+        return SimpleNamespace(header=SimpleNamespace(message_type="return"),
+                               body=("ok",))
+
+    def close(self):
+        self.closed = True
+
+
+class TestSessionBusReconnect:
+    @pytest.fixture
+    def transport(self, monkeypatch):
+        FakeRouter.instances = []
+        monkeypatch.setattr(plasma_dbus, "JEEPNEY_AVAILABLE", True)
+        monkeypatch.setattr(plasma_dbus, "DBusAddress", lambda *a, **k: None)
+        monkeypatch.setattr(plasma_dbus, "new_method_call", lambda *a: "msg")
+        monkeypatch.setattr(plasma_dbus, "MessageType",
+                            SimpleNamespace(error="error"))
+        monkeypatch.setattr(plasma_dbus, "DBusRouter", FakeRouter)
+        monkeypatch.setattr(plasma_dbus, "open_dbus_connection",
+                            lambda bus: MagicMock())
+        return plasma_dbus.SessionBusTransport()
+
+    def test_connection_reused(self, transport):
+        assert transport.evaluate_script("x") == "ok"
+        assert transport.evaluate_script("y") == "ok"
+        assert len(FakeRouter.instances) == 1
+
+    def test_dead_connection_reopened_from_call_error(self, transport):
+        transport.connect()
+        FakeRouter.instances[0].fail = ConnectionResetError("closed")
+        assert transport.evaluate_script("x") == "ok"
+        first, second = FakeRouter.instances
+        assert first.closed and first.conn.close.called
+        assert not second.closed
+
+    def test_lost_twice_raises(self, transport, monkeypatch):
+        class DeadRouter(FakeRouter):
+            def __init__(self, conn):
+                super().__init__(conn)
+                self.fail = BrokenPipeError("gone")
+        monkeypatch.setattr(plasma_dbus, "DBusRouter", DeadRouter)
+        with pytest.raises(TransportUnavailable):
+            transport.evaluate_script("x")
+        assert len(FakeRouter.instances) == 2
+
+    def test_other_errors_are_not_reconnects(self, transport):
+        transport.connect()
+        FakeRouter.instances[0].fail = ValueError("bad message")
+        with pytest.raises(ValueError):
+            transport.evaluate_script("x")
+        assert len(FakeRouter.instances) == 1
+
+
+class TestChangeWallpaperWithTransport:
+    def test_sets_every_screen(self, monkeypatch):
+        fake = FakeTransport(screens=3)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        assert wallpaper.change_wallpaper("/img/new.jpg") is True
+        assert set(fake.images.values()) == {"file:///img/new.jpg"}
+
+    def test_plasma_not_running(self, monkeypatch):
+        fake = FakeTransport(running=False)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        assert wallpaper.change_wallpaper("/img/new.jpg") is False
+
+    def test_auto_retries_over_gdbus_when_connection_breaks(self, monkeypatch):
+        broken = FakeTransport(broken=True)
+        fallback = FakeTransport(screens=1)
+        plasma_dbus.set_backend("auto")
+        monkeypatch.setattr(plasma_dbus, "_session_failed", False)
+        monkeypatch.setattr(
+            plasma_dbus, "get_transport",
+            lambda: fallback if plasma_dbus._session_failed else broken)
+        assert wallpaper.change_wallpaper("/img/new.jpg") is True
+        assert fallback.images[0] == "file:///img/new.jpg"
+
+    def test_session_backend_reports_broken_connection(self, monkeypatch):
+        plasma_dbus.set_backend("session")
+        monkeypatch.setattr(plasma_dbus, "get_transport",
+                            lambda: FakeTransport(broken=True))
+        assert wallpaper.change_wallpaper("/img/new.jpg") is False
+
+    def test_get_current_wallpaper_strips_scheme(self, monkeypatch):
+        fake = FakeTransport(screens=1)
+        fake.images[0] = "file:///home/u/sun_07.jpg"
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        assert wallpaper.get_current_wallpaper() == "/home/u/sun_07.jpg"
+
+
+class TestBatchApply:
+    def test_one_round_trip_for_all_screens(self, monkeypatch):
+        fake = FakeTransport(screens=4)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        assert wallpaper.change_wallpaper("/img/new.jpg") is True
+        assert fake.calls == ["evaluateScript"]
+        assert set(fake.images.values()) == {"file:///img/new.jpg"}
+
+    def test_falls_back_when_scripting_refused(self, monkeypatch):
+        fake = FakeTransport(screens=2, scripting=False)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        assert wallpaper.change_wallpaper("/img/new.jpg") is True
+        assert fake.calls.count("setWallpaper") == 2
+        assert set(fake.images.values()) == {"file:///img/new.jpg"}
+
+    def test_disabled_uses_per_screen_walk(self, monkeypatch):
+        fake = FakeTransport(screens=2)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        monkeypatch.setattr(wallpaper, "_batch_apply", True)
+        wallpaper.configure_from_config(
+            {"wallpaper": {"dbus_backend": "gdbus", "batch_apply": False}})
+        assert wallpaper.change_wallpaper("/img/new.jpg") is True
+        assert fake.calls[0] == "ping"
+
+    def test_script_quotes_uri_as_js_literal(self):
+        script = wallpaper._batch_apply_script('/a/"b\\c".jpg')
+        uri = re.search(r'var uri = (".*");', script).group(1)
+        assert json.loads(uri) == 'file:///a/"b\\c".jpg'
+
+    @pytest.mark.parametrize("output,expected", [
+        ('[{"screen":0,"ok":true}]', [{"screen": 0, "ok": True}]),
+        ('noise\n[{"screen":1,"ok":false,"error":"x"}]\n',
+         [{"screen": 1, "ok": False, "error": "x"}]),
+        ("[]", []),
+        ("", None),
+        (None, None),
+        ("[1, 2]", None),
+        ("TypeError: desktops is not defined", None),
+    ])
+    def test_parse_json_report(self, output, expected):
+        assert wallpaper._parse_json_report(output) == expected
+
+    def test_all_screens_failed(self, monkeypatch):
+        fake = FakeTransport(screens=2)
+        fake.evaluate_script = lambda script, timeout=5: json.dumps(
+            [{"screen": 0, "ok": False, "error": "immutable"}])
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        assert wallpaper.change_wallpaper("/img/new.jpg") is False
+
+    def test_batched_gdbus_reply(self, monkeypatch):
+        report = '[{"screen":0,"ok":true},{"screen":1,"ok":true}]'
+        mock_run = MagicMock(return_value=MagicMock(
+            returncode=0, stdout="('" + report + "\\n',)\n"))
+        monkeypatch.setattr(subprocess, "run", mock_run)
+        assert wallpaper.change_wallpaper("/img/new.jpg") is True
+        assert mock_run.call_count == 1
+
+
+class TestScreenTopology:
+    def test_topology_queried_once_and_reused(self, monkeypatch):
+        fake = FakeTransport(screens=2)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        screens = wallpaper.get_screen_topology()
+        assert [s.screen for s in screens] == [0, 1]
+        assert wallpaper.get_screen_topology() == screens
+        assert fake.calls == ["evaluateScript"]
+        assert wallpaper.screen_resolutions() == {0: (1920, 1080),
+                                                  1: (1921, 1080)}
+
+    def test_change_signal_invalidates(self, monkeypatch):
+        fake = FakeTransport(screens=1)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        wallpaper.get_screen_topology()
+        members = {m["member"] for _cb, m in fake.subscriptions}
+        assert members == {"configChanged", "NameOwnerChanged",
+                           "wallpaperChanged"}
+        fake.screens = 2
+        fake.images[1] = "file:///old.jpg"
+        callback = fake.subscriptions[0][0]
+        callback(object())          # KScreen configChanged arrives
+        assert len(wallpaper.get_screen_topology()) == 2
+
+    def test_batched_apply_refreshes_topology(self, monkeypatch):
+        fake = FakeTransport(screens=3)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        assert wallpaper.change_wallpaper("/img/new.jpg") is True
+        assert len(wallpaper.get_screen_topology()) == 3
+        assert fake.calls == ["evaluateScript"]
+
+    def test_per_screen_walk_uses_cached_count(self, monkeypatch):
+        fake = FakeTransport(screens=2, scripting=False)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        wallpaper._store_topology(fake, [wallpaper.ScreenInfo(0),
+                                         wallpaper.ScreenInfo(1)])
+        monkeypatch.setattr(wallpaper, "_batch_apply", False)
+        assert wallpaper.change_wallpaper("/img/new.jpg") is True
+        assert "evaluateScript" not in fake.calls
+        assert wallpaper._topology is not None
+
+    def test_failed_set_invalidates(self, monkeypatch):
+        fake = FakeTransport(screens=2)
+        fake.set_wallpaper = lambda plugin, params, screen, timeout=5: screen == 0
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        monkeypatch.setattr(wallpaper, "_batch_apply", False)
+        assert wallpaper.change_wallpaper("/img/new.jpg") is True
+        assert wallpaper._topology is None
+
+    def test_unreachable_plasma_not_cached(self, monkeypatch):
+        fake = FakeTransport(running=False)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        assert wallpaper.get_screen_topology() == []
+        assert wallpaper._topology is None
+
+    def test_resolution_unknown(self):
+        assert wallpaper.ScreenInfo(0).resolution is None
+
+
+class TestCurrentWallpaperCache:
+    def test_own_apply_is_written_through(self, monkeypatch):
+        fake = FakeTransport(screens=2)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        assert wallpaper.change_wallpaper("/img/new.jpg") is True
+        fake.calls.clear()
+        assert wallpaper.get_current_wallpaper() == "/img/new.jpg"
+        assert fake.calls == []
+
+    def test_query_result_cached_until_interval(self, monkeypatch):
+        fake = FakeTransport(screens=1)
+        fake.images[0] = "file:///home/u/a.jpg"
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        clock = [1000.0]
+        monkeypatch.setattr(wallpaper.time, "monotonic", lambda: clock[0])
+        monkeypatch.setattr(wallpaper, "_revalidate_interval", 300)
+        assert wallpaper.get_current_wallpaper() == "/home/u/a.jpg"
+        fake.images[0] = "file:///home/u/b.jpg"
+        clock[0] += 299
+        assert wallpaper.get_current_wallpaper() == "/home/u/a.jpg"
+        clock[0] += 2
+        assert wallpaper.get_current_wallpaper() == "/home/u/b.jpg"
+
+    def test_refresh_bypasses_cache(self, monkeypatch):
+        fake = FakeTransport(screens=1)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        wallpaper.change_wallpaper("/img/new.jpg")
+        fake.images[0] = "file:///img/external.jpg"
+        assert wallpaper.get_current_wallpaper(refresh=True) == "/img/external.jpg"
+
+    def test_external_change_signal_invalidates(self, monkeypatch):
+        fake = FakeTransport(screens=1)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        clock = [1000.0]
+        monkeypatch.setattr(wallpaper.time, "monotonic", lambda: clock[0])
+        wallpaper.change_wallpaper("/img/new.jpg")
+        on_changed = {m["member"]: cb for cb, m in fake.subscriptions}[
+            "wallpaperChanged"]
+        # Our own apply's signal is ignored ...
+        on_changed(object())
+        fake.images[0] = "file:///img/external.jpg"
+        assert wallpaper.get_current_wallpaper() == "/img/new.jpg"
+        # ... a later one (user picked another image) is not.
+        clock[0] += 10
+        on_changed(object())
+        assert wallpaper.get_current_wallpaper() == "/img/external.jpg"
+
+    def test_failed_apply_invalidates(self, monkeypatch):
+        fake = FakeTransport(screens=1)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        wallpaper.change_wallpaper("/img/new.jpg")
+        fake.running = False
+        assert wallpaper.change_wallpaper("/img/other.jpg") is False
+        assert wallpaper._current_checked is None
+
+    def test_configure_revalidate_interval(self, monkeypatch):
+        monkeypatch.setattr(wallpaper, "_revalidate_interval", 300)
+        wallpaper.configure_from_config(
+            {"wallpaper": {"dbus_backend": "gdbus", "revalidate_interval": 30}})
+        assert wallpaper._revalidate_interval == 30
+
+
+class TestResolutionVariants:
+    def _variant(self, image, screen_info):
+        """Create an up-to-date variant of ``image`` for ``screen_info``."""
+        path = variants.variant_path(image, screen_info.resolution)
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b"jpeg")
+        return path
+
+    def _setup(self, monkeypatch, tmp_path, **kw):
+        fake = FakeTransport(screens=2, **kw)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        image = tmp_path / "Theme" / "sun_1.jpg"
+        image.parent.mkdir()
+        image.write_bytes(b"full-size jpeg")
+        screens = [wallpaper.ScreenInfo(0, "org.kde.image", 1920, 1080),
+                   wallpaper.ScreenInfo(1, "org.kde.image", 2560, 1440)]
+        wallpaper._store_topology(fake, screens)
+        variant = self._variant(str(image), screens[1])
+        return fake, str(image), variant
+
+    def test_batched_apply_uses_ready_variant_per_screen(self, monkeypatch,
+                                                         tmp_path):
+        fake, image, variant = self._setup(monkeypatch, tmp_path)
+        assert wallpaper.change_wallpaper(image) is True
+        assert fake.calls == ["evaluateScript"]
+        assert fake.images == {0: f"file://{image}", 1: f"file://{variant}"}
+
+    def test_per_screen_walk_uses_ready_variant(self, monkeypatch, tmp_path):
+        fake, image, variant = self._setup(monkeypatch, tmp_path,
+                                           scripting=False)
+        assert wallpaper.change_wallpaper(image) is True
+        assert fake.images == {0: f"file://{image}", 1: f"file://{variant}"}
+
+    def test_missing_variant_is_queued_not_built(self, monkeypatch, tmp_path):
+        queued = []
+        monkeypatch.setattr(variants, "_queue", queued.append)
+        fake, image, _variant = self._setup(monkeypatch, tmp_path)
+        assert wallpaper.change_wallpaper(image) is True
+        assert fake.images[0] == f"file://{image}"
+        assert (image, (1920, 1080)) in queued
+
+    def test_disabled_applies_original_everywhere(self, monkeypatch, tmp_path):
+        fake, image, _variant = self._setup(monkeypatch, tmp_path)
+        variants.set_enabled(False)
+        assert wallpaper.change_wallpaper(image) is True
+        assert set(fake.images.values()) == {f"file://{image}"}
+
+    def test_current_wallpaper_maps_variant_to_theme_image(self, monkeypatch,
+                                                           tmp_path):
+        fake, image, variant = self._setup(monkeypatch, tmp_path)
+        monkeypatch.setattr(variants, "DEFAULT_THEMES_DIR", tmp_path)
+        fake.images[0] = f"file://{variant}"
+        assert wallpaper.get_current_wallpaper(refresh=True) == image
+
+    def test_variant_scale_sizes_for_device_pixels(self, monkeypatch, tmp_path):
+        fake, image, _variant = self._setup(monkeypatch, tmp_path)
+        wallpaper.configure_from_config(
+            {"wallpaper": {"dbus_backend": "gdbus", "variant_scale": 2}})
+        try:
+            hidpi = self._variant(image, wallpaper.ScreenInfo(0, "", 3840, 2160))
+            assert wallpaper.change_wallpaper(image) is True
+            assert fake.images[0] == f"file://{hidpi}"
+        finally:
+            variants.set_scale(1)
+
+
+
+class TestShellAvailability:
+    """plasmashell's bus-name ownership replaces the per-apply Ping."""
+
+    def _join_replay(self):
+        for t in threading.enumerate():
+            if t.name == "kwallpaper-replay":
+                t.join(timeout=5)
+
+    def test_no_ping_while_shell_known_up(self, monkeypatch):
+        fake = OwnerTrackingTransport(screens=2, scripting=False)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        assert wallpaper.change_wallpaper("/img/new.jpg") is True
+        assert "ping" not in fake.calls
+        assert wallpaper.shell_available(fake) is True
+
+    def test_gdbus_style_transport_still_pings(self, monkeypatch):
+        fake = FakeTransport(screens=1, scripting=False)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        assert wallpaper.change_wallpaper("/img/new.jpg") is True
+        assert "ping" in fake.calls
+        assert wallpaper.shell_available(fake) is None
+
+    def test_apply_queued_while_shell_down(self, monkeypatch, capsys):
+        fake = OwnerTrackingTransport(screens=1, running=False)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        assert wallpaper.change_wallpaper("/img/new.jpg") is False
+        assert fake.calls == ["NameHasOwner"]   # no D-Bus call into Plasma
+        assert wallpaper._pending_apply == "/img/new.jpg"
+        assert "will be applied when it starts" in capsys.readouterr().err
+
+    def test_queued_apply_replayed_when_shell_starts(self, monkeypatch):
+        monkeypatch.setattr(wallpaper, "_REPLAY_DELAYS", (0,))
+        fake = OwnerTrackingTransport(screens=2, running=False)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        wallpaper.change_wallpaper("/img/old-request.jpg")
+        wallpaper.change_wallpaper("/img/new.jpg")   # latest request wins
+        fake.owner_changed(True)
+        self._join_replay()
+        assert set(fake.images.values()) == {"file:///img/new.jpg"}
+        assert wallpaper._pending_apply is None
+
+    def test_shell_exit_tracked(self, monkeypatch):
+        fake = OwnerTrackingTransport(screens=1)
+        monkeypatch.setattr(plasma_dbus, "get_transport", lambda: fake)
+        assert wallpaper.change_wallpaper("/img/a.jpg") is True
+        fake.owner_changed(False)
+        assert wallpaper.shell_available() is False
+        assert wallpaper.change_wallpaper("/img/b.jpg") is False
+        assert fake.images[0] == "file:///img/a.jpg"
@@ -0,0 +1,59 @@
+"""Tests for the next-image prefetch stage (kwallpaper.prefetch)."""
+import os
+
+import pytest
+
+from kwallpaper import prefetch, variants
+
+
+@pytest.fixture(autouse=True)
+def _variants_enabled():
+    variants.set_enabled(True)
+    yield
+    variants.set_enabled(True)
+
+
+def test_warm_file(tmp_path):
+    f = tmp_path / "sun_1.jpg"
+    f.write_bytes(b"x" * 4096)
+    assert prefetch.warm_file(str(f)) is True
+    assert prefetch.warm_file(str(tmp_path / "missing.jpg")) is False
+
+
+def test_warm_file_read_fallback(tmp_path, monkeypatch):
+    f = tmp_path / "sun_1.jpg"
+    f.write_bytes(b"x" * 4096)
+    reads = []
+    real_read = os.read
+    monkeypatch.delattr(os, "posix_fadvise", raising=False)
+    monkeypatch.setattr(os, "read",
+                        lambda fd, n: reads.append(n) or real_read(fd, n))
+    assert prefetch.warm_file(str(f)) is True
+    assert reads  # read through instead of fadvise
+
+
+def test_prefetch_image_builds_and_warms_variants(tmp_path, monkeypatch):
+    src = tmp_path / "sun_1.jpg"
+    src.write_bytes(b"full")
+    built = {}
+
+    def fake_ensure(path, resolution):
+        out = tmp_path / f"{resolution[0]}x{resolution[1]}.jpg"
+        out.write_bytes(b"variant")
+        built[resolution] = str(out)
+        return str(out)
+
+    monkeypatch.setattr(variants, "ensure_variant", fake_ensure)
+    warmed = prefetch.prefetch_image(
+        str(src), {0: (1920, 1080), 1: (2560, 1440), 2: (1920, 1080)})
+    assert set(built) == {(1920, 1080), (2560, 1440)}
+    assert warmed == [str(src), built[(1920, 1080)], built[(2560, 1440)]]
+
+
+def test_prefetch_image_variants_disabled(tmp_path, monkeypatch):
+    src = tmp_path / "sun_1.jpg"
+    src.write_bytes(b"full")
+    variants.set_enabled(False)
+    monkeypatch.setattr(variants, "ensure_variant",
+                        lambda *a: pytest.fail("variant built while disabled"))
+    assert prefetch.prefetch_image(str(src), {0: (1920, 1080)}) == [str(src)]
@@ -7,6 +7,7 @@ Pins the behaviour contract:
   from the persisted last_change_date
 - per-run results are delivered to the GUI log callback, not print
 """
+import concurrent.futures
 import logging
 import sys
 import time
@@ -79,7 +80,10 @@ class TestTaskScheduling:
             with patch.object(scheduler_module, "IntervalTrigger") as interval:
                 assert mgr.start() is True
                 jobs = {c.kwargs.get("id") for c in instance.add_job.call_args_list}
-                assert jobs == {"cycle_task"}
+                # No separate shuffle job: the cycle one-shot (here the
+                # interval fallback — no theme applied yet) and its
+                # safety net both run the shuffle check.
+                assert jobs == {"cycle_task", "safety_task"}
                 interval.assert_called()
                 assert interval.call_args.kwargs.get("seconds") == 1
         mgr.scheduler = None
@@ -177,6 +181,55 @@ class TestLogCallback:
         assert any("failed" in m.lower() for m in messages)
 
 
+class TestCycleApply:
+    """Scheduled cycles set the wallpaper through the async apply API,
+    bounded by ``wallpaper.apply_deadline``."""
+
+    def _report(self, ok):
+        from kwallpaper.wallpaper_async import ApplyReport, ScreenResult
+        return ApplyReport("/img/a.jpg", [ScreenResult(0, ok, "" if ok else "x")])
+
+    def test_cycle_run_passes_async_apply(self, cfg):
+        mgr = _make_manager(cfg)
+        seen = []
+
+        def fake_cycle(args):
+            seen.append(args.apply)
+            return 0
+        with patch.object(scheduler_module, "run_cycle_command", fake_cycle):
+            mgr._run_cycle_task()
+        assert seen == [mgr._apply_for_cycle]
+
+    def test_apply_for_cycle_reports_success(self, cfg, monkeypatch):
+        from kwallpaper import wallpaper, wallpaper_async
+        mgr = _make_manager(cfg)
+        messages = []
+        mgr.log_callback = messages.append
+        deadlines = []
+
+        def fake_future(path, deadline):
+            deadlines.append(deadline)
+            f = concurrent.futures.Future()
+            f.set_result(self._report(True))
+            return f
+        monkeypatch.setattr(wallpaper_async, "change_wallpaper_future", fake_future)
+        monkeypatch.setattr(scheduler_module, "APPLY_RESULT_SLACK", 0.0)
+        assert mgr._apply_for_cycle("/img/a.jpg") is True
+        assert deadlines == [wallpaper.get_apply_deadline()]
+        assert messages == ["Wallpaper set on 1/1 screen(s)"]
+
+    def test_apply_for_cycle_gives_up_after_deadline(self, cfg, monkeypatch):
+        from kwallpaper import wallpaper, wallpaper_async
+        mgr = _make_manager(cfg)
+        pending = concurrent.futures.Future()
+        monkeypatch.setattr(wallpaper_async, "change_wallpaper_future",
+                            lambda path, deadline: pending)
+        monkeypatch.setattr(wallpaper, "get_apply_deadline", lambda: 0.01)
+        monkeypatch.setattr(scheduler_module, "APPLY_RESULT_SLACK", 0.0)
+        assert mgr._apply_for_cycle("/img/a.jpg") is False
+        assert pending.cancelled()
+
+
 def test_get_config_corrupt_config_falls_back_to_sun_model(tmp_path):
     """An unreadable config file must fall back to the same model as a
     fresh install (sun), not the pre-Phase-4 legacy default."""
@@ -9,7 +9,7 @@ in environments without apscheduler installed (the Flatpak bundles it).
 import json
 import sys
 import types
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
@@ -45,9 +45,12 @@ if "apscheduler" not in sys.modules:
         })
 
 from kwallpaper import cli as cli_module
+from kwallpaper import fswatch
 from kwallpaper import core as core_module
 from kwallpaper import scheduler as scheduler_module
+from kwallpaper import state_store
 from kwallpaper.scheduler import SchedulerManager
+from kwallpaper.selection import Selection
 
 TZ = ZoneInfo("America/Phoenix")
 FIXED_NEXT = datetime(2026, 8, 18, 12, 0, tzinfo=TZ)
@@ -62,8 +65,8 @@ def _make_manager(cfg, running=True):
 def _write_cycle_env(tmp_path, monkeypatch):
     """Theme dir + config for run_cycle_command / run_change_command
     tests.  Returns (cfg_path, selected_image_path).  The selected image
-    is pinned by patching select_image_for_time_cli, so no real image
-    selection or D-Bus call happens."""
+    is pinned by patching select_at / select_image_for_time_cli, so no
+    real image selection or D-Bus call happens."""
     themes = tmp_path / "themes"
     t = themes / "TestTheme"
     t.mkdir(parents=True)
@@ -82,6 +85,12 @@ def _write_cycle_env(tmp_path, monkeypatch):
     monkeypatch.setattr(cli_module, "check_day_passed", lambda *a: False)
     monkeypatch.setattr(cli_module, "select_image_for_time_cli",
                         lambda theme, cfg: str(t / "sun_07.jpg"))
+    monkeypatch.setattr(cli_module, "select_at",
+                        lambda theme, cfg: Selection(
+                            now=FIXED_NEXT, model="sun", category="day",
+                            image=7, path=str(t / "sun_07.jpg"),
+                            window_start=None, window_end=None,
+                            next_change=FIXED_NEXT))
     cfg = tmp_path / "config.json"
     cfg.write_text(json.dumps({
         "version": 2,
@@ -122,8 +131,22 @@ class TestSkipIfUnchanged:
         assert calls == [selected]
         out = capsys.readouterr().out
         assert "Changed wallpaper to sun_07.jpg" in out
-        saved = json.loads(Path(cfg).read_text())
-        assert saved["theme"]["last_applied_image"] == selected
+        saved = state_store.load_state(cfg)
+        assert saved["last_applied"]["image"] == selected
+
+    def test_cycle_uses_callers_apply(self, tmp_path, monkeypatch):
+        # The scheduler passes its deadline-bounded async apply.
+        cfg, selected = _write_cycle_env(tmp_path, monkeypatch)
+        monkeypatch.setattr(cli_module, "change_wallpaper",
+                            lambda p: pytest.fail("synchronous apply"))
+        applied = []
+        args = SimpleNamespace(theme_path=None, config=cfg, time=None,
+                               monitor=False,
+                               apply=lambda p: applied.append(p) or True)
+        assert cli_module.run_cycle_command(args) == 0
+        assert applied == [selected]
+        saved = state_store.load_state(cfg)
+        assert saved["last_applied"]["image"] == selected
 
     def test_cycle_failed_change_does_not_persist(self, tmp_path, monkeypatch):
         cfg, selected = _write_cycle_env(tmp_path, monkeypatch)
@@ -131,8 +154,8 @@ class TestSkipIfUnchanged:
         args = SimpleNamespace(theme_path=None, config=cfg, time=None,
                                monitor=False)
         assert cli_module.run_cycle_command(args) == 1
-        saved = json.loads(Path(cfg).read_text())
-        assert saved["theme"]["last_applied_image"] == ""
+        saved = state_store.load_state(cfg)
+        assert saved["last_applied"]["image"] == ""
 
     def test_change_command_persists_after_success(self, tmp_path, monkeypatch):
         # run_change_command is an explicit user action: it always
@@ -149,8 +172,8 @@ class TestSkipIfUnchanged:
                                monitor=False)
         assert cli_module.run_change_command(args) == 0
         assert calls == [selected]
-        saved = json.loads(Path(cfg).read_text())
-        assert saved["theme"]["last_applied_image"] == selected
+        saved = state_store.load_state(cfg)
+        assert saved["last_applied"]["image"] == selected
 
     def test_apply_theme_persists_last_applied_image(self, tmp_path, monkeypatch):
         themes = tmp_path / "themes"
@@ -181,13 +204,11 @@ class TestSkipIfUnchanged:
                             lambda theme, cfg_path: str(t / "sun_07.jpg"))
         monkeypatch.setattr(core_module, "load_config",
                             lambda p: json.loads(Path(p).read_text()))
-        monkeypatch.setattr(core_module, "save_config",
-                            lambda p, c: Path(p).write_text(json.dumps(c)))
 
         result = core_module.apply_theme(str(t), str(cfg))
         assert result.success
-        saved = json.loads(Path(cfg).read_text())
-        assert saved["theme"]["last_applied_image"] == str(t / "sun_07.jpg")
+        saved = state_store.load_state(str(cfg))
+        assert saved["last_applied"]["image"] == str(t / "sun_07.jpg")
 
     def test_apply_theme_failed_wallpaper_does_not_persist(self, tmp_path, monkeypatch):
         themes = tmp_path / "themes"
@@ -214,13 +235,11 @@ class TestSkipIfUnchanged:
         monkeypatch.setattr(core_module, "set_wallpaper", lambda p: False)
         monkeypatch.setattr(core_module, "load_config",
                             lambda p: json.loads(Path(p).read_text()))
-        monkeypatch.setattr(core_module, "save_config",
-                            lambda p, c: Path(p).write_text(json.dumps(c)))
 
         result = core_module.apply_theme(str(t), str(cfg))
         assert not result.success
-        saved = json.loads(Path(cfg).read_text())
-        assert saved.get("theme", {}).get("last_applied_image", "") == ""
+        saved = state_store.load_state(str(cfg))
+        assert saved["last_applied"]["image"] == ""
 
 
 @pytest.fixture
@@ -276,20 +295,21 @@ class TestSunModeStart:
         mgr.scheduler = None
         mgr._is_running = False
 
-    def test_legacy_mode_start_unchanged(self, cfg_legacy):
+    def test_legacy_mode_start_arms_one_shot_and_safety(self, cfg_legacy):
         mgr = _make_manager(cfg_legacy, running=False)
         with patch.object(scheduler_module, "BackgroundScheduler") as bs, \
              patch.object(scheduler_module, "DateTrigger") as dt, \
              patch.object(scheduler_module, "IntervalTrigger") as it, \
-             patch.object(scheduler_module, "next_change_time_for_config") as nct:
+             patch.object(scheduler_module, "next_change_time_for_config",
+                          return_value=FIXED_NEXT) as nct:
             assert mgr.start() is True
             calls = {c.kwargs.get("id"): c
                      for c in bs.return_value.add_job.call_args_list}
-            assert set(calls) == {"cycle_task"}
-            assert it.call_args.kwargs.get("seconds") == 60
-            assert calls["cycle_task"].kwargs["trigger"] is it.return_value
-            dt.assert_not_called()
-            nct.assert_not_called()
+            assert set(calls) == {"cycle_task", "safety_task"}
+            # No 60 s polling: only the safety net is an interval job.
+            assert it.call_args.kwargs.get("seconds") == 600
+            assert dt.call_args.kwargs.get("run_date") is FIXED_NEXT
+            nct.assert_called_once_with(cfg_legacy)
         mgr.scheduler = None
         mgr._is_running = False
 
@@ -350,6 +370,26 @@ class TestRearmSequence:
                    for c in mgr.scheduler.add_job.call_args_list]
             assert ids == ["cycle_task"]
 
+    def test_run_rearms_from_its_own_selection(self, cfg_sun):
+        mgr = _make_manager(cfg_sun, running=True)
+        mgr.scheduler = MagicMock()
+        selected = Selection(now=FIXED_NEXT, model="sun", category="day",
+                             image=7, path="/t/sun_07.jpg",
+                             window_start=None, window_end=None,
+                             next_change=FIXED_NEXT + timedelta(hours=1))
+
+        def run_cycle(args):
+            args.selection = selected
+            return 0
+        with patch.object(scheduler_module, "run_cycle_command", run_cycle), \
+             patch.object(scheduler_module, "DateTrigger") as dt, \
+             patch.object(scheduler_module,
+                          "next_change_time_for_config") as nct:
+            mgr._run_cycle_task()
+        nct.assert_not_called()
+        assert dt.call_args_list[0].kwargs.get("run_date") \
+            == selected.next_change
+
     def test_lock_skipped_run_still_rearms(self, cfg_sun):
         # The triggering one-shot was consumed by APScheduler even though
         # the run was skipped by the lock — the re-arm must still happen.
@@ -384,16 +424,30 @@ class TestRearmSequence:
             assert ids == ["cycle_task"]
             assert any("falling back" in m for m in messages)
 
-    def test_legacy_run_does_not_rearm(self, cfg_legacy):
+    def test_legacy_run_rearms_one_shot(self, cfg_legacy):
         mgr = _make_manager(cfg_legacy, running=True)
         mgr.scheduler = MagicMock()
         with patch.object(scheduler_module, "run_cycle_command",
                           return_value=0), \
-             patch.object(scheduler_module,
-                          "next_change_time_for_config") as nct:
+             patch.object(scheduler_module, "DateTrigger") as dt, \
+             patch.object(scheduler_module, "next_change_time_for_config",
+                          return_value=FIXED_NEXT) as nct:
             mgr._run_cycle_task()
-            nct.assert_not_called()
-            mgr.scheduler.add_job.assert_not_called()
+            nct.assert_called_once_with(cfg_legacy)
+            assert dt.call_args.kwargs.get("run_date") is FIXED_NEXT
+
+    def test_legacy_without_sun_times_interval_fallback(self, cfg_legacy):
+        mgr = _make_manager(cfg_legacy, running=True)
+        mgr.scheduler = MagicMock()
+        with patch.object(scheduler_module, "IntervalTrigger") as it, \
+             patch.object(scheduler_module, "DateTrigger") as dt, \
+             patch.object(scheduler_module, "next_change_time_for_config",
+                          side_effect=ValueError("no sun times")), \
+             patch.object(scheduler_module, "run_cycle_command",
+                          return_value=0):
+            mgr._run_cycle_task()
+            assert it.call_args.kwargs.get("seconds") == 60
+            dt.assert_not_called()
 
     def test_reload_interval_sun_mode_rearms(self, cfg_sun):
         mgr = _make_manager(cfg_sun, running=True)
@@ -470,7 +524,7 @@ class TestModelSwitchReload:
         # The safety job was re-added with the new interval.
         assert it.call_args.kwargs.get("seconds") == 60
 
-    def test_sun_to_legacy_removes_safety_task(self, cfg_sun):
+    def test_sun_to_legacy_keeps_safety_and_rearms(self, cfg_sun):
         mgr = _make_manager(cfg_sun, running=True)
         mgr.scheduler = MagicMock()
         # Simulate a running sun-mode scheduler: one-shot cycle job +
@@ -482,8 +536,134 @@ class TestModelSwitchReload:
         cfg = json.loads(Path(cfg_sun).read_text())
         cfg["scheduling"]["suntime_model"] = "legacy"
         Path(cfg_sun).write_text(json.dumps(cfg))
-        with patch.object(scheduler_module, "IntervalTrigger") as it:
+        with patch.object(scheduler_module, "IntervalTrigger") as it, \
+             patch.object(scheduler_module, "DateTrigger") as dt, \
+             patch.object(scheduler_module, "next_change_time_for_config",
+                          return_value=FIXED_NEXT):
             assert mgr.reload_cycle_interval() is True
-        assert 'safety' not in mgr._tasks
-        assert 'cycle' in mgr._tasks  # interval job re-added
-        assert it.call_args.kwargs.get("seconds") == 60  # cycle interval
+        assert mgr._tasks['safety']['interval'] == 600
+        assert it.call_args.kwargs.get("seconds") == 600
+        assert dt.call_args.kwargs.get("run_date") is FIXED_NEXT
+
+
+class TestPrefetch:
+    def _future_next(self):
+        return datetime.now(TZ).replace(microsecond=0) + timedelta(hours=1)
+
+    def test_rearm_arms_prefetch_before_change(self, cfg_sun):
+        next_dt = self._future_next()
+        mgr = _make_manager(cfg_sun, running=True)
+        mgr.scheduler = MagicMock()
+        with patch.object(scheduler_module, "DateTrigger") as dt, \
+             patch.object(scheduler_module, "next_change_time_for_config",
+                          return_value=next_dt):
+            mgr._rearm_next_change()
+        calls = {c.kwargs.get("id"): c
+                 for c in mgr.scheduler.add_job.call_args_list}
+        assert set(calls) == {"cycle_task", "prefetch_task"}
+        run_dates = [c.kwargs.get("run_date") for c in dt.call_args_list]
+        assert run_dates == [next_dt, next_dt - timedelta(seconds=30)]
+        assert calls["prefetch_task"].kwargs["args"] == [next_dt]
+
+    def test_lead_zero_disables_prefetch(self, cfg_sun):
+        cfg = json.loads(Path(cfg_sun).read_text())
+        cfg["scheduling"]["prefetch_lead"] = 0
+        Path(cfg_sun).write_text(json.dumps(cfg))
+        mgr = _make_manager(cfg_sun, running=True)
+        mgr.scheduler = MagicMock()
+        with patch.object(scheduler_module, "DateTrigger"), \
+             patch.object(scheduler_module, "next_change_time_for_config",
+                          return_value=self._future_next()):
+            mgr._rearm_next_change()
+        ids = [c.kwargs.get("id") for c in mgr.scheduler.add_job.call_args_list]
+        assert ids == ["cycle_task"]
+
+    def test_change_inside_lead_prefetches_now(self, cfg_sun):
+        next_dt = datetime.now(TZ) + timedelta(seconds=5)
+        mgr = _make_manager(cfg_sun, running=True)
+        mgr.scheduler = MagicMock()
+        with patch.object(scheduler_module, "DateTrigger") as dt, \
+             patch.object(scheduler_module, "next_change_time_for_config",
+                          return_value=next_dt):
+            mgr._rearm_next_change()
+        prefetch_at = dt.call_args_list[-1].kwargs["run_date"]
+        assert prefetch_at < next_dt - timedelta(seconds=4)
+
+    def test_prefetch_task_warms_next_image(self, cfg_sun):
+        mgr = _make_manager(cfg_sun, running=True)
+        next_dt = self._future_next()
+        with patch.object(scheduler_module, "next_image_for_config",
+                          return_value="/themes/T/sun_08.jpg") as nic, \
+             patch("kwallpaper.prefetch.prefetch_image",
+                   return_value=["/themes/T/sun_08.jpg"]) as pf:
+            mgr._run_prefetch_task(next_dt)
+        nic.assert_called_once_with(cfg_sun, next_dt)
+        pf.assert_called_once_with("/themes/T/sun_08.jpg")
+
+    def test_prefetch_failure_is_not_fatal(self, cfg_sun):
+        mgr = _make_manager(cfg_sun, running=True)
+        messages = []
+        mgr.log_callback = messages.append
+        with patch.object(scheduler_module, "next_image_for_config",
+                          side_effect=ValueError("no theme")):
+            mgr._run_prefetch_task(self._future_next())
+        assert any("Prefetch skipped" in m for m in messages)
+
+
+
+class TestFileEvents:
+    """Reactions to kwallpaper.fswatch events (config edited on disk)."""
+
+    CONFIG_EVENT = fswatch.FsEvent(frozenset({fswatch.CONFIG}),
+                                   ("config.json",))
+    THEMES_EVENT = fswatch.FsEvent(frozenset({fswatch.THEMES}), ("T",))
+
+    def test_safety_interval_change_reschedules(self, cfg_legacy):
+        mgr = _make_manager(cfg_legacy, running=True)
+        mgr.scheduler = MagicMock()
+        mgr._tasks['safety'] = {'interval': 600, 'type': 'interval'}
+        data = json.loads(Path(cfg_legacy).read_text())
+        data["scheduling"]["safety_interval"] = 120
+        Path(cfg_legacy).write_text(json.dumps(data))
+        with patch.object(scheduler_module, "IntervalTrigger") as it, \
+             patch.object(scheduler_module, "DateTrigger"), \
+             patch.object(scheduler_module, "next_change_time_for_config",
+                          return_value=FIXED_NEXT):
+            mgr._on_fs_event(self.CONFIG_EVENT)
+        it.assert_called_once_with(seconds=120)
+        assert mgr._tasks['safety']['interval'] == 120
+
+    def test_legacy_config_change_rearms(self, cfg_legacy):
+        mgr = _make_manager(cfg_legacy, running=True)
+        mgr.scheduler = MagicMock()
+        mgr._tasks['safety'] = {'interval': 600, 'type': 'interval'}
+        with patch.object(scheduler_module, "IntervalTrigger") as it, \
+             patch.object(scheduler_module, "DateTrigger") as dt, \
+             patch.object(scheduler_module, "next_change_time_for_config",
+                          return_value=FIXED_NEXT):
+            mgr._on_fs_event(self.CONFIG_EVENT)
+        it.assert_not_called()  # safety job left alone
+        assert dt.call_args_list[0].kwargs.get("run_date") is FIXED_NEXT
+
+    def test_run_cycle_disabled_ignores_events(self, cfg_legacy):
+        mgr = _make_manager(cfg_legacy, running=True)
+        mgr.scheduler = MagicMock()
+        mgr._on_fs_event(self.CONFIG_EVENT)
+        mgr._on_fs_event(self.THEMES_EVENT)
+        mgr.scheduler.add_job.assert_not_called()
+
+    def test_sun_mode_themes_change_rearms(self, cfg_sun):
+        mgr = _make_manager(cfg_sun, running=True)
+        mgr.scheduler = MagicMock()
+        mgr._tasks['safety'] = {'interval': 600, 'type': 'interval'}
+        with patch.object(scheduler_module, "DateTrigger") as dt, \
+             patch.object(scheduler_module, "next_change_time_for_config",
+                          return_value=FIXED_NEXT):
+            mgr._on_fs_event(self.THEMES_EVENT)
+        assert dt.call_args_list[0].kwargs.get("run_date") is FIXED_NEXT
+
+    def test_stopped_manager_ignores_events(self, cfg_sun):
+        mgr = _make_manager(cfg_sun, running=False)
+        mgr.scheduler = MagicMock()
+        mgr._on_fs_event(self.CONFIG_EVENT)
+        mgr.scheduler.add_job.assert_not_called()
@@ -0,0 +1,80 @@
+"""Tests for the vectorized sun-segment engine (kwallpaper.solarbatch).
+
+Every batch result is checked against the scalar astral path
+(``solar_segments``), which is the reference.
+"""
+from datetime import date, timedelta
+
+import pytest
+from zoneinfo import ZoneInfo
+
+from kwallpaper import solarbatch, solarsegments
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("astral")
+
+PHOENIX = (ZoneInfo("America/Phoenix"), 33.4484, -112.074)
+TROMSO = (ZoneInfo("Europe/Oslo"), 69.6492, 18.9553)
+SYDNEY = (ZoneInfo("Australia/Sydney"), -33.8688, 151.2093)
+
+
+@pytest.fixture(autouse=True)
+def _no_segment_cache():
+    solarsegments.clear_segment_cache()
+    yield
+    solarsegments.clear_segment_cache()
+
+
+def _days(start, count, step=1):
+    return [start + timedelta(days=i * step) for i in range(count)]
+
+
+def _assert_matches(days, tz, lat, lon):
+    for got in solarbatch.batch_segments(days, tz, lat, lon):
+        want = solarsegments._compute_segments(got.day, tz, lat, lon)
+        for name in solarbatch.BOUNDARIES:
+            expected, actual = getattr(want, name), getattr(got, name)
+            if expected is None:
+                assert actual is None, (got.day, name)
+            else:
+                assert actual is not None, (got.day, name)
+                assert abs((actual - expected).total_seconds()) < 1.0, \
+                    (got.day, name, actual, expected)
+
+
+@pytest.mark.parametrize("where", [PHOENIX, SYDNEY], ids=["phoenix", "sydney"])
+def test_year_matches_solar_segments(where):
+    _assert_matches(_days(date(2026, 1, 1), 365, step=3), *where)
+
+
+def test_dst_transitions_match():
+    tz, lat, lon = ZoneInfo("America/Los_Angeles"), 47.6062, -122.3321
+    _assert_matches(_days(date(2026, 3, 5), 10) + _days(date(2026, 10, 28), 10),
+                    tz, lat, lon)
+
+
+def test_polar_days_have_no_crossing():
+    tz, lat, lon = TROMSO
+    days = _days(date(2026, 6, 15), 10) + _days(date(2026, 12, 15), 10)
+    _assert_matches(days, tz, lat, lon)
+    columns = solarbatch.segment_arrays(days, tz, lat, lon)
+    # Midnight sun: no civil dusk; polar night: no golden hour.
+    assert np.isnan(columns["dusk"][:10]).all()
+    assert np.isnan(columns["golden_hour_end"][10:]).all()
+
+
+def test_segment_arrays_columns():
+    days = _days(date(2026, 6, 20), 3)
+    columns = solarbatch.segment_arrays(days, *PHOENIX)
+    assert set(columns) == {"day", *solarbatch.BOUNDARIES}
+    assert columns["day"].tolist() == days
+    for name in solarbatch.BOUNDARIES:
+        assert columns[name].shape == (3,)
+    # Consecutive days share a dawn.
+    assert columns["next_dawn"][:-1].tolist() == columns["dawn"][1:].tolist()
+
+
+def test_requires_numpy(monkeypatch):
+    monkeypatch.setattr(solarbatch, "NUMPY_AVAILABLE", False)
+    with pytest.raises(RuntimeError, match="numpy"):
+        solarbatch.batch_segments([date(2026, 6, 21)], *PHOENIX)
@@ -351,20 +351,14 @@ def _fake_segments(day, tz, lat, lon):
 
 
 def _patch_time_and_sun(monkeypatch, hh, mm, use_sun_model):
-    """Freeze 'now' at 2026-06-21 hh:mm Phoenix and pin sun values.
-
-    Patches BOTH the suntime and selection namespaces because
-    selection.py imports _real_sun_data into its own namespace.
-    """
+    """Freeze 'now' at 2026-06-21 hh:mm Phoenix and pin sun values
+    (selection reads them through suntime.sun_times)."""
     _FixedDT.FIXED = _FixedDT(2026, 6, 21, hh, mm, tzinfo=TZ)
     fake_sun = _fake_sun()
     fake_sun_data = lambda tz, lat, lon, date=None: dict(fake_sun)
     monkeypatch.setattr(selection, "datetime", _FixedDT)
     monkeypatch.setattr(suntime, "datetime", _FixedDT)
     monkeypatch.setattr(suntime, "_real_sun_data", fake_sun_data)
-    monkeypatch.setattr(selection, "_real_sun_data", fake_sun_data)
-    monkeypatch.setattr("kwallpaper.backup.save_daily_backup_schedule",
-                        lambda *a, **k: None)
     if use_sun_model:
         monkeypatch.setattr(solarsegments, "solar_segments", _fake_segments)
 
@@ -484,13 +478,15 @@ def test_cli_sun_model_empty_image_list_falls_back_to_legacy(
 
 
 def _patch_apply_theme_env(monkeypatch, tmp_path, cfg):
-    """Patch core's collaborators; return a list capturing applied paths."""
+    """Patch core's collaborators; return a list capturing applied paths.
+
+    The run state is committed for real, to the state.json next to
+    ``cfg`` (in tmp_path)."""
     applied = []
     monkeypatch.setattr(core, "set_wallpaper",
                         lambda p: applied.append(p) or True)
     monkeypatch.setattr(core, "load_config",
                         lambda p: json.loads(Path(p).read_text()))
-    monkeypatch.setattr(core, "save_config", lambda p, c: None)
     monkeypatch.setattr(core, "discover_themes",
                         lambda: [("theme", str(Path(cfg).parent / "theme"))])
     return applied
@@ -511,6 +507,8 @@ def test_apply_theme_routes_to_sun_model(tmp_path, monkeypatch):
     result = core.apply_theme("theme", str(cfg))
     assert result.success
     assert Path(applied[0]).name == "sun_08.jpg"
+    state = json.loads((cfg.parent / "state.json").read_text())
+    assert state["last_applied"] == {"theme": "theme", "image": applied[0]}
 
 
 def test_apply_theme_default_model_is_legacy(tmp_path, monkeypatch):
@@ -526,3 +524,85 @@ def test_apply_theme_default_model_is_legacy(tmp_path, monkeypatch):
     result = core.apply_theme("theme", str(cfg))
     assert result.success
     assert Path(applied[0]).name == "sun_12.jpg"
+    state = json.loads((cfg.parent / "state.json").read_text())
+    assert state["last_applied"] == {"theme": "theme", "image": applied[0]}
+
+
+# ── segment cache ─────────────────────────────────────────────────────────
+
+@pytest.fixture
+def counted_compute(monkeypatch):
+    """Replace the astral computation with a synthetic one that records
+    each call as (day, dawn supplied?, next_dawn supplied?)."""
+    calls = []
+
+    def fake(day, tz, lat, lon, dawn=solarsegments._UNKNOWN,
+             next_dawn=solarsegments._UNKNOWN):
+        calls.append((day, dawn is not solarsegments._UNKNOWN,
+                      next_dawn is not solarsegments._UNKNOWN))
+        base = datetime(day.year, day.month, day.day, tzinfo=tz)
+        return Segments(
+            day=day,
+            dawn=base + timedelta(hours=5) if dawn is solarsegments._UNKNOWN else dawn,
+            golden_hour_end=base + timedelta(hours=6),
+            golden_hour=base + timedelta(hours=18),
+            dusk=base + timedelta(hours=19),
+            next_dawn=(base + timedelta(days=1, hours=5)
+                       if next_dawn is solarsegments._UNKNOWN else next_dawn))
+
+    monkeypatch.setattr(solarsegments, "_compute_segments", fake)
+    solarsegments.clear_segment_cache()
+    yield calls
+    solarsegments.clear_segment_cache()
+
+
+def test_segment_cache_hits_and_rounding(counted_compute):
+    first = solar_segments(DAY, TZ, LAT, LON)
+    assert solar_segments(DAY, TZ, LAT + 1e-7, LON - 1e-7) is first
+    assert len(counted_compute) == 1
+    stats = solarsegments.segment_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_segment_cache_shares_neighbouring_dawn(counted_compute):
+    today = solar_segments(DAY, TZ, LAT, LON)
+    tomorrow = solar_segments(DAY + timedelta(days=1), TZ, LAT, LON)
+    yesterday = solar_segments(DAY - timedelta(days=1), TZ, LAT, LON)
+    assert tomorrow.dawn == today.next_dawn
+    assert yesterday.next_dawn == today.dawn
+    assert counted_compute == [(DAY, False, False),
+                               (DAY + timedelta(days=1), True, False),
+                               (DAY - timedelta(days=1), False, True)]
+
+
+def test_segment_cache_is_bounded(counted_compute, monkeypatch):
+    monkeypatch.setattr(solarsegments, "_segment_cache_size", 2)
+    for offset in range(3):
+        solar_segments(DAY + timedelta(days=10 * offset), TZ, LAT, LON)
+    assert solarsegments.segment_cache_stats()["size"] == 2
+    solar_segments(DAY, TZ, LAT, LON)        # evicted: computed again
+    assert len(counted_compute) == 4
+
+
+def test_cache_settings_read_from_config(counted_compute, monkeypatch, caplog):
+    monkeypatch.setattr(solarsegments, "_segment_cache_size", 64)
+    monkeypatch.setattr(solarsegments, "_coord_precision", 4)
+    from kwallpaper import wallpaper
+    wallpaper.configure_from_config({
+        "scheduling": {"segment_cache_size": 1},
+        "location": {"coordinate_precision": 2},
+    })
+    assert solarsegments.segment_cache_stats()["maxsize"] == 1
+    first = solar_segments(DAY, TZ, LAT, LON)
+    assert solar_segments(DAY, TZ, LAT + 0.001, LON) is first
+    assert len(counted_compute) == 1
+
+    # Re-applying the same settings keeps the cache; bad values are ignored.
+    solarsegments.configure_from_config({
+        "scheduling": {"segment_cache_size": -1},
+        "location": {"coordinate_precision": 2},
+    })
+    assert solarsegments.segment_cache_stats()["size"] == 1
+    assert solarsegments._segment_cache_size == 1
+    assert "segment_cache_size" in caplog.text
@@ -0,0 +1,133 @@
+"""Tests for the precomputed yearly sun tables (kwallpaper.solartable)."""
+from datetime import date, datetime, timedelta
+
+import pytest
+from zoneinfo import ZoneInfo
+
+from kwallpaper import solarsegments, solartable
+from kwallpaper.solarsegments import Segments
+
+TZ = ZoneInfo("America/Phoenix")
+LAT, LON = 33.4484, -112.074
+
+
+def _fake_segments(day, tz, lat, lon, dawn=None, next_dawn=None):
+    """Deterministic stand-in for astral: no dusk on the 1st of a month."""
+    def at(hour, d=day):
+        return datetime(d.year, d.month, d.day, hour, 30, 15, 400000, tzinfo=tz)
+    return Segments(day=day, dawn=at(5), golden_hour_end=at(6),
+                    golden_hour=at(18),
+                    dusk=None if day.day == 1 else at(19),
+                    next_dawn=at(5, day + timedelta(days=1)))
+
+
+@pytest.fixture
+def tables(tmp_path, monkeypatch):
+    monkeypatch.setattr(solartable, "_enabled", True)
+    monkeypatch.setattr(solartable, "TABLES_DIR", tmp_path / "solar")
+    monkeypatch.setattr(solartable, "_failed", set())
+    monkeypatch.setattr(solarsegments, "_compute_segments", _fake_segments)
+    solarsegments.clear_segment_cache()
+    yield tmp_path / "solar"
+    solartable.close_tables()
+    solarsegments.clear_segment_cache()
+
+
+def test_table_round_trip(tables):
+    path = solartable.build_table(2026, TZ, LAT, LON)
+    assert path.parent == tables
+    # 365 days + January 1st of 2027, four int64 columns each.
+    assert path.stat().st_size == solartable._HEADER.size + 366 * 4 * 8
+
+    seg = solartable.lookup(date(2026, 6, 21), TZ, LAT, LON)
+    assert seg.dawn == datetime(2026, 6, 21, 5, 30, 15, tzinfo=TZ)
+    assert seg.dusk == datetime(2026, 6, 21, 19, 30, 15, tzinfo=TZ)
+    assert seg.next_dawn == datetime(2026, 6, 22, 5, 30, 15, tzinfo=TZ)
+    assert seg.dawn.utcoffset() == timedelta(hours=-7)
+
+    assert solartable.lookup(date(2026, 3, 1), TZ, LAT, LON).dusk is None
+    last = solartable.lookup(date(2026, 12, 31), TZ, LAT, LON)
+    assert last.next_dawn == datetime(2027, 1, 1, 5, 30, 15, tzinfo=TZ)
+
+
+def test_solar_segments_reads_the_table(tables, monkeypatch):
+    solartable.build_table(2026, TZ, LAT, LON)
+
+    def astral_called(*args, **kwargs):
+        raise AssertionError("astral must not be called")
+    monkeypatch.setattr(solarsegments, "_compute_segments", astral_called)
+    seg = solarsegments.solar_segments(date(2026, 6, 21), TZ, LAT, LON)
+    assert seg.golden_hour == datetime(2026, 6, 21, 18, 30, 15, tzinfo=TZ)
+
+
+def test_missing_table_is_built_in_background(tables):
+    day = date(2027, 2, 3)
+    assert solartable.lookup(day, TZ, LAT, LON) is None
+    solartable._jobs.join()
+    assert solartable.table_path(2027, TZ, LAT, LON).exists()
+    assert solartable.lookup(day, TZ, LAT, LON).day == day
+
+
+def test_failed_build_is_not_retried(tables, monkeypatch):
+    builds = []
+
+    def failing_build(year, tz, lat, lon):
+        builds.append(year)
+        raise ValueError("astral cannot handle this location")
+    monkeypatch.setattr(solartable, "build_table", failing_build)
+    for day in (date(2027, 2, 3), date(2027, 2, 4)):
+        assert solartable.lookup(day, TZ, LAT, LON) is None
+        solartable._jobs.join()
+    assert builds == [2027]
+
+
+def test_concurrent_builds_use_separate_temp_files(tables, monkeypatch):
+    import os
+    names = []
+    real_replace = os.replace
+
+    def recording_replace(src, dst):
+        names.append(os.path.basename(src))
+        real_replace(src, dst)
+    monkeypatch.setattr(solartable.os, "replace", recording_replace)
+    path = solartable.build_table(2026, TZ, LAT, LON)
+    solartable.build_table(2026, TZ, LAT, LON)
+    assert len(set(names)) == 2
+    assert all(n.startswith(f".{path.name}.") for n in names)
+    assert sorted(p.name for p in tables.iterdir()) == [path.name]
+
+
+def test_foreign_or_truncated_tables_are_ignored(tables, monkeypatch):
+    queued = []
+    monkeypatch.setattr(solartable, "_queue", queued.append)
+    path = solartable.build_table(2026, TZ, LAT, LON)
+    path.write_bytes(path.read_bytes()[:-8])
+    assert solartable.lookup(date(2026, 5, 5), TZ, LAT, LON) is None
+
+    other = solartable.build_table(2026, TZ, LAT, -100.0)
+    path.write_bytes(other.read_bytes())
+    assert solartable.lookup(date(2026, 5, 5), TZ, LAT, LON) is None
+    assert queued == [("America/Phoenix", LAT, LON, 2026)] * 2
+
+
+def test_table_matches_astral(tmp_path, monkeypatch):
+    pytest.importorskip("astral")
+    monkeypatch.setattr(solartable, "TABLES_DIR", tmp_path)
+    monkeypatch.setattr(solartable, "_enabled", True)
+    tz = ZoneInfo("Europe/Oslo")
+    lat, lon = 69.6492, 18.9553
+    solartable.build_table(2026, tz, lat, lon)
+    try:
+        for day in (date(2026, 1, 1), date(2026, 3, 29), date(2026, 6, 21),
+                    date(2026, 12, 21), date(2026, 12, 31)):
+            want = solarsegments._compute_segments(day, tz, lat, lon)
+            got = solartable.lookup(day, tz, lat, lon)
+            for name in ("dawn", "golden_hour_end", "golden_hour", "dusk",
+                         "next_dawn"):
+                expected, actual = getattr(want, name), getattr(got, name)
+                if expected is None:
+                    assert actual is None
+                else:
+                    assert abs((actual - expected).total_seconds()) <= 0.5
+    finally:
+        solartable.close_tables()
@@ -0,0 +1,64 @@
+"""Tests for the unified run-state store (state.json)."""
+import json
+
+import pytest
+
+from kwallpaper import state_store, statefile
+
+
+@pytest.fixture
+def cfg(tmp_path):
+    statefile.forget()
+    return tmp_path / "config.json"
+
+
+def test_defaults_when_nothing_exists(cfg):
+    state = state_store.load_state(cfg)
+    assert state["last_applied"] == {"theme": "", "image": ""}
+    assert state["shuffle"]["shuffle_list"] == []
+    assert (cfg.parent / "state.json").exists()
+
+
+def test_migrates_legacy_files(cfg):
+    cfg.write_text(json.dumps({"theme": {
+        "last_applied": "Mojave", "last_applied_image": "/t/Mojave/m_3.jpg"}}))
+    (cfg.parent / "shuffle-list.json").write_text(json.dumps({
+        "shuffle_list": ["/t/Mojave", "/t/Catalina"], "current_index": 1,
+        "last_used_date": "2026-03-01", "last_change_date": "2026-03-01"}))
+    state = state_store.load_state(cfg)
+    assert state["last_applied"] == {"theme": "Mojave",
+                                     "image": "/t/Mojave/m_3.jpg"}
+    assert state["shuffle"]["current_index"] == 1
+    assert state["shuffle"]["last_change_date"] == "2026-03-01"
+    # Later legacy edits are ignored: the store is authoritative.
+    cfg.write_text(json.dumps({"theme": {"last_applied": "Other"}}))
+    assert state_store.load_state(cfg)["last_applied"]["theme"] == "Mojave"
+
+
+def test_transaction_writes_once(cfg, monkeypatch):
+    state_store.load_state(cfg)
+    writes = []
+    real_write = statefile.write_json
+    monkeypatch.setattr(statefile, "write_json",
+                        lambda *a, **k: writes.append(a[0]) or real_write(*a, **k))
+    with state_store.transaction(cfg) as state:
+        state["last_applied"]["image"] = "/t/a.jpg"
+        state["shuffle"].update(shuffle_list=["/t"], current_index=0)
+        state["shuffle"]["last_change_date"] = "2026-03-02"
+    assert len(writes) == 1
+    saved = json.loads((cfg.parent / "state.json").read_text())
+    assert saved["last_applied"]["image"] == "/t/a.jpg"
+    assert saved["shuffle"]["last_change_date"] == "2026-03-02"
+
+
+def test_failed_transaction_discards_changes(cfg):
+    with pytest.raises(RuntimeError):
+        with state_store.transaction(cfg) as state:
+            state["last_applied"]["image"] = "/t/half-done.jpg"
+            raise RuntimeError("wallpaper step failed")
+    assert state_store.load_state(cfg)["last_applied"]["image"] == ""
+
+
+def test_corrupt_store_falls_back_to_defaults(cfg):
+    (cfg.parent / "state.json").write_text("{truncated")
+    assert state_store.load_state(cfg)["shuffle"]["current_index"] == 0
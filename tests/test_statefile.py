@@ -0,0 +1,73 @@
+"""Tests for dirty-checked, atomic state-file writes."""
+import json
+import os
+
+import pytest
+
+from kwallpaper import shuffle_list_manager, statefile
+from kwallpaper.config import load_config, save_config
+
+
+@pytest.fixture(autouse=True)
+def _forget():
+    statefile.forget()
+    yield
+    statefile.forget()
+
+
+def test_identical_payload_not_rewritten(tmp_path):
+    p = tmp_path / "state.json"
+    assert statefile.write_json(p, {"a": 1}) is True
+    mtime = p.stat().st_mtime_ns
+    os.utime(p, ns=(mtime - 10**10, mtime - 10**10))
+    assert statefile.write_json(p, {"a": 1}) is False
+    assert p.stat().st_mtime_ns == mtime - 10**10
+    assert statefile.write_json(p, {"a": 2}) is True
+    assert json.loads(p.read_text()) == {"a": 2}
+
+
+def test_external_change_is_noticed(tmp_path):
+    p = tmp_path / "state.json"
+    statefile.write_json(p, {"a": 1})
+    p.write_text(json.dumps({"a": 1, "edited": True}, indent=2))
+    assert statefile.write_json(p, {"a": 1}) is True
+    assert json.loads(p.read_text()) == {"a": 1}
+
+
+def test_failed_write_keeps_old_file(tmp_path):
+    p = tmp_path / "state.json"
+    statefile.write_json(p, {"a": 1})
+    with pytest.raises(TypeError):
+        statefile.write_json(p, {"a": object()})
+    assert json.loads(p.read_text()) == {"a": 1}
+    assert [f.name for f in tmp_path.iterdir()] == ["state.json"]
+
+
+def test_fsync_write(tmp_path):
+    p = tmp_path / "sub" / "state.json"
+    assert statefile.write_json(p, [1, 2], fsync=True) is True
+    assert statefile.read_json(p) == [1, 2]
+
+
+def test_save_config_skips_unchanged(tmp_path):
+    p = tmp_path / "config.json"
+    save_config(str(p), {"scheduling": {"cycle_interval": 60}})
+    config = load_config(str(p))
+    assert save_config(str(p), config) is False
+    config["theme"]["last_applied_image"] = "/x/sun_1.jpg"
+    assert save_config(str(p), config) is True
+    assert load_config(str(p))["theme"]["last_applied_image"] == "/x/sun_1.jpg"
+
+
+def test_shuffle_state_round_trip(tmp_path):
+    cfg = str(tmp_path / "config.json")
+    shuffle_list_manager.save_theme_change_date("2026-01-02", cfg)
+    shuffle_list_manager.save_shuffle_list(["a", "b"], 1, "2026-01-02", cfg)
+    state = shuffle_list_manager.load_shuffle_list(cfg)
+    assert state == {"shuffle_list": ["a", "b"], "current_index": 1,
+                     "last_used_date": "2026-01-02",
+                     "last_change_date": "2026-01-02"}
+    state_file = tmp_path / "state.json"
+    mtime = state_file.stat().st_mtime_ns
+    shuffle_list_manager.save_shuffle_list(["a", "b"], 1, "2026-01-02", cfg)
+    assert state_file.stat().st_mtime_ns == mtime
@@ -23,6 +23,8 @@ from kwallpaper.suntime import (
     index_period,
     image_index_for,
     image_period,
+    legacy_image_at,
+    legacy_next_change_time,
     period_boundaries,
     time_of_day_for,
 )
@@ -217,3 +219,100 @@ class TestImageIndexFor:
         # 06:30 is inside the night period (before 06:37) -> 16
         assert image_index_for("night", _at("06:30"), sun,
                                [14, 15, 16]) == 16
+
+
+class TestLegacyNextChangeTime:
+    """legacy_next_change_time against a brute-force scan of the legacy
+    file selection (legacy_image_at)."""
+
+    THEME = {
+        "sunriseImageList": [1, 2, 3, 4],
+        "dayImageList": [5, 6, 7, 8, 9],
+        "sunsetImageList": [10, 11, 12, 13],
+        "nightImageList": [14, 15, 16],
+    }
+
+    @staticmethod
+    def _sun_for(day):
+        def t(h, m):
+            return datetime(day.year, day.month, day.day, h, m, tzinfo=TZ)
+        sun = {"dawn": t(6, 50), "sunrise": t(7, 15), "sunset": t(17, 40),
+               "dusk": t(18, 5)}
+        # A slowly drifting day, so consecutive dates differ.
+        shift = timedelta(minutes=day.day % 7)
+        return {k: v + shift for k, v in sun.items()}
+
+    def _image(self, when):
+        return legacy_image_at(when, self._sun_for(when.date()),
+                               self.THEME)[1]
+
+    @pytest.mark.parametrize("start", ["00:00", "03:17", "06:30", "07:12",
+                                       "12:00", "17:59", "18:20", "23:59"])
+    def test_matches_minute_scan(self, start):
+        now = _at(start)
+        nxt = legacy_next_change_time(now, self.THEME, self._sun_for)
+        current = self._image(now)
+        assert nxt > now
+        assert self._image(nxt) != current
+        t = now
+        while t + timedelta(minutes=1) < nxt:
+            t += timedelta(minutes=1)
+            assert self._image(t) == current, t
+
+    def test_walks_every_change_of_a_day(self):
+        now, seen = _at("00:00"), []
+        while now < _at("00:00") + timedelta(days=1):
+            now = legacy_next_change_time(now, self.THEME, self._sun_for)
+            seen.append(self._image(now))
+        # Every image of the theme is shown once over the day.
+        assert sorted(set(seen)) == list(range(1, 17))
+
+    def test_unavailable_sun_raises(self):
+        with pytest.raises(ValueError, match="sun times unavailable"):
+            legacy_next_change_time(_at("12:00"), self.THEME,
+                                    lambda day: None)
+
+
+class TestSunTimes:
+    """The memoized per-(date, location) provider of legacy sun values."""
+
+    LOCATION = ("UTC", 33.4484, -112.074)
+
+    @pytest.fixture
+    def evaluated(self, monkeypatch):
+        calls = []
+
+        def sun_data(tz, lat, lon, date=None):
+            calls.append((date, lat))
+            return _sun("07:07", "07:30", "02:00", "02:23")
+        monkeypatch.setattr(suntime, "_real_sun_data", sun_data)
+        return calls
+
+    def test_one_evaluation_per_date_and_location(self, evaluated):
+        day = _at("12:00").date()
+        first = suntime.sun_times(*self.LOCATION, day)
+        # Next-day adjusted: sunset/dusk before sunrise/dawn move a day on.
+        assert first["sunset"] == _at("02:00") + timedelta(days=1)
+        first["dawn"] = None
+        assert suntime.sun_times(*self.LOCATION, day)["dawn"] is not None
+        suntime.sun_times("UTC", 40.0, -112.074, day)
+        suntime.sun_times(*self.LOCATION, day + timedelta(days=1))
+        assert evaluated == [(day, 33.4484), (day, 40.0),
+                             (day + timedelta(days=1), 33.4484)]
+
+    def test_failures_are_retried(self, monkeypatch):
+        monkeypatch.setattr(suntime, "_real_sun_data",
+                            lambda tz, lat, lon, date=None: None)
+        day = _at("12:00").date()
+        assert suntime.sun_times(*self.LOCATION, day) is None
+        monkeypatch.setattr(suntime, "_real_sun_data",
+                            lambda tz, lat, lon, date=None: _sun())
+        assert suntime.sun_times(*self.LOCATION, day) == _sun()
+
+    def test_legacy_sun_for_shares_the_memo(self, evaluated):
+        day = _at("12:00").date()
+        # No config: the legacy default location.
+        sun = suntime.legacy_sun_for(None)(day)
+        assert suntime.sun_times("America/Phoenix", 33.4484, -112.074,
+                                 day) == sun
+        assert len(evaluated) == 1
@@ -1,5 +1,6 @@
 """Phase 4: strict theme import validation (missing referenced images)."""
 import json
+import os
 import zipfile
 
 import pytest
@@ -149,3 +150,27 @@ def test_image_files_for_numbered_fallback(tmp_path):
         (tmp_path / f"sun_{{0}}_{i}.jpg").touch()
     files = themes_module.image_files_for(tmp_path, theme)
     assert [f.name for f in files] == [f"sun_{{0}}_{i}.jpg" for i in range(1, 5)]
+
+
+def test_image_files_for_reuses_index_until_dir_changes(tmp_path, monkeypatch):
+    """The file list is cached per directory and rescanned only when the
+    directory's mtime changes."""
+    theme = {"imageFilename": "test_*.jpg"}
+    for i in (1, 2):
+        (tmp_path / f"test_{i}.jpg").touch()
+    scans = []
+    real_scan = themes_module._scan_image_files
+    monkeypatch.setattr(themes_module, "_scan_image_files",
+                        lambda d, p: scans.append(d) or real_scan(d, p))
+
+    for value in range(1, 17):
+        themes_module.image_file_for_value(tmp_path, theme, value)
+    assert len(scans) == 1
+    assert themes_module.image_file_for_value(tmp_path, theme, 3).name \
+        == "test_1.jpg"  # wraps around
+
+    (tmp_path / "test_3.jpg").touch()
+    os.utime(tmp_path, ns=(0, tmp_path.stat().st_mtime_ns + 1))
+    files = themes_module.image_files_for(tmp_path, theme)
+    assert [f.name for f in files] == ["test_1.jpg", "test_2.jpg", "test_3.jpg"]
+    assert len(scans) == 2
@@ -0,0 +1,122 @@
+"""Tests for the resolution-matched wallpaper variant cache.
+
+Plasma decodes the full theme JPEG (often 5K–6K) on every change on every
+screen; kwallpaper.variants keeps a cover-sized copy per screen resolution.
+These tests pin the cache layout (the theme folder must stay the variant's
+parent so theme detection keeps working), the hot-path lookup (never
+decodes, queues instead), and the build rules (cover, never upscale).
+"""
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from kwallpaper import variants
+
+
+@pytest.fixture(autouse=True)
+def _variant_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(variants, "VARIANTS_DIR", tmp_path / "variants")
+    monkeypatch.setattr(variants, "DEFAULT_THEMES_DIR", tmp_path / "themes")
+    monkeypatch.setattr(variants, "_not_needed", set())
+    variants.set_enabled(True)
+    variants.set_scale(1)
+
+
+def _theme_image(tmp_path, name="sun_1.jpg") -> Path:
+    image = tmp_path / "themes" / "Mojave" / name
+    image.parent.mkdir(parents=True, exist_ok=True)
+    image.write_bytes(b"jpeg")
+    return image
+
+
+def test_variant_keeps_theme_folder_as_parent(tmp_path):
+    image = _theme_image(tmp_path)
+    path = variants.variant_path(str(image), (1920, 1080))
+    assert path == tmp_path / "variants" / "1920x1080" / "Mojave" / "sun_1.jpg"
+    assert path.parent.name == "Mojave"
+
+
+def test_lookup_queues_missing_variant(tmp_path, monkeypatch):
+    queued = []
+    monkeypatch.setattr(variants, "_queue", queued.append)
+    image = _theme_image(tmp_path)
+    assert variants.variant_for(str(image), (1920, 1080)) is None
+    assert queued == [(str(image), (1920, 1080))]
+
+
+def test_lookup_ignores_stale_variant(tmp_path, monkeypatch):
+    monkeypatch.setattr(variants, "_queue", lambda key: None)
+    image = _theme_image(tmp_path)
+    variant = variants.variant_path(str(image), (1920, 1080))
+    variant.parent.mkdir(parents=True)
+    variant.write_bytes(b"old")
+    os.utime(variant, (1, 1))
+    assert variants.variant_for(str(image), (1920, 1080)) is None
+    variant.touch()
+    assert variants.variant_for(str(image), (1920, 1080)) == str(variant)
+
+
+def test_source_for_maps_variant_back(tmp_path):
+    image = _theme_image(tmp_path, "sun_3.jpeg")
+    variant = variants.variant_path(str(image), (2560, 1440))
+    assert variants.source_for(str(variant)) == str(image)
+    assert variants.source_for("/elsewhere/a.jpg") == "/elsewhere/a.jpg"
+
+
+def test_prepare_theme_queues_every_image_per_size(tmp_path, monkeypatch):
+    queued = []
+    monkeypatch.setattr(variants, "_queue", queued.append)
+    for i in (1, 2):
+        _theme_image(tmp_path, f"sun_{i}.jpg")
+    theme = tmp_path / "themes" / "Mojave"
+    (theme / "theme.json").write_text(json.dumps(
+        {"imageFilename": "sun_*.jpg", "dayImageList": [1, 2]}))
+    n = variants.prepare_theme(str(theme), [(1920, 1080), (1920, 1080),
+                                            (2560, 1440)])
+    assert n == 4
+    assert {size for _img, size in queued} == {(1920, 1080), (2560, 1440)}
+
+
+def test_prepare_theme_disabled(tmp_path):
+    variants.set_enabled(False)
+    assert variants.prepare_theme(str(tmp_path), [(1920, 1080)]) == 0
+
+
+def test_invalid_scale_keeps_previous():
+    variants.set_scale(2)
+    variants.set_scale(0)
+    assert variants.target_size((1920, 1080)) == (3840, 2160)
+
+
+class TestBuild:
+    @pytest.fixture
+    def qt(self):
+        return pytest.importorskip("PyQt6.QtGui")
+
+    def _jpeg(self, qt, path: Path, w: int, h: int):
+        img = qt.QImage(w, h, qt.QImage.Format.Format_RGB32)
+        img.fill(0x3060C0)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        assert img.save(str(path), "JPG", 90)
+
+    def test_downscales_to_cover_screen(self, qt, tmp_path):
+        src = tmp_path / "themes" / "Mojave" / "sun_1.jpg"
+        self._jpeg(qt, src, 1200, 600)
+        out = variants.ensure_variant(str(src), (400, 400))
+        assert out == str(variants.variant_path(str(src), (400, 400)))
+        size = qt.QImageReader(out).size()
+        # Covers 400x400 (Plasma crops to fill), keeps the aspect ratio.
+        assert (size.width(), size.height()) == (800, 400)
+
+    def test_never_upscales(self, qt, tmp_path):
+        src = tmp_path / "themes" / "Mojave" / "sun_1.jpg"
+        self._jpeg(qt, src, 640, 360)
+        assert variants.ensure_variant(str(src), (1920, 1080)) == str(src)
+        assert not variants.variant_path(str(src), (1920, 1080)).exists()
+        assert variants.variant_for(str(src), (1920, 1080)) is None
+
+    def test_unreadable_source_falls_back(self, qt, tmp_path):
+        src = _theme_image(tmp_path)
+        assert variants.ensure_variant(str(src), (400, 400)) == str(src)
@@ -0,0 +1,305 @@
+"""Tests for the asyncio wallpaper API (kwallpaper.wallpaper_async)."""
+
+import asyncio
+import concurrent.futures
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from kwallpaper import core, plasma_dbus, wallpaper, wallpaper_async
+from kwallpaper.wallpaper_async import (
+    ApplyReport,
+    ScreenResult,
+    change_wallpaper_async,
+    get_current_wallpaper_async,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clean_caches():
+    plasma_dbus.set_backend("gdbus")
+    wallpaper.invalidate_screen_topology()
+    wallpaper.invalidate_current_wallpaper()
+    yield
+    wallpaper.invalidate_screen_topology()
+    wallpaper.invalidate_current_wallpaper()
+
+
+class FakeAsyncTransport:
+    """N screens; ``delays[screen]`` seconds per setWallpaper (None: hang)."""
+
+    name = "fake"
+
+    def __init__(self, screens=3, delays=None, fail=(), topology=True):
+        self.screens = screens
+        self.topology = topology
+        self.delays = delays or {}
+        self.fail = set(fail)
+        self.images = {}
+        self.cancelled = []
+        self.calls = []
+
+    async def evaluate_script(self, script):
+        self.calls.append("evaluateScript")
+        if "writeConfig" in script:
+            uri = script.split("var uri = ", 1)[1].split(";", 1)[0]
+            for i in range(self.screens):
+                self.images[i] = uri.strip('"')
+            return "[" + ",".join(
+                f'{{"screen":{i},"plugin":"org.kde.image","ok":true}}'
+                for i in range(self.screens)) + "]"
+        if not self.topology:
+            return None
+        return "[" + ",".join(
+            f'{{"screen":{i},"plugin":"org.kde.image","width":800,"height":600}}'
+            for i in range(self.screens)) + "]"
+
+    async def wallpaper(self, screen):
+        self.calls.append("wallpaper")
+        return {"Image": self.images.get(screen, "file:///old.jpg")}
+
+    async def set_wallpaper(self, plugin, params, screen):
+        self.calls.append("setWallpaper")
+        delay = self.delays.get(screen, 0.0)
+        try:
+            if delay is None:
+                await asyncio.Event().wait()    # wedged screen
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(screen)
+            raise
+        if screen in self.fail:
+            return False
+        self.images[screen] = params["Image"]
+        return True
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    transport = FakeAsyncTransport()
+
+    async def get_transport():
+        return transport
+    monkeypatch.setattr(wallpaper_async, "get_async_transport", get_transport)
+    return transport
+
+
+def test_sets_every_screen_concurrently(fake):
+    fake.delays = {0: 0.2, 1: 0.2, 2: 0.2}
+    start = time.monotonic()
+    report = asyncio.run(change_wallpaper_async("/img/a.jpg", deadline=5))
+    elapsed = time.monotonic() - start
+    assert report.success and not report.failed and not report.timed_out
+    assert [r.screen for r in report.screens] == [0, 1, 2]
+    assert set(fake.images.values()) == {"file:///img/a.jpg"}
+    # Concurrent: ~one delay, not three.
+    assert elapsed < 0.5
+
+
+def test_deadline_cancels_wedged_screen(fake):
+    fake.delays = {1: None}
+    start = time.monotonic()
+    report = asyncio.run(change_wallpaper_async("/img/a.jpg", deadline=0.3))
+    assert time.monotonic() - start < 1.0
+    assert report.timed_out
+    assert report.success                       # screens 0 and 2 made it
+    assert [r.screen for r in report.failed] == [1]
+    assert report.failed[0].error == "deadline exceeded"
+    assert fake.cancelled == [1]
+    # A straggler means the topology may be stale.
+    assert wallpaper._cached_topology() is None
+
+
+def test_failed_screen_reported(fake):
+    fake.fail = {2}
+    report = asyncio.run(change_wallpaper_async("/img/a.jpg", deadline=5))
+    assert report.success
+    assert report.failed == [ScreenResult(2, False, "setWallpaper failed",
+                                          report.failed[0].elapsed)]
+    assert "screen 2: setWallpaper failed" in report.message
+
+
+def test_all_screens_failed_invalidates_current(fake):
+    fake.fail = {0, 1, 2}
+    wallpaper._remember_current("/img/old.jpg")
+    report = asyncio.run(change_wallpaper_async("/img/a.jpg", deadline=5))
+    assert not report.success
+    assert wallpaper._cached_current() == (False, None)
+
+
+def test_success_writes_through_current_cache(fake):
+    asyncio.run(change_wallpaper_async("/img/a.jpg", deadline=5))
+    assert wallpaper._cached_current() == (True, "/img/a.jpg")
+    fake.calls.clear()
+    assert asyncio.run(get_current_wallpaper_async()) == "/img/a.jpg"
+    assert fake.calls == []
+
+
+def test_topology_reused(fake):
+    asyncio.run(change_wallpaper_async("/img/a.jpg", deadline=5))
+    asyncio.run(change_wallpaper_async("/img/b.jpg", deadline=5))
+    assert fake.calls.count("evaluateScript") == 1
+
+
+def test_unknown_topology_sets_every_desktop(fake):
+    fake.topology = False
+    report = asyncio.run(change_wallpaper_async("/img/a.jpg", deadline=5))
+    assert report.success and not report.failed
+    assert [r.screen for r in report.screens] == [0, 1, 2]
+    assert "setWallpaper" not in fake.calls
+    assert fake.images == {i: "file:///img/a.jpg" for i in range(3)}
+
+
+def test_no_screens_reported_is_an_error(fake):
+    fake.topology = False
+    fake.screens = 0
+    report = asyncio.run(change_wallpaper_async("/img/a.jpg", deadline=5))
+    assert not report.success and report.screens == []
+    assert report.error
+    assert "setWallpaper" not in fake.calls
+    assert wallpaper._cached_current() == (False, None)
+
+
+def test_get_current_refresh_queries_dbus(fake):
+    fake.images[0] = "file:///home/u/x.jpg"
+    assert asyncio.run(get_current_wallpaper_async(refresh=True)) == "/home/u/x.jpg"
+
+
+def test_kreadconfig_fallback_maps_variant_to_theme_image(monkeypatch):
+    async def unavailable():
+        raise plasma_dbus.TransportUnavailable("no bus")
+
+    class Proc:
+        returncode = 0
+
+        async def communicate(self):
+            return b"/cache/variants/800x600/abc.jpg\n", b""
+
+    async def fake_exec(*args, **kwargs):
+        return Proc()
+    monkeypatch.setattr(wallpaper_async, "get_async_transport", unavailable)
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", fake_exec)
+    monkeypatch.setattr(wallpaper.variants, "source_for",
+                        lambda p: "/themes/t/a.jpg"
+                        if p == "/cache/variants/800x600/abc.jpg" else p)
+    path = asyncio.run(get_current_wallpaper_async(refresh=True))
+    assert path == "/themes/t/a.jpg"
+    assert wallpaper._cached_current() == (True, "/themes/t/a.jpg")
+
+
+def test_unavailable_transport_reported(monkeypatch):
+    async def unavailable():
+        raise plasma_dbus.TransportUnavailable("no bus")
+    monkeypatch.setattr(wallpaper_async, "get_async_transport", unavailable)
+    report = asyncio.run(change_wallpaper_async("/img/a.jpg", deadline=1))
+    assert not report.success
+    assert "no bus" in report.message
+
+
+class FakeAsyncRouter:
+    """Stand-in for jeepney's asyncio ``DBusRouter`` (context manager)."""
+
+    def __init__(self, conn, fail=None):
+        self.conn = conn
+        self.fail = fail
+        self.exited = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.exited = True
+        return False
+
+    async def send_and_get_reply(self, msg):
+        if self.fail is not None:
+            raise self.fail
+        return SimpleNamespace(header=SimpleNamespace(message_type="return"),
+                               body=("ok",))
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def test_session_transport_reconnects_on_lost_connection(monkeypatch):
+    routers = []
+
+    def make_router(conn):
+        fail = ConnectionResetError("closed") if not routers else None
+        routers.append(FakeAsyncRouter(conn, fail))
+        return routers[-1]
+
+    async def open_connection(bus):
+        return FakeConnection()
+    monkeypatch.setattr(wallpaper_async, "JEEPNEY_AVAILABLE", True)
+    monkeypatch.setattr(wallpaper_async, "DBusAddress", lambda *a, **k: None)
+    monkeypatch.setattr(wallpaper_async, "new_method_call", lambda *a: "msg")
+    monkeypatch.setattr(wallpaper_async, "MessageType",
+                        SimpleNamespace(error="error"))
+    monkeypatch.setattr(wallpaper_async, "DBusRouter", make_router)
+    monkeypatch.setattr(wallpaper_async, "open_dbus_connection", open_connection)
+
+    async def run():
+        transport = wallpaper_async.AsyncSessionBusTransport()
+        assert await transport.evaluate_script("x") == "ok"
+        await transport.close()
+
+    asyncio.run(run())
+    first, second = routers
+    assert first.exited and first.conn.closed
+    assert second.exited and second.conn.closed
+
+
+def test_future_api_runs_on_background_loop(fake):
+    future = wallpaper_async.change_wallpaper_future("/img/f.jpg", deadline=5)
+    assert isinstance(future, concurrent.futures.Future)
+    report = future.result(timeout=5)
+    assert isinstance(report, ApplyReport) and report.success
+
+
+def test_default_deadline_from_config(fake, monkeypatch):
+    monkeypatch.setattr(wallpaper, "_apply_deadline", 0.2)
+    fake.delays = {0: None}
+    report = asyncio.run(change_wallpaper_async("/img/a.jpg"))
+    assert report.timed_out
+
+
+class TestApplyThemeAsync:
+    def test_commits_after_success(self, monkeypatch):
+        plan = core._ApplyPlan(None, "t", "/themes/t", "t", "/themes/t/1.jpg",
+                               "UTC")
+        monkeypatch.setattr(core, "_prepare_apply", lambda *a: plan)
+        committed = []
+        monkeypatch.setattr(core, "_commit_apply", lambda p: committed.append(p)
+                            or core.ApplyResult(True, p.name, p.image_path))
+
+        async def ok(image_path, deadline=None):
+            return ApplyReport(image_path, [ScreenResult(0, True)])
+        monkeypatch.setattr(wallpaper_async, "change_wallpaper_async", ok)
+        result = core.apply_theme_async("t").result(timeout=5)
+        assert result.success and committed == [plan]
+
+    def test_no_commit_on_failure(self, monkeypatch):
+        plan = core._ApplyPlan(None, "t", "/themes/t", "t", "/themes/t/1.jpg",
+                               "UTC")
+        monkeypatch.setattr(core, "_prepare_apply", lambda *a: plan)
+        monkeypatch.setattr(core, "_commit_apply",
+                            lambda p: pytest.fail("committed a failed apply"))
+
+        async def failed(image_path, deadline=None):
+            return ApplyReport(image_path, [ScreenResult(0, False, "boom")])
+        monkeypatch.setattr(wallpaper_async, "change_wallpaper_async", failed)
+        result = core.apply_theme_async("t").result(timeout=5)
+        assert not result.success and "boom" in result.message
+
+    def test_selection_failure_is_immediate(self, monkeypatch):
+        monkeypatch.setattr(core, "_prepare_apply",
+                            lambda *a: core.ApplyResult(False, message="no theme"))
+        future = core.apply_theme_async("missing")
+        assert future.done() and future.result().message == "no theme"
@@ -1,9 +1,19 @@
 import pytest
 from unittest.mock import MagicMock
 from kwallpaper import wallpaper_changer
+from kwallpaper import plasma_dbus, wallpaper
 change_wallpaper = wallpaper_changer.change_wallpaper
 
 
+@pytest.fixture(autouse=True)
+def _gdbus_backend():
+    # subprocess.run is mocked below, so pin the subprocess transport
+    # and start from empty D-Bus caches.
+    plasma_dbus.set_backend("gdbus")
+    wallpaper.invalidate_screen_topology()
+    wallpaper.invalidate_current_wallpaper()
+
+
 def test_change_wallpaper_plasma_apply_fails(monkeypatch):
     """Test wallpaper change when gdbus fails (Plasma not running)."""
     mock_run = MagicMock()
@@ -14,7 +14,7 @@ or follows the system KDE theme by default.
 
 import sys
 import logging
-import json
+import concurrent.futures
 import socket
 import threading
 from pathlib import Path
@@ -43,8 +43,11 @@ try:
 except ImportError:
     PYQT6_AVAILABLE = False
 
+from kwallpaper import fswatch
 from kwallpaper.scheduler import SchedulerManager, create_scheduler
 from kwallpaper.schedule_preview import SchedulePreviewWidget
+from kwallpaper.selection import load_theme_data
+from kwallpaper.themes import image_files_for
 from kwallpaper.wallpaper_changer import (
     load_config, save_config, DEFAULT_CONFIG_PATH,
     discover_themes, extract_theme,
@@ -349,7 +352,10 @@ class _LoadSignals(QObject):
 class _OpWorker(QRunnable):
     """Runs a blocking core operation off the GUI thread.
 
-    The callable must return (success: bool, message: str).
+    The callable must return (success: bool, message: str[, detail]) — or
+    a concurrent.futures.Future resolving to that tuple, in which case the
+    pool thread returns at once and the signal is emitted when the Future
+    completes (e.g. an apply awaiting D-Bus on the asyncio loop).
     """
 
     def __init__(self, op: str, fn, sig: QObject):
@@ -361,14 +367,32 @@ class _OpWorker(QRunnable):
 
     def run(self):
         try:
-            success, message = self._fn()
+            result = self._fn()
         except Exception as e:
-            import traceback
-            logger.error(f"{self._op} failed: {e}")
-            logger.error(traceback.format_exc())
-            success, message = False, str(e)
+            self._fail(e)
+            return
+        if isinstance(result, concurrent.futures.Future):
+            result.add_done_callback(self._future_done)
+        else:
+            self._emit(result)
+
+    def _future_done(self, future: concurrent.futures.Future):
+        try:
+            self._emit(future.result())
+        except Exception as e:
+            self._fail(e)
+
+    def _emit(self, result):
+        success, message = result[0], result[1]
         self._sig.op_finished.emit(self._op, success, message)
 
+    def _fail(self, e: Exception):
+        import traceback
+        logger.error(f"{self._op} failed: {e}")
+        logger.error("".join(traceback.format_exception(
+            type(e), e, e.__traceback__)))
+        self._sig.op_finished.emit(self._op, False, str(e))
+
 
 class _LoadToken:
     """Monotonic generation counter used to cancel superseded loads."""
@@ -881,6 +905,8 @@ class ImageCrossFadeWidget(QWidget):
 class ThemesPage(QWidget):
     """Browse, preview, import, and apply wallpaper themes."""
 
+    _fs_changed = pyqtSignal(object)        # fswatch.FsEvent, queued to GUI thread
+
     def __init__(self, config_path: str, parent=None):
         super().__init__(parent)
         self._cfg = config_path
@@ -895,6 +921,32 @@ class ThemesPage(QWidget):
         self._signals = _LoadSignals(self)
         self._signals.op_finished.connect(self._on_op_finished)
         self._build()
+        # Themes added/removed and config edits made outside the GUI (CLI,
+        # file manager, text editor).  The watcher calls back on its own
+        # thread, so only the queued signal is emitted from there.
+        self._fs_changed.connect(self._on_fs_changed)
+        self._unwatch = None
+        self._watch_files()
+
+    def _watch_files(self):
+        try:
+            unwatch = fswatch.get_watcher(self._cfg).subscribe(
+                self._fs_changed.emit)
+        except Exception as e:
+            logger.warning(f"File watcher unavailable: {e}")
+            return
+        self._unwatch = unwatch
+        # The shared watcher thread outlives this widget: drop the
+        # subscription together with the C++ object, or the watcher keeps
+        # emitting on a deleted QObject.  (A closure, not a bound method:
+        # slots of the dying object are disconnected before destroyed.)
+        self.destroyed.connect(lambda *_: unwatch())
+
+    def stop_watching(self):
+        """Unsubscribe from the file watcher (window cleanup)."""
+        if self._unwatch is not None:
+            self._unwatch()
+            self._unwatch = None
 
     # ── construction ----------------------------------------------------------
     def _build(self):
@@ -1016,6 +1068,22 @@ class ThemesPage(QWidget):
         self.schedule_preview.refresh(self._cfg, theme_path)
 
     # ── slots -----------------------------------------------------------------
+    def _on_fs_changed(self, event):
+        """Slot: the themes directory or the config changed on disk."""
+        if fswatch.THEMES in event.kinds:
+            cur = self.theme_list.currentItem()
+            selected = cur.data(Qt.ItemDataRole.UserRole) if cur else None
+            self._image_cache.clear()
+            self.load_themes()
+            for row in range(self.theme_list.count()):
+                if self.theme_list.item(row).data(
+                        Qt.ItemDataRole.UserRole) == selected:
+                    self.theme_list.setCurrentRow(row)
+                    break
+        if fswatch.CONFIG in event.kinds:
+            # Location / time model edits move the schedule preview.
+            self.refresh_schedule_preview()
+
     def _on_select(self, cur, _prev):
         if cur is None:
             self.apply_btn.setEnabled(False)
@@ -1165,12 +1233,24 @@ class ThemesPage(QWidget):
             self._signals))
 
     def _apply_worker(self, folder_path: str):
-        """Blocking theme apply (worker thread)."""
-        from kwallpaper.core import apply_theme
-        result = apply_theme(folder_path, self._cfg)
-        if result.success:
-            return (True, f"Applied: {result.theme_name}", "")
-        return (False, f"Failed to apply: {result.message}", "")
+        """Theme apply (worker thread): picks the image here, then hands the
+        D-Bus sets to the asyncio loop and returns a Future."""
+        from kwallpaper.core import apply_theme_async
+        pending = apply_theme_async(folder_path, self._cfg)
+        outcome = concurrent.futures.Future()
+
+        def _done(f):
+            try:
+                result = f.result()
+            except Exception as e:
+                outcome.set_exception(e)
+                return
+            if result.success:
+                outcome.set_result((True, f"Applied: {result.theme_name}", ""))
+            else:
+                outcome.set_result((False, f"Failed to apply: {result.message}", ""))
+        pending.add_done_callback(_done)
+        return outcome
 
     # ── helpers ---------------------------------------------------------------
     def _update_delete_button_state(self, running: bool):
@@ -1186,33 +1266,6 @@ class ThemesPage(QWidget):
         w = self.window()
         if isinstance(w, QMainWindow):
             w.statusBar().showMessage(msg, ms)
-    def _discover_images(self, theme_path: str) -> list[str]:
-        """Discover all image files in theme directory in one glob call."""
-        images = []
-        try:
-            # Single glob to get all JPEG/PNG files - much faster than 3 globs
-            for f in Path(theme_path).glob("*.jpeg"):
-                images.append((f.stem, str(f)))
-            for f in Path(theme_path).glob("*.jpg"):
-                images.append((f.stem, str(f)))
-            for f in Path(theme_path).glob("*.png"):
-                images.append((f.stem, str(f)))
-
-            # Filter for index pattern and sort by index
-            result: list[str] = []
-            for name, path in sorted(images, key=lambda x: int(x[0].rsplit("_", 1)[-1])):
-                try:
-                    if "_" in name:
-                        idx = int(name.rsplit("_", 1)[-1])
-                        if 1 <= idx <= 16:
-                            result.append(path)
-                except (ValueError, IndexError):
-                    continue
-            return result
-        except Exception as e:
-            logger.error(f"Image discovery error: {e}")
-            return []
-
     def _images_for(self, theme_path: str) -> list[str]:
         """Return sorted image file paths (indices 1-16) for a theme."""
         # Check cache first - eliminates 48+ glob() calls on repeated selection
@@ -1221,21 +1274,16 @@ class ThemesPage(QWidget):
 
         result: list[str] = []
         try:
-            jf = next(Path(theme_path).glob("*.json"), None)
-            if not jf:
-                return result
-            with open(jf) as fh:
-                data = json.load(fh)
-            # Discover images in one pass instead of 48 individual calls
-            images = self._discover_images(theme_path)
-            # Filter to indices 1-16
-            for path in images:
-                stem = Path(path).stem
+            # The theme's own image list (served by its manifest when
+            # fresh) instead of a theme.json parse and three globs.
+            theme_dir = Path(theme_path)
+            for path in image_files_for(theme_dir, load_theme_data(theme_dir)):
+                stem = path.stem
                 try:
                     if "_" in stem:
                         idx = int(stem.rsplit("_", 1)[-1])
                         if 1 <= idx <= 16:
-                            result.append(path)
+                            result.append(str(path))
                 except (ValueError, IndexError):
                     continue
         except Exception as e:
@@ -1976,6 +2024,8 @@ class WallpaperChangerWindow(QMainWindow):
             # blocking the GUI thread here could stall for the full cycle
             # interval (gdbus calls).
             self.sched.scheduler.stop(wait=False)
+        self.themes.stop_watching()
+        fswatch.stop_watchers()
 
     def _maybe_start_scheduler(self):
         """Auto-start scheduler if enabled in config."""